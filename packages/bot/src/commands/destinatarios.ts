@@ -1,5 +1,5 @@
 import type { BotContext } from "../types.js";
-import { prisma } from "@mediabot/shared";
+import { prisma, invalidateRecipientCache } from "@mediabot/shared";
 import type { RecipientType } from "@prisma/client";
 
 /**
@@ -170,6 +170,7 @@ export async function handleDesvincular(ctx: BotContext) {
     where: { id: recipient.id },
     data: { active: false },
   });
+  await invalidateRecipientCache();
 
   // Limpiar campos legacy si corresponden
   if (recipient.type === "AGENCY_INTERNAL" && client.telegramGroupId === chatId) {
@@ -1,5 +1,5 @@
 import type { BotContext } from "../types.js";
-import { prisma } from "@mediabot/shared";
+import { prisma, invalidateRecipientCache } from "@mediabot/shared";
 
 /**
  * Comando /vincular_org - Vincula un grupo o chat a una organización.
@@ -68,6 +68,7 @@ export async function handleVincularOrg(ctx: BotContext) {
       addedBy: ctx.session.userId,
     },
   });
+  await invalidateRecipientCache();
 
   await ctx.reply(
     `✅ ${isPrivate ? "Chat" : "Grupo"} vinculado a la organización *${org.name}*.\n\n` +
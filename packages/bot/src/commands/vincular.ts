@@ -1,5 +1,5 @@
 import type { BotContext } from "../types.js";
-import { prisma } from "@mediabot/shared";
+import { prisma, invalidateRecipientCache } from "@mediabot/shared";
 import type { RecipientType } from "@prisma/client";
 
 /**
@@ -110,6 +110,7 @@ export async function handleVincular(ctx: BotContext) {
         addedBy: ctx.session.userId,
       },
     });
+    await invalidateRecipientCache();
 
     await ctx.reply(
       `✅ ${isPrivate ? "Chat" : "Grupo"} reactivado como *${typeLabel}* para ${client.name}.\n` +
@@ -134,6 +135,7 @@ export async function handleVincular(ctx: BotContext) {
       addedBy: ctx.session.userId,
     },
   });
+  await invalidateRecipientCache();
 
   // Actualizar campos legacy para compatibilidad
   if (recipientType === "AGENCY_INTERNAL" && !client.telegramGroupId) {
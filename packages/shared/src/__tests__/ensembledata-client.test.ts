@@ -438,6 +438,39 @@ describe("EnsembleDataClient", () => {
       expect(comments).toHaveLength(25);
       expect(mockFetch).toHaveBeenCalledTimes(2);
     });
+    it("omite comentarios ya almacenados sin cortar la paginación (orden por relevancia)", async () => {
+      const ytComment = (id: string) => ({
+        commentThreadRenderer: {
+          comment: {
+            properties: { commentId: id, content: { content: id }, publishedTime: "1 hour ago" },
+            author: { channelId: `UC_${id}`, displayName: id },
+            toolbar: {},
+          },
+        },
+      });
+      // El top comment ya almacenado llega primero en cada página
+      mockFetch.mockResolvedValueOnce({
+        ok: true,
+        json: async () => ({
+          data: { comments: [ytComment("top_known"), ytComment("new_1")], nextCursor: "page2" },
+          units_charged: 1,
+        }),
+      });
+      mockFetch.mockResolvedValueOnce({
+        ok: true,
+        json: async () => ({
+          data: { comments: [ytComment("known_2"), ytComment("new_2")] },
+          units_charged: 1,
+        }),
+      });
+
+      const comments = await client.getYouTubeVideoComments("abc123", 40, {
+        knownCommentIds: new Set(["top_known", "known_2"]),
+      });
+
+      expect(comments.map((c) => c.commentId)).toEqual(["new_1", "new_2"]);
+      expect(mockFetch).toHaveBeenCalledTimes(2);
+    });
   });
 
   describe("validateHandle - YOUTUBE", () => {
@@ -654,5 +687,79 @@ describe("EnsembleDataClient", () => {
       expect(comments).toHaveLength(20);
       expect(mockFetch).toHaveBeenCalledTimes(2);
     });
+
+    it("detiene la paginación al encontrar un comentario ya almacenado", async () => {
+      mockFetch.mockResolvedValueOnce({
+        ok: true,
+        json: async () => ({
+          data: {
+            comments: [
+              { node: { pk: "new_1", text: "Nuevo", user: { username: "a" } } },
+              { node: { pk: "new_2", text: "Nuevo 2", user: { username: "b" } } },
+              { node: { pk: "old_1", text: "Ya guardado", user: { username: "c" } } },
+              { node: { pk: "old_2", text: "Ya guardado 2", user: { username: "d" } } },
+            ],
+            nextCursor: "next_page_token",
+          },
+          units_charged: 4,
+        }),
+      });
+
+      const comments = await client.getInstagramPostComments("media123", 30, {
+        knownCommentIds: new Set(["old_1"]),
+      });
+      expect(comments.map((c) => c.commentId)).toEqual(["new_1", "new_2"]);
+      // No pide la siguiente página
+      expect(mockFetch).toHaveBeenCalledTimes(1);
+      // Refresco incremental usa orden cronológico
+      expect(mockFetch.mock.calls[0][0]).toContain("sorting=recent");
+    });
+  });
+
+  // ==================== TIKTOK COMMENTS ====================
+
+  describe("getTikTokPostComments", () => {
+    const ttComment = (cid: string) => ({
+      cid,
+      text: `Comentario ${cid}`,
+      create_time: 1770754306,
+      digg_count: 3,
+      user: { unique_id: `user_${cid}`, nickname: cid },
+    });
+
+    it("normaliza comentarios", async () => {
+      mockFetch.mockResolvedValueOnce({
+        ok: true,
+        json: async () => ({ data: { comments: [ttComment("c1")] }, units_charged: 1 }),
+      });
+
+      const comments = await client.getTikTokPostComments("7300000000000000000", 30);
+      expect(comments).toHaveLength(1);
+      expect(comments[0].commentId).toBe("c1");
+      expect(comments[0].authorHandle).toBe("user_c1");
+      expect(comments[0].likes).toBe(3);
+    });
+
+    it("omite comentarios ya almacenados sin cortar la paginación (orden por relevancia)", async () => {
+      mockFetch.mockResolvedValueOnce({
+        ok: true,
+        json: async () => ({
+          data: { comments: [ttComment("top_known"), ttComment("new_1")], nextCursor: 30 },
+          units_charged: 1,
+        }),
+      });
+      mockFetch.mockResolvedValueOnce({
+        ok: true,
+        json: async () => ({ data: { comments: [ttComment("new_2"), ttComment("known_2")] }, units_charged: 1 }),
+      });
+
+      const comments = await client.getTikTokPostComments("7300000000000000000", 60, {
+        knownCommentIds: new Set(["top_known", "known_2"]),
+      });
+
+      expect(comments.map((c) => c.commentId)).toEqual(["new_1", "new_2"]);
+      expect(mockFetch).toHaveBeenCalledTimes(2);
+      expect(mockFetch.mock.calls[1][0]).toContain("cursor=30");
+    });
   });
 });
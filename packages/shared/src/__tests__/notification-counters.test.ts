@@ -0,0 +1,88 @@
+/**
+ * Tests para los contadores de no leídas: lectura del contador, recálculo en
+ * frío protegido por generación y ajustes en lote.
+ */
+import { describe, it, expect, vi, beforeEach } from "vitest";
+
+const redis = vi.hoisted(() => ({
+  connect: vi.fn().mockResolvedValue(undefined),
+  mget: vi.fn(),
+  eval: vi.fn().mockResolvedValue(0),
+  set: vi.fn(),
+}));
+
+vi.mock("ioredis", () => ({
+  default: vi.fn().mockImplementation(() => redis),
+}));
+
+vi.mock("../config", () => ({
+  config: { redis: { url: "redis://localhost:6379" } },
+}));
+
+import { adjustUnreadCounts, getUnreadCount, resetUnreadCounts } from "../notification-counters";
+
+describe("notification counters", () => {
+  beforeEach(() => {
+    redis.mget.mockReset();
+    redis.eval.mockClear();
+  });
+
+  it("usa el contador existente sin consultar la DB", async () => {
+    redis.mget.mockResolvedValue(["4", "7"]);
+    const countFromDb = vi.fn();
+
+    expect(await getUnreadCount("user-1", countFromDb)).toBe(4);
+    expect(countFromDb).not.toHaveBeenCalled();
+  });
+
+  it("guarda el recálculo condicionado a la generación leída antes de contar", async () => {
+    redis.mget.mockResolvedValue([null, "7"]);
+
+    expect(await getUnreadCount("user-1", async () => 3)).toBe(3);
+
+    const [, numKeys, key, genKey, count, , generation] = redis.eval.mock.calls[0];
+    expect(numKeys).toBe(2);
+    expect(key).toBe("notifications:unread:user-1");
+    expect(genKey).toBe("notifications:unread:user-1:gen");
+    expect(count).toBe(3);
+    expect(generation).toBe("7");
+  });
+
+  it("sin generación previa compara contra vacío", async () => {
+    redis.mget.mockResolvedValue([null, null]);
+
+    await getUnreadCount("user-1", async () => 0);
+
+    expect(redis.eval.mock.calls[0].at(-1)).toBe("");
+  });
+
+  it("ajusta todos los usuarios en una sola llamada, con su generación", async () => {
+    await adjustUnreadCounts(["a", "b"], 1);
+
+    expect(redis.eval).toHaveBeenCalledTimes(1);
+    const [, numKeys, ...rest] = redis.eval.mock.calls[0];
+    expect(numKeys).toBe(4);
+    expect(rest.slice(0, 4)).toEqual([
+      "notifications:unread:a",
+      "notifications:unread:a:gen",
+      "notifications:unread:b",
+      "notifications:unread:b:gen",
+    ]);
+  });
+
+  it("si el ajuste falla descarta los contadores", async () => {
+    redis.eval.mockRejectedValueOnce(new Error("Redis down"));
+
+    await adjustUnreadCounts(["a"], -1);
+
+    expect(redis.eval).toHaveBeenCalledTimes(2);
+    expect(redis.eval.mock.calls[1].slice(1, 4)).toEqual([2, "notifications:unread:a", "notifications:unread:a:gen"]);
+  });
+
+  it("no llama a Redis sin usuarios", async () => {
+    await resetUnreadCounts([]);
+    await adjustUnreadCounts([], 1);
+
+    expect(redis.eval).not.toHaveBeenCalled();
+  });
+});
@@ -0,0 +1,157 @@
+/**
+ * Tests para el snapshot de settings: carga en una consulta, getter síncrono
+ * e invalidación entre procesos via Redis pub/sub.
+ */
+import { describe, it, expect, vi, beforeEach } from "vitest";
+
+// Instancias de Redis creadas por el módulo (publisher y subscriber)
+const redisState = vi.hoisted(() => ({ instances: [] as any[] }));
+
+vi.mock("ioredis", () => ({
+  default: vi.fn().mockImplementation(() => {
+    const instance = {
+      handlers: {} as Record<string, (...args: string[]) => void>,
+      connect: vi.fn().mockResolvedValue(undefined),
+      subscribe: vi.fn().mockResolvedValue(1),
+      publish: vi.fn().mockResolvedValue(1),
+      on: vi.fn((event: string, handler: (...args: string[]) => void) => {
+        instance.handlers[event] = handler;
+      }),
+    };
+    redisState.instances.push(instance);
+    return instance;
+  }),
+}));
+
+vi.mock("../config", () => ({
+  config: { redis: { url: "redis://localhost:6379" } },
+}));
+
+vi.mock("../prisma", () => ({
+  prisma: {
+    setting: {
+      findMany: vi.fn(),
+      upsert: vi.fn(),
+    },
+  },
+}));
+
+import { prisma } from "../prisma";
+import {
+  SETTINGS_INVALIDATION_CHANNEL,
+  getSettingNumber,
+  getSettingNumberSync,
+  invalidateSettingsCache,
+  prefetchSettings,
+  setSettingValue,
+} from "../settings";
+
+const findMany = prisma.setting.findMany as ReturnType<typeof vi.fn>;
+
+function subscriber() {
+  return redisState.instances.find((r) => r.handlers.message);
+}
+
+describe("settings snapshot", () => {
+  beforeEach(async () => {
+    findMany.mockReset();
+    findMany.mockResolvedValue([
+      { key: "urgency.critical_min_relevance", value: "9", type: "NUMBER" },
+      { key: "crisis.window_minutes", value: "30", type: "NUMBER" },
+    ]);
+    // Partir de un snapshot vencido en cada test
+    invalidateSettingsCache();
+    await prefetchSettings();
+    findMany.mockClear();
+  });
+
+  it("resuelve varias claves sin consultar de nuevo la DB", async () => {
+    expect(await getSettingNumber("urgency.critical_min_relevance", 8)).toBe(9);
+    expect(await getSettingNumber("crisis.window_minutes", 60)).toBe(30);
+    expect(await getSettingNumber("no.existe", 4)).toBe(4);
+    expect(findMany).not.toHaveBeenCalled();
+  });
+
+  it("expone un getter síncrono", () => {
+    expect(getSettingNumberSync("urgency.critical_min_relevance", 8)).toBe(9);
+    expect(getSettingNumberSync("no.existe", 7)).toBe(7);
+  });
+
+  it("setSettingValue actualiza el snapshot local y avisa a los demás procesos", async () => {
+    (prisma.setting.upsert as ReturnType<typeof vi.fn>).mockResolvedValue({
+      key: "crisis.window_minutes",
+      value: "15",
+      type: "NUMBER",
+    });
+
+    await setSettingValue("crisis.window_minutes", "15", "NUMBER");
+
+    expect(getSettingNumberSync("crisis.window_minutes", 60)).toBe(15);
+    const publisher = redisState.instances.find((r) => r.publish.mock.calls.length > 0);
+    const [channel, payload] = publisher.publish.mock.calls.at(-1)!;
+    expect(channel).toBe(SETTINGS_INVALIDATION_CHANNEL);
+    expect(JSON.parse(payload)).toMatchObject({ key: "crisis.window_minutes" });
+  });
+
+  it("recarga el snapshot al recibir la invalidación de otro proceso", async () => {
+    findMany.mockResolvedValue([{ key: "crisis.window_minutes", value: "45", type: "NUMBER" }]);
+
+    subscriber().handlers.message(SETTINGS_INVALIDATION_CHANNEL, JSON.stringify({ origin: "otro", key: null }));
+    await prefetchSettings();
+
+    expect(findMany).toHaveBeenCalledTimes(1);
+    expect(getSettingNumberSync("crisis.window_minutes", 60)).toBe(45);
+  });
+
+  it("descarta una carga en curso si llega una invalidación y vuelve a consultar", async () => {
+    let resolveStale!: (rows: unknown[]) => void;
+    findMany
+      .mockReturnValueOnce(new Promise((resolve) => (resolveStale = resolve)))
+      .mockResolvedValueOnce([{ key: "crisis.window_minutes", value: "45", type: "NUMBER" }]);
+
+    invalidateSettingsCache();
+    const load = prefetchSettings();
+    subscriber().handlers.message(SETTINGS_INVALIDATION_CHANNEL, JSON.stringify({ origin: "otro", key: null }));
+    // La primera consulta empezó antes de la escritura en el otro proceso
+    resolveStale([{ key: "crisis.window_minutes", value: "30", type: "NUMBER" }]);
+    await load;
+
+    expect(findMany).toHaveBeenCalledTimes(2);
+    expect(getSettingNumberSync("crisis.window_minutes", 60)).toBe(45);
+  });
+
+  it("una carga en curso no pisa el valor escrito por setSettingValue", async () => {
+    let resolveStale!: (rows: unknown[]) => void;
+    findMany
+      .mockReturnValueOnce(new Promise((resolve) => (resolveStale = resolve)))
+      .mockResolvedValueOnce([{ key: "crisis.window_minutes", value: "15", type: "NUMBER" }]);
+    (prisma.setting.upsert as ReturnType<typeof vi.fn>).mockResolvedValue({
+      key: "crisis.window_minutes",
+      value: "15",
+      type: "NUMBER",
+    });
+
+    invalidateSettingsCache();
+    const load = prefetchSettings();
+    await setSettingValue("crisis.window_minutes", "15", "NUMBER");
+    resolveStale([{ key: "crisis.window_minutes", value: "30", type: "NUMBER" }]);
+    await load;
+
+    expect(getSettingNumberSync("crisis.window_minutes", 60)).toBe(15);
+  });
+
+  it("ignora sus propios mensajes", async () => {
+    (prisma.setting.upsert as ReturnType<typeof vi.fn>).mockResolvedValue({
+      key: "crisis.window_minutes",
+      value: "20",
+      type: "NUMBER",
+    });
+    await setSettingValue("crisis.window_minutes", "20", "NUMBER");
+    const publisher = redisState.instances.find((r) => r.publish.mock.calls.length > 0);
+    const [, ownPayload] = publisher.publish.mock.calls.at(-1)!;
+
+    subscriber().handlers.message(SETTINGS_INVALIDATION_CHANNEL, ownPayload);
+
+    expect(findMany).not.toHaveBeenCalled();
+  });
+});
@@ -26,6 +26,9 @@ export const config = {
   },
   telegram: {
     botToken: requireEnv("TELEGRAM_BOT_TOKEN", process.env.NODE_ENV === "test" ? "test-token" : undefined),
+    // Límites de envío de la API (compartidos entre réplicas vía Redis)
+    globalRatePerSecond: optionalEnvInt("TELEGRAM_GLOBAL_RATE_PER_SECOND", 30),
+    perChatIntervalMs: optionalEnvInt("TELEGRAM_PER_CHAT_INTERVAL_MS", 1000),
   },
   google: {
     cseApiKey: optionalEnv("GOOGLE_CSE_API_KEY", ""),
@@ -58,10 +61,25 @@ export const config = {
       concurrency: optionalEnvInt("ANALYSIS_WORKER_CONCURRENCY", 3),
       rateLimitMax: optionalEnvInt("ANALYSIS_RATE_LIMIT_MAX", 20),
       rateLimitWindowMs: optionalEnvInt("ANALYSIS_RATE_LIMIT_WINDOW_MS", 60000),
+      // Menciones del mismo cliente analizadas en una sola llamada a Gemini
+      batchSize: optionalEnvInt("ANALYSIS_BATCH_SIZE", 5),
     },
     notification: {
       concurrency: optionalEnvInt("NOTIFICATION_WORKER_CONCURRENCY", 5),
+      // Ventana de agrupación de alertas/temas no críticos por destinatario y cliente (0 = desactivada)
+      coalesceWindowSeconds: optionalEnvInt("NOTIFY_COALESCE_WINDOW_SECONDS", 60),
     },
+    telegramDelivery: {
+      concurrency: optionalEnvInt("TELEGRAM_DELIVERY_CONCURRENCY", 10),
+    },
+    digest: {
+      // Clientes procesados en paralelo por el digest diario
+      concurrency: optionalEnvInt("DIGEST_CONCURRENCY", 5),
+    },
+  },
+  // Clustering de menciones: expiración del índice LSH de candidatos (24-72 h)
+  clustering: {
+    lshTtlHours: optionalEnvInt("CLUSTER_LSH_TTL_HOURS", 48),
   },
   // Job retry configuration
   jobs: {
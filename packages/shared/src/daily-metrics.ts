@@ -0,0 +1,116 @@
+import { prisma } from "./prisma";
+
+/**
+ * Lectura del rollup diario por cliente (ClientDailyMetrics). Lo escriben los
+ * workers (incremental + reconstrucción nocturna); aquí solo se suman rangos
+ * de días completos (UTC).
+ */
+
+export interface DailyMetricsTotals {
+  mentions: number;
+  positive: number;
+  negative: number;
+  neutral: number;
+  mixed: number;
+  critical: number;
+  high: number;
+  medium: number;
+  low: number;
+  tier1: number;
+  tier2: number;
+  tier3: number;
+  weightedMentions: number;
+  socialMentions: number;
+  socialEngaged: number;
+  socialEngagement: number;
+}
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+const SUM_FIELDS = {
+  mentions: true,
+  positive: true,
+  negative: true,
+  neutral: true,
+  mixed: true,
+  critical: true,
+  high: true,
+  medium: true,
+  low: true,
+  tier1: true,
+  tier2: true,
+  tier3: true,
+  weightedMentions: true,
+  socialMentions: true,
+  socialEngaged: true,
+  socialEngagement: true,
+} as const;
+
+export function emptyDailyMetrics(): DailyMetricsTotals {
+  const totals = {} as DailyMetricsTotals;
+  for (const field of Object.keys(SUM_FIELDS) as (keyof DailyMetricsTotals)[]) totals[field] = 0;
+  return totals;
+}
+
+/**
+ * Primer día (UTC) de una ventana de `days` días que termina hoy:
+ * metricsSince(7) cubre hoy y los 6 días anteriores.
+ */
+export function metricsSince(days: number, now: Date = new Date()): Date {
+  const today = Math.floor(now.getTime() / DAY_MS) * DAY_MS;
+  return new Date(today - (days - 1) * DAY_MS);
+}
+
+/**
+ * Totales por cliente en [from, to] (días). Clientes sin filas no aparecen.
+ */
+export async function sumDailyMetricsByClient(
+  clientIds: string[],
+  from: Date,
+  to?: Date
+): Promise<Map<string, DailyMetricsTotals>> {
+  const totals = new Map<string, DailyMetricsTotals>();
+  if (clientIds.length === 0) return totals;
+
+  const rows = await prisma.clientDailyMetrics.groupBy({
+    by: ["clientId"],
+    where: {
+      clientId: { in: clientIds },
+      date: to ? { gte: from, lte: to } : { gte: from },
+    },
+    _sum: SUM_FIELDS,
+  });
+
+  for (const row of rows) {
+    const sum = emptyDailyMetrics();
+    for (const field of Object.keys(SUM_FIELDS) as (keyof DailyMetricsTotals)[]) {
+      sum[field] = row._sum[field] ?? 0;
+    }
+    totals.set(row.clientId, sum);
+  }
+  return totals;
+}
+
+/** Menciones por día de un conjunto de clientes en [from, to] */
+export async function dailyMentionSeries(
+  clientIds: string[],
+  from: Date,
+  to?: Date
+): Promise<Map<string, number>> {
+  const series = new Map<string, number>();
+  if (clientIds.length === 0) return series;
+
+  const rows = await prisma.clientDailyMetrics.groupBy({
+    by: ["date"],
+    where: {
+      clientId: { in: clientIds },
+      date: to ? { gte: from, lte: to } : { gte: from },
+    },
+    _sum: { mentions: true },
+  });
+
+  for (const row of rows) {
+    series.set(row.date.toISOString().slice(0, 10), row._sum.mentions ?? 0);
+  }
+  return series;
+}
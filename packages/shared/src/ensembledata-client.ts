@@ -181,6 +181,18 @@ export interface SocialComment {
   postedAt: Date | null;
 }
 
+/**
+ * Opciones para extracción incremental de comentarios.
+ * Instagram se pide en orden cronológico ("recent"): al encontrar un
+ * comentario ya almacenado se detiene la paginación (el resto ya se tiene).
+ * YouTube y TikTok solo devuelven orden por relevancia, donde los comentarios
+ * ya almacenados aparecen mezclados con los nuevos: se omiten y se sigue
+ * paginando hasta el máximo.
+ */
+export interface CommentFetchOptions {
+  knownCommentIds?: Set<string>;
+}
+
 // Unified Response
 export interface SocialPost {
   platform: SocialPlatform;
@@ -952,7 +964,11 @@ class EnsembleDataClient {
    * Endpoint: /youtube/video/comments
    * Estructura: data.comments[].commentThreadRenderer.comment.{properties, author, toolbar}
    */
-  async getYouTubeVideoComments(videoId: string, maxComments: number = 30): Promise<SocialComment[]> {
+  async getYouTubeVideoComments(
+    videoId: string,
+    maxComments: number = 30,
+    options: CommentFetchOptions = {}
+  ): Promise<SocialComment[]> {
     const allComments: SocialComment[] = [];
     let cursor: string | undefined;
     const maxRequests = Math.ceil(maxComments / 20);
@@ -972,9 +988,12 @@ class EnsembleDataClient {
         const comments = (data?.comments || []) as any[];
         if (comments.length === 0) break;
 
+        // Orden por relevancia: un comentario ya almacenado no implica que el resto lo esté
         for (const comment of comments) {
           if (allComments.length >= maxComments) break;
-          allComments.push(this.normalizeYouTubeComment(comment));
+          const normalized = this.normalizeYouTubeComment(comment);
+          if (options.knownCommentIds?.has(normalized.commentId)) continue;
+          allComments.push(normalized);
         }
 
         // Paginación usa nextCursor
@@ -1102,9 +1121,14 @@ class EnsembleDataClient {
    *
    * @param postId - ID del post de TikTok
    * @param maxComments - Máximo de comentarios a extraer (default: 60, max: 2 requests)
+   * @param options - knownCommentIds para omitir comentarios ya almacenados
    * @returns Array de comentarios normalizados
    */
-  async getTikTokPostComments(postId: string, maxComments: number = 60): Promise<SocialComment[]> {
+  async getTikTokPostComments(
+    postId: string,
+    maxComments: number = 60,
+    options: CommentFetchOptions = {}
+  ): Promise<SocialComment[]> {
     const allComments: SocialComment[] = [];
     let cursor: number | undefined;
     const commentsPerRequest = 30;
@@ -1128,9 +1152,12 @@ class EnsembleDataClient {
         const comments = response.data?.comments || [];
         if (comments.length === 0) break;
 
+        // Orden por relevancia: un comentario ya almacenado no implica que el resto lo esté
         for (const comment of comments) {
           if (allComments.length >= maxComments) break;
-          allComments.push(this.normalizeTikTokComment(comment));
+          const normalized = this.normalizeTikTokComment(comment);
+          if (options.knownCommentIds?.has(normalized.commentId)) continue;
+          allComments.push(normalized);
         }
 
         // Paginación usa nextCursor
@@ -1158,9 +1185,14 @@ class EnsembleDataClient {
    *
    * @param shortcode - Shortcode del post de Instagram (ej: "CxYz123AbC")
    * @param maxComments - Máximo de comentarios a extraer (default: 30, max: 3 requests)
+   * @param options - knownCommentIds para extracción incremental (usa orden "recent")
    * @returns Array de comentarios normalizados
    */
-  async getInstagramPostComments(mediaId: string, maxComments: number = 30): Promise<SocialComment[]> {
+  async getInstagramPostComments(
+    mediaId: string,
+    maxComments: number = 30,
+    options: CommentFetchOptions = {}
+  ): Promise<SocialComment[]> {
     const allComments: SocialComment[] = [];
     let cursor = "";
     const commentsPerRequest = 15;
@@ -1171,7 +1203,8 @@ class EnsembleDataClient {
         const params: Record<string, string | number | boolean> = {
           media_id: mediaId,
           cursor,
-          sorting: "popular",
+          // En refresco incremental se necesita orden cronológico para cortar en lo ya almacenado
+          sorting: options.knownCommentIds ? "recent" : "popular",
         };
 
         const response = await this.request<{
@@ -1183,11 +1216,18 @@ class EnsembleDataClient {
         const rawComments = response.data?.comments || [];
         if (rawComments.length === 0) break;
 
+        let reachedKnown = false;
         for (const wrapper of rawComments) {
           if (allComments.length >= maxComments) break;
           const comment = wrapper.node || wrapper;
-          allComments.push(this.normalizeInstagramComment(comment as InstagramComment));
+          const normalized = this.normalizeInstagramComment(comment as InstagramComment);
+          if (options.knownCommentIds?.has(normalized.commentId)) {
+            reachedKnown = true;
+            break;
+          }
+          allComments.push(normalized);
         }
+        if (reachedKnown) break;
 
         // Paginación usa nextCursor
         const nextCursor = response.data?.nextCursor;
@@ -3,6 +3,9 @@ export * from "./types";
 export * from "./config";
 export * from "./queue-client";
 export * from "./settings";
+export * from "./daily-metrics";
+export * from "./recipient-cache";
+export * from "./notification-counters";
 export {
   getGeminiClient,
   getGeminiModel,
@@ -18,6 +21,7 @@ export {
   type SocialPlatform,
   type SocialPost,
   type SocialComment,
+  type CommentFetchOptions,
   type TwitterUserInfo,
   type InstagramUserInfo,
   type TikTokUserInfo,
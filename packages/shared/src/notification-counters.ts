@@ -0,0 +1,135 @@
+/**
+ * Contadores de notificaciones in-app no leídas por usuario.
+ *
+ * NotificationBell consulta el conteo cada 30s por pestaña abierta. En vez de
+ * un COUNT(*) WHERE read = false por consulta, el conteo vive en Redis
+ * (`notifications:unread:{userId}`): se calcula desde la DB la primera vez,
+ * los workers lo incrementan al crear notificaciones y el router lo ajusta al
+ * marcar como leídas. Cada ajuste sube además una generación por usuario
+ * (`notifications:unread:{userId}:gen`) que protege el recálculo en frío. El
+ * TTL acota cualquier desfase.
+ */
+import { getSharedRedis } from "./redis-client";
+
+export const UNREAD_COUNT_KEY_PREFIX = "notifications:unread:";
+
+/** Vida del contador; al expirar se recalcula desde la DB */
+const UNREAD_COUNT_TTL_SECONDS = 24 * 60 * 60;
+
+// KEYS = pares (contador, generación). Solo ajusta contadores existentes: sin
+// valor base, incrementar desde 0 daría un conteo incorrecto. Nunca baja de 0.
+// La generación sube siempre, para que un recálculo en curso sepa que llegó
+// tarde (ver STORE_SCRIPT).
+const ADJUST_SCRIPT = `
+local ttl = tonumber(ARGV[2])
+for i = 1, #KEYS, 2 do
+  local key = KEYS[i]
+  redis.call("INCR", KEYS[i + 1])
+  redis.call("EXPIRE", KEYS[i + 1], ttl)
+  if redis.call("EXISTS", key) == 1 then
+    local value = redis.call("INCRBY", key, ARGV[1])
+    if value < 0 then redis.call("SET", key, 0) end
+    redis.call("EXPIRE", key, ttl)
+  end
+end
+return 0
+`;
+
+// Guarda un conteo recalculado desde la DB solo si nadie lo escribió ni lo
+// ajustó/descartó mientras se contaba (la generación sigue igual).
+const STORE_SCRIPT = `
+local generation = redis.call("GET", KEYS[2]) or ""
+if generation ~= ARGV[3] then return 0 end
+if redis.call("SET", KEYS[1], ARGV[1], "EX", ARGV[2], "NX") then return 1 end
+return 0
+`;
+
+// KEYS = pares (contador, generación)
+const RESET_SCRIPT = `
+local ttl = tonumber(ARGV[1])
+for i = 1, #KEYS, 2 do
+  redis.call("DEL", KEYS[i])
+  redis.call("INCR", KEYS[i + 1])
+  redis.call("EXPIRE", KEYS[i + 1], ttl)
+end
+return 0
+`;
+
+function unreadKey(userId: string): string {
+  return `${UNREAD_COUNT_KEY_PREFIX}${userId}`;
+}
+
+function generationKey(userId: string): string {
+  return `${UNREAD_COUNT_KEY_PREFIX}${userId}:gen`;
+}
+
+function counterKeyPairs(userIds: string[]): string[] {
+  return userIds.flatMap((userId) => [unreadKey(userId), generationKey(userId)]);
+}
+
+/**
+ * Conteo de no leídas del usuario: del contador si existe, si no de
+ * `countFromDb`. El conteo recalculado solo se guarda si ningún ajuste llegó
+ * mientras se contaba: una notificación creada en medio no incrementa un
+ * contador inexistente, y guardar el conteo previo la perdería hasta el TTL.
+ */
+export async function getUnreadCount(userId: string, countFromDb: () => Promise<number>): Promise<number> {
+  let generation: string | null;
+  try {
+    const [cached, current] = await getSharedRedis().mget(unreadKey(userId), generationKey(userId));
+    if (cached !== null) return Math.max(0, Number(cached));
+    generation = current;
+  } catch (error) {
+    console.error("[Notifications] Failed to read unread counter:", error);
+    return countFromDb();
+  }
+
+  const count = await countFromDb();
+  try {
+    await getSharedRedis().eval(
+      STORE_SCRIPT,
+      2,
+      unreadKey(userId),
+      generationKey(userId),
+      Math.max(0, count),
+      UNREAD_COUNT_TTL_SECONDS,
+      generation ?? ""
+    );
+  } catch (error) {
+    console.error("[Notifications] Failed to store unread counter:", error);
+  }
+  return count;
+}
+
+/**
+ * Suma `delta` (negativo para restar) a los contadores existentes de los
+ * usuarios. Un solo round-trip para todo el fan-out.
+ */
+export async function adjustUnreadCounts(userIds: string[], delta: number): Promise<void> {
+  if (userIds.length === 0 || delta === 0) return;
+  try {
+    await getSharedRedis().eval(
+      ADJUST_SCRIPT,
+      userIds.length * 2,
+      ...counterKeyPairs(userIds),
+      delta,
+      UNREAD_COUNT_TTL_SECONDS
+    );
+  } catch (error) {
+    // Si el ajuste falla, el contador puede quedar desfasado: descartarlo
+    console.error("[Notifications] Failed to adjust unread counters:", error);
+    await resetUnreadCounts(userIds);
+  }
+}
+
+/**
+ * Descarta los contadores; la siguiente consulta los recalcula desde la DB.
+ */
+export async function resetUnreadCounts(userIds: string[]): Promise<void> {
+  if (userIds.length === 0) return;
+  try {
+    await getSharedRedis().eval(RESET_SCRIPT, userIds.length * 2, ...counterKeyPairs(userIds), UNREAD_COUNT_TTL_SECONDS);
+  } catch (error) {
+    console.error("[Notifications] Failed to reset unread counters:", error);
+  }
+}
@@ -9,6 +9,7 @@ export const REALTIME_CHANNELS = {
   MENTION_ANALYZED: "mediabot:mention:analyzed",
   SOCIAL_NEW: "mediabot:social:new",
   CRISIS_NEW: "mediabot:crisis:new",
+  NOTIFICATION_NEW: "mediabot:notification:new",
 } as const;
 
 export type RealtimeChannel = (typeof REALTIME_CHANNELS)[keyof typeof REALTIME_CHANNELS];
@@ -19,6 +20,7 @@ export const REALTIME_EVENT_TYPES = {
   MENTION_ANALYZED: "mention:analyzed",
   SOCIAL_NEW: "social:new",
   CRISIS_NEW: "crisis:new",
+  NOTIFICATION_NEW: "notification:new",
 } as const;
 
 export type RealtimeEventType = (typeof REALTIME_EVENT_TYPES)[keyof typeof REALTIME_EVENT_TYPES];
@@ -29,6 +31,7 @@ export const CHANNEL_TO_EVENT: Record<RealtimeChannel, RealtimeEventType> = {
   [REALTIME_CHANNELS.MENTION_ANALYZED]: REALTIME_EVENT_TYPES.MENTION_ANALYZED,
   [REALTIME_CHANNELS.SOCIAL_NEW]: REALTIME_EVENT_TYPES.SOCIAL_NEW,
   [REALTIME_CHANNELS.CRISIS_NEW]: REALTIME_EVENT_TYPES.CRISIS_NEW,
+  [REALTIME_CHANNELS.NOTIFICATION_NEW]: REALTIME_EVENT_TYPES.NOTIFICATION_NEW,
 };
 
 export interface RealtimeEventData {
@@ -41,6 +44,8 @@ export interface RealtimeEventData {
   urgency?: string;
   platform?: string;
   severity?: string;
+  /** Destinatarios de una notificación in-app (el SSE los filtra y no los reenvía) */
+  userIds?: string[];
   timestamp: string;
 }
 
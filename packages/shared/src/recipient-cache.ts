@@ -0,0 +1,46 @@
+/**
+ * Versión del cache de destinatarios Telegram.
+ *
+ * Los workers cachean en memoria la resolución de destinatarios por
+ * (cliente, tipo de notificación). Cualquier cambio de destinatarios,
+ * preferencias o usuarios con Telegram (web, bot o auto-desactivación)
+ * incrementa esta versión en Redis, y los workers descartan sus entradas
+ * cacheadas con una versión anterior.
+ *
+ * Los admins/supervisores de cada org que reciben las notificaciones in-app
+ * de reglas de alerta se cachean por org en Redis; crear un usuario o cambiar
+ * su rol borra la entrada de su org.
+ */
+import { getSharedRedis } from "./redis-client";
+
+export const RECIPIENT_CACHE_VERSION_KEY = "telegram:recipients:version";
+
+/**
+ * Invalida la resolución de destinatarios cacheada en todos los procesos.
+ * Llamar después de modificar TelegramRecipient, OrgTelegramRecipient o el
+ * telegramUserId/preferencias/rol de un usuario.
+ */
+export async function invalidateRecipientCache(): Promise<void> {
+  try {
+    await getSharedRedis().incr(RECIPIENT_CACHE_VERSION_KEY);
+  } catch (error) {
+    // Las entradas cacheadas expiran solas (TTL en workers)
+    console.error("[Recipients] Failed to invalidate recipient cache:", error);
+  }
+}
+
+export const ORG_ADMINS_KEY_PREFIX = "alert-rule:org-admins:";
+
+/**
+ * Descarta los admins cacheados de las orgs. Llamar después de crear un
+ * usuario, cambiar su rol o moverlo de org.
+ */
+export async function invalidateOrgAdminCache(orgIds: string[]): Promise<void> {
+  if (orgIds.length === 0) return;
+  try {
+    await getSharedRedis().del(...orgIds.map((orgId) => `${ORG_ADMINS_KEY_PREFIX}${orgId}`));
+  } catch (error) {
+    // La entrada expira sola (ORG_ADMINS_TTL_SECONDS en workers)
+    console.error("[Recipients] Failed to invalidate org admin cache:", error);
+  }
+}
@@ -0,0 +1,35 @@
+/**
+ * Conexión Redis compartida por los helpers server-side de shared (contadores
+ * de notificaciones, versión del cache de destinatarios, eventos en tiempo
+ * real, invalidación de settings). Se abre en el primer uso.
+ *
+ * Una conexión en modo subscribe no acepta otros comandos: los subscribers
+ * abren la suya. NO se exporta desde el barrel index.ts.
+ */
+import Redis from "ioredis";
+import { config } from "./config.js";
+
+let redis: Redis | null = null;
+
+export function getSharedRedis(): Redis {
+  if (!redis) {
+    redis = new Redis(config.redis.url, {
+      maxRetriesPerRequest: 3,
+      lazyConnect: true,
+    });
+    redis.connect().catch((err: unknown) => {
+      console.error("[Redis] Error connecting shared client:", err);
+    });
+  }
+  return redis;
+}
+
+/**
+ * Cierra la conexión compartida (para shutdown graceful).
+ */
+export async function closeSharedRedis(): Promise<void> {
+  if (redis) {
+    await redis.quit();
+    redis = null;
+  }
+}
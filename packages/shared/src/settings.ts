@@ -1,15 +1,39 @@
+import { randomUUID } from "crypto";
+import Redis from "ioredis";
 import { prisma } from "./prisma";
+import { config } from "./config";
+import { getSharedRedis } from "./redis-client";
 import type { SettingType } from "@prisma/client";
 
-// In-memory cache with TTL
+/**
+ * Settings snapshot shared by all reads in the process.
+ *
+ * All settings are loaded with one query and served from memory. Changes made
+ * through setSettingValue/invalidateSettingsCache are broadcast on a Redis
+ * pub/sub channel so every web and worker process reloads its snapshot right
+ * away; the TTL is only a safety net if a message is lost.
+ */
 interface CachedSetting {
   value: string;
   type: SettingType;
-  expiresAt: number;
 }
 
-const cache = new Map<string, CachedSetting>();
-const CACHE_TTL_MS = 60 * 1000; // 1 minute cache
+export const SETTINGS_INVALIDATION_CHANNEL = "mediabot:settings:invalidate";
+
+const SNAPSHOT_TTL_MS = 5 * 60 * 1000;
+/** Identifies this process so it ignores its own invalidation messages */
+const INSTANCE_ID = randomUUID();
+
+/** Reload attempts when invalidations keep arriving during a load */
+const MAX_LOAD_ATTEMPTS = 3;
+
+let snapshot = new Map<string, CachedSetting>();
+let snapshotExpiresAt = 0;
+let loading: Promise<void> | null = null;
+/** Bumped on every local write or invalidation; a load started before it is stale */
+let generation = 0;
+
+let subscriber: Redis | null = null;
 
 // Default settings that will be seeded if not present
 export const DEFAULT_SETTINGS: Record<string, { value: string; type: SettingType; category: string; label: string; description: string }> = {
@@ -20,6 +44,20 @@ export const DEFAULT_SETTINGS: Record<string, { value: string; type: SettingType
     label: "Umbral de confianza pre-filtro",
     description: "Confianza minima del AI para considerar una mencion relevante (0-1)",
   },
+  "triage.enabled": {
+    value: "1",
+    type: "NUMBER",
+    category: "analysis",
+    label: "Triage local activo",
+    description: "1 para resolver localmente los casos obvios antes de Gemini (requiere modelo entrenado), 0 para desactivarlo",
+  },
+  "triage.confidence_threshold": {
+    value: "0.9",
+    type: "NUMBER",
+    category: "analysis",
+    label: "Umbral de confianza triage",
+    description: "Confianza minima del modelo local para resolver sin Gemini (0-1); por debajo se escala al AI",
+  },
   "urgency.critical_min_relevance": {
     value: "8",
     type: "NUMBER",
@@ -83,8 +121,95 @@ export const DEFAULT_SETTINGS: Record<string, { value: string; type: SettingType
     label: "Ventana de tiempo (minutos)",
     description: "Ventana de tiempo en minutos para detectar crisis",
   },
+  "crisis.anomaly_min_surprise": {
+    value: "4",
+    type: "NUMBER",
+    category: "crisis",
+    label: "Sorpresa minima de anomalia",
+    description: "-log10 de la probabilidad (Poisson) de las negativas de la ventana segun la linea base del cliente para activar crisis (4 = p <= 0.0001)",
+  },
+  "crisis.anomaly_min_mentions": {
+    value: "3",
+    type: "NUMBER",
+    category: "crisis",
+    label: "Minimo de negativas (anomalia)",
+    description: "Menciones negativas minimas en la ventana para que una anomalia active crisis",
+  },
 };
 
+/**
+ * Subscribe once per process to invalidations from other processes.
+ */
+function ensureSubscribed(): void {
+  if (subscriber) return;
+  subscriber = new Redis(config.redis.url, { lazyConnect: true });
+  subscriber.on("message", (_channel: string, message: string) => {
+    try {
+      const { origin } = JSON.parse(message) as { origin?: string };
+      if (origin === INSTANCE_ID) return;
+    } catch {
+      // Unknown payload: reload anyway
+    }
+    generation++;
+    snapshotExpiresAt = 0;
+    void refreshSnapshot();
+  });
+  subscriber
+    .connect()
+    .then(() => subscriber?.subscribe(SETTINGS_INVALIDATION_CHANNEL))
+    .catch((err: unknown) => {
+      console.error("[Settings] Error subscribing to invalidations:", err);
+    });
+}
+
+/**
+ * Reload the snapshot with a single query. Concurrent callers share the load.
+ */
+function refreshSnapshot(): Promise<void> {
+  if (!loading) {
+    loading = loadSnapshot().finally(() => {
+      loading = null;
+    });
+  }
+  return loading;
+}
+
+/**
+ * A write or invalidation that lands while the query is in flight may not be
+ * in its result: the result is discarded and the query runs again, so callers
+ * that joined the load see the change.
+ */
+async function loadSnapshot(): Promise<void> {
+  for (let attempt = 0; attempt < MAX_LOAD_ATTEMPTS; attempt++) {
+    const startedAt = generation;
+    let settings: { key: string; value: string; type: SettingType }[];
+    try {
+      settings = await prisma.setting.findMany({ select: { key: true, value: true, type: true } });
+    } catch (error) {
+      // Keep serving the previous snapshot; retry on the next read
+      console.error("[Settings] Failed to load settings:", error);
+      return;
+    }
+    if (generation !== startedAt) continue;
+
+    snapshot = new Map(settings.map((s) => [s.key, { value: s.value, type: s.type }]));
+    snapshotExpiresAt = Date.now() + SNAPSHOT_TTL_MS;
+    return;
+  }
+  // Still changing: keep the snapshot expired so the next read reloads
+}
+
+/**
+ * Load the settings snapshot if it is missing or expired. Call at startup
+ * (or before a batch) so hot paths can use the synchronous getters.
+ */
+export async function prefetchSettings(): Promise<void> {
+  ensureSubscribed();
+  if (snapshotExpiresAt <= Date.now()) {
+    await refreshSnapshot();
+  }
+}
+
 /**
  * Get a setting value with caching
  */
@@ -92,39 +217,41 @@ export async function getSettingValue<T = string>(
   key: string,
   defaultValue: T
 ): Promise<T> {
-  // Check cache first
-  const cached = cache.get(key);
-  if (cached && cached.expiresAt > Date.now()) {
-    return parseValue(cached.value, cached.type) as T;
-  }
-
-  // Fetch from database
-  const setting = await prisma.setting.findUnique({
-    where: { key },
-  });
+  await prefetchSettings();
+  return getSettingValueSync(key, defaultValue);
+}
 
-  if (!setting) {
-    // Return default, no caching for missing keys
-    return defaultValue;
+/**
+ * Get a setting value from the in-memory snapshot without awaiting. Returns
+ * the default until the first load finishes; an expired snapshot is served
+ * while it reloads in the background.
+ */
+export function getSettingValueSync<T = string>(key: string, defaultValue: T): T {
+  if (snapshotExpiresAt <= Date.now()) {
+    ensureSubscribed();
+    void refreshSnapshot();
   }
+  const cached = snapshot.get(key);
+  return cached ? (parseValue(cached.value, cached.type) as T) : defaultValue;
+}
 
-  // Update cache
-  cache.set(key, {
-    value: setting.value,
-    type: setting.type,
-    expiresAt: Date.now() + CACHE_TTL_MS,
-  });
-
-  return parseValue(setting.value, setting.type) as T;
+function toNumber(value: unknown, defaultValue: number): number {
+  const parsed = parseFloat(String(value));
+  return isNaN(parsed) ? defaultValue : parsed;
 }
 
 /**
  * Get a numeric setting value
  */
 export async function getSettingNumber(key: string, defaultValue: number): Promise<number> {
-  const value = await getSettingValue(key, String(defaultValue));
-  const parsed = parseFloat(String(value));
-  return isNaN(parsed) ? defaultValue : parsed;
+  return toNumber(await getSettingValue(key, String(defaultValue)), defaultValue);
+}
+
+/**
+ * Get a numeric setting value from the snapshot without awaiting
+ */
+export function getSettingNumberSync(key: string, defaultValue: number): number {
+  return toNumber(getSettingValueSync(key, String(defaultValue)), defaultValue);
 }
 
 /**
@@ -136,7 +263,7 @@ export async function getSettingBoolean(key: string, defaultValue: boolean): Pro
 }
 
 /**
- * Set a setting value (also updates cache)
+ * Set a setting value (updates the local snapshot and notifies other processes)
  */
 export async function setSettingValue(
   key: string,
@@ -156,12 +283,9 @@ export async function setSettingValue(
     },
   });
 
-  // Update cache
-  cache.set(key, {
-    value: setting.value,
-    type: setting.type,
-    expiresAt: Date.now() + CACHE_TTL_MS,
-  });
+  generation++;
+  snapshot.set(key, { value: setting.value, type: setting.type });
+  await publishInvalidation(key);
 }
 
 /**
@@ -175,15 +299,26 @@ export async function getAllSettings(category?: string) {
   });
 }
 
+async function publishInvalidation(key?: string): Promise<void> {
+  try {
+    await getSharedRedis().publish(
+      SETTINGS_INVALIDATION_CHANNEL,
+      JSON.stringify({ origin: INSTANCE_ID, key: key ?? null })
+    );
+  } catch (error) {
+    // Other processes pick up the change when their snapshot expires
+    console.error("[Settings] Failed to publish invalidation:", error);
+  }
+}
+
 /**
- * Invalidate cache for a specific key or all keys
+ * Invalidate the snapshot in this and every other process. The key is only
+ * informative: the whole snapshot is reloaded.
  */
 export function invalidateSettingsCache(key?: string): void {
-  if (key) {
-    cache.delete(key);
-  } else {
-    cache.clear();
-  }
+  generation++;
+  snapshotExpiresAt = 0;
+  void publishInvalidation(key);
 }
 
 /**
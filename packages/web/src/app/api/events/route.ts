@@ -26,7 +26,7 @@ export async function GET(request: Request) {
     return new Response("Unauthorized", { status: 401 });
   }
 
-  const { orgId, isSuperAdmin } = session.user;
+  const { id: userId, orgId, isSuperAdmin } = session.user;
 
   // Canales a los que suscribirse
   const channels = Object.values(REALTIME_CHANNELS);
@@ -53,10 +53,13 @@ export async function GET(request: Request) {
       // Handler de mensajes Redis
       const onMessage = (channel: string, message: string) => {
         try {
-          const data = JSON.parse(message) as RealtimeEventData;
+          const { userIds, ...data } = JSON.parse(message) as RealtimeEventData;
 
-          // Filtrar por organización: SuperAdmin ve todo, otros solo su org
-          if (!isSuperAdmin && data.orgId !== orgId) {
+          if (channel === REALTIME_CHANNELS.NOTIFICATION_NEW) {
+            // Notificaciones in-app: solo a sus destinatarios
+            if (!userIds?.includes(userId)) return;
+          } else if (!isSuperAdmin && data.orgId !== orgId) {
+            // Filtrar por organización: SuperAdmin ve todo, otros solo su org
             return;
           }
 
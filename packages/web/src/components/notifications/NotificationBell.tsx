@@ -4,6 +4,8 @@ import { useState, useEffect } from "react";
 import { Bell } from "lucide-react";
 import { trpc } from "@/lib/trpc";
 import { cn } from "@/lib/cn";
+import { useRealtimeEvent } from "@/components/realtime-provider";
+import { REALTIME_EVENT_TYPES } from "@/lib/realtime-types";
 import { NotificationDropdown } from "./NotificationDropdown";
 
 const POLL_INTERVAL = 30000; // 30 segundos
@@ -17,6 +19,12 @@ export function NotificationBell() {
     refetchIntervalInBackground: true,
   });
 
+  // Notificación nueva para este usuario: refrescar sin esperar al polling
+  const utils = trpc.useUtils();
+  useRealtimeEvent(REALTIME_EVENT_TYPES.NOTIFICATION_NEW, () => {
+    utils.notifications.getUnreadCount.invalidate();
+  });
+
   const unreadCount = data?.count || 0;
 
   // Cerrar dropdown cuando se cambia de página
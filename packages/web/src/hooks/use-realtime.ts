@@ -61,6 +61,7 @@ export function useRealtime(options: UseRealtimeOptions = {}) {
         "mention:analyzed",
         "social:new",
         "crisis:new",
+        "notification:new",
       ];
       eventTypes.forEach((type) => {
         es.addEventListener(type, (e: MessageEvent) => {
@@ -8,6 +8,7 @@ import {
   cleanJsonResponse,
   normalizeUrl,
   config,
+  invalidateRecipientCache,
 } from "@mediabot/shared";
 
 /**
@@ -260,6 +261,9 @@ export const clientsRouter = router({
         data: { orgId: input.newOrgId },
       });
 
+      // Cambian los destinatarios de nivel organización
+      await invalidateRecipientCache();
+
       return {
         success: true,
         message: `Cliente "${client.name}" transferido a "${targetOrg.name}"`,
@@ -1090,7 +1094,7 @@ IMPORTANTE: Genera 8-12 keywords variados basados en las noticias.`;
       if (existing) {
         // Reactivar si estaba inactivo
         if (!existing.active) {
-          return prisma.telegramRecipient.update({
+          const reactivated = await prisma.telegramRecipient.update({
             where: { id: existing.id },
             data: {
               active: true,
@@ -1099,6 +1103,8 @@ IMPORTANTE: Genera 8-12 keywords variados basados en las noticias.`;
               addedBy: ctx.user.id,
             },
           });
+          await invalidateRecipientCache();
+          return reactivated;
         }
         throw new TRPCError({
           code: "CONFLICT",
@@ -1129,6 +1135,7 @@ IMPORTANTE: Genera 8-12 keywords variados basados en las noticias.`;
         });
       }
 
+      await invalidateRecipientCache();
       return recipient;
     }),
 
@@ -1180,6 +1187,7 @@ IMPORTANTE: Genera 8-12 keywords variados basados en las noticias.`;
         }
       }
 
+      await invalidateRecipientCache();
       return updated;
     }),
 
@@ -1221,6 +1229,7 @@ IMPORTANTE: Genera 8-12 keywords variados basados en las noticias.`;
         });
       }
 
+      await invalidateRecipientCache();
       return { success: true };
     }),
 
@@ -1,6 +1,6 @@
 import { z } from "zod";
 import { router, superAdminProcedure } from "../trpc";
-import { prisma } from "@mediabot/shared";
+import { prisma, metricsSince, sumDailyMetricsByClient } from "@mediabot/shared";
 
 /**
  * Router del Executive Dashboard.
@@ -135,7 +135,6 @@ export const executiveRouter = router({
     )
     .query(async ({ input }) => {
       const days = input?.days ?? 7;
-      const since = new Date(Date.now() - days * 24 * 60 * 60 * 1000);
 
       try {
         const orgs = await prisma.organization.findMany({
@@ -149,108 +148,70 @@ export const executiveRouter = router({
           },
         });
 
-        const cards = await Promise.all(
-          orgs.map(async (org) => {
-            const clientIds = org.clients.map((c) => c.id);
-
-            if (clientIds.length === 0) {
-              return {
-                orgId: org.id,
-                orgName: org.name,
-                clientCount: 0,
-                mentionCount: 0,
-                socialMentionCount: 0,
-                activeCrises: 0,
-                avgSentiment: 0,
-                topClient: null,
-              };
-            }
-
-            const [mentionCount, socialMentionCount, activeCrises, positiveMentions, totalMentions, topClientData] =
-              await Promise.all([
-                // Menciones en el periodo
-                prisma.mention.count({
-                  where: {
-                    clientId: { in: clientIds },
-                    isLegacy: false,
-                    publishedAt: { gte: since },
-                  },
-                }),
-                // Social menciones en el periodo
-                prisma.socialMention.count({
-                  where: {
-                    clientId: { in: clientIds },
-                    postedAt: { gte: since },
-                  },
-                }),
-                // Crisis activas
-                prisma.crisisAlert.count({
-                  where: {
-                    clientId: { in: clientIds },
-                    status: "ACTIVE",
-                  },
-                }),
-                // Positivas para sentimiento
-                prisma.mention.count({
-                  where: {
-                    clientId: { in: clientIds },
-                    isLegacy: false,
-                    publishedAt: { gte: since },
-                    sentiment: "POSITIVE",
-                  },
-                }),
-                // Total para sentimiento
-                prisma.mention.count({
-                  where: {
-                    clientId: { in: clientIds },
-                    isLegacy: false,
-                    publishedAt: { gte: since },
-                  },
-                }),
-                // Top client por menciones
-                prisma.mention.groupBy({
-                  by: ["clientId"],
-                  where: {
-                    clientId: { in: clientIds },
-                    isLegacy: false,
-                    publishedAt: { gte: since },
-                  },
-                  _count: { id: true },
-                  orderBy: { _count: { id: "desc" } },
-                  take: 1,
-                }),
-              ]);
-
-            // Resolver top client
-            let topClient: { id: string; name: string; mentionCount: number } | null = null;
-            if (topClientData.length > 0) {
-              const clientInfo = org.clients.find((c) => c.id === topClientData[0].clientId);
-              if (clientInfo) {
-                topClient = {
-                  id: clientInfo.id,
-                  name: clientInfo.name,
-                  mentionCount: topClientData[0]._count.id,
-                };
-              }
-            }
-
-            const avgSentiment =
-              totalMentions > 0
-                ? Math.round((positiveMentions / totalMentions) * 100)
-                : 0;
+        const allClientIds = orgs.flatMap((org) => org.clients.map((c) => c.id));
+
+        // Menciones, sentimiento y social desde el rollup diario; crisis activas agrupadas
+        const [metrics, activeCrisesByClient] = await Promise.all([
+          sumDailyMetricsByClient(allClientIds, metricsSince(days)),
+          allClientIds.length > 0
+            ? prisma.crisisAlert.groupBy({
+                by: ["clientId"],
+                where: { clientId: { in: allClientIds }, status: "ACTIVE" },
+                _count: { id: true },
+              })
+            : Promise.resolve([]),
+        ]);
+        const crisesByClient = new Map(activeCrisesByClient.map((c) => [c.clientId, c._count.id]));
 
+        const cards = orgs.map((org) => {
+          if (org.clients.length === 0) {
             return {
               orgId: org.id,
               orgName: org.name,
-              clientCount: org.clients.length,
-              mentionCount,
-              socialMentionCount,
-              activeCrises,
-              avgSentiment,
-              topClient,
+              clientCount: 0,
+              mentionCount: 0,
+              socialMentionCount: 0,
+              activeCrises: 0,
+              avgSentiment: 0,
+              topClient: null,
             };
-          })
-        );
+          }
+
+          let mentionCount = 0;
+          let socialMentionCount = 0;
+          let positiveMentions = 0;
+          let activeCrises = 0;
+          let topClient: { id: string; name: string; mentionCount: number } | null = null;
+
+          for (const client of org.clients) {
+            const m = metrics.get(client.id);
+            activeCrises += crisesByClient.get(client.id) ?? 0;
+            if (!m) continue;
+
+            mentionCount += m.mentions;
+            socialMentionCount += m.socialMentions;
+            positiveMentions += m.positive;
+            if (m.mentions > 0 && (!topClient || m.mentions > topClient.mentionCount)) {
+              topClient = { id: client.id, name: client.name, mentionCount: m.mentions };
+            }
+          }
+
+          const avgSentiment =
+            mentionCount > 0
+              ? Math.round((positiveMentions / mentionCount) * 100)
+              : 0;
+
+          return {
+            orgId: org.id,
+            orgName: org.name,
+            clientCount: org.clients.length,
+            mentionCount,
+            socialMentionCount,
+            activeCrises,
+            avgSentiment,
+            topClient,
+          };
+        });
 
         return cards;
       } catch (error) {
@@ -296,14 +257,19 @@ export const executiveRouter = router({
 
         const allClientIds = clients.map((c) => c.id);
 
+        // Menciones, sentimiento y social desde el rollup diario:
+        // últimos 7 días y los 7 anteriores (días UTC completos)
+        const currentStart = metricsSince(7, now);
+        const prevStart = metricsSince(14, now);
+        const prevEnd = new Date(currentStart.getTime() - 24 * 60 * 60 * 1000);
+        const [currentMetrics, prevMetrics] = await Promise.all([
+          sumDailyMetricsByClient(allClientIds, currentStart),
+          sumDailyMetricsByClient(allClientIds, prevStart, prevEnd),
+        ]);
+
         // Obtener datos globales para normalización
-        const totalMentionsAll = await prisma.mention.count({
-          where: {
-            clientId: { in: allClientIds },
-            isLegacy: false,
-            publishedAt: { gte: last7d },
-          },
-        });
+        let totalMentionsAll = 0;
+        for (const m of currentMetrics.values()) totalMentionsAll += m.mentions;
 
         const avgMentionsPerClient =
           clients.length > 0 ? totalMentionsAll / clients.length : 1;
@@ -311,39 +277,31 @@ export const executiveRouter = router({
         // Calcular score para cada cliente
         const scores = await Promise.all(
           clients.map(async (client) => {
+            const current = currentMetrics.get(client.id);
+            const prev = prevMetrics.get(client.id);
+
             // Periodo actual (7d)
+            const mentionCount = current?.mentions ?? 0;
+            const positiveMentions = current?.positive ?? 0;
+            const negativeMentions = current?.negative ?? 0;
+            const totalClientMentions = mentionCount;
+            const socialEngaged = current?.socialEngaged ?? 0;
+            const totalSocial = current?.socialMentions ?? 0;
+            // Periodo anterior (7d previos) para tendencia
+            const prevMentionCount = prev?.mentions ?? 0;
+            const prevPositiveMentions = prev?.positive ?? 0;
+            const prevTotalMentions = prevMentionCount;
+            const prevSocialEngaged = prev?.socialEngaged ?? 0;
+            const prevTotalSocial = prev?.socialMentions ?? 0;
+
             const [
-              mentionCount,
-              positiveMentions,
-              negativeMentions,
-              totalClientMentions,
               activeCrisisCount,
               lastCrisis,
               responseDraftCount,
-              socialEngaged,
-              totalSocial,
-              // Periodo anterior (7d previos) para tendencia
-              prevMentionCount,
-              prevPositiveMentions,
-              prevTotalMentions,
               prevActiveCrisis,
               prevResponseDraftCount,
-              prevSocialEngaged,
-              prevTotalSocial,
             ] = await Promise.all([
               // --- Periodo actual ---
-              prisma.mention.count({
-                where: { clientId: client.id, isLegacy: false, publishedAt: { gte: last7d } },
-              }),
-              prisma.mention.count({
-                where: { clientId: client.id, isLegacy: false, publishedAt: { gte: last7d }, sentiment: "POSITIVE" },
-              }),
-              prisma.mention.count({
-                where: { clientId: client.id, isLegacy: false, publishedAt: { gte: last7d }, sentiment: "NEGATIVE" },
-              }),
-              prisma.mention.count({
-                where: { clientId: client.id, isLegacy: false, publishedAt: { gte: last7d } },
-              }),
               prisma.crisisAlert.count({
                 where: { clientId: client.id, status: "ACTIVE" },
               }),
@@ -361,31 +319,7 @@ export const executiveRouter = router({
                   createdAt: { gte: last7d },
                 },
               }),
-              // Social con engagement > 10
-              prisma.socialMention.count({
-                where: {
-                  clientId: client.id,
-                  postedAt: { gte: last7d },
-                  OR: [
-                    { likes: { gte: 10 } },
-                    { comments: { gte: 10 } },
-                    { shares: { gte: 10 } },
-                  ],
-                },
-              }),
-              prisma.socialMention.count({
-                where: { clientId: client.id, postedAt: { gte: last7d } },
-              }),
               // --- Periodo anterior ---
-              prisma.mention.count({
-                where: { clientId: client.id, isLegacy: false, publishedAt: { gte: prev7d, lt: last7d } },
-              }),
-              prisma.mention.count({
-                where: { clientId: client.id, isLegacy: false, publishedAt: { gte: prev7d, lt: last7d }, sentiment: "POSITIVE" },
-              }),
-              prisma.mention.count({
-                where: { clientId: client.id, isLegacy: false, publishedAt: { gte: prev7d, lt: last7d } },
-              }),
               prisma.crisisAlert.count({
                 where: { clientId: client.id, status: "ACTIVE", createdAt: { gte: prev7d, lt: last7d } },
               }),
@@ -398,20 +332,6 @@ export const executiveRouter = router({
                   createdAt: { gte: prev7d, lt: last7d },
                 },
               }),
-              prisma.socialMention.count({
-                where: {
-                  clientId: client.id,
-                  postedAt: { gte: prev7d, lt: last7d },
-                  OR: [
-                    { likes: { gte: 10 } },
-                    { comments: { gte: 10 } },
-                    { shares: { gte: 10 } },
-                  ],
-                },
-              }),
-              prisma.socialMention.count({
-                where: { clientId: client.id, postedAt: { gte: prev7d, lt: last7d } },
-              }),
             ]);
 
             // --- Calcular componentes del score ---
@@ -1,9 +1,11 @@
 import { z } from "zod";
 import { TRPCError } from "@trpc/server";
 import { router, protectedProcedure, getEffectiveOrgId } from "../trpc";
-import { prisma } from "@mediabot/shared";
+import { prisma, metricsSince, sumDailyMetricsByClient, dailyMentionSeries } from "@mediabot/shared";
 // Note: Do NOT use Prisma.empty in $queryRaw tagged templates - it generates phantom $N params
 
+const DAY_MS = 24 * 60 * 60 * 1000;
+
 export const intelligenceRouter = router({
   /**
    * Obtiene el Share of Voice de un cliente vs sus competidores.
@@ -38,11 +40,7 @@ export const intelligenceRouter = router({
       const orgId = client.orgId;
 
       const endDate = new Date();
-      const startDate = new Date();
-      startDate.setDate(startDate.getDate() - days);
-
-      // Obtener menciones del cliente con peso por tier
-      const clientMentions = await getMentionsWithTier(clientId, startDate, endDate);
+      const startDate = metricsSince(days, endDate);
 
       // Obtener competidores del modelo Competitor
       const clientCompetitors = await prisma.clientCompetitor.findMany({
@@ -50,6 +48,32 @@ export const intelligenceRouter = router({
         include: { competitor: true },
       });
 
+      // Buscar clientes que coincidan con nombres de competidores
+      const competitorClients =
+        includeCompetitors && clientCompetitors.length > 0
+          ? await prisma.client.findMany({
+              where: {
+                orgId,
+                OR: clientCompetitors.map((cc) => ({
+                  name: { contains: cc.competitor.name, mode: "insensitive" as const },
+                })),
+                active: true,
+                id: { not: clientId },
+              },
+            })
+          : [];
+
+      // Menciones y peso por tier desde el rollup diario (cliente + competidores)
+      const metrics = await sumDailyMetricsByClient(
+        [clientId, ...competitorClients.map((c) => c.id)],
+        startDate
+      );
+      const clientMetrics = metrics.get(clientId);
+      const clientMentions = {
+        count: clientMetrics?.mentions ?? 0,
+        weighted: clientMetrics?.weightedMentions ?? 0,
+      };
+
       const competitorData: Array<{
         id: string;
         name: string;
@@ -57,33 +81,14 @@ export const intelligenceRouter = router({
         weighted: number;
         sov: number;
         weightedSov: number;
-      }> = [];
-
-      if (includeCompetitors && clientCompetitors.length > 0) {
-        // Buscar clientes que coincidan con nombres de competidores
-        const competitorClients = await prisma.client.findMany({
-          where: {
-            orgId,
-            OR: clientCompetitors.map((cc) => ({
-              name: { contains: cc.competitor.name, mode: "insensitive" as const },
-            })),
-            active: true,
-            id: { not: clientId },
-          },
-        });
-
-        for (const comp of competitorClients) {
-          const mentions = await getMentionsWithTier(comp.id, startDate, endDate);
-          competitorData.push({
-            id: comp.id,
-            name: comp.name,
-            mentions: mentions.count,
-            weighted: mentions.weighted,
-            sov: 0,
-            weightedSov: 0,
-          });
-        }
-      }
+      }> = competitorClients.map((comp) => ({
+        id: comp.id,
+        name: comp.name,
+        mentions: metrics.get(comp.id)?.mentions ?? 0,
+        weighted: metrics.get(comp.id)?.weightedMentions ?? 0,
+        sov: 0,
+        weightedSov: 0,
+      }));
 
       // Calcular totales y SOV
       const total = clientMentions.count + competitorData.reduce((s, c) => s + c.mentions, 0);
@@ -344,7 +349,7 @@ export const intelligenceRouter = router({
       const startDate = new Date();
       startDate.setDate(startDate.getDate() - 7);
 
-      const [mentions, crisisCount, sovHistory, weeklyInsight] = await Promise.all([
+      const [mentions, crisisCount, dailyMetrics, weeklyInsight] = await Promise.all([
         prisma.mention.findMany({
           where: {
             clientId: input.clientId,
@@ -359,7 +364,7 @@ export const intelligenceRouter = router({
             createdAt: { gte: startDate, lte: endDate },
           },
         }),
-        getMentionsWithTier(input.clientId, startDate, endDate),
+        sumDailyMetricsByClient([input.clientId], metricsSince(7, endDate)),
         prisma.weeklyInsight.findFirst({
           where: { clientId: input.clientId },
           orderBy: { weekStart: "desc" },
@@ -386,7 +391,7 @@ export const intelligenceRouter = router({
         clientName: client.name,
         period: { start: startDate.toISOString(), end: endDate.toISOString() },
         totalMentions: mentions.length,
-        weightedMentions: sovHistory.weighted,
+        weightedMentions: dailyMetrics.get(input.clientId)?.weightedMentions ?? 0,
         sentimentBreakdown,
         crisisAlerts: crisisCount,
         topMentions,
@@ -472,7 +477,7 @@ export const intelligenceRouter = router({
       return { topicsCount: 0, emergingTopics: 0, avgSOV: 0, weightedMentions: 0 };
     }
 
-    const [topicsCount, emergingCount, avgSOV, weightedMentions] = await Promise.all([
+    const [topicsCount, emergingCount, orgClients] = await Promise.all([
       // Temas únicos esta semana
       prisma.$queryRaw<[{ count: bigint }]>`
         SELECT COUNT(DISTINCT topic) as count
@@ -495,77 +500,38 @@ export const intelligenceRouter = router({
           HAVING COUNT(*) >= 3
         ) subq
       `,
-      // SOV promedio de clientes activos
-      prisma.$queryRaw<[{ avg: number | null }]>`
-        SELECT AVG(mention_count::float / NULLIF(total_count::float, 0) * 100) as avg
-        FROM (
-          SELECT c.id,
-            (SELECT COUNT(*) FROM "Mention" WHERE "clientId" = c.id AND COALESCE("publishedAt", "createdAt") >= ${last7d}) as mention_count,
-            (SELECT COUNT(*) FROM "Mention" m2 JOIN "Client" c2 ON m2."clientId" = c2.id WHERE c2."orgId" = ${orgId} AND COALESCE(m2."publishedAt", m2."createdAt") >= ${last7d}) as total_count
-          FROM "Client" c
-          WHERE c."orgId" = ${orgId} AND c.active = true
-        ) subq
-        WHERE mention_count > 0
-      `,
-      // Menciones ponderadas por tier
-      prisma.$queryRaw<[{ weighted: bigint }]>`
-        SELECT COALESCE(SUM(
-          CASE st.tier
-            WHEN 1 THEN 3
-            WHEN 2 THEN 2
-            ELSE 1
-          END
-        ), 0) as weighted
-        FROM "Mention" m
-        JOIN "Article" a ON m."articleId" = a.id
-        JOIN "Client" c ON m."clientId" = c.id
-        LEFT JOIN "SourceTier" st ON LOWER(REGEXP_REPLACE(a.source, '^www\\.', '')) = st.domain
-        WHERE c."orgId" = ${orgId}
-        AND COALESCE(m."publishedAt", m."createdAt") >= ${last7d}
-      `,
+      prisma.client.findMany({
+        where: { orgId },
+        select: { id: true, active: true },
+      }),
     ]);
 
+    // SOV promedio y menciones ponderadas desde el rollup diario
+    const metrics = await sumDailyMetricsByClient(orgClients.map((c) => c.id), metricsSince(7));
+    let totalMentions = 0;
+    let weightedMentions = 0;
+    for (const m of metrics.values()) {
+      totalMentions += m.mentions;
+      weightedMentions += m.weightedMentions;
+    }
+    const activeCounts = orgClients
+      .filter((c) => c.active)
+      .map((c) => metrics.get(c.id)?.mentions ?? 0)
+      .filter((count) => count > 0);
+    const avgSOV =
+      activeCounts.length > 0 && totalMentions > 0
+        ? activeCounts.reduce((sum, count) => sum + (count / totalMentions) * 100, 0) / activeCounts.length
+        : 0;
+
     return {
       topicsCount: Number(topicsCount[0]?.count ?? 0),
       emergingTopics: Number(emergingCount[0]?.count ?? 0),
-      avgSOV: avgSOV[0]?.avg ?? 0,
-      weightedMentions: Number(weightedMentions[0]?.weighted ?? 0),
+      avgSOV,
+      weightedMentions,
     };
   }),
 });
 
-/**
- * Obtiene menciones con peso por tier de fuente.
- */
-async function getMentionsWithTier(
-  clientId: string,
-  startDate: Date,
-  endDate: Date
-): Promise<{ count: number; weighted: number }> {
-  const result = await prisma.$queryRaw<[{ count: bigint; weighted: bigint }]>`
-    SELECT
-      COUNT(*) as count,
-      COALESCE(SUM(
-        CASE st.tier
-          WHEN 1 THEN 3
-          WHEN 2 THEN 2
-          ELSE 1
-        END
-      ), COUNT(*)) as weighted
-    FROM "Mention" m
-    JOIN "Article" a ON m."articleId" = a.id
-    LEFT JOIN "SourceTier" st ON LOWER(REGEXP_REPLACE(a.source, '^www\\.', '')) = st.domain
-    WHERE m."clientId" = ${clientId}
-    AND COALESCE(m."publishedAt", m."createdAt") >= ${startDate}
-    AND COALESCE(m."publishedAt", m."createdAt") <= ${endDate}
-  `;
-
-  return {
-    count: Number(result[0]?.count ?? 0),
-    weighted: Number(result[0]?.weighted ?? 0),
-  };
-}
-
 /**
  * Obtiene histórico de SOV por semana.
  */
@@ -574,32 +540,28 @@ async function getSOVHistory(
   orgId: string,
   weeks: number
 ): Promise<Array<{ week: Date; sov: number; mentions: number }>> {
-  const history: Array<{ week: Date; sov: number; mentions: number }> = [];
-  const now = new Date();
-
-  for (let i = weeks - 1; i >= 0; i--) {
-    const weekEnd = new Date(now);
-    weekEnd.setDate(weekEnd.getDate() - i * 7);
-    weekEnd.setHours(23, 59, 59, 999);
-
-    const weekStart = new Date(weekEnd);
-    weekStart.setDate(weekStart.getDate() - 7);
-    weekStart.setHours(0, 0, 0, 0);
+  const orgClients = await prisma.client.findMany({
+    where: { orgId },
+    select: { id: true },
+  });
+
+  // Semanas de 7 días completos terminando hoy, desde el rollup diario
+  const since = metricsSince(weeks * 7);
+  const [clientSeries, orgSeries] = await Promise.all([
+    dailyMentionSeries([clientId], since),
+    dailyMentionSeries(orgClients.map((c) => c.id), since),
+  ]);
 
-    const [clientCount, totalCount] = await Promise.all([
-      prisma.mention.count({
-        where: {
-          clientId,
-          publishedAt: { gte: weekStart, lte: weekEnd },
-        },
-      }),
-      prisma.mention.count({
-        where: {
-          client: { orgId },
-          publishedAt: { gte: weekStart, lte: weekEnd },
-        },
-      }),
-    ]);
+  const history: Array<{ week: Date; sov: number; mentions: number }> = [];
+  for (let w = 0; w < weeks; w++) {
+    const weekStart = new Date(since.getTime() + w * 7 * DAY_MS);
+    let clientCount = 0;
+    let totalCount = 0;
+    for (let d = 0; d < 7; d++) {
+      const day = new Date(weekStart.getTime() + d * DAY_MS).toISOString().slice(0, 10);
+      clientCount += clientSeries.get(day) ?? 0;
+      totalCount += orgSeries.get(day) ?? 0;
+    }
 
     history.push({
       week: weekStart,
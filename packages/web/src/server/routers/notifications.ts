@@ -1,6 +1,11 @@
 import { z } from "zod";
 import { router, protectedProcedure } from "../trpc";
-import { prisma } from "@mediabot/shared";
+import {
+  prisma,
+  adjustUnreadCounts,
+  getUnreadCount,
+  resetUnreadCounts,
+} from "@mediabot/shared";
 
 export const notificationsRouter = router({
   /**
@@ -48,15 +53,18 @@ export const notificationsRouter = router({
     }),
 
   /**
-   * Obtiene el conteo de notificaciones no leídas
+   * Obtiene el conteo de notificaciones no leídas (contador en Redis; la DB
+   * solo se consulta si el contador no existe)
    */
   getUnreadCount: protectedProcedure.query(async ({ ctx }) => {
-    const count = await prisma.notification.count({
-      where: {
-        userId: ctx.user.id,
-        read: false,
-      },
-    });
+    const count = await getUnreadCount(ctx.user.id, () =>
+      prisma.notification.count({
+        where: {
+          userId: ctx.user.id,
+          read: false,
+        },
+      })
+    );
 
     return { count };
   }),
@@ -71,6 +79,7 @@ export const notificationsRouter = router({
         where: {
           id: input.id,
           userId: ctx.user.id,
+          read: false,
         },
         data: {
           read: true,
@@ -78,7 +87,16 @@ export const notificationsRouter = router({
         },
       });
 
-      return { success: notification.count > 0 };
+      if (notification.count > 0) {
+        await adjustUnreadCounts([ctx.user.id], -1);
+        return { success: true };
+      }
+
+      // Ya estaba leída: éxito si existe
+      const existing = await prisma.notification.count({
+        where: { id: input.id, userId: ctx.user.id },
+      });
+      return { success: existing > 0 };
     }),
 
   /**
@@ -96,6 +114,10 @@ export const notificationsRouter = router({
       },
     });
 
+    // Descartar (y subir la generación) en vez de escribir 0: una notificación
+    // creada durante el updateMany no se pierde del contador
+    await resetUnreadCounts([ctx.user.id]);
+
     return { count: result.count };
   }),
 
@@ -126,6 +148,11 @@ export const notificationsRouter = router({
         },
       });
 
+      // Pudo no estar leída: recalcular el contador en la próxima consulta
+      if (result.count > 0) {
+        await resetUnreadCounts([ctx.user.id]);
+      }
+
       return { success: result.count > 0 };
     }),
 
@@ -1,7 +1,7 @@
 import { z } from "zod";
 import { TRPCError } from "@trpc/server";
 import { router, superAdminProcedure } from "../trpc";
-import { prisma } from "@mediabot/shared";
+import { prisma, invalidateRecipientCache, invalidateOrgAdminCache } from "@mediabot/shared";
 import bcrypt from "bcryptjs";
 
 /**
@@ -245,10 +245,14 @@ export const organizationsRouter = router({
         return client;
       }
 
-      return prisma.client.update({
+      const updated = await prisma.client.update({
         where: { id: clientId },
         data: { orgId: targetOrgId },
       });
+
+      // Cambian los destinatarios de nivel organización
+      await invalidateRecipientCache();
+      return updated;
     }),
 
   /**
@@ -300,7 +304,7 @@ export const organizationsRouter = router({
 
       const passwordHash = await bcrypt.hash(password, 12);
 
-      return prisma.user.create({
+      const created = await prisma.user.create({
         data: {
           name,
           email,
@@ -318,6 +322,10 @@ export const organizationsRouter = router({
           createdAt: true,
         },
       });
+
+      // Los admins/supervisores reciben las notificaciones de reglas de alerta
+      if (role !== "ANALYST") await invalidateOrgAdminCache([orgId]);
+      return created;
     }),
 
   /**
@@ -368,7 +376,7 @@ export const organizationsRouter = router({
         throw new TRPCError({ code: "NOT_FOUND", message: "Organización no encontrada" });
       }
 
-      return prisma.orgTelegramRecipient.upsert({
+      const recipient = await prisma.orgTelegramRecipient.upsert({
         where: {
           orgId_chatId: { orgId: input.orgId, chatId: input.chatId },
         },
@@ -382,6 +390,9 @@ export const organizationsRouter = router({
           label: input.label,
         },
       });
+
+      await invalidateRecipientCache();
+      return recipient;
     }),
 
   /**
@@ -402,12 +413,15 @@ export const organizationsRouter = router({
         throw new TRPCError({ code: "NOT_FOUND", message: "Destinatario no encontrado" });
       }
 
-      return prisma.orgTelegramRecipient.update({
+      const updated = await prisma.orgTelegramRecipient.update({
         where: { id: input.id },
         data: {
           preferences: JSON.parse(JSON.stringify(input.preferences)),
         },
       });
+
+      await invalidateRecipientCache();
+      return updated;
     }),
 
   /**
@@ -423,9 +437,12 @@ export const organizationsRouter = router({
         throw new TRPCError({ code: "NOT_FOUND", message: "Destinatario no encontrado" });
       }
 
-      return prisma.orgTelegramRecipient.update({
+      const updated = await prisma.orgTelegramRecipient.update({
         where: { id: input.id },
         data: { active: false },
       });
+
+      await invalidateRecipientCache();
+      return updated;
     }),
 });
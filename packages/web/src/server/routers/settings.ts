@@ -6,6 +6,7 @@ import {
   getAllSettings,
   setSettingValue,
   invalidateSettingsCache,
+  invalidateRecipientCache,
   seedDefaultSettings,
   DEFAULT_SETTINGS,
 } from "@mediabot/shared";
@@ -133,11 +134,9 @@ export const settingsRouter = router({
         }
       }
 
+      // Actualiza el snapshot de este proceso y avisa al resto (web y workers)
       await setSettingValue(key, value, type);
 
-      // Clear cache for this setting
-      invalidateSettingsCache(key);
-
       return { success: true, key, value };
     }),
 
@@ -155,7 +154,6 @@ export const settingsRouter = router({
       }
 
       await setSettingValue(input.key, defaultSetting.value, defaultSetting.type);
-      invalidateSettingsCache(input.key);
 
       return {
         success: true,
@@ -227,7 +225,7 @@ export const settingsRouter = router({
       })
     )
     .mutation(async ({ input, ctx }) => {
-      return prisma.user.update({
+      const updated = await prisma.user.update({
         where: { id: ctx.user.id },
         data: {
           telegramNotifPrefs: JSON.parse(JSON.stringify(input.preferences)),
@@ -237,6 +235,9 @@ export const settingsRouter = router({
           telegramNotifPrefs: true,
         },
       });
+
+      await invalidateRecipientCache();
+      return updated;
     }),
 
   /**
@@ -263,7 +264,7 @@ export const settingsRouter = router({
         });
       }
 
-      return prisma.user.update({
+      const updated = await prisma.user.update({
         where: { id: ctx.user.id },
         data: { telegramUserId: input.telegramUserId },
         select: {
@@ -271,6 +272,9 @@ export const settingsRouter = router({
           telegramUserId: true,
         },
       });
+
+      await invalidateRecipientCache();
+      return updated;
     }),
 });
 
@@ -393,18 +393,43 @@ Genera:
   getSocialMentionById: protectedProcedure
     .input(z.object({ id: z.string() }))
     .query(async ({ input, ctx }) => {
+      // Comentarios almacenados por fila; se exponen como commentsData (top por likes)
+      const include = {
+        client: { select: { id: true, name: true } },
+        extractedComments: {
+          orderBy: { likes: "desc" as const },
+          take: 100,
+          select: {
+            commentId: true,
+            text: true,
+            authorHandle: true,
+            authorName: true,
+            likes: true,
+            replies: true,
+            postedAt: true,
+          },
+        },
+      };
+
       // Super Admin puede ver cualquier mención social
       const mention = ctx.user.isSuperAdmin
         ? await prisma.socialMention.findFirst({
             where: { id: input.id },
-            include: { client: { select: { id: true, name: true } } },
+            include,
           })
         : await prisma.socialMention.findFirst({
             where: { id: input.id, client: { orgId: ctx.user.orgId! } },
-            include: { client: { select: { id: true, name: true } } },
+            include,
           });
 
-      return mention;
+      if (!mention) return mention;
+
+      // Menciones extraídas antes de la tabla de comentarios conservan su commentsData legacy
+      const { extractedComments, ...rest } = mention;
+      return {
+        ...rest,
+        commentsData: extractedComments.length > 0 ? extractedComments : rest.commentsData,
+      };
     }),
 
   /**
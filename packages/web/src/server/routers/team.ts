@@ -1,7 +1,7 @@
 import { z } from "zod";
 import { TRPCError } from "@trpc/server";
 import { router, protectedProcedure, getEffectiveOrgId } from "../trpc";
-import { prisma } from "@mediabot/shared";
+import { prisma, invalidateRecipientCache, invalidateOrgAdminCache } from "@mediabot/shared";
 import bcrypt from "bcryptjs";
 
 export const teamRouter = router({
@@ -57,7 +57,7 @@ export const teamRouter = router({
       }
 
       const passwordHash = await bcrypt.hash(input.password, 12);
-      return prisma.user.create({
+      const created = await prisma.user.create({
         data: {
           name: input.name,
           email: input.email,
@@ -67,6 +67,11 @@ export const teamRouter = router({
           orgId: targetOrgId,
         },
       });
+
+      // Los Admin con Telegram reciben notificaciones de la org
+      if (created.telegramUserId) await invalidateRecipientCache();
+      if (created.role !== "ANALYST") await invalidateOrgAdminCache([targetOrgId]);
+      return created;
     }),
 
   update: protectedProcedure
@@ -88,6 +93,13 @@ export const teamRouter = router({
       if (!user) {
         throw new TRPCError({ code: "NOT_FOUND", message: "User not found" });
       }
-      return prisma.user.update({ where: { id }, data });
+      const updated = await prisma.user.update({ where: { id }, data });
+
+      // Rol o Telegram cambian el nivel Admin de destinatarios
+      if (data.role !== undefined || data.telegramUserId !== undefined) await invalidateRecipientCache();
+      if (data.role !== undefined && data.role !== user.role && user.orgId) {
+        await invalidateOrgAdminCache([user.orgId]);
+      }
+      return updated;
     }),
 });
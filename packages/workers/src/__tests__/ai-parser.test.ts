@@ -27,7 +27,12 @@ vi.mock("@mediabot/shared", () => ({
   },
 }));
 
-const { analyzeMention, generateDigestSummary, preFilterArticle } = await import("../analysis/ai.js");
+vi.mock("../analysis/ai-metrics.js", () => ({
+  generateContentTracked: (model: { generateContent: (req: unknown) => unknown }, _family: string, req: unknown) =>
+    model.generateContent(req),
+}));
+
+const { analyzeMention, analyzeMentionsBatch, generateDigestSummary, preFilterArticle } = await import("../analysis/ai.js");
 
 describe("analyzeMention", () => {
   beforeEach(() => {
@@ -431,3 +436,88 @@ describe("generateDigestSummary", () => {
     expect(promptText).not.toContain("Redes sociales:");
   });
 });
+
+describe("analyzeMentionsBatch", () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+  });
+
+  const baseParams = {
+    clientName: "Company",
+    clientDescription: "Tech company",
+    clientIndustry: "Technology",
+    mentions: [
+      { id: "m-a", articleTitle: "Company wins award", articleContent: "...", source: "EFE", keyword: "Company" },
+      { id: "m-b", articleTitle: "Company sued", articleContent: "...", source: "El Pais", keyword: "Company" },
+    ],
+  };
+
+  it("should analyze several mentions in a single call and map results by position", async () => {
+    mockGenerateContent.mockResolvedValue({
+      response: {
+        text: () => JSON.stringify({
+          results: [
+            { id: 2, summary: "Demanda", sentiment: "NEGATIVE", relevance: 9, suggestedAction: "Escalar", topic: "Demanda Legal", topicConfidence: 0.9 },
+            { id: 1, summary: "Premio", sentiment: "POSITIVE", relevance: 7, suggestedAction: "Difundir", topic: "Premios", topicConfidence: 0.8 },
+          ],
+        }),
+      },
+    });
+
+    const results = await analyzeMentionsBatch(baseParams);
+
+    expect(mockGenerateContent).toHaveBeenCalledTimes(1);
+    expect(results.get("m-a")?.sentiment).toBe("POSITIVE");
+    expect(results.get("m-a")?.topic).toBe("Premios");
+    expect(results.get("m-b")?.sentiment).toBe("NEGATIVE");
+    expect(results.get("m-b")?.relevance).toBe(9);
+  });
+
+  it("should fill missing or invalid entries with defaults", async () => {
+    mockGenerateContent.mockResolvedValue({
+      response: {
+        text: () => JSON.stringify({
+          results: [{ id: 1, summary: "Ok", sentiment: "HAPPY", relevance: 20, suggestedAction: "Nada" }],
+        }),
+      },
+    });
+
+    const results = await analyzeMentionsBatch(baseParams);
+
+    expect(results.get("m-a")?.sentiment).toBe("NEUTRAL");
+    expect(results.get("m-a")?.relevance).toBe(10);
+    expect(results.get("m-a")?.topic).toBeNull();
+    expect(results.get("m-b")?.summary).toContain("no disponible");
+    expect(results.get("m-b")?.relevance).toBe(5);
+  });
+
+  it("should send keyword passages instead of the full body for long articles", async () => {
+    mockGenerateContent.mockResolvedValue({ response: { text: () => JSON.stringify({ results: [] }) } });
+
+    const filler = "Texto de relleno sin relacion con el cliente. ".repeat(200);
+    await analyzeMentionsBatch({
+      ...baseParams,
+      mentions: [{
+        id: "m-a",
+        articleTitle: "Nota larga",
+        articleContent: `${filler}La empresa Company anuncio resultados. ${filler}`,
+        source: "EFE",
+        keyword: "Company",
+      }],
+    });
+
+    const promptText = mockGenerateContent.mock.calls[0][0].contents[0].parts[0].text as string;
+    expect(promptText).toContain("Company anuncio resultados");
+    expect(promptText.length).toBeLessThan(filler.length);
+  });
+
+  it("should return defaults for every mention on API error", async () => {
+    mockGenerateContent.mockRejectedValue(new Error("API Error"));
+
+    const results = await analyzeMentionsBatch(baseParams);
+
+    expect(results.size).toBe(2);
+    expect(results.get("m-a")?.sentiment).toBe("NEUTRAL");
+    expect(results.get("m-b")?.topicConfidence).toBe(0);
+  });
+});
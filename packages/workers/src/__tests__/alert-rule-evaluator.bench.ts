@@ -0,0 +1,33 @@
+import { bench, describe, vi } from "vitest";
+
+vi.mock("@mediabot/shared", () => ({
+  prisma: {
+    $queryRaw: vi.fn(),
+    client: { findMany: vi.fn() },
+    clientCompetitor: { findMany: vi.fn() },
+  },
+}));
+
+vi.mock("../analysis/anomaly.js", () => ({
+  getAnomalyScores: vi.fn().mockResolvedValue(null),
+}));
+
+import { prisma } from "@mediabot/shared";
+import { evaluateRules } from "../workers/alert-rule-evaluator";
+import { buildRuleFixture, fakeQueryRaw } from "./alert-rules-fixtures";
+
+const NOW = Date.UTC(2026, 0, 20, 12);
+
+// El evaluador registra un resumen por corrida
+vi.spyOn(console, "log").mockImplementation(() => {});
+const fixture = buildRuleFixture(1000, 200, NOW);
+
+vi.mocked(prisma.$queryRaw).mockImplementation(fakeQueryRaw(fixture.mentions) as never);
+vi.mocked(prisma.client.findMany).mockResolvedValue(fixture.clients as never);
+vi.mocked(prisma.clientCompetitor.findMany).mockResolvedValue(fixture.competitors as never);
+
+describe("alert rule evaluation", () => {
+  bench("1k reglas, 200 clientes", async () => {
+    await evaluateRules(fixture.rules, NOW);
+  });
+});
@@ -0,0 +1,157 @@
+import { describe, it, expect, vi, beforeEach } from "vitest";
+
+vi.mock("@mediabot/shared", () => ({
+  prisma: {
+    $queryRaw: vi.fn(),
+    client: { findMany: vi.fn() },
+    clientCompetitor: { findMany: vi.fn() },
+  },
+}));
+
+vi.mock("../analysis/anomaly.js", () => ({
+  getAnomalyScores: vi.fn(),
+}));
+
+import { prisma } from "@mediabot/shared";
+import { getAnomalyScores } from "../analysis/anomaly.js";
+import {
+  evaluateRules,
+  evaluateRuleInMemory,
+  ruleWindows,
+  windowKey,
+  type EvaluationContext,
+  type RuleForEvaluation,
+} from "../workers/alert-rule-evaluator";
+import { buildRuleFixture, fakeQueryRaw, type FakeMention } from "./alert-rules-fixtures";
+
+const HOUR = 60 * 60 * 1000;
+const NOW = Date.UTC(2026, 0, 20, 12);
+
+function rule(type: string, condition: Record<string, number> = {}, clientId = "c1"): RuleForEvaluation {
+  return { id: `${type}-${clientId}`, type, clientId, condition, client: { orgId: "org-1" } };
+}
+
+function mentions(clientId: string, count: number, hoursAgo: number, sentiment = "NEUTRAL"): FakeMention[] {
+  return Array.from({ length: count }, () => ({ clientId, sentiment, publishedAt: NOW - hoursAgo * HOUR }));
+}
+
+function setup(data: FakeMention[], clients = [{ id: "c1", name: "Acme", orgId: "org-1", active: true }]) {
+  vi.mocked(prisma.$queryRaw).mockImplementation(fakeQueryRaw(data) as never);
+  vi.mocked(prisma.client.findMany).mockResolvedValue(clients as never);
+}
+
+describe("alert-rule-evaluator", () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+    vi.mocked(getAnomalyScores).mockResolvedValue(null);
+    vi.mocked(prisma.clientCompetitor.findMany).mockResolvedValue([]);
+  });
+
+  describe("ruleWindows", () => {
+    it("comparte ventanas entre reglas con la misma configuración", () => {
+      const keys = new Set(
+        [rule("SOV_DROP"), rule("SENTIMENT_SHIFT"), rule("COMPETITOR_SPIKE")].flatMap((r) =>
+          ruleWindows(r).map(windowKey)
+        )
+      );
+      expect(keys.size).toBe(2);
+    });
+  });
+
+  describe("evaluateRules", () => {
+    it("evalúa NEGATIVE_SPIKE, NO_MENTIONS y SENTIMENT_SHIFT desde los conteos agrupados", async () => {
+      setup([
+        ...mentions("c1", 6, 2, "NEGATIVE"),
+        ...mentions("c1", 4, 2),
+        ...mentions("c1", 10, 24 * 10), // periodo anterior: 0% negativas
+      ]);
+
+      const results = await evaluateRules(
+        [
+          rule("NEGATIVE_SPIKE", { threshold: 5, timeWindowHours: 24 }),
+          rule("NO_MENTIONS", { hours: 48 }),
+          rule("SENTIMENT_SHIFT", { shiftThreshold: 15, days: 7 }),
+        ],
+        NOW
+      );
+
+      expect(results.get("NEGATIVE_SPIKE-c1")).toEqual({ triggered: true, value: 6 });
+      expect(results.get("NO_MENTIONS-c1")?.triggered).toBe(false);
+      expect(results.get("SENTIMENT_SHIFT-c1")?.triggered).toBe(true);
+    });
+
+    it("calcula SOV_DROP con el total de la org en memoria", async () => {
+      setup(
+        [
+          ...mentions("c1", 5, 24 * 2), // actual: 5 de 25 = 20%
+          ...mentions("c2", 20, 24 * 2),
+          ...mentions("c1", 10, 24 * 10), // anterior: 10 de 20 = 50%
+          ...mentions("c2", 10, 24 * 10),
+        ],
+        [
+          { id: "c1", name: "Acme", orgId: "org-1", active: true },
+          { id: "c2", name: "Globex", orgId: "org-1", active: true },
+        ]
+      );
+
+      const results = await evaluateRules([rule("SOV_DROP", { dropThreshold: 10, days: 7 })], NOW);
+      expect(results.get("SOV_DROP-c1")?.triggered).toBe(true);
+    });
+
+    it("resuelve competidores por nombre dentro de la org", async () => {
+      setup(
+        [...mentions("c2", 8, 24 * 2), ...mentions("c2", 2, 24 * 10)],
+        [
+          { id: "c1", name: "Acme", orgId: "org-1", active: true },
+          { id: "c2", name: "Globex Corp", orgId: "org-1", active: true },
+        ]
+      );
+      vi.mocked(prisma.clientCompetitor.findMany).mockResolvedValue([
+        { clientId: "c1", competitor: { name: "globex" } },
+      ] as never);
+
+      const results = await evaluateRules([rule("COMPETITOR_SPIKE", { spikeThreshold: 30, days: 7 })], NOW);
+      expect(results.get("COMPETITOR_SPIKE-c1")?.triggered).toBe(true);
+    });
+
+    it("usa la línea base de anomalías para VOLUME_SURGE cuando existe", async () => {
+      setup(mentions("c1", 30, 2));
+      vi.mocked(getAnomalyScores).mockResolvedValue({
+        windowMinutes: 1440,
+        total: { observed: 30, expected: 28, zScore: 0.3, surprise: 0.2 },
+        negative: { observed: 0, expected: 1, zScore: 0, surprise: 0 },
+        negativeRatio: { observed: 0, expected: 0.1, zScore: 0 },
+      });
+
+      const results = await evaluateRules([rule("VOLUME_SURGE")], NOW);
+
+      // Sin línea base, 30 contra promedio 0 dispararía
+      expect(results.get("VOLUME_SURGE-c1")?.triggered).toBe(false);
+    });
+
+    it("con 1k reglas hace una consulta por ventana distinta", async () => {
+      const fixture = buildRuleFixture(1000, 200, NOW);
+      setup(fixture.mentions, fixture.clients);
+      vi.mocked(prisma.clientCompetitor.findMany).mockResolvedValue(fixture.competitors as never);
+
+      const results = await evaluateRules(fixture.rules, NOW);
+
+      expect(results.size).toBe(1000);
+      // 24h, 7d-24h (VOLUME_SURGE), 48h (NO_MENTIONS), 7d y 14d-7d (periodos)
+      expect(vi.mocked(prisma.$queryRaw).mock.calls.length).toBe(5);
+      expect(prisma.client.findMany).toHaveBeenCalledTimes(1);
+    });
+  });
+
+  describe("evaluateRuleInMemory", () => {
+    it("retorna false para tipos desconocidos", () => {
+      const ctx: EvaluationContext = {
+        counts: new Map(),
+        orgClients: new Map(),
+        competitorClients: new Map(),
+        anomalies: new Map(),
+      };
+      expect(evaluateRuleInMemory(rule("UNKNOWN"), ctx)).toEqual({ triggered: false, value: null });
+    });
+  });
+});
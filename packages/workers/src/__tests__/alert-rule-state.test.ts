@@ -0,0 +1,115 @@
+import { describe, it, expect, vi, beforeEach } from "vitest";
+
+vi.mock("@mediabot/shared", () => ({
+  prisma: {
+    user: { findMany: vi.fn() },
+  },
+  ORG_ADMINS_KEY_PREFIX: "alert-rule:org-admins:",
+}));
+
+vi.mock("../queues.js", () => {
+  const pipeline = { set: vi.fn().mockReturnThis(), exec: vi.fn().mockResolvedValue([]) };
+  return {
+    connection: {
+      mget: vi.fn(),
+      pipeline: vi.fn(() => pipeline),
+    },
+  };
+});
+
+import { prisma } from "@mediabot/shared";
+import { connection } from "../queues.js";
+import {
+  nextRuleState,
+  getOrgAdminIds,
+  loadRuleStates,
+  ALERT_RULE_COOLDOWN_MS,
+  CLEAR_EVALUATIONS,
+  type AlertRuleState,
+} from "../workers/alert-rule-state";
+
+const NOW = Date.UTC(2026, 0, 20, 12);
+const CONDITION = '{"threshold":5}';
+const fired = { triggered: true, value: 8 };
+const quiet = { triggered: false, value: 1 };
+
+function run(steps: Array<{ triggered: boolean; value: number | null }>, stepMs = 30 * 60 * 1000) {
+  let state: AlertRuleState | null = null;
+  const notified: boolean[] = [];
+  steps.forEach((evaluation, i) => {
+    const next = nextRuleState(state, evaluation, CONDITION, NOW + i * stepMs);
+    state = next.state;
+    notified.push(next.notify);
+  });
+  return { state: state as AlertRuleState | null, notified };
+}
+
+describe("alert-rule-state", () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+  });
+
+  describe("nextRuleState", () => {
+    it("notifica al dispararse y repite solo tras el cooldown", () => {
+      const { notified, state } = run([fired, fired, fired]);
+
+      expect(notified).toEqual([true, false, true]);
+      expect(state?.lastFiredAt).toBe(NOW + ALERT_RULE_COOLDOWN_MS);
+      expect(state?.lastValue).toBe(8);
+    });
+
+    it("no re-notifica si la métrica oscila alrededor del umbral", () => {
+      const { notified, state } = run([fired, quiet, fired], 5 * 60 * 1000);
+
+      expect(notified).toEqual([true, false, false]);
+      expect(state?.firing).toBe(true);
+    });
+
+    it("se resuelve tras CLEAR_EVALUATIONS evaluaciones sin cumplirse", () => {
+      const quietRun = Array.from({ length: CLEAR_EVALUATIONS }, () => quiet);
+      const { notified, state } = run([fired, ...quietRun, fired], 5 * 60 * 1000);
+
+      expect(notified[notified.length - 1]).toBe(true);
+      expect(state?.clearStreak).toBe(0);
+    });
+
+    it("reinicia el estado si cambia la condición", () => {
+      const first = nextRuleState(null, fired, CONDITION, NOW);
+      const next = nextRuleState(first.state, fired, '{"threshold":3}', NOW + 60 * 1000);
+
+      expect(next.notify).toBe(true);
+    });
+  });
+
+  describe("loadRuleStates", () => {
+    it("ignora reglas sin estado o con JSON inválido", async () => {
+      vi.mocked(connection.mget).mockResolvedValue([
+        JSON.stringify({ firing: true, lastFiredAt: NOW }),
+        null,
+        "{roto",
+      ] as never);
+
+      const states = await loadRuleStates(["r1", "r2", "r3"]);
+
+      expect([...states.keys()]).toEqual(["r1"]);
+      expect(states.get("r1")?.clearStreak).toBe(0);
+    });
+  });
+
+  describe("getOrgAdminIds", () => {
+    it("resuelve las orgs faltantes con una sola consulta", async () => {
+      vi.mocked(connection.mget).mockResolvedValue([JSON.stringify(["u1"]), null, null] as never);
+      vi.mocked(prisma.user.findMany).mockResolvedValue([
+        { id: "u2", orgId: "org-2" },
+        { id: "u3", orgId: "org-2" },
+      ] as never);
+
+      const admins = await getOrgAdminIds(["org-1", "org-2", "org-3", "org-2"]);
+
+      expect(prisma.user.findMany).toHaveBeenCalledTimes(1);
+      expect(admins.get("org-1")).toEqual(["u1"]);
+      expect(admins.get("org-2")).toEqual(["u2", "u3"]);
+      expect(admins.get("org-3")).toEqual([]);
+    });
+  });
+});
@@ -0,0 +1,89 @@
+/**
+ * Datos sintéticos para el test y el benchmark del evaluador de reglas.
+ */
+import type { RuleForEvaluation } from "../workers/alert-rule-evaluator";
+
+export interface FakeMention {
+  clientId: string;
+  sentiment: string;
+  publishedAt: number;
+}
+
+const RULE_TYPES = [
+  "NEGATIVE_SPIKE",
+  "VOLUME_SURGE",
+  "NO_MENTIONS",
+  "SOV_DROP",
+  "COMPETITOR_SPIKE",
+  "SENTIMENT_SHIFT",
+];
+
+/**
+ * `$queryRaw` falso: aplica la consulta agrupada por ventana sobre menciones
+ * en memoria. Parámetros en el orden del template: clientIds, since[, until].
+ */
+export function fakeQueryRaw(mentions: FakeMention[]) {
+  return async (_strings: TemplateStringsArray, ...values: unknown[]) => {
+    const [clientIds, since, until] = values as [string[], Date, Date | undefined];
+    const ids = new Set(clientIds);
+    const groups = new Map<string, { clientId: string; sentiment: string; count: number }>();
+
+    for (const m of mentions) {
+      if (!ids.has(m.clientId) || m.publishedAt < since.getTime()) continue;
+      if (until && m.publishedAt >= until.getTime()) continue;
+      const key = `${m.clientId}:${m.sentiment}`;
+      const group = groups.get(key) ?? { clientId: m.clientId, sentiment: m.sentiment, count: 0 };
+      group.count++;
+      groups.set(key, group);
+    }
+    return [...groups.values()];
+  };
+}
+
+/**
+ * `ruleCount` reglas repartidas entre `clientCount` clientes de 10 orgs, con
+ * las mismas ventanas por defecto que crea el dashboard.
+ */
+export function buildRuleFixture(ruleCount: number, clientCount = 200, now = Date.now()) {
+  const clients = Array.from({ length: clientCount }, (_, i) => ({
+    id: `client-${i}`,
+    name: `Cliente ${i}`,
+    orgId: `org-${i % 10}`,
+    active: true,
+  }));
+
+  const rules: RuleForEvaluation[] = Array.from({ length: ruleCount }, (_, i) => {
+    const client = clients[i % clientCount];
+    return {
+      id: `rule-${i}`,
+      type: RULE_TYPES[i % RULE_TYPES.length],
+      clientId: client.id,
+      condition: {},
+      client: { orgId: client.orgId },
+    };
+  });
+
+  const competitors = clients.map((client, i) => ({
+    clientId: client.id,
+    competitor: { name: clients[(i + 10) % clientCount].name },
+  }));
+
+  // ~30 menciones por cliente en las últimas dos semanas
+  const mentions: FakeMention[] = [];
+  let seed = 42;
+  const random = () => {
+    seed = (seed * 16807) % 2147483647;
+    return seed / 2147483647;
+  };
+  for (const client of clients) {
+    for (let j = 0; j < 30; j++) {
+      mentions.push({
+        clientId: client.id,
+        sentiment: random() < 0.2 ? "NEGATIVE" : "NEUTRAL",
+        publishedAt: now - Math.floor(random() * 14 * 24 * 60 * 60 * 1000),
+      });
+    }
+  }
+
+  return { clients, rules, competitors, mentions };
+}
@@ -0,0 +1,180 @@
+/**
+ * Tests para la agrupación de notificaciones por (destinatario, cliente).
+ */
+import { describe, it, expect, vi, beforeEach } from "vitest";
+
+vi.mock("@mediabot/shared", () => ({
+  config: { workers: { notification: { coalesceWindowSeconds: 60 } } },
+}));
+
+const buffers = vi.hoisted(() => new Map<string, string[]>());
+
+vi.mock("../queues.js", () => {
+  // multi() mínimo sobre listas en memoria
+  const multi = () => {
+    const ops: Array<() => [null, unknown]> = [];
+    const tx = {
+      rpush: (key: string, value: string) => {
+        ops.push(() => {
+          const list = buffers.get(key) ?? [];
+          list.push(value);
+          buffers.set(key, list);
+          return [null, list.length];
+        });
+        return tx;
+      },
+      pexpire: () => {
+        ops.push(() => [null, 1]);
+        return tx;
+      },
+      lindex: (key: string, index: number) => {
+        ops.push(() => [null, buffers.get(key)?.[index] ?? null]);
+        return tx;
+      },
+      lrange: (key: string) => {
+        ops.push(() => [null, [...(buffers.get(key) ?? [])]]);
+        return tx;
+      },
+      del: (key: string) => {
+        ops.push(() => [null, buffers.delete(key) ? 1 : 0]);
+        return tx;
+      },
+      exec: async () => ops.map((op) => op()),
+    };
+    return tx;
+  };
+  const queue = { add: vi.fn().mockResolvedValue({}) };
+  return {
+    connection: { multi },
+    QUEUE_NAMES: { NOTIFY_TELEGRAM: "notify-telegram" },
+    getQueue: vi.fn(() => queue),
+  };
+});
+
+vi.mock("../notifications/telegram-delivery.js", () => ({
+  DELIVERY_PRIORITY: { CRITICAL: 1, HIGH: 2, NORMAL: 5, DIGEST: 10 },
+  enqueueTelegramDeliveries: vi.fn(async (recipients: unknown[]) => recipients.length),
+  recordCoalescedFlush: vi.fn(),
+  toJobOptions: (options?: unknown) => options ?? {},
+}));
+
+import type { Job } from "bullmq";
+import { getQueue } from "../queues.js";
+import { enqueueTelegramDeliveries, recordCoalescedFlush } from "../notifications/telegram-delivery.js";
+import {
+  combineEvents,
+  enqueueCoalescedDeliveries,
+  processCoalesceFlush,
+  type CoalesceFlushJob,
+} from "../notifications/coalescer.js";
+
+const target = (summary: string) => ({ clientId: "c1", clientName: "Cliente", summary });
+
+describe("combineEvents", () => {
+  it("con un solo evento envía el mensaje original con su teclado", () => {
+    const options = { reply_markup: { inline_keyboard: [] } };
+    expect(combineEvents("Cliente", [{ message: "original", summary: "s", options }])).toEqual({
+      message: "original",
+      options,
+    });
+  });
+
+  it("con varios eventos lista los resúmenes", () => {
+    const { message, options } = combineEvents("Cliente", [
+      { message: "a", summary: "Alerta A" },
+      { message: "b", summary: "Tema B" },
+    ]);
+    expect(message).toContain("2 NOTIFICACIONES | Cliente");
+    expect(message).toContain("• Alerta A\n• Tema B");
+    expect(options).toBeUndefined();
+  });
+
+  it("recorta la lista en mensajes muy largos", () => {
+    const events = Array.from({ length: 20 }, (_, i) => ({ message: `m${i}`, summary: `evento ${i}` }));
+    const { message } = combineEvents("Cliente", events);
+    expect(message).toContain("• evento 14");
+    expect(message).not.toContain("• evento 15");
+    expect(message).toContain("... y 5 mas");
+  });
+});
+
+describe("enqueueCoalescedDeliveries", () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+    buffers.clear();
+  });
+
+  it("CRITICAL pasa directo sin agrupar", async () => {
+    await enqueueCoalescedDeliveries([{ chatId: "1" }], "crisis", target("x"), undefined, 1);
+
+    expect(enqueueTelegramDeliveries).toHaveBeenCalledWith([{ chatId: "1" }], "crisis", undefined, 1);
+    expect(buffers.size).toBe(0);
+  });
+
+  it("todos los eventos de la ventana programan el mismo flush (jobId idempotente)", async () => {
+    await enqueueCoalescedDeliveries([{ chatId: "1" }, { chatId: "2" }], "a", target("A"));
+    await enqueueCoalescedDeliveries([{ chatId: "1" }], "b", target("B"));
+
+    const calls = vi.mocked(getQueue("notify-telegram").add).mock.calls;
+    expect(calls).toHaveLength(3);
+    expect(calls[0][0]).toBe("coalesce-flush");
+    expect(calls[0][1]).toMatchObject({ chatId: "1", clientId: "c1" });
+    expect(calls[0][2]).toMatchObject({ delay: 60000 });
+    // Mismo buffer y misma ventana → mismo jobId; otro destinatario → otro job
+    expect(calls[2][2]?.jobId).toBe(calls[0][2]?.jobId);
+    expect(calls[1][2]?.jobId).not.toBe(calls[0][2]?.jobId);
+    expect(calls[0][2]?.jobId).not.toContain(":");
+    expect(buffers.get("telegram:coalesce:1:c1")).toHaveLength(2);
+    expect(enqueueTelegramDeliveries).not.toHaveBeenCalled();
+  });
+
+  it("si falla el add del primer evento, el siguiente programa el flush", async () => {
+    const queue = getQueue("notify-telegram");
+    vi.mocked(queue.add).mockRejectedValueOnce(new Error("Redis timeout"));
+
+    await expect(enqueueCoalescedDeliveries([{ chatId: "1" }], "a", target("A"))).rejects.toThrow("Redis timeout");
+    await enqueueCoalescedDeliveries([{ chatId: "1" }], "b", target("B"));
+
+    const calls = vi.mocked(queue.add).mock.calls;
+    expect(calls).toHaveLength(2);
+    expect(calls[1][2]?.jobId).toBe(calls[0][2]?.jobId);
+  });
+});
+
+describe("processCoalesceFlush", () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+    buffers.clear();
+  });
+
+  const flushJob = { data: { chatId: "1", clientId: "c1", clientName: "Cliente", priority: 5 } } as Job<CoalesceFlushJob>;
+
+  it("envía un solo mensaje por todos los eventos y registra los envíos ahorrados", async () => {
+    await enqueueCoalescedDeliveries([{ chatId: "1" }], "a", target("A"));
+    await enqueueCoalescedDeliveries([{ chatId: "1" }], "b", target("B"));
+    await enqueueCoalescedDeliveries([{ chatId: "1" }], "c", target("C"));
+
+    await processCoalesceFlush(flushJob);
+
+    expect(enqueueTelegramDeliveries).toHaveBeenCalledTimes(1);
+    const [recipients, message] = (enqueueTelegramDeliveries as ReturnType<typeof vi.fn>).mock.calls[0];
+    expect(recipients).toEqual([{ chatId: "1", label: undefined, source: undefined }]);
+    expect(message).toContain("3 NOTIFICACIONES");
+    expect(recordCoalescedFlush).toHaveBeenCalledWith(3);
+    expect(buffers.has("telegram:coalesce:1:c1")).toBe(false);
+  });
+
+  it("entrega con la prioridad más alta de la ventana", async () => {
+    await enqueueCoalescedDeliveries([{ chatId: "1" }], "a", target("A"), undefined, 5);
+    await enqueueCoalescedDeliveries([{ chatId: "1" }], "b", target("B"), undefined, 2);
+
+    await processCoalesceFlush(flushJob);
+
+    expect(vi.mocked(enqueueTelegramDeliveries).mock.calls[0][3]).toBe(2);
+  });
+
+  it("no envía nada si la ventana quedó vacía", async () => {
+    await processCoalesceFlush(flushJob);
+    expect(enqueueTelegramDeliveries).not.toHaveBeenCalled();
+  });
+});
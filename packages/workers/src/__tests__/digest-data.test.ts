@@ -0,0 +1,158 @@
+import { describe, it, expect, vi } from "vitest";
+
+vi.mock("@mediabot/shared", () => ({ prisma: {} }));
+
+import { foldDigestStats, forEachWithConcurrency, rankBySourceReach } from "../notifications/digest-data.js";
+
+const clients = [
+  { id: "c1", orgId: "o1" },
+  { id: "c2", orgId: "o1" },
+  { id: "c3", orgId: "o2" },
+];
+
+describe("foldDigestStats", () => {
+  it("suma sentimiento de hoy y ayer por cliente", () => {
+    const stats = foldDigestStats(
+      clients,
+      [
+        { clientId: "c1", sentiment: "POSITIVE", today: 3, yesterday: 1 },
+        { clientId: "c1", sentiment: "NEGATIVE", today: 2, yesterday: 4 },
+        { clientId: "c2", sentiment: "NEUTRAL", today: 5, yesterday: 0 },
+      ],
+      [],
+      [],
+      []
+    );
+
+    const c1 = stats.get("c1")!;
+    expect(c1.mentions).toBe(5);
+    expect(c1.sentiment).toEqual({ positive: 3, negative: 2, neutral: 0, mixed: 0 });
+    expect(c1.yesterdayMentions).toBe(5);
+    expect(c1.yesterdaySentiment).toEqual({ positive: 1, negative: 4, neutral: 0, mixed: 0 });
+    expect(stats.get("c2")!.sentiment.neutral).toBe(5);
+  });
+
+  it("calcula SOV contra el total de la organización", () => {
+    const stats = foldDigestStats(
+      clients,
+      [
+        { clientId: "c1", sentiment: "POSITIVE", today: 5, yesterday: 1 },
+        { clientId: "c2", sentiment: "POSITIVE", today: 15, yesterday: 3 },
+      ],
+      [{ orgId: "o1", today: 20, yesterday: 4 }],
+      [],
+      []
+    );
+
+    expect(stats.get("c1")!.sov).toBe(25);
+    expect(stats.get("c1")!.yesterdaySov).toBe(25);
+    expect(stats.get("c2")!.sov).toBe(75);
+    expect(stats.get("c3")!.sov).toBe(0);
+  });
+
+  it("agrega redes sociales por plataforma y crisis activas", () => {
+    const stats = foldDigestStats(
+      clients,
+      [],
+      [],
+      [
+        { clientId: "c3", platform: "TIKTOK", posts: 2, likes: 100, comments: 10, shares: 1 },
+        { clientId: "c3", platform: "YOUTUBE", posts: 1, likes: 50, comments: 5, shares: 0 },
+      ],
+      [{ clientId: "c3", count: 2 }]
+    );
+
+    const c3 = stats.get("c3")!;
+    expect(c3.social).toEqual({
+      totalPosts: 3,
+      platforms: { TIKTOK: 2, YOUTUBE: 1 },
+      likes: 150,
+      comments: 15,
+      shares: 1,
+    });
+    expect(c3.activeCrises).toBe(2);
+    expect(stats.get("c1")!.social.totalPosts).toBe(0);
+  });
+
+  it("ignora filas de clientes fuera de la lista", () => {
+    const stats = foldDigestStats(
+      clients,
+      [{ clientId: "otro", sentiment: "POSITIVE", today: 1, yesterday: 0 }],
+      [],
+      [],
+      [{ clientId: "otro", count: 1 }]
+    );
+    expect(stats.size).toBe(3);
+    expect(stats.has("otro")).toBe(false);
+  });
+});
+
+describe("rankBySourceReach", () => {
+  it("ordena por relevancia y desempata por tier de la fuente", () => {
+    const tiers = new Map([["eluniversal.com.mx", 1], ["diariodeyucatan.com", 2]]);
+    const ranked = rankBySourceReach(
+      [
+        { relevance: 7, source: "blog.example.com" },
+        { relevance: 7, source: "https://www.diariodeyucatan.com/nota" },
+        { relevance: 9, source: "blog.example.com" },
+        { relevance: 7, source: "noticias.eluniversal.com.mx" },
+      ],
+      tiers,
+      3
+    );
+
+    expect(ranked.map((r) => r.source)).toEqual([
+      "blog.example.com",
+      "noticias.eluniversal.com.mx",
+      "https://www.diariodeyucatan.com/nota",
+    ]);
+  });
+});
+
+describe("forEachWithConcurrency", () => {
+  it("no supera el límite de tareas en paralelo", async () => {
+    let running = 0;
+    let peak = 0;
+    const done: number[] = [];
+
+    await forEachWithConcurrency(
+      [1, 2, 3, 4, 5, 6, 7],
+      3,
+      async (n) => {
+        running++;
+        peak = Math.max(peak, running);
+        await new Promise((resolve) => setTimeout(resolve, 5));
+        running--;
+        done.push(n);
+      },
+      () => {}
+    );
+
+    expect(peak).toBe(3);
+    expect(done.sort()).toEqual([1, 2, 3, 4, 5, 6, 7]);
+  });
+
+  it("sigue con los demás elementos si uno falla", async () => {
+    const done: string[] = [];
+    const failed: string[] = [];
+
+    await forEachWithConcurrency(
+      ["a", "b", "c"],
+      2,
+      async (item) => {
+        if (item === "b") throw new Error("boom");
+        done.push(item);
+      },
+      (item) => failed.push(item)
+    );
+
+    expect(done.sort()).toEqual(["a", "c"]);
+    expect(failed).toEqual(["b"]);
+  });
+
+  it("no hace nada con la lista vacía", async () => {
+    const fn = vi.fn();
+    await forEachWithConcurrency([], 5, fn, () => {});
+    expect(fn).not.toHaveBeenCalled();
+  });
+});
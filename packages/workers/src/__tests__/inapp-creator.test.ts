@@ -0,0 +1,77 @@
+/**
+ * Tests para el fan-out de notificaciones in-app: un createMany, un ajuste de
+ * contadores y un solo evento realtime por lote.
+ */
+import { describe, it, expect, vi, beforeEach } from "vitest";
+
+vi.mock("@mediabot/shared", () => ({
+  prisma: {
+    user: { findMany: vi.fn() },
+    notification: { createMany: vi.fn().mockResolvedValue({ count: 0 }) },
+  },
+  adjustUnreadCounts: vi.fn().mockResolvedValue(undefined),
+}));
+
+vi.mock("@mediabot/shared/src/realtime-publisher.js", () => ({
+  publishRealtimeEvent: vi.fn(),
+}));
+
+vi.mock("@mediabot/shared/src/realtime-types.js", () => ({
+  REALTIME_CHANNELS: { NOTIFICATION_NEW: "mediabot:notification:new" },
+}));
+
+import { prisma, adjustUnreadCounts } from "@mediabot/shared";
+import { publishRealtimeEvent } from "@mediabot/shared/src/realtime-publisher.js";
+import {
+  createInAppNotificationForOrg,
+  createInAppNotifications,
+} from "../notifications/inapp-creator.js";
+
+describe("createInAppNotificationForOrg", () => {
+  beforeEach(() => vi.clearAllMocks());
+
+  it("crea todas las notificaciones de la org en un solo lote", async () => {
+    (prisma.user.findMany as ReturnType<typeof vi.fn>).mockResolvedValue([
+      { id: "u1" },
+      { id: "u2" },
+      { id: "u3" },
+    ]);
+
+    const created = await createInAppNotificationForOrg("org-1", {
+      type: "CRISIS_ALERT",
+      title: "Crisis",
+      message: "5 menciones negativas",
+      data: { clientId: "c1" },
+    });
+
+    expect(created).toBe(3);
+    expect(prisma.notification.createMany).toHaveBeenCalledTimes(1);
+    const rows = (prisma.notification.createMany as ReturnType<typeof vi.fn>).mock.calls[0][0].data;
+    expect(rows.map((r: { userId: string }) => r.userId)).toEqual(["u1", "u2", "u3"]);
+
+    expect(adjustUnreadCounts).toHaveBeenCalledWith(["u1", "u2", "u3"], 1);
+    expect(publishRealtimeEvent).toHaveBeenCalledTimes(1);
+    expect(publishRealtimeEvent).toHaveBeenCalledWith(
+      "mediabot:notification:new",
+      expect.objectContaining({ clientId: "c1", orgId: "org-1", userIds: ["u1", "u2", "u3"] })
+    );
+  });
+
+  it("no escribe ni publica si la org no tiene usuarios", async () => {
+    (prisma.user.findMany as ReturnType<typeof vi.fn>).mockResolvedValue([]);
+
+    expect(await createInAppNotificationForOrg("org-1", { type: "SYSTEM", title: "t", message: "m" })).toBe(0);
+    expect(prisma.notification.createMany).not.toHaveBeenCalled();
+    expect(publishRealtimeEvent).not.toHaveBeenCalled();
+  });
+});
+
+describe("createInAppNotifications", () => {
+  beforeEach(() => vi.clearAllMocks());
+
+  it("sin destinatarios no hace nada", async () => {
+    expect(await createInAppNotifications([], { type: "SYSTEM", title: "t", message: "m" })).toBe(0);
+    expect(prisma.notification.createMany).not.toHaveBeenCalled();
+    expect(adjustUnreadCounts).not.toHaveBeenCalled();
+  });
+});
@@ -0,0 +1,88 @@
+/**
+ * Tests para el cache de resolución de destinatarios por (cliente, tipo).
+ */
+import { describe, it, expect, vi, beforeEach } from "vitest";
+
+vi.mock("@mediabot/shared", () => ({
+  prisma: {
+    telegramRecipient: { findMany: vi.fn() },
+    client: { findUnique: vi.fn() },
+    orgTelegramRecipient: { findMany: vi.fn() },
+    user: { findMany: vi.fn() },
+  },
+  isNotifTypeEnabled: (prefs: Record<string, boolean> | null, type: string) => !prefs || prefs[type] !== false,
+  RECIPIENT_CACHE_VERSION_KEY: "telegram:recipients:version",
+}));
+
+vi.mock("../queues.js", () => ({
+  connection: { get: vi.fn() },
+}));
+
+vi.mock("../notifications/telegram-delivery.js", () => ({
+  DELIVERY_PRIORITY: { CRITICAL: 1, HIGH: 2, NORMAL: 5, DIGEST: 10 },
+  enqueueTelegramDeliveries: vi.fn(),
+}));
+
+import { prisma } from "@mediabot/shared";
+import { connection } from "../queues.js";
+import { clearRecipientCache, getAllRecipientsForClient } from "../notifications/recipients.js";
+
+const mockPrisma = prisma as unknown as {
+  telegramRecipient: { findMany: ReturnType<typeof vi.fn> };
+  client: { findUnique: ReturnType<typeof vi.fn> };
+  orgTelegramRecipient: { findMany: ReturnType<typeof vi.fn> };
+  user: { findMany: ReturnType<typeof vi.fn> };
+};
+
+describe("getAllRecipientsForClient cache", () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+    clearRecipientCache();
+    (connection.get as ReturnType<typeof vi.fn>).mockResolvedValue("1");
+    mockPrisma.telegramRecipient.findMany.mockResolvedValue([
+      { chatId: "-100", label: "Interno", type: "AGENCY_INTERNAL" },
+    ]);
+    mockPrisma.client.findUnique.mockResolvedValue({ orgId: "org-1" });
+    mockPrisma.orgTelegramRecipient.findMany.mockResolvedValue([
+      { chatId: "-200", label: "Org", preferences: { DAILY_DIGEST: false } },
+    ]);
+    mockPrisma.user.findMany.mockResolvedValue([]);
+  });
+
+  it("reutiliza la resolución mientras la versión no cambie", async () => {
+    const first = await getAllRecipientsForClient("c1", "MENTION_ALERT");
+    const second = await getAllRecipientsForClient("c1", "MENTION_ALERT");
+
+    expect(first.map((r) => r.chatId)).toEqual(["-100", "-200"]);
+    expect(second).toEqual(first);
+    expect(mockPrisma.telegramRecipient.findMany).toHaveBeenCalledTimes(1);
+    expect(mockPrisma.user.findMany).toHaveBeenCalledTimes(2); // admins + superadmins, una sola vez
+  });
+
+  it("vuelve a resolver cuando se invalida la versión", async () => {
+    await getAllRecipientsForClient("c1", "MENTION_ALERT");
+    (connection.get as ReturnType<typeof vi.fn>).mockResolvedValue("2");
+    await getAllRecipientsForClient("c1", "MENTION_ALERT");
+
+    expect(mockPrisma.telegramRecipient.findMany).toHaveBeenCalledTimes(2);
+  });
+
+  it("cachea por tipo de notificación (las preferencias filtran distinto)", async () => {
+    const alerts = await getAllRecipientsForClient("c1", "MENTION_ALERT");
+    const digest = await getAllRecipientsForClient("c1", "DAILY_DIGEST");
+
+    expect(alerts.map((r) => r.chatId)).toEqual(["-100", "-200"]);
+    expect(digest.map((r) => r.chatId)).toEqual(["-100"]);
+    expect(mockPrisma.telegramRecipient.findMany).toHaveBeenCalledTimes(2);
+  });
+
+  it("retorna copias: modificar el resultado no altera el cache", async () => {
+    const first = await getAllRecipientsForClient("c1", "MENTION_ALERT");
+    first[0].label = "cambiado";
+    first.pop();
+
+    const second = await getAllRecipientsForClient("c1", "MENTION_ALERT");
+    expect(second).toHaveLength(2);
+    expect(second[0].label).toBe("Interno");
+  });
+});
@@ -46,6 +46,10 @@ vi.mock("@mediabot/shared", () => {
   };
 });
 
+vi.mock("../analysis/daily-metrics.js", () => ({
+  recordSocialMetrics: vi.fn().mockResolvedValue(undefined),
+}));
+
 // Importar después de los mocks
 import { collectSocialForClient } from "../collectors/social";
 import { getEnsembleDataClient, prisma } from "@mediabot/shared";
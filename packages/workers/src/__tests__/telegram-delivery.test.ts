@@ -0,0 +1,205 @@
+/**
+ * Tests para la capa de entrega Telegram: rate limit, retry_after y errores permanentes.
+ */
+import { describe, it, expect, vi, beforeEach } from "vitest";
+import { DelayedError } from "bullmq";
+
+vi.mock("@mediabot/shared", () => ({
+  prisma: {
+    telegramRecipient: { updateMany: vi.fn().mockResolvedValue({ count: 1 }) },
+    orgTelegramRecipient: { updateMany: vi.fn().mockResolvedValue({ count: 1 }) },
+    user: { updateMany: vi.fn().mockResolvedValue({ count: 1 }) },
+  },
+  config: {
+    telegram: { globalRatePerSecond: 30, perChatIntervalMs: 1000 },
+  },
+  invalidateRecipientCache: vi.fn().mockResolvedValue(undefined),
+}));
+
+vi.mock("../queues.js", () => {
+  const tx = {
+    hincrby: vi.fn().mockReturnThis(),
+    expire: vi.fn().mockReturnThis(),
+    exec: vi.fn().mockResolvedValue([]),
+  };
+  const queue = { addBulk: vi.fn().mockResolvedValue([]) };
+  return {
+    connection: {
+      eval: vi.fn().mockResolvedValue([0, 0]),
+      set: vi.fn().mockResolvedValue("OK"),
+      multi: vi.fn(() => tx),
+    },
+    QUEUE_NAMES: { NOTIFY_TELEGRAM: "notify-telegram" },
+    getQueue: vi.fn(() => queue),
+  };
+});
+
+vi.mock("../notifications/bot-instance.js", () => ({
+  bot: { api: { sendMessage: vi.fn().mockResolvedValue({}) } },
+}));
+
+import { prisma, invalidateRecipientCache } from "@mediabot/shared";
+import { connection, getQueue } from "../queues.js";
+import { bot } from "../notifications/bot-instance.js";
+import {
+  DELIVERY_PRIORITY,
+  enqueueTelegramDeliveries,
+  isPermanentTelegramError,
+  priorityForUrgency,
+  processTelegramDelivery,
+  retryAfterMs,
+  type TelegramDeliveryJob,
+} from "../notifications/telegram-delivery.js";
+import type { Job } from "bullmq";
+
+function makeJob(data: Partial<TelegramDeliveryJob> = {}) {
+  return {
+    timestamp: Date.now() - 250,
+    data: {
+      chatId: "-100123",
+      label: "Grupo",
+      source: "client",
+      message: "hola",
+      priority: DELIVERY_PRIORITY.NORMAL,
+      ...data,
+    },
+    moveToDelayed: vi.fn().mockResolvedValue(undefined),
+  } as unknown as Job<TelegramDeliveryJob> & { moveToDelayed: ReturnType<typeof vi.fn> };
+}
+
+describe("retryAfterMs", () => {
+  it("convierte retry_after de un 429 a ms", () => {
+    expect(retryAfterMs({ error_code: 429, parameters: { retry_after: 7 } })).toBe(7000);
+  });
+
+  it("usa 1s si el 429 no trae retry_after", () => {
+    expect(retryAfterMs({ error_code: 429 })).toBe(1000);
+  });
+
+  it("retorna null para otros errores", () => {
+    expect(retryAfterMs({ error_code: 400 })).toBeNull();
+    expect(retryAfterMs(new Error("boom"))).toBeNull();
+    expect(retryAfterMs(null)).toBeNull();
+  });
+});
+
+describe("isPermanentTelegramError", () => {
+  it("detecta chats inexistentes o bots bloqueados", () => {
+    expect(isPermanentTelegramError(new Error("Bad Request: chat not found"))).toBe(true);
+    expect(isPermanentTelegramError("Forbidden: bot was blocked by the user")).toBe(true);
+    expect(isPermanentTelegramError(new Error("ETIMEDOUT"))).toBe(false);
+  });
+});
+
+describe("priorityForUrgency", () => {
+  it("CRITICAL antes que HIGH antes que el resto", () => {
+    expect(priorityForUrgency("CRITICAL")).toBe(DELIVERY_PRIORITY.CRITICAL);
+    expect(priorityForUrgency("HIGH")).toBe(DELIVERY_PRIORITY.HIGH);
+    expect(priorityForUrgency("MEDIUM")).toBe(DELIVERY_PRIORITY.NORMAL);
+    expect(priorityForUrgency(null)).toBe(DELIVERY_PRIORITY.NORMAL);
+    expect(DELIVERY_PRIORITY.CRITICAL).toBeLessThan(DELIVERY_PRIORITY.DIGEST);
+  });
+});
+
+describe("enqueueTelegramDeliveries", () => {
+  beforeEach(() => vi.clearAllMocks());
+
+  it("encola un job por destinatario con la prioridad indicada", async () => {
+    const queued = await enqueueTelegramDeliveries(
+      [{ chatId: "1" }, { chatId: "2", label: "Admin", source: "org" }],
+      "mensaje",
+      { parse_mode: "Markdown" },
+      DELIVERY_PRIORITY.DIGEST
+    );
+
+    expect(queued).toBe(2);
+    const queue = getQueue("notify-telegram");
+    const jobs = (queue.addBulk as ReturnType<typeof vi.fn>).mock.calls[0][0];
+    expect(jobs).toHaveLength(2);
+    expect(jobs[1].name).toBe("deliver");
+    expect(jobs[1].data).toMatchObject({ chatId: "2", source: "org", message: "mensaje", priority: 10 });
+    expect(jobs[1].opts.priority).toBe(10);
+  });
+
+  it("no encola nada sin destinatarios", async () => {
+    expect(await enqueueTelegramDeliveries([], "mensaje")).toBe(0);
+    expect(getQueue).not.toHaveBeenCalled();
+  });
+});
+
+describe("processTelegramDelivery", () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+    (connection.eval as ReturnType<typeof vi.fn>).mockResolvedValue([0, 0]);
+    (bot.api.sendMessage as ReturnType<typeof vi.fn>).mockResolvedValue({});
+  });
+
+  it("envía si hay token y registra la latencia", async () => {
+    await processTelegramDelivery(makeJob(), "token");
+
+    expect(bot.api.sendMessage).toHaveBeenCalledWith("-100123", "hola", undefined);
+    const tx = connection.multi();
+    expect(tx.hincrby).toHaveBeenCalledWith(expect.stringMatching(/^metrics:telegram:/), "normal:sent", 1);
+    expect(tx.hincrby).toHaveBeenCalledWith(expect.any(String), "normal:latencyMs", expect.any(Number));
+  });
+
+  it("pospone el job si la espera por rate limit es larga", async () => {
+    (connection.eval as ReturnType<typeof vi.fn>).mockResolvedValue([5000, 0]);
+    const job = makeJob();
+
+    await expect(processTelegramDelivery(job, "token")).rejects.toBeInstanceOf(DelayedError);
+    expect(job.moveToDelayed).toHaveBeenCalledWith(expect.any(Number), "token");
+    expect(bot.api.sendMessage).not.toHaveBeenCalled();
+  });
+
+  it("pospone de inmediato si el chat no tiene token, aunque la espera sea corta", async () => {
+    (connection.eval as ReturnType<typeof vi.fn>).mockResolvedValue([200, 1]);
+    const job = makeJob();
+
+    await expect(processTelegramDelivery(job, "token")).rejects.toBeInstanceOf(DelayedError);
+    expect(connection.eval).toHaveBeenCalledTimes(1);
+    const [delayedUntil] = job.moveToDelayed.mock.calls[0];
+    expect(delayedUntil - Date.now()).toBeGreaterThanOrEqual(150);
+    expect(bot.api.sendMessage).not.toHaveBeenCalled();
+  });
+
+  it("espera dentro del job solo la espera corta del bucket global", async () => {
+    (connection.eval as ReturnType<typeof vi.fn>).mockResolvedValueOnce([10, 0]).mockResolvedValueOnce([0, 0]);
+
+    await processTelegramDelivery(makeJob(), "token");
+
+    expect(connection.eval).toHaveBeenCalledTimes(2);
+    expect(bot.api.sendMessage).toHaveBeenCalledTimes(1);
+  });
+
+  it("respeta retry_after de un 429: bloquea el chat y pospone", async () => {
+    (bot.api.sendMessage as ReturnType<typeof vi.fn>).mockRejectedValue({
+      error_code: 429,
+      parameters: { retry_after: 3 },
+    });
+    const job = makeJob();
+
+    await expect(processTelegramDelivery(job, "token")).rejects.toBeInstanceOf(DelayedError);
+    expect(connection.set).toHaveBeenCalledWith("telegram:block:chat:-100123", "1", "PX", 3000);
+    const [delayedUntil] = job.moveToDelayed.mock.calls[0];
+    expect(delayedUntil - Date.now()).toBeGreaterThan(2000);
+  });
+
+  it("desactiva al destinatario con error permanente sin reintentar", async () => {
+    (bot.api.sendMessage as ReturnType<typeof vi.fn>).mockRejectedValue(new Error("Bad Request: chat not found"));
+
+    await processTelegramDelivery(makeJob({ source: "client" }), "token");
+
+    expect(prisma.telegramRecipient.updateMany).toHaveBeenCalledWith({
+      where: { chatId: "-100123", active: true },
+      data: { active: false },
+    });
+    expect(invalidateRecipientCache).toHaveBeenCalled();
+  });
+
+  it("propaga errores transitorios para que BullMQ reintente", async () => {
+    (bot.api.sendMessage as ReturnType<typeof vi.fn>).mockRejectedValue(new Error("ETIMEDOUT"));
+
+    await expect(processTelegramDelivery(makeJob(), "token")).rejects.toThrow("ETIMEDOUT");
+  });
+});
@@ -1,37 +1,31 @@
-import { describe, it, expect } from "vitest";
-
-// Extract classifyUrgency logic for testing
-// Since it's not exported, we replicate and test the logic directly
-
-const HIGH_REACH_SOURCES = new Set([
-  "elpais.com", "elmundo.es", "lavanguardia.com", "abc.es",
-  "20minutos.es", "europapress.es", "efe.com", "rtve.es",
-  "infobae.com", "cnn", "bbc", "reuters", "elconfidencial.com",
-]);
-
-function classifyUrgency(
-  relevance: number,
-  sentiment: string,
-  source: string
-): string {
-  const sourceLower = source.toLowerCase();
-  const isHighReach = [...HIGH_REACH_SOURCES].some((s) =>
-    sourceLower.includes(s)
-  );
-
-  if (relevance >= 8 && sentiment === "NEGATIVE" && isHighReach) {
-    return "CRITICAL";
-  }
-  if (relevance >= 7 || sentiment === "NEGATIVE") {
-    return "HIGH";
-  }
-  if (relevance >= 4) {
-    return "MEDIUM";
-  }
-  return "LOW";
-}
+import { describe, it, expect, vi, beforeEach } from "vitest";
+
+vi.mock("@mediabot/shared", () => ({
+  prisma: {
+    sourceTier: {
+      findMany: vi.fn().mockResolvedValue([
+        { domain: "diariodeyucatan.com", tier: 1 },
+        { domain: "diariolocal.mx", tier: 3 },
+      ]),
+    },
+  },
+  getSettingNumberSync: vi.fn((_key: string, defaultValue: number) => defaultValue),
+}));
+
+import { classifyUrgency } from "../analysis/urgency.js";
+import {
+  buildSourceReachIndex,
+  getSourceReachIndex,
+  invalidateSourceTierMap,
+  isHighReachSource,
+} from "../analysis/source-tiers.js";
 
 describe("classifyUrgency", () => {
+  beforeEach(async () => {
+    invalidateSourceTierMap();
+    await getSourceReachIndex();
+  });
+
   describe("CRITICAL urgency", () => {
     it("should return CRITICAL for high relevance + negative + high-reach source", () => {
       expect(classifyUrgency(8, "NEGATIVE", "elpais.com")).toBe("CRITICAL");
@@ -82,7 +76,7 @@ describe("classifyUrgency", () => {
   });
 
   describe("high-reach source detection", () => {
-    it("should detect sources by substring match", () => {
+    it("should detect the domain inside URLs and free text", () => {
       // Source URLs can contain the high-reach domain
       expect(classifyUrgency(9, "NEGATIVE", "https://elpais.com/article/123")).toBe("CRITICAL");
       expect(classifyUrgency(9, "NEGATIVE", "El Pais via elpais.com")).toBe("CRITICAL");
@@ -92,5 +86,30 @@ describe("classifyUrgency", () => {
       expect(classifyUrgency(9, "NEGATIVE", "ELPAIS.COM")).toBe("CRITICAL");
       expect(classifyUrgency(9, "NEGATIVE", "BBC News")).toBe("CRITICAL");
     });
+
+    it("should match subdomains but not lookalike domains", () => {
+      expect(classifyUrgency(9, "NEGATIVE", "edition.cnn.com")).toBe("CRITICAL");
+      expect(classifyUrgency(9, "NEGATIVE", "www.elmundo.es")).toBe("CRITICAL");
+      expect(classifyUrgency(9, "NEGATIVE", "fakeelpais.com")).not.toBe("CRITICAL");
+    });
+
+    it("should treat tier 1 sources from SourceTier as high reach", () => {
+      expect(classifyUrgency(9, "NEGATIVE", "diariodeyucatan.com")).toBe("CRITICAL");
+      expect(classifyUrgency(9, "NEGATIVE", "diariolocal.mx")).not.toBe("CRITICAL");
+    });
+  });
+});
+
+describe("isHighReachSource", () => {
+  it("uses only the static list before SourceTier loads", () => {
+    const index = buildSourceReachIndex([]);
+    expect(isHighReachSource("elpais.com", index)).toBe(true);
+    expect(isHighReachSource("diariodeyucatan.com", index)).toBe(false);
+  });
+
+  it("remembers resolved sources", () => {
+    const index = buildSourceReachIndex([]);
+    isHighReachSource("reuters wire", index);
+    expect(index.reachMemo.get("reuters wire")).toBe(true);
   });
 });
@@ -0,0 +1,113 @@
+import { describe, it, expect } from "vitest";
+import {
+  createAnomalyModel,
+  foldHour,
+  hourBucket,
+  isModelWarm,
+  poissonSurprise,
+  scoreWindow,
+  HOUR_MS,
+  WARMUP_HOURS,
+  type HourCounts,
+} from "../anomaly-model";
+
+// Lunes 2026-01-05 00:00 UTC
+const START_HOUR = hourBucket(Date.UTC(2026, 0, 5));
+
+/** Volumen determinista: 15/h de día (12-23 UTC), 5/h de noche; 20% negativas */
+function typicalCounts(hour: number): HourCounts {
+  const utcHour = new Date(hour * HOUR_MS).getUTCHours();
+  const total = utcHour >= 12 ? 15 : 5;
+  return { total, negative: Math.round(total * 0.2) };
+}
+
+function trainedModel(weeks = 3) {
+  const model = createAnomalyModel(START_HOUR - 1);
+  for (let hour = START_HOUR; hour < START_HOUR + weeks * 168; hour++) {
+    foldHour(model, hour, typicalCounts(hour));
+  }
+  return model;
+}
+
+describe("poissonSurprise", () => {
+  it("coincide con la cola de Poisson", () => {
+    // P(X >= 10 | λ = 2) ≈ 4.65e-5
+    expect(poissonSurprise(10, 2)).toBeCloseTo(4.33, 1);
+  });
+
+  it("es 0 cuando lo observado no supera lo esperado", () => {
+    expect(poissonSurprise(3, 5)).toBe(0);
+    expect(poissonSurprise(0, 0)).toBe(0);
+  });
+});
+
+describe("foldHour", () => {
+  it("aprende nivel y estacionalidad por hora del día", () => {
+    const model = trainedModel();
+
+    expect(isModelWarm(model)).toBe(true);
+    expect(model.total.hourOfDay[15]).toBeGreaterThan(model.total.hourOfDay[3] * 2);
+    expect(model.negativeRatio.mean).toBeGreaterThan(0.15);
+    expect(model.negativeRatio.mean).toBeLessThan(0.25);
+  });
+
+  it("ignora horas ya incorporadas", () => {
+    const model = trainedModel(1);
+    const before = JSON.stringify(model);
+    foldHour(model, START_HOUR, { total: 500, negative: 500 });
+    expect(JSON.stringify(model)).toBe(before);
+  });
+
+  it("no está caliente antes de WARMUP_HOURS", () => {
+    const model = createAnomalyModel(START_HOUR - 1);
+    for (let i = 0; i < WARMUP_HOURS - 1; i++) foldHour(model, START_HOUR + i, typicalCounts(START_HOUR + i));
+    expect(isModelWarm(model)).toBe(false);
+  });
+});
+
+describe("scoreWindow", () => {
+  const model = trainedModel();
+  const currentHour = START_HOUR + 3 * 168 + 15; // 15:00 UTC, hora de alto volumen
+  const now = currentHour * HOUR_MS + HOUR_MS - 1; // final de la hora
+
+  it("no marca anomalía con volumen habitual", () => {
+    const scores = scoreWindow(model, typicalCounts, now, 60);
+
+    expect(scores.total.expected).toBeGreaterThan(12);
+    expect(scores.negative.surprise).toBeLessThan(1);
+    expect(Math.abs(scores.total.zScore)).toBeLessThan(2);
+  });
+
+  it("detecta un pico de negativas relativo a la hora", () => {
+    const counts = (hour: number) =>
+      hour === currentHour ? { total: 30, negative: 18 } : typicalCounts(hour);
+    const scores = scoreWindow(model, counts, now, 60);
+
+    expect(scores.negative.surprise).toBeGreaterThan(4);
+    expect(scores.negativeRatio.zScore).toBeGreaterThan(3);
+  });
+
+  it("el mismo volumen es anómalo de madrugada y normal de día", () => {
+    const nightHour = START_HOUR + 3 * 168 + 3;
+    const nightNow = nightHour * HOUR_MS + HOUR_MS - 1;
+    const counts = (target: number) => (hour: number) =>
+      hour === target ? { total: 15, negative: 3 } : typicalCounts(hour);
+
+    const night = scoreWindow(model, counts(nightHour), nightNow, 60);
+    const day = scoreWindow(model, counts(currentHour), now, 60);
+
+    expect(night.total.surprise).toBeGreaterThan(2);
+    expect(day.total.surprise).toBeLessThan(1);
+  });
+
+  it("la ventana se desliza sobre la hora anterior al cambiar de hora", () => {
+    // Pico a las 15:xx evaluado a las 16:01: sigue dentro de los últimos 60 min
+    const nextNow = (currentHour + 1) * HOUR_MS + 60 * 1000;
+    const counts = (hour: number) =>
+      hour === currentHour ? { total: 30, negative: 18 } : hour === currentHour + 1 ? { total: 0, negative: 0 } : typicalCounts(hour);
+    const scores = scoreWindow(model, counts, nextNow, 60);
+
+    expect(scores.negative.observed).toBeGreaterThanOrEqual(17);
+    expect(scores.negative.surprise).toBeGreaterThan(4);
+  });
+});
@@ -0,0 +1,121 @@
+import { describe, it, expect, vi, beforeEach } from "vitest";
+
+// Redis en memoria con lo mínimo que usa cluster-cache
+const { store } = vi.hoisted(() => ({
+  store: {
+    strings: new Map<string, string>(),
+    sets: new Map<string, Set<string>>(),
+    zsets: new Map<string, Map<string, number>>(),
+    hashes: new Map<string, Record<string, string>>(),
+  },
+}));
+
+vi.mock("../../queues.js", () => {
+  const ops = {
+    get: (key: string) => store.strings.get(key) ?? null,
+    set: (key: string, value: string) => {
+      store.strings.set(key, value);
+      return "OK";
+    },
+    del: (...keys: string[]) => keys.filter((k) => store.strings.delete(k)).length,
+    expire: () => 1,
+    zadd: (key: string, score: number, member: string) => {
+      if (!store.zsets.has(key)) store.zsets.set(key, new Map());
+      store.zsets.get(key)!.set(member, score);
+      return 1;
+    },
+    zcard: (key: string) => store.zsets.get(key)?.size ?? 0,
+    zpopmin: (key: string, count: number) => {
+      const zset = store.zsets.get(key) ?? new Map<string, number>();
+      const popped = [...zset.entries()].sort((a, b) => a[1] - b[1]).slice(0, count);
+      for (const [member] of popped) zset.delete(member);
+      return popped.flatMap(([member, score]) => [member, String(score)]);
+    },
+    sadd: (key: string, ...members: string[]) => {
+      if (!store.sets.has(key)) store.sets.set(key, new Set());
+      members.forEach((m) => store.sets.get(key)!.add(m));
+      return members.length;
+    },
+    smismember: (key: string, ...members: string[]) =>
+      members.map((m) => (store.sets.get(key)?.has(m) ? 1 : 0)),
+    hincrby: (key: string, field: string, by: number) => {
+      const hash = store.hashes.get(key) ?? {};
+      hash[field] = String((parseInt(hash[field] || "0", 10) || 0) + by);
+      store.hashes.set(key, hash);
+      return Number(hash[field]);
+    },
+    hgetall: (key: string) => store.hashes.get(key) ?? {},
+  };
+
+  const multi = () => {
+    const queued: Array<() => unknown> = [];
+    const chain: Record<string, unknown> = {
+      exec: async () => queued.map((fn) => [null, fn()]),
+    };
+    for (const [name, fn] of Object.entries(ops)) {
+      chain[name] = (...args: unknown[]) => {
+        queued.push(() => (fn as (...a: unknown[]) => unknown)(...args));
+        return chain;
+      };
+    }
+    return chain;
+  };
+
+  const connection: Record<string, unknown> = { multi };
+  for (const [name, fn] of Object.entries(ops)) {
+    connection[name] = async (...args: unknown[]) => (fn as (...a: unknown[]) => unknown)(...args);
+  }
+  return { connection };
+});
+
+import {
+  cacheAssignment,
+  getCachedAssignment,
+  cacheRejectedParents,
+  getRejectedParents,
+  getClusterCacheStats,
+} from "../cluster-cache";
+
+describe("cluster-cache", () => {
+  beforeEach(() => {
+    store.strings.clear();
+    store.sets.clear();
+    store.zsets.clear();
+    store.hashes.clear();
+  });
+
+  it("guarda y recupera asignaciones por cliente y título", async () => {
+    await cacheAssignment("client-1", "acme anuncia planta", "parent-1");
+
+    expect(await getCachedAssignment("client-1", "acme anuncia planta")).toBe("parent-1");
+    expect(await getCachedAssignment("client-2", "acme anuncia planta")).toBeNull();
+  });
+
+  it("registra pares negativos y los filtra", async () => {
+    await cacheRejectedParents("client-1", "acme anuncia planta", ["p1", "p2"]);
+
+    const rejected = await getRejectedParents("client-1", "acme anuncia planta", ["p1", "p3"]);
+    expect([...rejected]).toEqual(["p1"]);
+  });
+
+  it("no consulta Redis sin candidatos", async () => {
+    expect((await getRejectedParents("client-1", "titulo", [])).size).toBe(0);
+  });
+
+  it("reporta hit rates", async () => {
+    await cacheAssignment("client-1", "titulo", "parent-1");
+    await getCachedAssignment("client-1", "titulo");
+    await getCachedAssignment("client-1", "otro titulo");
+    await getRejectedParents("client-1", "titulo", ["a", "b"]);
+
+    // Los contadores se escriben fire-and-forget
+    await new Promise((resolve) => setTimeout(resolve, 0));
+    const stats = await getClusterCacheStats();
+
+    expect(stats.assignHits).toBe(1);
+    expect(stats.assignMisses).toBe(1);
+    expect(stats.assignHitRate).toBe(0.5);
+    expect(stats.negativeMisses).toBe(2);
+    expect(stats.negativeHitRate).toBe(0);
+  });
+});
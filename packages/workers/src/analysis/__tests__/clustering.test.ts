@@ -21,7 +21,12 @@ vi.mock("@mediabot/shared", () => ({
   }),
 }));
 
+vi.mock("../../queues.js", () => ({
+  connection: {},
+}));
+
 import { prisma, getGeminiModel } from "@mediabot/shared";
+import { parseCandidateComparison } from "../clustering";
 
 // Importar funciones del módulo (usamos implementaciones de test ya que algunas no están exportadas)
 
@@ -359,4 +364,35 @@ describe("clustering", () => {
       expect(result.confidence).toBe(0.9);
     });
   });
+
+  describe("parseCandidateComparison", () => {
+    it("should map positional ids to candidate ids", () => {
+      const results = parseCandidateComparison(
+        '{"results": [{"id": 2, "sameEvent": true, "confidence": 0.92}, {"id": 1, "sameEvent": false, "confidence": 0.8}]}',
+        ["m-a", "m-b"]
+      );
+
+      expect(results.get("m-a")).toEqual({ sameEvent: false, confidence: 0.8 });
+      expect(results.get("m-b")).toEqual({ sameEvent: true, confidence: 0.92 });
+    });
+
+    it("should ignore out-of-range ids and clamp confidence", () => {
+      const results = parseCandidateComparison(
+        '```json\n{"results": [{"id": 7, "sameEvent": true}, {"id": 1, "sameEvent": true, "confidence": 3}]}\n```',
+        ["m-a"]
+      );
+
+      expect(results.size).toBe(1);
+      expect(results.get("m-a")?.confidence).toBe(1);
+    });
+
+    it("should leave missing candidates without result", () => {
+      const results = parseCandidateComparison('{"results": []}', ["m-a", "m-b"]);
+      expect(results.size).toBe(0);
+    });
+
+    it("should throw on malformed responses", () => {
+      expect(() => parseCandidateComparison("I think these are the same event", ["m-a"])).toThrow();
+    });
+  });
 });
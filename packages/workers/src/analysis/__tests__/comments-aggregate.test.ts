@@ -0,0 +1,58 @@
+import { describe, it, expect } from "vitest";
+import { breakdownToCounts, deriveCommentsSentiment } from "../comments-aggregate";
+
+describe("breakdownToCounts", () => {
+  it("convierte porcentajes a conteos que suman el total", () => {
+    const counts = breakdownToCounts({ positive: 40, negative: 30, neutral: 30 }, 7);
+    expect(counts.positive + counts.negative + counts.neutral).toBe(7);
+    expect(counts.positive).toBe(3);
+  });
+
+  it("normaliza breakdowns que no suman 100", () => {
+    const counts = breakdownToCounts({ positive: 1, negative: 1, neutral: 0 }, 10);
+    expect(counts).toEqual({ positive: 5, negative: 5, neutral: 0 });
+  });
+
+  it("asigna todo a neutral si el breakdown está vacío", () => {
+    expect(breakdownToCounts({ positive: 0, negative: 0, neutral: 0 }, 4)).toEqual({
+      positive: 0,
+      negative: 0,
+      neutral: 4,
+    });
+  });
+
+  it("retorna ceros para un delta vacío", () => {
+    expect(breakdownToCounts({ positive: 50, negative: 50, neutral: 0 }, 0)).toEqual({
+      positive: 0,
+      negative: 0,
+      neutral: 0,
+    });
+  });
+});
+
+describe("deriveCommentsSentiment", () => {
+  it("retorna NEUTRAL sin comentarios", () => {
+    expect(deriveCommentsSentiment({ positive: 0, negative: 0, neutral: 0 })).toBe("NEUTRAL");
+  });
+
+  it("retorna el bucket dominante", () => {
+    expect(deriveCommentsSentiment({ positive: 2, negative: 10, neutral: 3 })).toBe("NEGATIVE");
+    expect(deriveCommentsSentiment({ positive: 10, negative: 1, neutral: 3 })).toBe("POSITIVE");
+    expect(deriveCommentsSentiment({ positive: 1, negative: 1, neutral: 10 })).toBe("NEUTRAL");
+  });
+
+  it("retorna MIXED cuando positivos y negativos son ambos significativos", () => {
+    expect(deriveCommentsSentiment({ positive: 40, negative: 35, neutral: 25 })).toBe("MIXED");
+  });
+
+  it("acumula deltas sucesivos", () => {
+    const first = breakdownToCounts({ positive: 80, negative: 10, neutral: 10 }, 10);
+    const second = breakdownToCounts({ positive: 0, negative: 100, neutral: 0 }, 40);
+    const total = {
+      positive: first.positive + second.positive,
+      negative: first.negative + second.negative,
+      neutral: first.neutral + second.neutral,
+    };
+    expect(deriveCommentsSentiment(total)).toBe("NEGATIVE");
+  });
+});
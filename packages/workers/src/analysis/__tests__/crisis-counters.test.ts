@@ -0,0 +1,96 @@
+import { describe, it, expect, vi, beforeEach } from "vitest";
+
+const { connection, transaction } = vi.hoisted(() => {
+  const transaction = {
+    del: vi.fn(),
+    hset: vi.fn(),
+    expire: vi.fn(),
+    sadd: vi.fn(),
+    srem: vi.fn(),
+    set: vi.fn(),
+    exec: vi.fn().mockResolvedValue([]),
+  };
+  for (const fn of Object.values(transaction)) {
+    if (fn !== transaction.exec) fn.mockReturnValue(transaction);
+  }
+  return {
+    transaction,
+    connection: {
+      eval: vi.fn().mockResolvedValue(1),
+      smembers: vi.fn().mockResolvedValue([]),
+      multi: vi.fn(() => transaction),
+      pipeline: vi.fn(),
+    },
+  };
+});
+
+vi.mock("@mediabot/shared", () => ({
+  prisma: { $queryRaw: vi.fn() },
+}));
+
+vi.mock("../../queues.js", () => ({ connection }));
+
+import { prisma } from "@mediabot/shared";
+import { recordMentionSentiment, reconcileCrisisCounters } from "../crisis-counters";
+
+const base = {
+  clientId: "client-1",
+  mentionId: "mention-1",
+  publishedAt: new Date(),
+};
+
+describe("recordMentionSentiment", () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+  });
+
+  it("cuenta la mención al analizarla como NEGATIVE", async () => {
+    await recordMentionSentiment({ ...base, sentiment: "NEGATIVE", previousSentiment: null });
+
+    const [, numKeys, marker, key, , state, , , assumed] = connection.eval.mock.calls[0];
+    expect(numKeys).toBe(3);
+    expect(marker).toBe("crisis:neg-counted:mention-1");
+    expect(key).toBe("crisis:neg:client-1");
+    expect(state).toBe("1");
+    expect(assumed).toBe("0");
+  });
+
+  it("la descuenta si un re-análisis la saca de NEGATIVE", async () => {
+    await recordMentionSentiment({ ...base, sentiment: "POSITIVE", previousSentiment: "NEGATIVE" });
+
+    const [, , , , , state, , , assumed] = connection.eval.mock.calls[0];
+    expect(state).toBe("0");
+    expect(assumed).toBe("1");
+  });
+
+  it("no toca Redis si no cambia de lado", async () => {
+    await recordMentionSentiment({ ...base, sentiment: "NEGATIVE", previousSentiment: "NEGATIVE" });
+    await recordMentionSentiment({ ...base, sentiment: "NEUTRAL", previousSentiment: null });
+    await recordMentionSentiment({ ...base, publishedAt: null, sentiment: "NEGATIVE", previousSentiment: null });
+
+    expect(connection.eval).not.toHaveBeenCalled();
+  });
+});
+
+describe("reconcileCrisisCounters", () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+  });
+
+  it("reemplaza los contadores dentro de un MULTI", async () => {
+    vi.mocked(prisma.$queryRaw).mockResolvedValue([
+      { clientId: "client-1", bucket: BigInt(100), count: 2 },
+    ] as never);
+    connection.smembers.mockResolvedValue(["client-2"]);
+
+    const result = await reconcileCrisisCounters(60);
+
+    expect(result).toEqual({ clients: 1, mentions: 2 });
+    expect(connection.multi).toHaveBeenCalledTimes(1);
+    expect(connection.pipeline).not.toHaveBeenCalled();
+    expect(transaction.del).toHaveBeenCalledWith("crisis:neg:client-1");
+    expect(transaction.hset).toHaveBeenCalledWith("crisis:neg:client-1", { "100": 2 });
+    expect(transaction.srem).toHaveBeenCalledWith("crisis:neg-clients", "client-2");
+    expect(transaction.exec).toHaveBeenCalledTimes(1);
+  });
+});
@@ -31,8 +31,20 @@ vi.mock("../../queues.js", () => ({
   },
 }));
 
+// Contadores en Redis: por defecto sin sincronizar (cae al COUNT en Postgres)
+vi.mock("../crisis-counters.js", () => ({
+  getNegativeMentionCount: vi.fn(),
+}));
+
+// Línea base de anomalías: por defecto fría (se usa el umbral fijo)
+vi.mock("../anomaly.js", () => ({
+  getAnomalyScores: vi.fn(),
+}));
+
 import { prisma, getSettingNumber, config } from "@mediabot/shared";
 import { getQueue } from "../../queues.js";
+import { getNegativeMentionCount } from "../crisis-counters.js";
+import { getAnomalyScores } from "../anomaly.js";
 import {
   checkForCrisis,
   createCrisisAlert,
@@ -46,6 +58,8 @@ describe("crisis-detector", () => {
     vi.clearAllMocks();
     // Setup default mocks
     vi.mocked(getSettingNumber).mockImplementation(async (key, defaultValue) => defaultValue);
+    vi.mocked(getNegativeMentionCount).mockResolvedValue(null);
+    vi.mocked(getAnomalyScores).mockResolvedValue(null);
   });
 
   afterEach(() => {
@@ -194,6 +208,108 @@ describe("crisis-detector", () => {
     });
   });
 
+  describe("checkForCrisis con contadores en Redis", () => {
+    it("usa el contador sin consultar Postgres cuando está sincronizado", async () => {
+      vi.mocked(getNegativeMentionCount).mockResolvedValue(12);
+      vi.mocked(prisma.crisisAlert.findFirst).mockResolvedValue(null);
+
+      const result = await checkForCrisis("client-123");
+
+      expect(getNegativeMentionCount).toHaveBeenCalledWith("client-123", 60);
+      expect(prisma.mention.count).not.toHaveBeenCalled();
+      expect(result.isCrisis).toBe(true);
+      expect(result.severity).toBe("HIGH");
+    });
+
+    it("cae al COUNT si Redis falla", async () => {
+      vi.mocked(getNegativeMentionCount).mockRejectedValue(new Error("Redis down"));
+      vi.mocked(prisma.mention.count).mockResolvedValue(3);
+      vi.mocked(prisma.crisisAlert.findFirst).mockResolvedValue(null);
+
+      const result = await checkForCrisis("client-123");
+
+      expect(prisma.mention.count).toHaveBeenCalled();
+      expect(result.mentionCount).toBe(3);
+    });
+
+    it("no actualiza la alerta activa si el conteo no cambió", async () => {
+      vi.mocked(getNegativeMentionCount).mockResolvedValue(8);
+      vi.mocked(prisma.crisisAlert.findFirst).mockResolvedValue({
+        id: "alert-existing",
+        mentionCount: 8,
+      } as never);
+
+      await checkForCrisis("client-123");
+
+      expect(prisma.crisisAlert.update).not.toHaveBeenCalled();
+    });
+  });
+
+  describe("checkForCrisis con línea base de anomalías", () => {
+    const scores = (observed: number, expected: number, surprise: number) => ({
+      windowMinutes: 60,
+      total: { observed: observed * 4, expected: expected * 4, zScore: 0, surprise: 0 },
+      negative: { observed, expected, zScore: 0, surprise },
+      negativeRatio: { observed: 0.25, expected: 0.25, zScore: 0 },
+    });
+
+    it("no activa crisis con volumen negativo habitual bajo el umbral fijo", async () => {
+      vi.mocked(prisma.mention.count).mockResolvedValue(4);
+      vi.mocked(prisma.crisisAlert.findFirst).mockResolvedValue(null);
+      vi.mocked(getAnomalyScores).mockResolvedValue(scores(4, 3.5, 0.3));
+
+      const result = await checkForCrisis("client-123");
+
+      expect(result.isCrisis).toBe(false);
+      expect(result.reason).toContain("Not anomalous");
+    });
+
+    it("mantiene el umbral fijo como piso aunque no haya anomalía", async () => {
+      vi.mocked(prisma.mention.count).mockResolvedValue(12);
+      vi.mocked(prisma.crisisAlert.findFirst).mockResolvedValue(null);
+      vi.mocked(getAnomalyScores).mockResolvedValue(scores(12, 10.5, 0.4));
+
+      const result = await checkForCrisis("client-123");
+
+      // 12 supera el umbral fijo (5) aunque sea habitual para el cliente
+      expect(result.isCrisis).toBe(true);
+      expect(result.reason).toContain("12 negative mentions");
+    });
+
+    it("activa crisis en un cliente chico por debajo del umbral fijo", async () => {
+      vi.mocked(prisma.mention.count).mockResolvedValue(4);
+      vi.mocked(prisma.crisisAlert.findFirst).mockResolvedValue(null);
+      vi.mocked(getAnomalyScores).mockResolvedValue(scores(4, 0.1, 6.2));
+
+      const result = await checkForCrisis("client-123");
+
+      expect(result.isCrisis).toBe(true);
+      expect(result.severity).toBe("MEDIUM");
+      expect(result.mentionCount).toBe(4);
+    });
+
+    it("escala la severidad con la sorpresa", async () => {
+      vi.mocked(prisma.mention.count).mockResolvedValue(30);
+      vi.mocked(prisma.crisisAlert.findFirst).mockResolvedValue(null);
+      vi.mocked(getAnomalyScores).mockResolvedValue(scores(30, 2, 20));
+
+      const result = await checkForCrisis("client-123");
+
+      expect(result.severity).toBe("CRITICAL");
+    });
+
+    it("usa el umbral fijo si la consulta de anomalías falla", async () => {
+      vi.mocked(prisma.mention.count).mockResolvedValue(7);
+      vi.mocked(prisma.crisisAlert.findFirst).mockResolvedValue(null);
+      vi.mocked(getAnomalyScores).mockRejectedValue(new Error("Redis down"));
+
+      const result = await checkForCrisis("client-123");
+
+      expect(result.isCrisis).toBe(true);
+      expect(result.reason).toContain("7 negative mentions");
+    });
+  });
+
   describe("createCrisisAlert", () => {
     it("should create alert and enqueue notification", async () => {
       const clientId = "client-123";
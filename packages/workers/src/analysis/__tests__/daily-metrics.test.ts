@@ -0,0 +1,174 @@
+import { describe, it, expect, vi, beforeEach } from "vitest";
+
+vi.mock("@mediabot/shared", () => ({
+  prisma: {
+    $executeRaw: vi.fn(),
+    $queryRaw: vi.fn(),
+    $transaction: vi.fn(),
+    sourceTier: { findMany: vi.fn() },
+    clientDailyMetrics: { deleteMany: vi.fn(), createMany: vi.fn() },
+  },
+}));
+
+import { prisma } from "@mediabot/shared";
+import {
+  addMentionCounts,
+  emptyCounters,
+  foldDailyMetrics,
+  metricsDay,
+  rebuildDailyMetrics,
+  recordMentionMetrics,
+  recordSocialMetrics,
+} from "../daily-metrics";
+import { invalidateSourceTierMap } from "../source-tiers";
+
+const DAY = new Date("2026-03-10T00:00:00.000Z");
+const TIERS = new Map([["eluniversal.com.mx", 1]]);
+
+/** Valores interpolados en la última llamada a $executeRaw */
+function lastInsertValues(): unknown[] {
+  const calls = vi.mocked(prisma.$executeRaw).mock.calls;
+  return calls[calls.length - 1].slice(1);
+}
+
+describe("daily metrics counters", () => {
+  it("agrupa por día UTC", () => {
+    expect(metricsDay(new Date("2026-03-10T23:59:59.000Z")).toISOString()).toBe(DAY.toISOString());
+  });
+
+  it("un re-análisis mueve la mención de bucket sin contarla dos veces", () => {
+    const counters = addMentionCounts(emptyCounters(), { sentiment: "NEGATIVE", urgency: "HIGH", weight: 3 });
+    addMentionCounts(counters, { sentiment: "NEUTRAL", urgency: "LOW", weight: 3 }, -1);
+
+    expect(counters.mentions).toBe(0);
+    expect(counters.negative).toBe(1);
+    expect(counters.neutral).toBe(-1);
+    expect(counters.high).toBe(1);
+    expect(counters.low).toBe(-1);
+    expect(counters.tier1).toBe(0);
+    expect(counters.weightedMentions).toBe(0);
+  });
+
+  it("pliega grupos de menciones y social por cliente y día", () => {
+    const rows = foldDailyMetrics(
+      [
+        { clientId: "a", day: DAY, source: "eluniversal.com.mx", sentiment: "POSITIVE", urgency: "MEDIUM", count: 4 },
+        { clientId: "a", day: DAY, source: "Blog Local", sentiment: "NEGATIVE", urgency: "HIGH", count: 2 },
+      ],
+      [{ clientId: "a", day: DAY, count: 3, engaged: 1, engagement: 45 }],
+      TIERS
+    );
+
+    expect(rows.size).toBe(1);
+    const { counters } = [...rows.values()][0];
+    expect(counters).toMatchObject({
+      mentions: 6,
+      positive: 4,
+      negative: 2,
+      medium: 4,
+      high: 2,
+      tier1: 4,
+      tier3: 2,
+      weightedMentions: 14,
+      socialMentions: 3,
+      socialEngaged: 1,
+      socialEngagement: 45,
+    });
+  });
+});
+
+describe("incremental writes", () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+    invalidateSourceTierMap();
+    vi.mocked(prisma.sourceTier.findMany).mockResolvedValue([{ domain: "eluniversal.com.mx", tier: 1 }] as never);
+  });
+
+  it("suma una mención nueva con el peso de su fuente", async () => {
+    await recordMentionMetrics({
+      clientId: "a",
+      date: new Date("2026-03-10T15:00:00.000Z"),
+      source: "https://www.eluniversal.com.mx/nota",
+      sentiment: "POSITIVE",
+      urgency: "LOW",
+    });
+
+    // Lock compartido del rollup + INSERT, en una transacción
+    expect(prisma.$executeRaw).toHaveBeenCalledTimes(2);
+    expect(prisma.$transaction).toHaveBeenCalledTimes(1);
+    const values = lastInsertValues();
+    expect(values[1]).toBe("a");
+    expect(values[2]).toBe("2026-03-10");
+    // mentions, positive ... tier1 ... weightedMentions
+    expect(values.slice(3, 16)).toEqual([1, 1, 0, 0, 0, 0, 0, 0, 1, 1, 0, 0, 3]);
+  });
+
+  it("un post existente solo aporta el cambio de engagement", async () => {
+    await recordSocialMetrics({
+      clientId: "a",
+      date: DAY,
+      current: { likes: 12, comments: 3, shares: 0 },
+      previous: { likes: 5, comments: 3, shares: 0 },
+    });
+
+    const values = lastInsertValues();
+    // socialMentions, socialEngaged, socialEngagement
+    expect(values.slice(16, 19)).toEqual([0, 1, 7]);
+  });
+
+  it("no escribe si el engagement no cambió", async () => {
+    const engagement = { likes: 1, comments: 0, shares: 0 };
+    await recordSocialMetrics({ clientId: "a", date: DAY, current: engagement, previous: engagement });
+
+    expect(prisma.$executeRaw).not.toHaveBeenCalled();
+  });
+});
+
+describe("rebuildDailyMetrics", () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+    invalidateSourceTierMap();
+    vi.spyOn(console, "log").mockImplementation(() => {});
+    vi.mocked(prisma.sourceTier.findMany).mockResolvedValue([] as never);
+    // El callback interactivo recibe el mismo mock como cliente de la transacción
+    vi.mocked(prisma.$transaction).mockImplementation((async (arg: unknown) =>
+      typeof arg === "function" ? arg(prisma) : []) as never);
+  });
+
+  it("reemplaza el rango por bloques de 7 días", async () => {
+    vi.mocked(prisma.$queryRaw)
+      .mockResolvedValueOnce([
+        { clientId: "a", day: DAY, source: "x.com", sentiment: "NEUTRAL", urgency: "LOW", count: 2 },
+      ] as never)
+      .mockResolvedValue([] as never);
+
+    const result = await rebuildDailyMetrics(DAY, new Date("2026-03-19T12:00:00.000Z"));
+
+    // 10 días → bloques [10, 17) y [17, 20): dos consultas por bloque
+    expect(result.days).toBe(10);
+    expect(prisma.$transaction).toHaveBeenCalledTimes(2);
+    expect(prisma.$queryRaw).toHaveBeenCalledTimes(4);
+    expect(prisma.clientDailyMetrics.deleteMany).toHaveBeenCalledWith({
+      where: { date: { gte: DAY, lt: new Date("2026-03-17T00:00:00.000Z") } },
+    });
+    expect(vi.mocked(prisma.clientDailyMetrics.createMany).mock.calls[0][0]).toMatchObject({
+      data: [{ clientId: "a", date: DAY, mentions: 2, neutral: 2, low: 2, tier3: 2, weightedMentions: 2 }],
+    });
+  });
+
+  it("consulta dentro de la transacción después de tomar el lock exclusivo", async () => {
+    const order: string[] = [];
+    vi.mocked(prisma.$executeRaw).mockImplementation((async (strings: TemplateStringsArray) => {
+      order.push(strings.join("$"));
+    }) as never);
+    vi.mocked(prisma.$queryRaw).mockImplementation((async () => {
+      order.push("query");
+      return [];
+    }) as never);
+
+    await rebuildDailyMetrics(DAY, DAY);
+
+    expect(order[0]).toContain("pg_advisory_xact_lock(");
+    expect(order.slice(1)).toEqual(["query", "query"]);
+  });
+});
@@ -0,0 +1,59 @@
+import { describe, it, expect, vi, beforeEach } from "vitest";
+
+vi.mock("@mediabot/shared", () => ({
+  prisma: {
+    $queryRaw: vi.fn(),
+    mention: { count: vi.fn() },
+  },
+}));
+
+vi.mock("../ai", () => ({ extractTopic: vi.fn() }));
+vi.mock("../topic-thread-manager.js", () => ({ assignMentionToThread: vi.fn() }));
+vi.mock("../../queues.js", () => ({ connection: {} }));
+
+import { prisma } from "@mediabot/shared";
+import { detectEmergingTopics, topicGrowth } from "../topic-extractor";
+
+describe("topicGrowth", () => {
+  it("compara la ventana contra la tasa de la semana previa", () => {
+    // 6 días de línea base con 36 menciones = 6/día esperadas en 24h
+    expect(topicGrowth(6, 36, 24, 144)).toBeCloseTo(1, 5);
+    expect(topicGrowth(20, 36, 24, 144)).toBeCloseTo(3, 5);
+  });
+
+  it("un tema sin historia crece count + 1", () => {
+    expect(topicGrowth(3, 0, 24, 144)).toBe(4);
+  });
+});
+
+describe("detectEmergingTopics", () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+  });
+
+  it("resuelve actual y línea base en una sola consulta", async () => {
+    vi.mocked(prisma.$queryRaw).mockResolvedValue([
+      { topic: "Reforma Judicial", count: 12, baselineCount: 60 },
+      { topic: "Huelga De Maestros", count: 4, baselineCount: 0 },
+    ] as never);
+
+    const topics = await detectEmergingTopics("org-1", 24, 3);
+
+    expect(prisma.$queryRaw).toHaveBeenCalledTimes(1);
+    expect(prisma.mention.count).not.toHaveBeenCalled();
+    expect(topics.map((t) => t.topic)).toEqual(["Huelga De Maestros", "Reforma Judicial"]);
+    expect(topics[0]).toMatchObject({ isNew: true, growth: 5 });
+    expect(topics[1].isNew).toBe(false);
+    expect(topics[1].growth).toBeCloseTo(13 / 11, 5);
+  });
+
+  it("usa la misma fecha efectiva para la ventana actual y la línea base", async () => {
+    vi.mocked(prisma.$queryRaw).mockResolvedValue([] as never);
+
+    await detectEmergingTopics("org-1", 24, 3);
+
+    const sql = (vi.mocked(prisma.$queryRaw).mock.calls[0][0] as unknown as TemplateStringsArray).join("$");
+    expect(sql).not.toMatch(/m\."publishedAt" [<>]/);
+    expect(sql.match(/COALESCE\(m\."publishedAt", m\."createdAt"\)/g)).toHaveLength(4);
+  });
+});
@@ -0,0 +1,79 @@
+import { describe, it, expect } from "vitest";
+import {
+  buildShingles,
+  computeSignature,
+  signatureBands,
+  estimateSimilarity,
+  shingleSimilarity,
+  BANDS,
+  NUM_HASHES,
+} from "../minhash";
+
+describe("buildShingles", () => {
+  it("normaliza acentos, stopwords y variantes morfológicas", () => {
+    const shingles = buildShingles("Inversión de Acme en México", "Las inversiones crecen");
+    expect(shingles.has("invers")).toBe(true);
+    expect(shingles.has("mexico")).toBe(true);
+    expect(shingles.has("de")).toBe(false);
+    expect(shingles.has("las")).toBe(false);
+  });
+
+  it("retorna un conjunto vacío sin texto útil", () => {
+    expect(buildShingles("de la en", null).size).toBe(0);
+  });
+});
+
+describe("computeSignature", () => {
+  it("es determinista y tiene NUM_HASHES valores", () => {
+    const shingles = buildShingles("Acme anuncia planta en Monterrey");
+    const a = computeSignature(shingles);
+    const b = computeSignature(shingles);
+    expect(a).toHaveLength(NUM_HASHES);
+    expect(a).toEqual(b);
+  });
+
+  it("estima similitud cercana al Jaccard real", () => {
+    const a = buildShingles("Acme anuncia nueva planta automotriz en Monterrey con inversion millonaria");
+    const b = buildShingles("Acme confirma nueva planta automotriz en Monterrey tras inversion millonaria");
+    const exact = shingleSimilarity(a, b);
+    const estimated = estimateSimilarity(computeSignature(a), computeSignature(b));
+    expect(Math.abs(exact - estimated)).toBeLessThan(0.25);
+  });
+});
+
+describe("signatureBands", () => {
+  it("genera una clave por banda", () => {
+    const bands = signatureBands(computeSignature(buildShingles("Acme gana premio")));
+    expect(bands).toHaveLength(BANDS);
+    expect(new Set(bands).size).toBe(BANDS);
+  });
+
+  it("menciones del mismo evento comparten alguna banda", () => {
+    const a = signatureBands(computeSignature(buildShingles(
+      "Acme anuncia nueva planta en Monterrey",
+      "La empresa Acme invertira 500 millones en una planta automotriz en Monterrey"
+    )));
+    const b = signatureBands(computeSignature(buildShingles(
+      "Acme invertira 500 millones en planta de Monterrey",
+      "Acme anuncio una planta automotriz en Monterrey con inversion de 500 millones"
+    )));
+    expect(a.some((band) => b.includes(band))).toBe(true);
+  });
+
+  it("textos sin relación rara vez colisionan", () => {
+    const a = new Set(signatureBands(computeSignature(buildShingles(
+      "Acme anuncia nueva planta en Monterrey", "Inversion automotriz en Nuevo Leon"
+    ))));
+    const b = signatureBands(computeSignature(buildShingles(
+      "Tigres gana el clasico regiomontano", "Partido de futbol en el estadio universitario"
+    )));
+    expect(b.filter((band) => a.has(band)).length).toBeLessThanOrEqual(1);
+  });
+});
+
+describe("shingleSimilarity", () => {
+  it("calcula Jaccard exacto", () => {
+    expect(shingleSimilarity(new Set(["a", "b"]), new Set(["b", "c"]))).toBeCloseTo(1 / 3);
+    expect(shingleSimilarity(new Set(), new Set())).toBe(0);
+  });
+});
@@ -0,0 +1,71 @@
+import { describe, it, expect } from "vitest";
+import { estimateTokens, truncateText, extractKeywordPassages, capList } from "../prompt-budget";
+
+describe("estimateTokens", () => {
+  it("estima ~4 caracteres por token", () => {
+    expect(estimateTokens("")).toBe(0);
+    expect(estimateTokens("a".repeat(400))).toBe(100);
+  });
+});
+
+describe("truncateText", () => {
+  it("no modifica textos dentro del límite", () => {
+    expect(truncateText("hola mundo", 20)).toBe("hola mundo");
+  });
+
+  it("corta en límite de palabra y marca el corte", () => {
+    const result = truncateText("uno dos tres cuatro cinco seis", 16);
+    expect(result).toBe("uno dos tres...");
+  });
+});
+
+describe("extractKeywordPassages", () => {
+  const filler = "Lorem ipsum dolor sit amet consectetur. ".repeat(60);
+
+  it("devuelve el contenido completo si cabe en el presupuesto", () => {
+    expect(extractKeywordPassages("Nota corta sobre Acme", ["Acme"], 500)).toBe("Nota corta sobre Acme");
+  });
+
+  it("incluye el pasaje alrededor de la keyword lejos del inicio", () => {
+    const content = `${filler}El director de Acme anunció una inversión. ${filler}`;
+    const result = extractKeywordPassages(content, ["Acme"], 800);
+
+    expect(result).toContain("Acme anunció una inversión");
+    expect(result).toContain("[...]");
+    expect(result.startsWith("Lorem ipsum")).toBe(true);
+    expect(result.length).toBeLessThanOrEqual(800);
+  });
+
+  it("ignora acentos y mayúsculas al buscar", () => {
+    const content = `${filler}Declaraciones de la Secretaría de Economía sobre aranceles. ${filler}`;
+    const result = extractKeywordPassages(content, ["secretaria de economia"], 700);
+    expect(result).toContain("Secretaría de Economía");
+  });
+
+  it("recorta desde el inicio si no hay apariciones", () => {
+    const result = extractKeywordPassages(filler, ["Acme"], 200);
+    expect(result.length).toBeLessThanOrEqual(203);
+    expect(result.endsWith("...")).toBe(true);
+  });
+
+  it("respeta el presupuesto con muchas apariciones", () => {
+    const content = Array.from({ length: 40 }, (_, i) => `${filler.slice(0, 300)} Acme ${i}`).join(" ");
+    const result = extractKeywordPassages(content, ["Acme"], 1000);
+    expect(result.length).toBeLessThanOrEqual(1000);
+  });
+});
+
+describe("capList", () => {
+  it("limita por cantidad", () => {
+    expect(capList(["a", "b", "c"], 2)).toEqual(["a", "b"]);
+  });
+
+  it("limita por tamaño total", () => {
+    expect(capList(["aaaa", "bbbb", "cccc"], 10, 10)).toEqual(["aaaa", "bbbb"]);
+  });
+
+  it("tolera listas vacías o ausentes", () => {
+    expect(capList(undefined, 5)).toEqual([]);
+    expect(capList([], 5, 100)).toEqual([]);
+  });
+});
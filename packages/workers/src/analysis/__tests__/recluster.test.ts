@@ -0,0 +1,129 @@
+import { describe, it, expect, vi } from "vitest";
+
+vi.mock("@mediabot/shared", () => ({
+  prisma: {},
+}));
+
+import { UnionFind, computeClusters, countClusters, type ReclusterItem } from "../recluster";
+
+const HOUR = 60 * 60 * 1000;
+const BASE = Date.UTC(2026, 0, 10, 12);
+
+function item(id: string, title: string, hoursOffset: number, overrides: Partial<ReclusterItem> = {}): ReclusterItem {
+  return {
+    id,
+    title,
+    summary: null,
+    timestamp: BASE + hoursOffset * HOUR,
+    parentMentionId: null,
+    clusterScore: null,
+    ...overrides,
+  };
+}
+
+describe("UnionFind", () => {
+  it("une componentes de forma transitiva", () => {
+    const uf = new UnionFind(5);
+    uf.union(0, 1);
+    uf.union(1, 2);
+    uf.union(3, 4);
+
+    expect(uf.find(0)).toBe(uf.find(2));
+    expect(uf.find(3)).toBe(uf.find(4));
+    expect(uf.find(0)).not.toBe(uf.find(3));
+  });
+});
+
+describe("computeClusters", () => {
+  it("agrupa menciones del mismo evento con la más antigua como padre", () => {
+    const items = [
+      item("b", "Acme anuncia nueva planta automotriz en Monterrey con inversión millonaria", 2),
+      item("a", "Acme anuncia nueva planta automotriz en Monterrey con inversión millonaria hoy", 0),
+      item("c", "Tigres gana el clásico regiomontano en el estadio universitario", 1),
+    ];
+
+    const { assignments } = computeClusters(items);
+
+    expect(assignments.get("a")).toEqual({ parentMentionId: null, clusterScore: null });
+    expect(assignments.get("b")?.parentMentionId).toBe("a");
+    expect(assignments.get("b")?.clusterScore).toBeGreaterThanOrEqual(0.5);
+    expect(assignments.get("c")?.parentMentionId).toBeNull();
+  });
+
+  it("no une menciones similares separadas por más de la ventana", () => {
+    const title = "Acme anuncia nueva planta automotriz en Monterrey con inversión millonaria";
+    const { assignments } = computeClusters([item("a", title, 0), item("b", title, 24 * 10)]);
+
+    expect(assignments.get("b")?.parentMentionId).toBeNull();
+  });
+
+  it("preserva clusters existentes y deja intactas menciones con padre fuera del rango", () => {
+    const items = [
+      item("p", "Gobierno presenta reforma fiscal", 0),
+      item("h", "Congreso discute presupuesto educativo", 1, { parentMentionId: "p", clusterScore: 0.8 }),
+      item("x", "Sismo sacude la costa de Oaxaca", 2, { parentMentionId: "fuera", clusterScore: 0.9 }),
+    ];
+
+    const { assignments } = computeClusters(items);
+
+    expect(assignments.get("h")).toEqual({ parentMentionId: "p", clusterScore: 0.8 });
+    expect(assignments.get("x")).toEqual({ parentMentionId: "fuera", clusterScore: 0.9 });
+  });
+
+  it("no degrada a un padre con hijos fuera del rango aunque haya una mención más antigua", () => {
+    const title = "Acme anuncia nueva planta automotriz en Monterrey con inversión millonaria";
+    const items = [
+      item("antigua", `${title} hoy`, 0),
+      // Su hija quedó fuera del rango re-clusterizado
+      item("padre", title, 2, { hasChildren: true }),
+    ];
+
+    const { assignments } = computeClusters(items);
+
+    expect(assignments.get("padre")).toEqual({ parentMentionId: null, clusterScore: null });
+    expect(assignments.get("antigua")?.parentMentionId).toBe("padre");
+  });
+
+  it("no fusiona dos clusters que ya tienen padre", () => {
+    const title = "Acme anuncia nueva planta automotriz en Monterrey con inversión millonaria";
+    const items = [
+      item("p1", title, 0),
+      item("h1", "Sismo sacude la costa de Oaxaca", 1, { parentMentionId: "p1", clusterScore: 0.7 }),
+      item("p2", `${title} hoy`, 2, { hasChildren: true }),
+    ];
+
+    const { assignments } = computeClusters(items);
+
+    expect(assignments.get("p1")?.parentMentionId).toBeNull();
+    expect(assignments.get("p2")?.parentMentionId).toBeNull();
+    expect(assignments.get("h1")?.parentMentionId).toBe("p1");
+  });
+
+  it("una mención con padre fijo no se vuelve padre ni se re-apunta", () => {
+    const title = "Acme anuncia nueva planta automotriz en Monterrey con inversión millonaria";
+    const items = [
+      item("fija", title, 0, { parentMentionId: "fuera", clusterScore: 0.9 }),
+      item("nieta", "Sismo sacude la costa de Oaxaca", 1, { parentMentionId: "fija", clusterScore: 0.6 }),
+      item("nueva", `${title} hoy`, 2),
+    ];
+
+    const { assignments } = computeClusters(items);
+
+    expect(assignments.get("fija")).toEqual({ parentMentionId: "fuera", clusterScore: 0.9 });
+    expect(assignments.get("nieta")).toEqual({ parentMentionId: "fija", clusterScore: 0.6 });
+    expect(assignments.get("nueva")?.parentMentionId).toBeNull();
+  });
+});
+
+describe("countClusters", () => {
+  it("cuenta padres distintos y menciones agrupadas", () => {
+    const counts = countClusters([
+      { parentMentionId: null, clusterScore: null },
+      { parentMentionId: "a", clusterScore: 0.9 },
+      { parentMentionId: "a", clusterScore: 0.8 },
+      { parentMentionId: "b", clusterScore: 0.7 },
+    ]);
+
+    expect(counts).toEqual({ clusters: 2, clustered: 5 });
+  });
+});
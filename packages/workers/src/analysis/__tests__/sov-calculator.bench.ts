@@ -0,0 +1,65 @@
+import { bench, describe, vi } from "vitest";
+
+vi.mock("@mediabot/shared", () => ({
+  prisma: { sourceTier: { findMany: vi.fn() } },
+}));
+
+import { weighSourceCounts, type SourceCountRow } from "../sov-calculator";
+import { extractDomain, tierWeight } from "../source-tiers";
+
+// 200 dominios con tier, 300 fuentes distintas, 5 clientes
+const TIERS = new Map(Array.from({ length: 200 }, (_, i) => [`medio${i}.com.mx`, (i % 3) + 1]));
+const SOURCES = Array.from({ length: 300 }, (_, i) => `https://www.medio${i}.com.mx/nota`);
+
+function buildMentions(n: number): { clientId: string; source: string }[] {
+  return Array.from({ length: n }, (_, i) => ({
+    clientId: `client-${i % 5}`,
+    source: SOURCES[(i * 7919) % SOURCES.length],
+  }));
+}
+
+/** Lo que devuelve el GROUP BY (cliente, fuente) */
+function groupRows(mentions: { clientId: string; source: string }[]): SourceCountRow[] {
+  const counts = new Map<string, SourceCountRow>();
+  for (const m of mentions) {
+    const key = `${m.clientId}|${m.source}`;
+    const row = counts.get(key) ?? { clientId: m.clientId, source: m.source, count: 0 };
+    row.count++;
+    counts.set(key, row);
+  }
+  return [...counts.values()];
+}
+
+/**
+ * Flujo anterior: un findUnique de SourceTier (await) por mención. Sin BD real
+ * solo mide el costo en proceso; en producción cada await es un round-trip.
+ */
+async function legacyWeights(mentions: { clientId: string; source: string }[]) {
+  const findUnique = async (domain: string) => (TIERS.has(domain) ? { tier: TIERS.get(domain)! } : null);
+  const totals = new Map<string, { count: number; weighted: number }>();
+  for (const m of mentions) {
+    const domain = extractDomain(m.source);
+    const tier = domain ? await findUnique(domain) : null;
+    const total = totals.get(m.clientId) ?? { count: 0, weighted: 0 };
+    total.count++;
+    total.weighted += tierWeight(tier?.tier);
+    totals.set(m.clientId, total);
+  }
+  return totals;
+}
+
+for (const size of [10_000, 100_000]) {
+  const mentions = buildMentions(size);
+  const rows = groupRows(mentions);
+
+  describe(`SOV ${size} menciones`, () => {
+    bench("por mención (anterior)", async () => {
+      await legacyWeights(mentions);
+    });
+
+    bench("agregado + mapa de tiers", () => {
+      weighSourceCounts(rows, TIERS);
+    });
+  });
+}
+
@@ -0,0 +1,135 @@
+import { describe, it, expect, vi, beforeEach } from "vitest";
+
+vi.mock("@mediabot/shared", () => ({
+  prisma: {
+    $queryRaw: vi.fn(),
+    client: { findUnique: vi.fn(), findMany: vi.fn() },
+    clientCompetitor: { findMany: vi.fn() },
+    sourceTier: { findMany: vi.fn(), findUnique: vi.fn() },
+  },
+}));
+
+import { prisma } from "@mediabot/shared";
+import { calculateSOV, getSOVHistory, weighSourceCounts } from "../sov-calculator";
+import { extractDomain, getSourceTierMap, invalidateSourceTierMap, tierWeight } from "../source-tiers";
+
+const TIERS = new Map([
+  ["eluniversal.com.mx", 1],
+  ["diariodeyucatan.com", 2],
+]);
+
+describe("source tiers", () => {
+  it("normaliza dominios igual que antes", () => {
+    expect(extractDomain("https://www.eluniversal.com.mx/nacion/nota")).toBe("eluniversal.com.mx");
+    expect(extractDomain("ElUniversal.com.mx")).toBe("eluniversal.com.mx");
+  });
+
+  it("pondera por tier con 1x por defecto", () => {
+    expect(tierWeight(1)).toBe(3);
+    expect(tierWeight(2)).toBe(2);
+    expect(tierWeight(3)).toBe(1);
+    expect(tierWeight(undefined)).toBe(1);
+  });
+
+  it("la primera carga guarda la huella y la verificación no recarga", async () => {
+    invalidateSourceTierMap();
+    vi.mocked(prisma.sourceTier.findMany).mockResolvedValue([] as never);
+    // md5('') = huella de la tabla vacía según el SQL
+    vi.mocked(prisma.$queryRaw).mockResolvedValue([{ fingerprint: "d41d8cd98f00b204e9800998ecf8427e" }] as never);
+    const now = Date.now();
+    const clock = vi.spyOn(Date, "now").mockReturnValue(now);
+
+    await getSourceTierMap();
+    clock.mockReturnValue(now + 2 * 60 * 1000);
+    await getSourceTierMap();
+
+    expect(prisma.$queryRaw).toHaveBeenCalledTimes(1);
+    expect(prisma.sourceTier.findMany).toHaveBeenCalledTimes(1);
+    clock.mockRestore();
+    vi.mocked(prisma.$queryRaw).mockReset();
+  });
+});
+
+describe("weighSourceCounts", () => {
+  it("suma conteo y peso por cliente", () => {
+    const totals = weighSourceCounts(
+      [
+        { clientId: "a", source: "eluniversal.com.mx", count: 10 },
+        { clientId: "a", source: "https://www.diariodeyucatan.com/x", count: 5 },
+        { clientId: "a", source: "Blog Local", count: 2 },
+        { clientId: "b", source: "eluniversal.com.mx", count: 1 },
+      ],
+      TIERS
+    );
+
+    expect(totals.get("a")).toEqual({ count: 17, weighted: 30 + 10 + 2 });
+    expect(totals.get("b")).toEqual({ count: 1, weighted: 3 });
+  });
+});
+
+describe("calculateSOV", () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+    invalidateSourceTierMap();
+  });
+
+  it("agrega cliente y competidores con una consulta sin buscar tiers por mención", async () => {
+    vi.mocked(prisma.client.findUnique).mockResolvedValue({ id: "a", name: "Cliente A", orgId: "org" } as never);
+    vi.mocked(prisma.clientCompetitor.findMany).mockResolvedValue([{ competitor: { name: "Rival" } }] as never);
+    vi.mocked(prisma.client.findMany).mockResolvedValue([{ id: "b", name: "Rival SA" }] as never);
+    vi.mocked(prisma.sourceTier.findMany).mockResolvedValue([{ domain: "eluniversal.com.mx", tier: 1 }] as never);
+    vi.mocked(prisma.$queryRaw).mockResolvedValue([
+      { clientId: "a", source: "eluniversal.com.mx", count: 3 },
+      { clientId: "b", source: "blog.mx", count: 3 },
+    ] as never);
+
+    const sov = await calculateSOV("a", 30);
+
+    expect(prisma.$queryRaw).toHaveBeenCalledTimes(1);
+    expect(prisma.sourceTier.findUnique).not.toHaveBeenCalled();
+    expect(sov.total).toBe(6);
+    expect(sov.totalWeighted).toBe(12);
+    expect(sov.client.sov).toBe(50);
+    expect(sov.client.weightedSov).toBe(75);
+    expect(sov.competitors[0].weightedSov).toBe(25);
+  });
+
+  it("reutiliza el mapa de tiers entre llamadas", async () => {
+    vi.mocked(prisma.client.findUnique).mockResolvedValue({ id: "a", name: "Cliente A", orgId: "org" } as never);
+    vi.mocked(prisma.clientCompetitor.findMany).mockResolvedValue([] as never);
+    vi.mocked(prisma.sourceTier.findMany).mockResolvedValue([] as never);
+    vi.mocked(prisma.$queryRaw).mockResolvedValue([] as never);
+
+    await calculateSOV("a", 30);
+    await calculateSOV("a", 7);
+
+    expect(prisma.sourceTier.findMany).toHaveBeenCalledTimes(1);
+  });
+});
+
+describe("getSOVHistory", () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+    invalidateSourceTierMap();
+    vi.mocked(prisma.sourceTier.findMany).mockResolvedValue([{ domain: "eluniversal.com.mx", tier: 1 }] as never);
+  });
+
+  it("resuelve todas las semanas con una consulta agrupada", async () => {
+    vi.mocked(prisma.client.findUnique).mockResolvedValue({ orgId: "org" } as never);
+    vi.mocked(prisma.$queryRaw).mockResolvedValue([
+      { week: 0, source: "eluniversal.com.mx", count: 2, orgCount: 4 },
+      { week: 0, source: "Blog Local", count: 0, orgCount: 4 },
+      { week: 2, source: "Blog Local", count: 1, orgCount: 2 },
+    ] as never);
+
+    const history = await getSOVHistory("a", 3);
+
+    expect(prisma.$queryRaw).toHaveBeenCalledTimes(1);
+    expect(history).toHaveLength(3);
+    // Orden cronológico: la semana más vieja primero
+    expect(history[0]).toMatchObject({ mentions: 1, sov: 50, weightedSov: 50 });
+    expect(history[1]).toMatchObject({ mentions: 0, sov: 0 });
+    expect(history[2]).toMatchObject({ mentions: 2, sov: 25, weightedSov: 75 });
+    expect(history[2].date.getTime() - history[1].date.getTime()).toBe(7 * 24 * 60 * 60 * 1000);
+  });
+});
@@ -0,0 +1,74 @@
+import { describe, it, expect } from "vitest";
+import {
+  addToSourceSketch,
+  breakdownKey,
+  dominantSentimentOf,
+  parseSourceSketch,
+  sameSketch,
+  sketchFromCounts,
+  topSourcesOf,
+  type SourceSketch,
+} from "../thread-stats";
+
+describe("breakdownKey", () => {
+  it("mapea el enum de sentimiento al bucket", () => {
+    expect(breakdownKey("NEGATIVE")).toBe("negative");
+    expect(breakdownKey("MIXED")).toBe("mixed");
+    expect(breakdownKey("UNKNOWN")).toBeNull();
+    expect(breakdownKey(null)).toBeNull();
+  });
+});
+
+describe("dominantSentimentOf", () => {
+  it("elige el bucket mayor", () => {
+    expect(dominantSentimentOf({ positive: 1, negative: 5, neutral: 3, mixed: 0 })).toBe("NEGATIVE");
+  });
+
+  it("resuelve empates como el recálculo completo", () => {
+    expect(dominantSentimentOf({ positive: 2, negative: 2, neutral: 2, mixed: 2 })).toBe("POSITIVE");
+    expect(dominantSentimentOf({ positive: 0, negative: 0, neutral: 3, mixed: 3 })).toBe("MIXED");
+    expect(dominantSentimentOf({ positive: 0, negative: 0, neutral: 0, mixed: 0 })).toBe("NEUTRAL");
+  });
+});
+
+describe("addToSourceSketch", () => {
+  it("cuenta fuentes exactas mientras hay capacidad", () => {
+    let sketch: SourceSketch = {};
+    for (const source of ["Milenio", "El Universal", "Milenio"]) sketch = addToSourceSketch(sketch, source);
+
+    expect(sketch).toEqual({ Milenio: 2, "El Universal": 1 });
+    expect(topSourcesOf(sketch)).toEqual(["Milenio", "El Universal"]);
+  });
+
+  it("no crece más allá de la capacidad y conserva las fuentes frecuentes", () => {
+    let sketch: SourceSketch = {};
+    for (let i = 0; i < 100; i++) sketch = addToSourceSketch(sketch, "La Jornada", 5);
+    for (let i = 0; i < 200; i++) sketch = addToSourceSketch(sketch, `blog-${i}`, 5);
+
+    expect(Object.keys(sketch)).toHaveLength(5);
+    expect(topSourcesOf(sketch, 1)).toEqual(["La Jornada"]);
+  });
+
+  it("no modifica el sketch recibido", () => {
+    const sketch = { Milenio: 1 };
+    addToSourceSketch(sketch, "Milenio");
+    expect(sketch).toEqual({ Milenio: 1 });
+  });
+});
+
+describe("reconciliación", () => {
+  it("sketchFromCounts conserva las fuentes con más menciones", () => {
+    const counts = new Map([["a", 1], ["b", 9], ["c", 4]]);
+    expect(sketchFromCounts(counts, 2)).toEqual({ b: 9, c: 4 });
+  });
+
+  it("sameSketch ignora el orden de las claves", () => {
+    expect(sameSketch({ c: 4, b: 9 }, { b: 9, c: 4 })).toBe(true);
+    expect(sameSketch({ b: 8, c: 4 }, { b: 9, c: 4 })).toBe(false);
+    expect(sameSketch(null, {})).toBe(true);
+  });
+
+  it("siembra threads sin sketch desde topSources", () => {
+    expect(parseSourceSketch(null, ["Milenio", "Reforma"])).toEqual({ Milenio: 1, Reforma: 1 });
+  });
+});
@@ -0,0 +1,46 @@
+import { describe, it, expect } from "vitest";
+import { findMatchingTopic, topicKey, trigramSimilarity } from "../topic-key";
+
+describe("topicKey", () => {
+  it("ignora mayúsculas, acentos, artículos y plurales simples", () => {
+    expect(topicKey("La Reforma Judicial")).toBe("reforma judicial");
+    expect(topicKey("Reformas Judiciales")).toBe("reforma judicial");
+    expect(topicKey("Fusión Empresarial")).toBe(topicKey("fusion empresarial"));
+  });
+
+  it("conserva números y temas formados solo por stopwords", () => {
+    expect(topicKey("Elecciones 2024")).toBe("eleccion 2024");
+    expect(topicKey("Los de la U")).toBe("los de la u");
+  });
+});
+
+describe("trigramSimilarity", () => {
+  it("es 1 para claves iguales y baja para temas distintos", () => {
+    expect(trigramSimilarity("reforma judicial", "reforma judicial")).toBe(1);
+    expect(trigramSimilarity("reforma judicial", "reforma electoral")).toBeLessThan(0.5);
+  });
+});
+
+describe("findMatchingTopic", () => {
+  const candidates = [
+    { id: "1", name: "Reforma Judicial" },
+    { id: "2", name: "Elecciones 2024" },
+    { id: "3", name: "Huelga De Maestros Cnte" },
+  ];
+
+  it("fusiona variantes con la misma clave", () => {
+    expect(findMatchingTopic("La Reforma Judicial", candidates)?.id).toBe("1");
+  });
+
+  it("fusiona variantes cercanas por trigramas", () => {
+    expect(findMatchingTopic("Huelga Maestros CNTE", candidates)?.id).toBe("3");
+  });
+
+  it("no fusiona temas que difieren en un número", () => {
+    expect(findMatchingTopic("Elecciones 2025", candidates)).toBeNull();
+  });
+
+  it("no fusiona temas distintos", () => {
+    expect(findMatchingTopic("Reforma Electoral", candidates)).toBeNull();
+  });
+});
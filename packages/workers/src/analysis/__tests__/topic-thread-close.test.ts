@@ -0,0 +1,119 @@
+import { describe, it, expect, vi, beforeEach } from "vitest";
+import { readFileSync } from "fs";
+
+const tx = vi.hoisted(() => ({
+  $queryRaw: vi.fn(),
+  $executeRaw: vi.fn().mockResolvedValue(0),
+  topicThreadEvent: { createMany: vi.fn() },
+}));
+
+vi.mock("@mediabot/shared", () => ({
+  prisma: {
+    $transaction: vi.fn((fn: (client: typeof tx) => Promise<unknown>) => fn(tx)),
+  },
+}));
+
+vi.mock("../../queues.js", () => ({
+  getQueue: vi.fn(),
+  QUEUE_NAMES: {},
+}));
+
+import { prisma } from "@mediabot/shared";
+import { closeInactiveThreads, CLOSE_BATCH_SIZE } from "../topic-thread-manager";
+
+/**
+ * Simula N threads inactivos: cada SELECT devuelve hasta LIMIT candidatos;
+ * `withPrevious` indica cuáles ya tienen un thread CLOSED con el mismo nombre.
+ */
+function inactiveThreads(total: number, withPrevious: (i: number) => boolean = () => false) {
+  let remaining = total;
+  tx.$queryRaw.mockImplementation(async (_strings: TemplateStringsArray, ...values: unknown[]) => {
+    const limit = values[1] as number;
+    const count = Math.min(limit, remaining);
+    remaining -= count;
+    return Array.from({ length: count }, (_, i) => ({
+      id: `thread-${remaining + i}`,
+      previousId: withPrevious(remaining + i) ? `closed-${remaining + i}` : null,
+    }));
+  });
+}
+
+/** SQL sin parámetros, en una línea */
+function sqlText(call: unknown[]): string {
+  return (call[0] as TemplateStringsArray).join("$").replace(/\s+/g, " ");
+}
+
+describe("closeInactiveThreads", () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+  });
+
+  it("cierra por lotes con un UPDATE y un createMany por transacción", async () => {
+    inactiveThreads(CLOSE_BATCH_SIZE * 2 + 10);
+
+    const closed = await closeInactiveThreads();
+
+    expect(closed).toBe(CLOSE_BATCH_SIZE * 2 + 10);
+    expect(prisma.$transaction).toHaveBeenCalledTimes(3);
+    expect(tx.$queryRaw).toHaveBeenCalledTimes(3);
+    // Sin threads CLOSED previos: solo el UPDATE de cierre
+    expect(tx.$executeRaw).toHaveBeenCalledTimes(3);
+    expect(tx.topicThreadEvent.createMany.mock.calls.map((c) => c[0].data.length)).toEqual([
+      CLOSE_BATCH_SIZE,
+      CLOSE_BATCH_SIZE,
+      10,
+    ]);
+    expect(tx.topicThreadEvent.createMany.mock.calls[0][0].data[0]).toMatchObject({
+      type: "CLOSED",
+      data: { reason: "inactivity", cutoffHours: 72 },
+    });
+  });
+
+  it("no crea eventos si no hay threads inactivos", async () => {
+    inactiveThreads(0);
+
+    expect(await closeInactiveThreads()).toBe(0);
+    expect(tx.$queryRaw).toHaveBeenCalledTimes(1);
+    expect(tx.$executeRaw).not.toHaveBeenCalled();
+    expect(tx.topicThreadEvent.createMany).not.toHaveBeenCalled();
+  });
+
+  it("cierra un tema recurrente fusionando el thread CLOSED anterior", async () => {
+    inactiveThreads(2, (i) => i === 1);
+
+    expect(await closeInactiveThreads()).toBe(2);
+
+    const statements = tx.$executeRaw.mock.calls.map(sqlText);
+    const deleteAt = statements.findIndex((sql) => sql.trim().startsWith(`DELETE FROM "TopicThread"`));
+    const closeAt = statements.findIndex((sql) => sql.includes("SET status = 'CLOSED'"));
+    expect(statements.some((sql) => sql.includes(`UPDATE "Mention" m SET "topicThreadId" = v.thread`))).toBe(true);
+    expect(statements.some((sql) => sql.includes(`UPDATE "SocialMention" s SET "topicThreadId" = v.thread`))).toBe(true);
+    // El anterior se elimina antes de cambiar el estado (unique [clientId, normalizedName, status])
+    expect(deleteAt).toBeGreaterThanOrEqual(0);
+    expect(deleteAt).toBeLessThan(closeAt);
+    expect(tx.$executeRaw.mock.calls[deleteAt]).toContainEqual(["closed-1"]);
+
+    const events = tx.topicThreadEvent.createMany.mock.calls[0][0].data;
+    expect(events.find((e: { topicThreadId: string }) => e.topicThreadId === "thread-1").data).toMatchObject({
+      mergedThreadId: "closed-1",
+    });
+  });
+
+  it("la consulta filtra y ordena por las columnas del índice [status, lastMentionAt]", async () => {
+    inactiveThreads(0);
+    await closeInactiveThreads();
+
+    // Chequeo del texto SQL (no del plan): predicados y ORDER BY sobre las
+    // columnas del índice, con LIMIT y bloqueo de los candidatos
+    const sql = sqlText(tx.$queryRaw.mock.calls[0]);
+    expect(sql).toContain(`WHERE status = 'ACTIVE' AND "lastMentionAt" < $`);
+    expect(sql).toContain(`ORDER BY "lastMentionAt" LIMIT $ FOR UPDATE SKIP LOCKED`);
+    expect(sql).not.toContain("NOT EXISTS");
+
+    const schema = readFileSync(new URL("../../../../../prisma/schema.prisma", import.meta.url), "utf-8");
+    const model = schema.match(/model TopicThread \{([\s\S]*?)\n\}/)?.[1] ?? "";
+    expect(model).toMatch(/@@index\(\[status, lastMentionAt\]\)/);
+    // El JOIN con el thread CLOSED anterior busca por (clientId, normalizedName, status): cubierto por el unique
+    expect(model).toMatch(/@@unique\(\[clientId, normalizedName, status\]\)/);
+  });
+});
@@ -0,0 +1,92 @@
+import { describe, it, expect, vi, beforeEach } from "vitest";
+
+vi.mock("@mediabot/shared", () => ({
+  prisma: {
+    $queryRaw: vi.fn(),
+    mention: { findUnique: vi.fn(), update: vi.fn() },
+    topicThread: { findFirst: vi.fn(), update: vi.fn() },
+    topicThreadEvent: { create: vi.fn(), count: vi.fn() },
+  },
+}));
+
+vi.mock("../../queues.js", () => ({
+  getQueue: vi.fn(() => ({ add: vi.fn() })),
+  QUEUE_NAMES: {},
+}));
+
+import { prisma } from "@mediabot/shared";
+import { assignMentionToThread } from "../topic-thread-manager";
+
+const NEW_THREAD = { id: "thread-new", clientId: "client-1", dominantSentiment: null, sourceSketch: {}, topSources: [] };
+
+function mentionLinkedTo(topicThreadId: string | null) {
+  vi.mocked(prisma.mention.findUnique).mockResolvedValue({
+    id: "mention-1",
+    topic: "Tarifas",
+    clientId: "client-1",
+    sentiment: "NEGATIVE",
+    topicThreadId,
+    article: { source: "elpais.com" },
+  } as never);
+}
+
+/** SQL de la n-ésima llamada a $queryRaw, sin parámetros y en una línea */
+function sqlOf(call: number): string {
+  const strings = vi.mocked(prisma.$queryRaw).mock.calls[call][0] as unknown as TemplateStringsArray;
+  return strings.join("$").replace(/\s+/g, " ");
+}
+
+describe("assignMentionToThread (re-vinculación)", () => {
+  beforeEach(() => {
+    vi.clearAllMocks();
+    vi.mocked(prisma.topicThread.findFirst).mockResolvedValue(NEW_THREAD as never);
+    vi.mocked(prisma.topicThreadEvent.count).mockResolvedValue(0);
+    vi.mocked(prisma.$queryRaw).mockImplementation((async (strings: TemplateStringsArray) => {
+      const sql = strings.join("$");
+      if (sql.includes("GREATEST")) {
+        return [{ id: "thread-old", sentimentBreakdown: { positive: 0, negative: 0, neutral: 0, mixed: 0 }, dominantSentiment: "NEGATIVE" }];
+      }
+      return [{
+        ...NEW_THREAD,
+        mentionCount: 3,
+        socialMentionCount: 0,
+        sentimentBreakdown: { positive: 0, negative: 3, neutral: 0, mixed: 0 },
+        lastNotifiedAt: null,
+        thresholdsReached: [],
+      }];
+    }) as never);
+  });
+
+  it("resta la mención del thread anterior al moverla a otro", async () => {
+    mentionLinkedTo("thread-old");
+
+    const result = await assignMentionToThread("mention-1", "mention");
+
+    expect(result).toEqual({ threadId: "thread-new" });
+    expect(prisma.$queryRaw).toHaveBeenCalledTimes(2);
+    expect(sqlOf(1)).toContain(`GREATEST("mentionCount" - $, 0)`);
+    expect(vi.mocked(prisma.$queryRaw).mock.calls[1]).toContain("thread-old");
+    // El anterior quedó sin negativas: se recalcula su sentimiento dominante
+    expect(prisma.topicThread.update).toHaveBeenCalledWith({
+      where: { id: "thread-old" },
+      data: { dominantSentiment: "NEUTRAL" },
+    });
+  });
+
+  it("no toca stats si la mención ya era del thread", async () => {
+    mentionLinkedTo("thread-new");
+
+    await assignMentionToThread("mention-1", "mention");
+
+    expect(prisma.$queryRaw).not.toHaveBeenCalled();
+  });
+
+  it("no resta nada en la primera vinculación", async () => {
+    mentionLinkedTo(null);
+
+    await assignMentionToThread("mention-1", "mention");
+
+    expect(prisma.$queryRaw).toHaveBeenCalledTimes(1);
+    expect(sqlOf(0)).not.toContain("GREATEST");
+  });
+});
@@ -0,0 +1,155 @@
+import { describe, it, expect } from "vitest";
+import {
+  trainTriageModel,
+  predictTriage,
+  serializeTriageModel,
+  parseTriageModel,
+  evaluateTriageModel,
+  canResolveLocally,
+  extractFeatures,
+  FEATURE_DIMS,
+  type TriageExample,
+} from "../triage-model";
+
+const TEAMS = ["Tigres", "Rayados", "Pumas", "Chivas", "Toluca"];
+
+function buildExamples(): TriageExample[] {
+  const examples: TriageExample[] = [];
+  for (let i = 0; i < 20; i++) {
+    const team = TEAMS[i % TEAMS.length];
+    examples.push({
+      title: `${team} gana el partido de la jornada ${i} en el estadio`,
+      content: `El delantero anotó dos goles en la liga. El marcador final favoreció al equipo; Acme patrocina la camiseta. Torneo de futbol jornada ${i}.`,
+      keyword: "Acme",
+      sentiment: "NEUTRAL",
+      relevance: 2,
+    });
+    examples.push({
+      title: `Denuncian a Acme por fraude en contratos ${i}`,
+      content: `Una investigación revela irregularidades y corrupción en Acme. La empresa enfrenta una demanda y multa por el escándalo ${i}.`,
+      keyword: "Acme",
+      sentiment: "NEGATIVE",
+      relevance: 8,
+    });
+    examples.push({
+      title: `Acme recibe premio por innovación ${i}`,
+      content: `El reconocimiento destaca el crecimiento y la inversión de Acme; la empresa celebra el logro con una nueva alianza ${i}.`,
+      keyword: "Acme",
+      sentiment: "POSITIVE",
+      relevance: 7,
+    });
+  }
+  return examples;
+}
+
+describe("extractFeatures", () => {
+  it("produce índices dentro del espacio de features", () => {
+    const x = extractFeatures({ title: "Acme gana premio", content: "Texto corto", keyword: "Acme" });
+    expect(x.size).toBeGreaterThan(0);
+    for (const idx of x.keys()) {
+      expect(idx).toBeGreaterThanOrEqual(0);
+      expect(idx).toBeLessThan(FEATURE_DIMS);
+    }
+  });
+
+  it("ignora acentos y mayúsculas", () => {
+    const a = extractFeatures({ title: "ESCÁNDALO en Acme", content: "", keyword: "acme" });
+    const b = extractFeatures({ title: "escandalo en acme", content: "", keyword: "ACME" });
+    expect([...a.entries()]).toEqual([...b.entries()]);
+  });
+});
+
+describe("trainTriageModel / predictTriage", () => {
+  const model = trainTriageModel(buildExamples());
+
+  it("reconoce una crónica deportiva como no relevante", () => {
+    const p = predictTriage(model, {
+      title: "Pumas empata el partido en el estadio",
+      content: "Goles en la jornada de la liga; el marcador quedó igualado. Acme aparece en la publicidad del torneo de futbol.",
+      keyword: "Acme",
+    });
+    expect(p.relevant).toBe(false);
+    expect(p.sentiment).toBe("NEUTRAL");
+  });
+
+  it("reconoce una nota negativa relevante", () => {
+    const p = predictTriage(model, {
+      title: "Acme enfrenta demanda por fraude",
+      content: "La investigación por corrupción y el escándalo afectan a Acme.",
+      keyword: "Acme",
+    });
+    expect(p.relevant).toBe(true);
+    expect(p.sentiment).toBe("NEGATIVE");
+  });
+
+  it("retorna confianzas entre 0.5 y 1", () => {
+    const p = predictTriage(model, { title: "Acme", content: "", keyword: "Acme" });
+    expect(p.relevanceConfidence).toBeGreaterThanOrEqual(0.5);
+    expect(p.relevanceConfidence).toBeLessThanOrEqual(1);
+    expect(p.sentimentConfidence).toBeGreaterThan(0);
+    expect(p.sentimentConfidence).toBeLessThanOrEqual(1);
+  });
+
+  it("es determinista con la misma semilla", () => {
+    const again = trainTriageModel(buildExamples());
+    expect(again.relevanceWeights).toEqual(model.relevanceWeights);
+  });
+});
+
+describe("serializeTriageModel / parseTriageModel", () => {
+  it("conserva las predicciones tras la serialización", () => {
+    const model = trainTriageModel(buildExamples());
+    const parsed = parseTriageModel(serializeTriageModel(model));
+    expect(parsed).not.toBeNull();
+
+    const input = { title: "Acme recibe premio", content: "Reconocimiento al crecimiento", keyword: "Acme" };
+    expect(predictTriage(parsed!, input).sentiment).toBe(predictTriage(model, input).sentiment);
+  });
+
+  it("rechaza JSON inválido o de otra versión", () => {
+    expect(parseTriageModel("not json")).toBeNull();
+    expect(parseTriageModel(JSON.stringify({ version: 2 }))).toBeNull();
+  });
+});
+
+describe("canResolveLocally", () => {
+  it("solo resuelve menciones no relevantes con ambas confianzas altas", () => {
+    const base = { sentiment: "NEUTRAL" as const, sentimentConfidence: 0.95, relevant: false, relevanceConfidence: 0.95 };
+    expect(canResolveLocally(base, 0.9)).toBe(true);
+    expect(canResolveLocally({ ...base, relevant: true }, 0.9)).toBe(false);
+    expect(canResolveLocally({ ...base, sentimentConfidence: 0.6 }, 0.9)).toBe(false);
+    expect(canResolveLocally({ ...base, relevanceConfidence: 0.8 }, 0.9)).toBe(false);
+  });
+});
+
+describe("evaluateTriageModel", () => {
+  it("reporta exactitud y fracción de llamadas evitadas", () => {
+    const examples = buildExamples();
+    const model = trainTriageModel(examples);
+    const report = evaluateTriageModel(model, examples, 0.5);
+
+    expect(report.total).toBe(examples.length);
+    expect(report.relevanceAccuracy).toBeGreaterThan(0.9);
+    expect(report.sentimentAccuracy).toBeGreaterThan(0.9);
+    // Con umbral 0.5 toda predicción es "segura", pero el pre-filtro solo acepta relevantes
+    expect(report.preFilterAvoided).toBeGreaterThan(0);
+    expect(report.preFilterAvoided).toBeLessThan(1);
+    expect(report.analysisAvoided).toBeGreaterThan(0);
+    expect(report.analysisAvoided).toBeLessThan(1);
+  });
+
+  it("evita menos llamadas con umbrales más altos", () => {
+    const examples = buildExamples();
+    const model = trainTriageModel(examples);
+    const low = evaluateTriageModel(model, examples, 0.6);
+    const high = evaluateTriageModel(model, examples, 0.99);
+    expect(high.preFilterAvoided).toBeLessThanOrEqual(low.preFilterAvoided);
+  });
+
+  it("maneja un conjunto vacío", () => {
+    const model = trainTriageModel(buildExamples());
+    const report = evaluateTriageModel(model, [], 0.9);
+    expect(report.total).toBe(0);
+    expect(report.sentimentAccuracy).toBe(0);
+  });
+});
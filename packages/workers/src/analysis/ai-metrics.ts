@@ -0,0 +1,148 @@
+/**
+ * Métricas de uso de Gemini por familia de prompt.
+ *
+ * Cada llamada registra tokens de entrada/salida y latencia en un hash diario
+ * de Redis (`metrics:ai:YYYY-MM-DD`), para ver qué familias dominan costo y
+ * latencia. Los tokens vienen de `usageMetadata`; si la respuesta no lo trae
+ * se estiman por longitud.
+ */
+
+import type { getGeminiModel } from "@mediabot/shared";
+import { connection } from "../queues.js";
+import { estimateTokens } from "./prompt-budget.js";
+
+export type AiPromptFamily =
+  | "prefilter"
+  | "analyze_mention"
+  | "analyze_batch"
+  | "extract_topic"
+  | "onboarding"
+  | "enhanced_onboarding"
+  | "response"
+  | "digest_summary"
+  | "weekly_insights"
+  | "daily_brief"
+  | "social_hashtags"
+  | "social_mention"
+  | "comments_sentiment"
+  | "cluster_compare";
+
+type GeminiModel = ReturnType<typeof getGeminiModel>;
+type GenerateContentRequest = Parameters<GeminiModel["generateContent"]>[0];
+
+const METRICS_KEY_PREFIX = "metrics:ai:";
+const METRICS_TTL_SECONDS = 14 * 24 * 60 * 60;
+
+export interface AiUsage {
+  inputTokens: number;
+  outputTokens: number;
+  latencyMs: number;
+  error?: boolean;
+}
+
+export interface AiFamilyStats {
+  calls: number;
+  errors: number;
+  inputTokens: number;
+  outputTokens: number;
+  latencyMs: number;
+  avgLatencyMs: number;
+}
+
+function metricsKey(date: Date = new Date()): string {
+  return `${METRICS_KEY_PREFIX}${date.toISOString().slice(0, 10)}`;
+}
+
+/**
+ * Registra el uso de una llamada. Fire-and-forget: una falla (o latencia) de
+ * Redis no debe afectar el análisis.
+ */
+export function recordAiUsage(family: AiPromptFamily, usage: AiUsage): void {
+  console.log(
+    `[AI] usage family=${family} in=${usage.inputTokens} out=${usage.outputTokens} ms=${usage.latencyMs}${usage.error ? " error" : ""}`
+  );
+  const key = metricsKey();
+  connection
+    .multi()
+    .hincrby(key, `${family}:calls`, 1)
+    .hincrby(key, `${family}:errors`, usage.error ? 1 : 0)
+    .hincrby(key, `${family}:inputTokens`, usage.inputTokens)
+    .hincrby(key, `${family}:outputTokens`, usage.outputTokens)
+    .hincrby(key, `${family}:latencyMs`, usage.latencyMs)
+    .expire(key, METRICS_TTL_SECONDS)
+    .exec()
+    .catch((error) => console.error("[AI] Failed to record usage metrics:", error));
+}
+
+function promptText(request: GenerateContentRequest): string {
+  if (typeof request === "string") return request;
+  if (Array.isArray(request)) {
+    return request.map((p) => (typeof p === "string" ? p : p.text || "")).join("");
+  }
+  return request.contents
+    .flatMap((c) => c.parts)
+    .map((p) => p.text || "")
+    .join("");
+}
+
+/**
+ * `model.generateContent` con registro de tokens y latencia por familia.
+ */
+export async function generateContentTracked(
+  model: GeminiModel,
+  family: AiPromptFamily,
+  request: GenerateContentRequest
+): ReturnType<GeminiModel["generateContent"]> {
+  const start = Date.now();
+  try {
+    const result = await model.generateContent(request);
+    const usage = result.response.usageMetadata;
+    let outputTokens = usage?.candidatesTokenCount;
+    if (outputTokens === undefined) {
+      try {
+        outputTokens = estimateTokens(result.response.text());
+      } catch {
+        outputTokens = 0;
+      }
+    }
+    recordAiUsage(family, {
+      inputTokens: usage?.promptTokenCount ?? estimateTokens(promptText(request)),
+      outputTokens,
+      latencyMs: Date.now() - start,
+    });
+    return result;
+  } catch (error) {
+    recordAiUsage(family, {
+      inputTokens: estimateTokens(promptText(request)),
+      outputTokens: 0,
+      latencyMs: Date.now() - start,
+      error: true,
+    });
+    throw error;
+  }
+}
+
+/**
+ * Lee las métricas de un día agrupadas por familia, ordenadas por latencia
+ * total descendente.
+ */
+export async function getAiUsageStats(date: Date = new Date()): Promise<Record<string, AiFamilyStats>> {
+  const raw = await connection.hgetall(metricsKey(date));
+  const stats: Record<string, AiFamilyStats> = {};
+
+  for (const [field, value] of Object.entries(raw)) {
+    const [family, metric] = field.split(":");
+    stats[family] ??= { calls: 0, errors: 0, inputTokens: 0, outputTokens: 0, latencyMs: 0, avgLatencyMs: 0 };
+    if (metric in stats[family]) {
+      stats[family][metric as keyof AiFamilyStats] = parseInt(value, 10) || 0;
+    }
+  }
+
+  for (const s of Object.values(stats)) {
+    s.avgLatencyMs = s.calls > 0 ? Math.round(s.latencyMs / s.calls) : 0;
+  }
+
+  return Object.fromEntries(
+    Object.entries(stats).sort(([, a], [, b]) => b.latencyMs - a.latencyMs)
+  );
+}
@@ -1,5 +1,32 @@
 import { getGeminiModel, cleanJsonResponse } from "@mediabot/shared";
 import type { AIAnalysisResult, OnboardingResult, PreFilterResult, ResponseGenerationResult } from "@mediabot/shared";
+import { generateContentTracked } from "./ai-metrics.js";
+import { capList, extractKeywordPassages, truncateText } from "./prompt-budget.js";
+
+/**
+ * Presupuesto de tamaño por familia de prompt. El contenido de artículos se
+ * reduce a los pasajes alrededor de la keyword (ver prompt-budget.ts).
+ */
+const PROMPT_BUDGET = {
+  preFilterContentChars: 800,
+  analyzeContentChars: 1500,
+  batchContentChars: 1500,
+  /** Con más de 3 menciones por lote se recorta el contenido de cada una */
+  batchContentCharsLarge: 1000,
+  topicContentChars: 1000,
+  responseContentChars: 1500,
+  existingTopics: 20,
+  existingTopicsChars: 600,
+  socialContentChars: 1500,
+  postContentChars: 800,
+  commentChars: 300,
+  topPostChars: 280,
+  digestTopMentions: 10,
+  briefTopics: 8,
+  briefTopicMentions: 3,
+  briefActionChars: 200,
+  competitors: 10,
+};
 
 /**
  * Pre-filters articles to reduce false positives before creating mentions.
@@ -13,7 +40,11 @@ export async function preFilterArticle(params: {
   clientDescription: string;
   keyword: string;
 }): Promise<PreFilterResult> {
-  const contentPreview = params.articleContent?.slice(0, 800) || "";
+  const contentPreview = extractKeywordPassages(
+    params.articleContent || "",
+    [params.keyword, params.clientName],
+    PROMPT_BUDGET.preFilterContentChars
+  );
   const model = getGeminiModel();
 
   const prompt = `Determina si este articulo es realmente relevante para el cliente o es un falso positivo.
@@ -32,7 +63,7 @@ Responde UNICAMENTE con JSON valido, sin markdown ni texto adicional:
 {"relevant": true, "reason": "explicacion breve", "confidence": 0.85}`;
 
   try {
-    const result = await model.generateContent({
+    const result = await generateContentTracked(model, "prefilter", {
       contents: [{ role: "user", parts: [{ text: prompt }] }],
       generationConfig: { maxOutputTokens: 256, temperature: 0.2 },
     });
@@ -75,7 +106,7 @@ Keyword detectado: ${params.keyword}
 Articulo:
 Titulo: ${params.articleTitle}
 Fuente: ${params.source}
-Contenido: ${params.articleContent?.slice(0, 1500) || "No disponible"}
+Contenido: ${extractKeywordPassages(params.articleContent || "", [params.keyword], PROMPT_BUDGET.analyzeContentChars) || "No disponible"}
 
 CRITERIOS DE SENTIMIENTO (evalua desde la perspectiva del cliente):
 - NEGATIVE: Criticas, escándalos, denuncias, acusaciones, problemas legales, violencia vinculada, pérdidas, fracasos, controversias, mala imagen publica, investigaciones en contra, protestas, quejas ciudadanas, incumplimiento, corrupción, inseguridad en su jurisdicción
@@ -97,7 +128,7 @@ Valores posibles para sentiment: POSITIVE, NEGATIVE, NEUTRAL, MIXED
 Relevance es un numero del 1 al 10 (1=irrelevante, 10=altamente relevante para el cliente).`;
 
   try {
-    const result = await model.generateContent({
+    const result = await generateContentTracked(model, "analyze_mention", {
       contents: [{ role: "user", parts: [{ text: prompt }] }],
       generationConfig: { maxOutputTokens: 512, temperature: 0.3 },
     });
@@ -124,6 +155,159 @@ Relevance es un numero del 1 al 10 (1=irrelevante, 10=altamente relevante para e
   }
 }
 
+// ==================== ANALISIS COMBINADO EN LOTE ====================
+
+export interface CombinedAnalysisResult extends AIAnalysisResult {
+  topic: string | null;
+  topicConfidence: number;
+}
+
+const VALID_SENTIMENTS = ["POSITIVE", "NEGATIVE", "NEUTRAL", "MIXED"];
+
+/**
+ * Normaliza la respuesta JSON del analisis combinado en lote.
+ * Las menciones que falten en la respuesta (o todas si no parsea) reciben el
+ * mismo resultado por defecto que analyzeMention, sin tema.
+ */
+export function parseBatchAnalysisResponse(
+  rawText: string,
+  mentionIds: string[]
+): Map<string, CombinedAnalysisResult> {
+  const results = new Map<string, CombinedAnalysisResult>();
+
+  try {
+    const cleaned = cleanJsonResponse(rawText);
+    const parsed = JSON.parse(cleaned) as { results?: Array<Record<string, unknown>> };
+
+    for (const item of parsed.results || []) {
+      // El prompt identifica cada mencion por su posicion (1..N)
+      const index = Number(item.id) - 1;
+      const mentionId = mentionIds[index];
+      if (!mentionId || results.has(mentionId)) continue;
+
+      const sentiment = String(item.sentiment || "");
+      const topic = typeof item.topic === "string" && item.topic.trim() ? item.topic.trim() : null;
+      results.set(mentionId, {
+        summary: String(item.summary || "Mencion detectada - analisis automatico no disponible"),
+        sentiment: (VALID_SENTIMENTS.includes(sentiment) ? sentiment : "NEUTRAL") as AIAnalysisResult["sentiment"],
+        relevance: Math.max(1, Math.min(10, Math.round(Number(item.relevance) || 5))),
+        suggestedAction: String(item.suggestedAction || "Revisar manualmente"),
+        topic,
+        topicConfidence: topic ? Math.max(0, Math.min(1, Number(item.topicConfidence) || 0)) : 0,
+      });
+    }
+  } catch (error) {
+    console.error("[AI] Failed to parse batch analysis response:", error);
+  }
+
+  for (const mentionId of mentionIds) {
+    if (!results.has(mentionId)) {
+      results.set(mentionId, {
+        summary: "Mencion detectada - analisis automatico no disponible",
+        sentiment: "NEUTRAL",
+        relevance: 5,
+        suggestedAction: "Revisar manualmente",
+        topic: null,
+        topicConfidence: 0,
+      });
+    }
+  }
+
+  return results;
+}
+
+/**
+ * Analisis combinado de varias menciones del mismo cliente en una sola llamada.
+ * Devuelve sentimiento, relevancia, resumen, accion sugerida y tema por mencion,
+ * reemplazando analyzeMention + extractTopic (una llamada por lote en vez de 2 por mencion).
+ */
+export async function analyzeMentionsBatch(params: {
+  clientName: string;
+  clientDescription: string;
+  clientIndustry: string;
+  existingTopics?: string[];
+  mentions: Array<{
+    id: string;
+    articleTitle: string;
+    articleContent: string;
+    source: string;
+    keyword: string;
+  }>;
+}): Promise<Map<string, CombinedAnalysisResult>> {
+  const mentionIds = params.mentions.map((m) => m.id);
+  if (mentionIds.length === 0) return new Map();
+
+  const contentLimit = params.mentions.length > 3
+    ? PROMPT_BUDGET.batchContentCharsLarge
+    : PROMPT_BUDGET.batchContentChars;
+  const mentionsText = params.mentions
+    .map((m, i) => `[${i + 1}]
+Titulo: ${m.articleTitle}
+Fuente: ${m.source}
+Keyword detectado: ${m.keyword}
+Contenido: ${extractKeywordPassages(m.articleContent || "", [m.keyword], contentLimit) || "No disponible"}`)
+    .join("\n\n");
+
+  const existingTopics = capList(params.existingTopics, PROMPT_BUDGET.existingTopics, PROMPT_BUDGET.existingTopicsChars);
+  const existingTopicsHint = existingTopics.length
+    ? `\nTemas existentes en el sistema (usa uno de estos si aplica, o crea uno nuevo):
+${existingTopics.join(", ")}\n`
+    : "";
+
+  const model = getGeminiModel();
+
+  const prompt = `Eres un analista de medios para una agencia de relaciones publicas. Analiza cada una de las siguientes ${params.mentions.length} menciones evaluando el SENTIMIENTO desde la perspectiva del cliente mencionado.
+
+Cliente: ${params.clientName}
+Industria: ${params.clientIndustry || "No especificada"}
+Descripcion: ${params.clientDescription || "No disponible"}
+
+MENCIONES:
+${mentionsText}
+
+CRITERIOS DE SENTIMIENTO (evalua desde la perspectiva del cliente):
+- NEGATIVE: Criticas, escándalos, denuncias, acusaciones, problemas legales, violencia vinculada, pérdidas, fracasos, controversias, mala imagen publica, investigaciones en contra, protestas, quejas ciudadanas, incumplimiento, corrupción, inseguridad en su jurisdicción
+- POSITIVE: Logros, reconocimientos, inauguraciones, inversiones exitosas, mejoras, alianzas beneficiosas, elogios, avances, buenos resultados, apoyo ciudadano
+- NEUTRAL: Información factual sin carga valorativa clara, notas informativas generales, menciones incidentales sin impacto en reputación
+- MIXED: Articulo que contiene elementos tanto positivos como negativos significativos para el cliente
+
+IMPORTANTE: No confundas neutralidad informativa con impacto reputacional. Una nota periodística puede tener tono informativo pero su contenido ser claramente negativo para el cliente.
+${existingTopicsHint}
+Responde UNICAMENTE con JSON valido, sin markdown ni texto adicional, con un elemento por mencion usando su numero como id:
+{
+  "results": [
+    {
+      "id": 1,
+      "summary": "Resumen ejecutivo de 2-3 lineas explicando por que esta mencion es relevante para el cliente",
+      "sentiment": "NEGATIVE",
+      "relevance": 7,
+      "suggestedAction": "Accion concreta sugerida para el equipo de PR",
+      "topic": "Nombre corto del tema (2-4 palabras)",
+      "topicConfidence": 0.85
+    }
+  ]
+}
+
+Valores posibles para sentiment: POSITIVE, NEGATIVE, NEUTRAL, MIXED
+Relevance es un numero del 1 al 10 (1=irrelevante, 10=altamente relevante para el cliente).
+El tema debe ser especifico pero reutilizable para agrupar articulos similares (ej: "Expansion internacional", "Resultados financieros").`;
+
+  try {
+    const result = await generateContentTracked(model, "analyze_batch", {
+      contents: [{ role: "user", parts: [{ text: prompt }] }],
+      generationConfig: { maxOutputTokens: 400 * params.mentions.length + 128, temperature: 0.3 },
+    });
+
+    const rawText = result.response.text();
+    console.log(`[AI] analyzeMentionsBatch response (${params.mentions.length} mentions):`, rawText.slice(0, 300));
+
+    return parseBatchAnalysisResponse(rawText, mentionIds);
+  } catch (error) {
+    console.error("[AI] Failed batch analysis for client:", params.clientName, error);
+    return parseBatchAnalysisResponse("", mentionIds);
+  }
+}
+
 export async function runOnboarding(params: {
   clientName: string;
   description: string;
@@ -192,7 +376,7 @@ Incluye al menos:
 Cada keyword debe incluir "confidence" (0.0-1.0) y "reason" explicando por que es relevante.`;
 
   try {
-    const result = await model.generateContent({
+    const result = await generateContentTracked(model, "onboarding", {
       contents: [{ role: "user", parts: [{ text: prompt }] }],
       generationConfig: { maxOutputTokens: 2048, temperature: 0.4 },
     });
@@ -242,7 +426,7 @@ Descripcion: ${params.clientDescription || "No disponible"}
 Articulo original:
 Titulo: ${params.articleTitle}
 Fuente: ${params.source}
-Contenido: ${params.articleContent?.slice(0, 1500) || "No disponible"}
+Contenido: ${extractKeywordPassages(params.articleContent || "", [params.clientName], PROMPT_BUDGET.responseContentChars) || "No disponible"}
 
 Analisis previo:
 Sentimiento: ${params.sentiment}
@@ -264,7 +448,7 @@ Responde UNICAMENTE con JSON valido, sin markdown ni texto adicional:
 Tonos validos: PROFESSIONAL, DEFENSIVE, CLARIFICATION, CELEBRATORY`;
 
   try {
-    const result = await model.generateContent({
+    const result = await generateContentTracked(model, "response", {
       contents: [{ role: "user", parts: [{ text: prompt }] }],
       generationConfig: { maxOutputTokens: 1536, temperature: 0.4 },
     });
@@ -304,6 +488,7 @@ export async function generateDigestSummary(params: {
   };
 }): Promise<string> {
   const topMentionsText = params.topMentions
+    .slice(0, PROMPT_BUDGET.digestTopMentions)
     .map((m) => `- ${m.title} (${m.source}, ${m.sentiment}, relevancia ${m.relevance}/10)`)
     .join("\n");
 
@@ -315,7 +500,7 @@ export async function generateDigestSummary(params: {
     socialContext = `\nRedes sociales: ${params.socialStats.totalPosts} publicaciones (${platformLine})
 Engagement total: ${params.socialStats.totalEngagement} interacciones`;
     if (params.socialStats.topPost) {
-      socialContext += `\nPost mas destacado: @${params.socialStats.topPost.author} en ${params.socialStats.topPost.platform} (${params.socialStats.topPost.likes} likes) - "${params.socialStats.topPost.content}"`;
+      socialContext += `\nPost mas destacado: @${params.socialStats.topPost.author} en ${params.socialStats.topPost.platform} (${params.socialStats.topPost.likes} likes) - "${truncateText(params.socialStats.topPost.content, PROMPT_BUDGET.topPostChars)}"`;
     }
   }
 
@@ -333,7 +518,7 @@ ${socialContext}
 Escribe un resumen de 3-5 lineas en espanol, directo y accionable. Incluye contexto social si hay datos. No uses markdown ni formato especial.`;
 
   try {
-    const result = await model.generateContent({
+    const result = await generateContentTracked(model, "digest_summary", {
       contents: [{ role: "user", parts: [{ text: prompt }] }],
       generationConfig: { maxOutputTokens: 512, temperature: 0.4 },
     });
@@ -363,9 +548,10 @@ export async function extractTopic(params: {
   clientName: string;
   existingTopics?: string[];
 }): Promise<TopicExtractionResult> {
-  const existingTopicsHint = params.existingTopics?.length
+  const existingTopics = capList(params.existingTopics, PROMPT_BUDGET.existingTopics, PROMPT_BUDGET.existingTopicsChars);
+  const existingTopicsHint = existingTopics.length
     ? `\n\nTemas existentes en el sistema (usa uno de estos si aplica, o crea uno nuevo):
-${params.existingTopics.slice(0, 20).join(", ")}`
+${existingTopics.join(", ")}`
     : "";
 
   const model = getGeminiModel();
@@ -373,7 +559,7 @@ ${params.existingTopics.slice(0, 20).join(", ")}`
   const prompt = `Extrae el tema principal de este articulo relacionado con "${params.clientName}".
 
 Titulo: ${params.articleTitle}
-Contenido: ${params.articleContent?.slice(0, 1000) || "No disponible"}
+Contenido: ${extractKeywordPassages(params.articleContent || "", [params.clientName], PROMPT_BUDGET.topicContentChars) || "No disponible"}
 ${existingTopicsHint}
 
 Responde UNICAMENTE con JSON valido, sin markdown ni texto adicional:
@@ -383,7 +569,7 @@ El tema debe ser especifico pero reutilizable para agrupar articulos similares.
 Ejemplos: "Expansion internacional", "Resultados financieros", "Lanzamiento producto"`;
 
   try {
-    const result = await model.generateContent({
+    const result = await generateContentTracked(model, "extract_topic", {
       contents: [{ role: "user", parts: [{ text: prompt }] }],
       generationConfig: { maxOutputTokens: 256, temperature: 0.3 },
     });
@@ -441,7 +627,10 @@ export async function generateWeeklyInsights(params: {
     .join("\n");
 
   const competitorsText = params.competitors?.length
-    ? params.competitors.map((c) => `- ${c.name}: ${c.sov.toFixed(1)}% SOV`).join("\n")
+    ? params.competitors
+        .slice(0, PROMPT_BUDGET.competitors)
+        .map((c) => `- ${c.name}: ${c.sov.toFixed(1)}% SOV`)
+        .join("\n")
     : "No hay datos de competidores";
 
   const mentionTrend =
@@ -481,7 +670,7 @@ Responde UNICAMENTE con JSON valido, sin markdown ni texto adicional:
 Los insights deben ser especificos, con datos, y orientados a la accion.`;
 
   try {
-    const result = await model.generateContent({
+    const result = await generateContentTracked(model, "weekly_insights", {
       contents: [{ role: "user", parts: [{ text: prompt }] }],
       generationConfig: { maxOutputTokens: 1024, temperature: 0.4 },
     });
@@ -553,13 +742,16 @@ export async function generateDailyBrief(params: {
   const deltaSign = mentionsDelta > 0 ? "+" : "";
 
   const actionsText = params.pendingActionItems.length > 0
-    ? params.pendingActionItems.slice(0, 5).map((a) => `- ${a}`).join("\n")
+    ? params.pendingActionItems
+        .slice(0, 5)
+        .map((a) => `- ${truncateText(a, PROMPT_BUDGET.briefActionChars)}`)
+        .join("\n")
     : "Sin acciones pendientes";
 
   // Construir sección de temas activos
   let topicsText = "";
   if (params.activeTopics.length > 0) {
-    for (const topic of params.activeTopics) {
+    for (const topic of params.activeTopics.slice(0, PROMPT_BUDGET.briefTopics)) {
       const totalMentions = topic.mentionCount + topic.socialMentionCount;
       topicsText += `\n  Tema: ${topic.name}\n`;
       topicsText += `  Menciones: ${topic.mentionCount} noticias + ${topic.socialMentionCount} posts sociales | Sentimiento: ${topic.dominantSentiment || "NEUTRAL"}\n`;
@@ -568,7 +760,7 @@ export async function generateDailyBrief(params: {
       }
       if (topic.recentMentions.length > 0) {
         topicsText += `  Articulos representativos:\n`;
-        for (const m of topic.recentMentions) {
+        for (const m of topic.recentMentions.slice(0, PROMPT_BUDGET.briefTopicMentions)) {
           topicsText += `    - "${m.title}" (${m.source}, ${m.sentiment})\n`;
         }
       }
@@ -615,7 +807,7 @@ Responde UNICAMENTE con JSON valido, sin markdown ni texto adicional:
 Los highlights deben ser especificos, con datos, y orientados a la accion. Maximo 8 highlights, 3 watch items, 3 acciones.`;
 
   try {
-    const result = await model.generateContent({
+    const result = await generateContentTracked(model, "daily_brief", {
       contents: [{ role: "user", parts: [{ text: prompt }] }],
       generationConfig: { maxOutputTokens: 1500, temperature: 0.4 },
     });
@@ -710,7 +902,7 @@ Genera:
 - 3-6 cuentas sugeridas (competidores, influencers, medios)`;
 
   try {
-    const result = await model.generateContent({
+    const result = await generateContentTracked(model, "social_hashtags", {
       contents: [{ role: "user", parts: [{ text: prompt }] }],
       generationConfig: { maxOutputTokens: 1024, temperature: 0.4 },
     });
@@ -797,7 +989,7 @@ Descripcion: ${params.clientDescription || "No disponible"}
 POST EN ${params.platform.toUpperCase()}:
 Autor: @${params.authorHandle}
 ${followersText}
-Contenido: "${params.content || "(sin texto)"}"
+Contenido: "${truncateText(params.content, PROMPT_BUDGET.socialContentChars) || "(sin texto)"}"
 Engagement: ${engagementText}
 Detectado por: ${params.sourceType} "${params.sourceValue}"
 
@@ -818,7 +1010,7 @@ Valores de engagementLevel:
 - LOW: Alcance limitado`;
 
   try {
-    const result = await model.generateContent({
+    const result = await generateContentTracked(model, "social_mention", {
       contents: [{ role: "user", parts: [{ text: prompt }] }],
       generationConfig: { maxOutputTokens: 512, temperature: 0.3 },
     });
@@ -870,6 +1062,8 @@ export interface CommentsAnalysisResult {
 /**
  * Analiza el sentimiento de los comentarios de un post social.
  * Se enfoca en la PERCEPCIÓN PÚBLICA, no en el contenido del post original.
+ * En refrescos incrementales recibe solo los comentarios nuevos y la
+ * percepción previa para actualizarla sin reanalizar todo.
  *
  * @param params - Parámetros del análisis
  * @returns Resultado del análisis de comentarios
@@ -889,6 +1083,7 @@ export async function analyzeCommentsSentiment(params: {
     shares: number;
     views?: number;
   };
+  previousPerception?: string;
 }): Promise<CommentsAnalysisResult> {
   // Limitar comentarios para el prompt (los más relevantes por likes)
   const sortedComments = [...params.comments]
@@ -896,7 +1091,7 @@ export async function analyzeCommentsSentiment(params: {
     .slice(0, 30);
 
   const commentsText = sortedComments
-    .map((c, i) => `${i + 1}. @${c.authorHandle} (${c.likes} likes): "${c.text}"`)
+    .map((c, i) => `${i + 1}. @${c.authorHandle} (${c.likes} likes): "${truncateText(c.text, PROMPT_BUDGET.commentChars)}"`)
     .join("\n");
 
   const model = getGeminiModel();
@@ -912,6 +1107,10 @@ export async function analyzeCommentsSentiment(params: {
 
   const platformLabel = params.platform === "TIKTOK" ? "TikTok" : params.platform === "INSTAGRAM" ? "Instagram" : params.platform;
 
+  const previousText = params.previousPerception
+    ? `\nPERCEPCION PREVIA (comentarios ya analizados anteriormente):\n"${params.previousPerception}"\nLos comentarios de abajo son NUEVOS desde ese analisis. El sentimentBreakdown debe describir SOLO los comentarios nuevos; publicPerception debe actualizar la percepcion previa integrando los nuevos.\n`
+    : "";
+
   const prompt = `Eres un analista de relaciones publicas especializado en redes sociales. Analiza los comentarios de este post de ${platformLabel} para entender la PERCEPCION PUBLICA hacia el cliente.
 
 CLIENTE: ${params.clientName}
@@ -923,8 +1122,8 @@ ${authorText}
 ${engagementText}
 
 CONTENIDO/COPY DEL POST:
-"${params.postContent || "(sin texto)"}"
-
+"${truncateText(params.postContent || "", PROMPT_BUDGET.postContentChars) || "(sin texto)"}"
+${previousText}
 COMENTARIOS DEL PUBLICO (${params.comments.length} total, mostrando los ${sortedComments.length} con mas likes):
 ${commentsText}
 
@@ -961,7 +1160,7 @@ Valores de riskLevel:
 - LOW: Comentarios positivos o neutrales, sin riesgo reputacional`;
 
   try {
-    const result = await model.generateContent({
+    const result = await generateContentTracked(model, "comments_sentiment", {
       contents: [{ role: "user", parts: [{ text: prompt }] }],
       generationConfig: { maxOutputTokens: 1024, temperature: 0.3 },
     });
@@ -1090,7 +1289,7 @@ IMPORTANTE:
 - La confianza debe reflejar cuantas veces aparece en las noticias`;
 
   try {
-    const result = await model.generateContent({
+    const result = await generateContentTracked(model, "enhanced_onboarding", {
       contents: [{ role: "user", parts: [{ text: prompt }] }],
       generationConfig: { maxOutputTokens: 2048, temperature: 0.4 },
     });
@@ -0,0 +1,270 @@
+/**
+ * Modelo de línea base por cliente para detectar anomalías de volumen.
+ *
+ * Por cada métrica horaria (menciones totales y negativas) se mantiene un
+ * modelo multiplicativo tipo Holt-Winters:
+ *
+ *   esperado(h) = nivel × estacionalidad[hora del día] × estacionalidad[día de la semana]
+ *
+ * actualizado con EWMA cada vez que se cierra una hora, más la varianza EWMA
+ * de los residuos. La proporción de negativas tiene su propia media/varianza.
+ * Las horas y días son UTC (la estacionalidad absorbe el desfase horario).
+ *
+ * Todo es O(1) por hora cerrada y O(horas de la ventana) por consulta.
+ * Módulo puro: el estado se persiste en Redis desde anomaly.ts.
+ */
+
+export const HOUR_MS = 60 * 60 * 1000;
+/** Horas observadas antes de confiar en el modelo */
+export const WARMUP_HOURS = 72;
+/** Máximo de horas que se recuperan de una vez tras una pausa */
+export const MAX_FOLD_GAP_HOURS = 168;
+
+const LEVEL_ALPHA = 0.02;
+const HOUR_OF_DAY_GAMMA = 0.1;
+const DAY_OF_WEEK_DELTA = 0.05;
+const VARIANCE_BETA = 0.02;
+const RATIO_ALPHA = 0.02;
+/** Rango de los factores estacionales (evita anular el esperado o que una hora
+ *  aislada con nivel casi nulo dispare el factor) */
+const MIN_SEASONAL_FACTOR = 0.05;
+const MAX_SEASONAL_FACTOR = 10;
+
+export interface MetricBaseline {
+  /** Tasa horaria desestacionalizada */
+  level: number;
+  hourOfDay: number[];
+  dayOfWeek: number[];
+  /** Varianza EWMA de (observado - esperado) por hora */
+  residualVariance: number;
+}
+
+export interface AnomalyModel {
+  version: 1;
+  total: MetricBaseline;
+  negative: MetricBaseline;
+  negativeRatio: { mean: number; variance: number };
+  hoursObserved: number;
+  /** Última hora (epoch / 1h) incorporada al modelo */
+  lastFoldedHour: number;
+}
+
+export interface HourCounts {
+  total: number;
+  negative: number;
+}
+
+export interface MetricScore {
+  observed: number;
+  expected: number;
+  /** (observado - esperado) / desviación estándar */
+  zScore: number;
+  /** -log10 P(X >= observado) con X ~ Poisson(esperado); 0 si observado <= esperado */
+  surprise: number;
+}
+
+export interface AnomalyScores {
+  windowMinutes: number;
+  total: MetricScore;
+  negative: MetricScore;
+  negativeRatio: { observed: number; expected: number; zScore: number };
+}
+
+export function hourBucket(timestamp: number): number {
+  return Math.floor(timestamp / HOUR_MS);
+}
+
+function createBaseline(): MetricBaseline {
+  return {
+    level: 0,
+    hourOfDay: new Array(24).fill(1),
+    dayOfWeek: new Array(7).fill(1),
+    residualVariance: 0,
+  };
+}
+
+export function createAnomalyModel(lastFoldedHour: number): AnomalyModel {
+  return {
+    version: 1,
+    total: createBaseline(),
+    negative: createBaseline(),
+    negativeRatio: { mean: 0, variance: 0 },
+    hoursObserved: 0,
+    lastFoldedHour,
+  };
+}
+
+function seasonalSlots(hour: number): { hourOfDay: number; dayOfWeek: number } {
+  const date = new Date(hour * HOUR_MS);
+  return { hourOfDay: date.getUTCHours(), dayOfWeek: date.getUTCDay() };
+}
+
+function expectedRate(baseline: MetricBaseline, hour: number): number {
+  const slot = seasonalSlots(hour);
+  return baseline.level * baseline.hourOfDay[slot.hourOfDay] * baseline.dayOfWeek[slot.dayOfWeek];
+}
+
+/** Reescala los factores para que promedien 1 (el nivel absorbe la escala) */
+function normalizeFactors(factors: number[]): void {
+  const mean = factors.reduce((sum, f) => sum + f, 0) / factors.length;
+  if (mean <= 0) return;
+  for (let i = 0; i < factors.length; i++) {
+    factors[i] = Math.max(MIN_SEASONAL_FACTOR, factors[i] / mean);
+  }
+}
+
+function foldMetric(baseline: MetricBaseline, hour: number, observed: number, hoursObserved: number): void {
+  const slot = seasonalSlots(hour);
+  const hod = baseline.hourOfDay[slot.hourOfDay];
+  const dow = baseline.dayOfWeek[slot.dayOfWeek];
+  const expected = baseline.level * hod * dow;
+
+  // Durante el calentamiento el peso es 1/n (media acumulada) para que las
+  // primeras horas no queden dominadas por el valor inicial
+  const warmupWeight = 1 / (hoursObserved + 1);
+  const residual = observed - expected;
+  baseline.residualVariance +=
+    Math.max(VARIANCE_BETA, warmupWeight) * (residual * residual - baseline.residualVariance);
+  baseline.level += Math.max(LEVEL_ALPHA, warmupWeight) * (observed / (hod * dow) - baseline.level);
+
+  const level = Math.max(baseline.level, 1e-6);
+  const clampFactor = (f: number) => Math.min(MAX_SEASONAL_FACTOR, Math.max(MIN_SEASONAL_FACTOR, f));
+  baseline.hourOfDay[slot.hourOfDay] = clampFactor(
+    hod + HOUR_OF_DAY_GAMMA * (clampFactor(observed / (level * dow)) - hod)
+  );
+  baseline.dayOfWeek[slot.dayOfWeek] = clampFactor(
+    dow + DAY_OF_WEEK_DELTA * (clampFactor(observed / (level * hod)) - dow)
+  );
+  normalizeFactors(baseline.hourOfDay);
+  normalizeFactors(baseline.dayOfWeek);
+}
+
+/**
+ * Incorpora una hora cerrada al modelo (muta y retorna el mismo objeto).
+ * Las horas deben llegar en orden; las ya incorporadas se ignoran.
+ */
+export function foldHour(model: AnomalyModel, hour: number, counts: HourCounts): AnomalyModel {
+  if (hour <= model.lastFoldedHour) return model;
+
+  foldMetric(model.total, hour, counts.total, model.hoursObserved);
+  foldMetric(model.negative, hour, counts.negative, model.hoursObserved);
+
+  if (counts.total > 0) {
+    const ratio = counts.negative / counts.total;
+    const deviation = ratio - model.negativeRatio.mean;
+    const weight = Math.max(RATIO_ALPHA, 1 / (model.hoursObserved + 1));
+    model.negativeRatio.mean += weight * deviation;
+    model.negativeRatio.variance += weight * (deviation * deviation - model.negativeRatio.variance);
+  }
+
+  model.hoursObserved++;
+  model.lastFoldedHour = hour;
+  return model;
+}
+
+export function isModelWarm(model: AnomalyModel): boolean {
+  return model.hoursObserved >= WARMUP_HOURS;
+}
+
+/** ln Γ(x) (aproximación de Lanczos) */
+function logGamma(x: number): number {
+  const g = 7;
+  const c = [
+    0.99999999999980993, 676.5203681218851, -1259.1392167224028, 771.32342877765313,
+    -176.61503916999185, 12.507343278686905, -0.13857109526572012, 9.9843695780195716e-6,
+    1.5056327351493116e-7,
+  ];
+  if (x < 0.5) return Math.log(Math.PI / Math.sin(Math.PI * x)) - logGamma(1 - x);
+  x -= 1;
+  let a = c[0];
+  const t = x + g + 0.5;
+  for (let i = 1; i < g + 2; i++) a += c[i] / (x + i);
+  return 0.5 * Math.log(2 * Math.PI) + (x + 0.5) * Math.log(t) - t + Math.log(a);
+}
+
+/**
+ * Sorpresa de Poisson: -log10 P(X >= observed) con X ~ Poisson(expected).
+ * 0 cuando lo observado no supera lo esperado.
+ */
+export function poissonSurprise(observed: number, expected: number): number {
+  if (observed <= expected || observed <= 0) return 0;
+  const lambda = Math.max(expected, 1e-3);
+
+  // P(X >= k) = pmf(k) * Σ_j Π_{i=1..j} λ/(k+i); converge porque k > λ
+  const logPmf = observed * Math.log(lambda) - lambda - logGamma(observed + 1);
+  let term = 1;
+  let sum = 1;
+  for (let i = 1; i < 1000 && term > 1e-12; i++) {
+    term *= lambda / (observed + i);
+    sum += term;
+  }
+  const logTail = logPmf + Math.log(sum);
+  return Math.max(0, -logTail / Math.LN10);
+}
+
+/**
+ * Puntajes de la ventana que termina en `now`. `counts(hour)` da los conteos
+ * observados por hora. La ventana se redondea a horas completas y se desliza:
+ * la hora en curso cuenta en proporción a los minutos transcurridos y la hora
+ * más vieja (`hours` atrás) por el resto, así que a las xx:01 la ventana de
+ * 60 min sigue cubriendo casi toda la hora anterior.
+ */
+export function scoreWindow(
+  model: AnomalyModel,
+  counts: (hour: number) => HourCounts,
+  now: number,
+  windowMinutes: number
+): AnomalyScores {
+  const currentHour = hourBucket(now);
+  const hours = Math.max(1, Math.round(windowMinutes / 60));
+  const elapsedFraction = Math.max((now - currentHour * HOUR_MS) / HOUR_MS, 1 / 60);
+
+  let observedTotal = 0;
+  let observedNegative = 0;
+  let expectedTotal = 0;
+  let expectedNegative = 0;
+  let weight = 0;
+
+  for (let hour = currentHour - hours; hour <= currentHour; hour++) {
+    const fraction =
+      hour === currentHour ? elapsedFraction : hour === currentHour - hours ? 1 - elapsedFraction : 1;
+    if (fraction <= 0) continue;
+    const c = counts(hour);
+    // La hora más vieja es parcial: se asume distribución uniforme dentro de ella
+    observedTotal += fraction === 1 || hour === currentHour ? c.total : Math.round(c.total * fraction);
+    observedNegative += fraction === 1 || hour === currentHour ? c.negative : Math.round(c.negative * fraction);
+    expectedTotal += expectedRate(model.total, hour) * fraction;
+    expectedNegative += expectedRate(model.negative, hour) * fraction;
+    weight += fraction;
+  }
+
+  const metricScore = (observed: number, expected: number, residualVariance: number): MetricScore => {
+    // Varianza al menos Poisson (sobre-dispersión vía residuos)
+    const variance = Math.max(residualVariance * weight, expected, 1e-6);
+    return {
+      observed,
+      expected,
+      zScore: (observed - expected) / Math.sqrt(variance),
+      surprise: poissonSurprise(observed, expected),
+    };
+  };
+
+  const ratioExpected = model.negativeRatio.mean;
+  const ratioObserved = observedTotal > 0 ? observedNegative / observedTotal : 0;
+  const ratioVariance = Math.max(
+    model.negativeRatio.variance / Math.max(weight, 1),
+    observedTotal > 0 ? (ratioExpected * (1 - ratioExpected)) / observedTotal : 0,
+    1e-6
+  );
+
+  return {
+    windowMinutes: hours * 60,
+    total: metricScore(observedTotal, expectedTotal, model.total.residualVariance),
+    negative: metricScore(observedNegative, expectedNegative, model.negative.residualVariance),
+    negativeRatio: {
+      observed: ratioObserved,
+      expected: ratioExpected,
+      zScore: observedTotal > 0 ? (ratioObserved - ratioExpected) / Math.sqrt(ratioVariance) : 0,
+    },
+  };
+}
@@ -0,0 +1,179 @@
+/**
+ * Motor de anomalías por cliente: conteos horarios en Redis + modelo de línea
+ * base (anomaly-model.ts) persistido como JSON.
+ *
+ * - `recordMentionForAnomaly` suma la mención a la hora en curso (por llegada,
+ *   no por publishedAt, para que la línea base y la ventana usen el mismo
+ *   reloj) e incorpora al modelo las horas ya cerradas.
+ * - `getAnomalyScores` puntúa una ventana en tiempo constante; retorna null
+ *   mientras el modelo no está caliente.
+ * - Si el modelo no existe (cliente nuevo, Redis vacío) se inicializa con los
+ *   últimos 14 días de Postgres en una consulta agrupada por hora.
+ */
+
+import { prisma } from "@mediabot/shared";
+import { connection } from "../queues.js";
+import {
+  createAnomalyModel,
+  foldHour,
+  hourBucket,
+  isModelWarm,
+  scoreWindow,
+  HOUR_MS,
+  MAX_FOLD_GAP_HOURS,
+  type AnomalyModel,
+  type AnomalyScores,
+  type HourCounts,
+} from "./anomaly-model.js";
+
+const COUNTS_KEY_PREFIX = "anomaly:counts:";
+const MODEL_KEY_PREFIX = "anomaly:model:";
+const LOCK_KEY_PREFIX = "anomaly:lock:";
+
+/** Conteos horarios: cubren la ventana más larga consultada y una pausa de una semana */
+const COUNTS_TTL_SECONDS = 8 * 24 * 60 * 60;
+const MODEL_TTL_SECONDS = 30 * 24 * 60 * 60;
+const LOCK_TTL_SECONDS = 60;
+const BOOTSTRAP_DAYS = 14;
+/** Ventana más larga que se puede consultar (7 días) */
+const MAX_WINDOW_HOURS = 168;
+
+function countsKey(clientId: string): string {
+  return `${COUNTS_KEY_PREFIX}${clientId}`;
+}
+
+function modelKey(clientId: string): string {
+  return `${MODEL_KEY_PREFIX}${clientId}`;
+}
+
+async function loadModel(clientId: string): Promise<AnomalyModel | null> {
+  const raw = await connection.get(modelKey(clientId));
+  if (!raw) return null;
+  try {
+    const model = JSON.parse(raw) as AnomalyModel;
+    return model.version === 1 ? model : null;
+  } catch {
+    return null;
+  }
+}
+
+async function readHourCounts(clientId: string, fromHour: number, toHour: number): Promise<Map<number, HourCounts>> {
+  const fields: string[] = [];
+  for (let hour = fromHour; hour <= toHour; hour++) fields.push(`${hour}:t`, `${hour}:n`);
+
+  const values = fields.length > 0 ? await connection.hmget(countsKey(clientId), ...fields) : [];
+  const counts = new Map<number, HourCounts>();
+  for (let i = 0, hour = fromHour; hour <= toHour; hour++, i += 2) {
+    counts.set(hour, {
+      total: parseInt(values[i] || "0", 10) || 0,
+      negative: parseInt(values[i + 1] || "0", 10) || 0,
+    });
+  }
+  return counts;
+}
+
+/**
+ * Modelo inicial desde Postgres: incorpora los últimos BOOTSTRAP_DAYS días
+ * hora a hora (incluidas las horas sin menciones) y siembra los conteos
+ * recientes para que las ventanas tengan datos desde el primer momento.
+ */
+async function bootstrapModel(clientId: string, currentHour: number): Promise<AnomalyModel> {
+  const firstHour = currentHour - BOOTSTRAP_DAYS * 24;
+
+  const rows = await prisma.$queryRaw<{ hour: bigint; total: number; negative: number }[]>`
+    SELECT FLOOR(EXTRACT(EPOCH FROM "createdAt") / 3600)::bigint AS hour,
+           COUNT(*)::int AS total,
+           COUNT(*) FILTER (WHERE sentiment = 'NEGATIVE')::int AS negative
+    FROM "Mention"
+    WHERE "clientId" = ${clientId}
+      AND "isLegacy" = false
+      AND "createdAt" >= ${new Date(firstHour * HOUR_MS)}
+      AND "createdAt" < ${new Date(currentHour * HOUR_MS)}
+    GROUP BY 1
+  `;
+
+  const history = new Map(rows.map((r) => [Number(r.hour), { total: r.total, negative: r.negative }]));
+  const model = createAnomalyModel(firstHour - 1);
+  for (let hour = firstHour; hour < currentHour; hour++) {
+    foldHour(model, hour, history.get(hour) ?? { total: 0, negative: 0 });
+  }
+
+  const seed: Record<string, number> = {};
+  for (const [hour, counts] of history) {
+    if (hour < currentHour - MAX_WINDOW_HOURS) continue;
+    seed[`${hour}:t`] = counts.total;
+    seed[`${hour}:n`] = counts.negative;
+  }
+  if (Object.keys(seed).length > 0) {
+    await connection.multi().hset(countsKey(clientId), seed).expire(countsKey(clientId), COUNTS_TTL_SECONDS).exec();
+  }
+
+  console.log(`[Anomaly] Bootstrapped model for client ${clientId} from ${rows.length} active hours`);
+  return model;
+}
+
+/**
+ * Incorpora al modelo las horas cerradas pendientes. Un lock por cliente evita
+ * que dos workers incorporen la misma hora.
+ */
+async function foldPendingHours(clientId: string, currentHour: number): Promise<void> {
+  const model = await loadModel(clientId);
+  if (model && model.lastFoldedHour >= currentHour - 1) return;
+
+  const lockKey = `${LOCK_KEY_PREFIX}${clientId}`;
+  const locked = await connection.set(lockKey, "1", "EX", LOCK_TTL_SECONDS, "NX");
+  if (!locked) return;
+
+  try {
+    let updated: AnomalyModel;
+    if (!model) {
+      updated = await bootstrapModel(clientId, currentHour);
+    } else {
+      const fromHour = Math.max(model.lastFoldedHour + 1, currentHour - MAX_FOLD_GAP_HOURS);
+      const counts = await readHourCounts(clientId, fromHour, currentHour - 1);
+      updated = model;
+      for (let hour = fromHour; hour < currentHour; hour++) {
+        foldHour(updated, hour, counts.get(hour)!);
+      }
+    }
+    await connection.set(modelKey(clientId), JSON.stringify(updated), "EX", MODEL_TTL_SECONDS);
+  } finally {
+    await connection.del(lockKey);
+  }
+}
+
+/**
+ * Registra una mención analizada en los conteos de la hora en curso y
+ * actualiza la línea base si cerró alguna hora.
+ */
+export async function recordMentionForAnomaly(params: { clientId: string; sentiment: string }): Promise<void> {
+  const currentHour = hourBucket(Date.now());
+  const key = countsKey(params.clientId);
+
+  await connection
+    .multi()
+    .hincrby(key, `${currentHour}:t`, 1)
+    .hincrby(key, `${currentHour}:n`, params.sentiment === "NEGATIVE" ? 1 : 0)
+    .expire(key, COUNTS_TTL_SECONDS)
+    .exec();
+
+  await foldPendingHours(params.clientId, currentHour);
+}
+
+/**
+ * Puntajes de anomalía (volumen total, negativo y proporción de negativas)
+ * para la ventana que termina ahora, o null si el cliente no tiene un modelo
+ * caliente todavía.
+ */
+export async function getAnomalyScores(clientId: string, windowMinutes: number): Promise<AnomalyScores | null> {
+  const model = await loadModel(clientId);
+  if (!model || !isModelWarm(model)) return null;
+
+  const now = Date.now();
+  const currentHour = hourBucket(now);
+  const hours = Math.min(MAX_WINDOW_HOURS, Math.max(1, Math.round(windowMinutes / 60)));
+  // Una hora extra: la ventana deslizante toma parte de la hora más vieja
+  const counts = await readHourCounts(clientId, currentHour - hours, currentHour);
+
+  return scoreWindow(model, (hour) => counts.get(hour) ?? { total: 0, negative: 0 }, now, hours * 60);
+}
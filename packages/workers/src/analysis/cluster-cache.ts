@@ -0,0 +1,157 @@
+/**
+ * Cache compartido (Redis) de asignaciones de clustering.
+ *
+ * - Asignaciones positivas: título normalizado de un cliente → mención padre,
+ *   con TTL deslizante y tope global LRU (ZSET por último acceso).
+ * - Pares negativos: "este título NO es el mismo evento que ese padre" o "lo
+ *   es, pero con confianza bajo el umbral", para no volver a enviar el mismo
+ *   par al LLM.
+ * - Hit rates diarios en `metrics:cluster-cache:YYYY-MM-DD`.
+ *
+ * Lo comparten todas las réplicas de workers y sobrevive reinicios.
+ */
+
+import { createHash } from "crypto";
+import { connection } from "../queues.js";
+
+const ASSIGN_KEY_PREFIX = "cluster:assign:";
+const ASSIGN_LRU_KEY = "cluster:assign-lru";
+const NEGATIVE_KEY_PREFIX = "cluster:neg:";
+const STATS_KEY_PREFIX = "metrics:cluster-cache:";
+
+const ASSIGN_TTL_SECONDS = 30 * 60;
+const NEGATIVE_TTL_SECONDS = 24 * 60 * 60;
+const STATS_TTL_SECONDS = 14 * 24 * 60 * 60;
+/** Máximo de asignaciones vivas; al excederlo se expulsan las menos usadas */
+const MAX_ASSIGNMENTS = 10000;
+
+type CacheStat = "assign_hit" | "assign_miss" | "negative_hit" | "negative_miss";
+
+export interface ClusterCacheStats {
+  assignHits: number;
+  assignMisses: number;
+  assignHitRate: number;
+  negativeHits: number;
+  negativeMisses: number;
+  negativeHitRate: number;
+}
+
+function titleHash(normalizedTitle: string): string {
+  return createHash("sha1").update(normalizedTitle).digest("hex").slice(0, 16);
+}
+
+function assignKey(clientId: string, normalizedTitle: string): string {
+  return `${ASSIGN_KEY_PREFIX}${clientId}:${titleHash(normalizedTitle)}`;
+}
+
+function negativeKey(clientId: string, normalizedTitle: string): string {
+  return `${NEGATIVE_KEY_PREFIX}${clientId}:${titleHash(normalizedTitle)}`;
+}
+
+function statsKey(date: Date = new Date()): string {
+  return `${STATS_KEY_PREFIX}${date.toISOString().slice(0, 10)}`;
+}
+
+function recordStat(stat: CacheStat, count = 1): void {
+  if (count <= 0) return;
+  const key = statsKey();
+  connection
+    .multi()
+    .hincrby(key, stat, count)
+    .expire(key, STATS_TTL_SECONDS)
+    .exec()
+    .catch((error) => console.error("[Clustering] Failed to record cache stats:", error));
+}
+
+/**
+ * Padre cacheado para un título del cliente, o null. Un hit renueva el TTL
+ * y la posición LRU.
+ */
+export async function getCachedAssignment(clientId: string, normalizedTitle: string): Promise<string | null> {
+  const key = assignKey(clientId, normalizedTitle);
+  const parentId = await connection.get(key);
+
+  if (!parentId) {
+    recordStat("assign_miss");
+    return null;
+  }
+
+  recordStat("assign_hit");
+  await connection
+    .multi()
+    .expire(key, ASSIGN_TTL_SECONDS)
+    .zadd(ASSIGN_LRU_KEY, Date.now(), key)
+    .exec();
+  return parentId;
+}
+
+export async function cacheAssignment(clientId: string, normalizedTitle: string, parentId: string): Promise<void> {
+  const key = assignKey(clientId, normalizedTitle);
+  const results = await connection
+    .multi()
+    .set(key, parentId, "EX", ASSIGN_TTL_SECONDS)
+    .zadd(ASSIGN_LRU_KEY, Date.now(), key)
+    .zcard(ASSIGN_LRU_KEY)
+    .exec();
+
+  const size = Number(results?.[2]?.[1] || 0);
+  if (size <= MAX_ASSIGNMENTS) return;
+
+  // Expulsar las asignaciones menos usadas recientemente
+  const evicted = await connection.zpopmin(ASSIGN_LRU_KEY, size - MAX_ASSIGNMENTS);
+  const keys = evicted.filter((_, i) => i % 2 === 0); // [member, score, member, score...]
+  if (keys.length > 0) await connection.del(...keys);
+}
+
+/**
+ * De los padres candidatos, los que ya se descartaron antes para este título.
+ */
+export async function getRejectedParents(
+  clientId: string,
+  normalizedTitle: string,
+  parentIds: string[]
+): Promise<Set<string>> {
+  if (parentIds.length === 0) return new Set();
+
+  const flags = await connection.smismember(negativeKey(clientId, normalizedTitle), ...parentIds);
+  const rejected = new Set(parentIds.filter((_, i) => flags[i] === 1));
+
+  recordStat("negative_hit", rejected.size);
+  recordStat("negative_miss", parentIds.length - rejected.size);
+  return rejected;
+}
+
+export async function cacheRejectedParents(
+  clientId: string,
+  normalizedTitle: string,
+  parentIds: string[]
+): Promise<void> {
+  if (parentIds.length === 0) return;
+  const key = negativeKey(clientId, normalizedTitle);
+  await connection
+    .multi()
+    .sadd(key, ...parentIds)
+    .expire(key, NEGATIVE_TTL_SECONDS)
+    .exec();
+}
+
+export async function getClusterCacheStats(date: Date = new Date()): Promise<ClusterCacheStats> {
+  const raw = await connection.hgetall(statsKey(date));
+  const value = (field: CacheStat) => parseInt(raw[field] || "0", 10) || 0;
+  const rate = (hits: number, misses: number) =>
+    hits + misses > 0 ? Math.round((hits / (hits + misses)) * 1000) / 1000 : 0;
+
+  const assignHits = value("assign_hit");
+  const assignMisses = value("assign_miss");
+  const negativeHits = value("negative_hit");
+  const negativeMisses = value("negative_miss");
+
+  return {
+    assignHits,
+    assignMisses,
+    assignHitRate: rate(assignHits, assignMisses),
+    negativeHits,
+    negativeMisses,
+    negativeHitRate: rate(negativeHits, negativeMisses),
+  };
+}
@@ -0,0 +1,180 @@
+/**
+ * Índice LSH por cliente en Redis para candidatos de clustering.
+ *
+ * Cada mención padre se registra en BANDS buckets
+ * (`cluster:lsh:v2:{clientId}:{banda}`), cada uno un ZSET de mentionIds con el
+ * momento de indexado como score. Los miembros más viejos que el TTL se
+ * recortan al indexar y cada bucket se limita a MAX_BUCKET_MEMBERS, así que
+ * buscar candidatos cuesta BANDS lecturas acotadas independientemente de
+ * cuántas menciones tenga el cliente.
+ *
+ * Igual que el re-clustering offline, se descartan antes del hash los
+ * shingles con frecuencia documental alta en el cliente: sin eso, una banda
+ * dominada por el nombre del cliente junta a casi todas sus menciones. Las
+ * frecuencias se llevan por día (`cluster:df:{clientId}:{YYYY-MM-DD}`, con
+ * TTL y a lo sumo MAX_DF_FIELDS shingles) y se suman los días que cubre la
+ * ventana de los buckets, así siguen a las menciones indexadas y no crecen
+ * sin límite.
+ */
+
+import { config } from "@mediabot/shared";
+import { connection } from "../queues.js";
+import {
+  MAX_SHINGLE_DOCUMENT_FREQUENCY,
+  MIN_ITEMS_FOR_DF_FILTER,
+  buildShingles,
+  computeSignature,
+  signatureBands,
+} from "./minhash.js";
+
+const LSH_KEY_PREFIX = "cluster:lsh:v2:";
+const DF_KEY_PREFIX = "cluster:df:";
+/** Campo del hash de frecuencias con el total de menciones indexadas */
+const DF_TOTAL_FIELD = "__docs";
+/** Tope de miembros por bucket (se conservan los más recientes) */
+const MAX_BUCKET_MEMBERS = 500;
+/** Tope de shingles distintos por hash diario; los que no entran cuentan como raros */
+const MAX_DF_FIELDS = 20000;
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+// Suma una mención al hash diario de frecuencias. Solo agrega shingles nuevos
+// mientras el hash tenga menos de ARGV[1] campos.
+// KEYS: hash del día. ARGV: tope de campos, TTL (s), shingles...
+const DF_ADD_SCRIPT = `
+local cap = tonumber(ARGV[1])
+redis.call("HINCRBY", KEYS[1], "${DF_TOTAL_FIELD}", 1)
+local size = redis.call("HLEN", KEYS[1])
+for i = 3, #ARGV do
+  if size < cap or redis.call("HEXISTS", KEYS[1], ARGV[i]) == 1 then
+    if redis.call("HINCRBY", KEYS[1], ARGV[i], 1) == 1 then size = size + 1 end
+  end
+end
+redis.call("EXPIRE", KEYS[1], tonumber(ARGV[2]))
+return 0
+`;
+
+/** Expiración de los buckets, acotada a 24-72 h */
+export function clusterIndexTtlHours(): number {
+  return Math.min(72, Math.max(24, config.clustering.lshTtlHours));
+}
+
+function bucketKey(clientId: string, band: string): string {
+  return `${LSH_KEY_PREFIX}${clientId}:${band}`;
+}
+
+function dfKey(clientId: string, timestamp: number): string {
+  return `${DF_KEY_PREFIX}${clientId}:${new Date(timestamp).toISOString().slice(0, 10)}`;
+}
+
+/** Hashes diarios que cubren la ventana de los buckets (día en curso incluido) */
+function dfWindowKeys(clientId: string, now: number): string[] {
+  const days = Math.ceil(clusterIndexTtlHours() / 24) + 1;
+  return Array.from({ length: days }, (_, i) => dfKey(clientId, now - i * DAY_MS));
+}
+
+/**
+ * Quita los shingles presentes en más de MAX_SHINGLE_DOCUMENT_FREQUENCY de
+ * las menciones indexadas del cliente en la ventana.
+ */
+async function dropFrequentShingles(clientId: string, shingles: Set<string>, now: number): Promise<Set<string>> {
+  const fields = [DF_TOTAL_FIELD, ...shingles];
+  const pipeline = connection.pipeline();
+  for (const key of dfWindowKeys(clientId, now)) pipeline.hmget(key, ...fields);
+  const results = (await pipeline.exec()) || [];
+
+  const counts = new Array<number>(fields.length).fill(0);
+  for (const [error, values] of results) {
+    if (error) throw error;
+    (values as (string | null)[]).forEach((value, i) => {
+      counts[i] += Number(value || 0);
+    });
+  }
+
+  const total = counts[0];
+  if (total < MIN_ITEMS_FOR_DF_FILTER) return shingles;
+
+  const maxFrequency = total * MAX_SHINGLE_DOCUMENT_FREQUENCY;
+  const kept = new Set<string>();
+  fields.slice(1).forEach((s, i) => {
+    if (counts[i + 1] <= maxFrequency) kept.add(s);
+  });
+  return kept;
+}
+
+/**
+ * Registra una mención (padre de cluster) en el índice del cliente.
+ */
+export async function indexMentionForClustering(params: {
+  mentionId: string;
+  clientId: string;
+  articleTitle: string;
+  aiSummary?: string | null;
+}): Promise<void> {
+  const allShingles = buildShingles(params.articleTitle, params.aiSummary);
+  if (allShingles.size === 0) return;
+
+  const ttlSeconds = clusterIndexTtlHours() * 60 * 60;
+  const now = Date.now();
+  const shingles = await dropFrequentShingles(params.clientId, allShingles, now);
+
+  const pipeline = connection.pipeline();
+  // Frecuencias con todos los shingles (los filtrados también cuentan); el
+  // hash del día vive lo que la ventana más el propio día
+  pipeline.eval(
+    DF_ADD_SCRIPT,
+    1,
+    dfKey(params.clientId, now),
+    MAX_DF_FIELDS,
+    ttlSeconds + DAY_MS / 1000,
+    ...allShingles
+  );
+
+  if (shingles.size > 0) {
+    for (const band of signatureBands(computeSignature(shingles))) {
+      const key = bucketKey(params.clientId, band);
+      pipeline.zadd(key, now, params.mentionId);
+      pipeline.zremrangebyscore(key, "-inf", now - ttlSeconds * 1000);
+      pipeline.zremrangebyrank(key, 0, -(MAX_BUCKET_MEMBERS + 1));
+      pipeline.expire(key, ttlSeconds);
+    }
+  }
+  await pipeline.exec();
+}
+
+/**
+ * Busca menciones candidatas con al menos una banda en común, ordenadas por
+ * número de bandas coincidentes (aproxima la similitud) y limitadas a `limit`.
+ */
+export async function findClusterCandidates(params: {
+  clientId: string;
+  articleTitle: string;
+  aiSummary?: string | null;
+  limit: number;
+}): Promise<string[]> {
+  const allShingles = buildShingles(params.articleTitle, params.aiSummary);
+  if (allShingles.size === 0) return [];
+
+  const now = Date.now();
+  const shingles = await dropFrequentShingles(params.clientId, allShingles, now);
+  if (shingles.size === 0) return [];
+
+  const minScore = now - clusterIndexTtlHours() * 60 * 60 * 1000;
+  const pipeline = connection.pipeline();
+  for (const band of signatureBands(computeSignature(shingles))) {
+    pipeline.zrevrangebyscore(bucketKey(params.clientId, band), "+inf", minScore, "LIMIT", 0, MAX_BUCKET_MEMBERS);
+  }
+  const results = (await pipeline.exec()) || [];
+
+  const collisions = new Map<string, number>();
+  for (const [error, members] of results) {
+    if (error) throw error;
+    for (const id of members as string[]) {
+      collisions.set(id, (collisions.get(id) || 0) + 1);
+    }
+  }
+
+  return [...collisions.entries()]
+    .sort((a, b) => b[1] - a[1])
+    .slice(0, params.limit)
+    .map(([id]) => id);
+}
@@ -1,33 +1,18 @@
 import { prisma, getGeminiModel, cleanJsonResponse } from "@mediabot/shared";
+import { generateContentTracked } from "./ai-metrics.js";
+import { truncateText } from "./prompt-budget.js";
+import { findClusterCandidates, indexMentionForClustering, clusterIndexTtlHours } from "./cluster-index.js";
+import { buildShingles, shingleSimilarity } from "./minhash.js";
+import {
+  cacheAssignment,
+  cacheRejectedParents,
+  getCachedAssignment,
+  getRejectedParents,
+} from "./cluster-cache.js";
 
-// Simple in-memory cache for recent cluster comparisons
-// Key: `${clientId}:${normalizedTitle}`, Value: { parentId, expiresAt }
-const clusterCache = new Map<string, { parentId: string; expiresAt: number }>();
-
-const CACHE_TTL_MS = 30 * 60 * 1000; // 30 minutes
-const MAX_CACHE_SIZE = 1000; // Límite para evitar crecimiento sin control
-
-/**
- * Agrega una entrada al cache, limpiando si excede el límite.
- */
-function addToCache(key: string, value: { parentId: string; expiresAt: number }): void {
-  // Si excede el límite, limpiar entradas expiradas primero
-  if (clusterCache.size >= MAX_CACHE_SIZE) {
-    cleanupClusterCache();
-    // Si aún excede, eliminar las más antiguas
-    if (clusterCache.size >= MAX_CACHE_SIZE) {
-      const entriesToDelete = Math.floor(MAX_CACHE_SIZE * 0.2); // Eliminar 20%
-      let deleted = 0;
-      for (const k of clusterCache.keys()) {
-        if (deleted >= entriesToDelete) break;
-        clusterCache.delete(k);
-        deleted++;
-      }
-    }
-  }
-  clusterCache.set(key, value);
-}
 const SIMILARITY_THRESHOLD = 0.7;
+/** Máximo de candidatos LSH que se cargan de la base de datos */
+const LSH_MAX_CANDIDATES = 50;
 
 /**
  * Normalizes a title for comparison by removing common noise
@@ -65,50 +50,83 @@ function jaccardSimilarity(set1: Set<string>, set2: Set<string>): number {
   return union.size > 0 ? intersection.size / union.size : 0;
 }
 
+/** Máximo de candidatos moderados evaluados en la única llamada al LLM */
+const MAX_AI_CANDIDATES = 5;
+
+export interface CandidateComparison {
+  sameEvent: boolean;
+  confidence: number;
+}
+
+/**
+ * Parsea la respuesta de comparación múltiple. Los ids del prompt son
+ * posiciones 1..N; candidatos ausentes o inválidos quedan sin resultado.
+ */
+export function parseCandidateComparison(
+  rawText: string,
+  candidateIds: string[]
+): Map<string, CandidateComparison> {
+  const results = new Map<string, CandidateComparison>();
+  const parsed = JSON.parse(cleanJsonResponse(rawText));
+  const items: unknown[] = Array.isArray(parsed) ? parsed : Array.isArray(parsed?.results) ? parsed.results : [];
+
+  for (const item of items) {
+    if (!item || typeof item !== "object") continue;
+    const entry = item as { id?: unknown; sameEvent?: unknown; confidence?: unknown };
+    const position = Number(entry.id);
+    if (!Number.isInteger(position) || position < 1 || position > candidateIds.length) continue;
+
+    results.set(candidateIds[position - 1], {
+      sameEvent: Boolean(entry.sameEvent),
+      confidence: Math.max(0, Math.min(1, Number(entry.confidence) || 0)),
+    });
+  }
+  return results;
+}
+
 /**
- * Uses AI to determine if two articles are about the same event
+ * Compara una mención contra todos sus candidatos en una sola llamada:
+ * el LLM indica, por candidato, si es el mismo evento y con qué confianza.
+ * Retorna null si la llamada falla (no debe cachearse como negativo).
  */
-async function aiCompareArticles(params: {
-  title1: string;
-  summary1: string;
-  title2: string;
-  summary2: string;
-}): Promise<{ sameEvent: boolean; confidence: number }> {
+async function aiRankCandidates(params: {
+  title: string;
+  summary: string;
+  candidates: Array<{ id: string; title: string; summary: string }>;
+}): Promise<Map<string, CandidateComparison> | null> {
   const model = getGeminiModel();
 
-  const prompt = `Determina si estos dos articulos tratan sobre el MISMO evento o noticia.
+  const candidatesText = params.candidates
+    .map((c, i) => `[${i + 1}]
+Titulo: ${c.title}
+Resumen: ${truncateText(c.summary, 400) || "No disponible"}`)
+    .join("\n\n");
+
+  const prompt = `Determina cuales de los articulos candidatos tratan sobre el MISMO evento o noticia que el articulo nuevo.
 
-Articulo 1:
-Titulo: ${params.title1}
-Resumen: ${params.summary1 || "No disponible"}
+Articulo nuevo:
+Titulo: ${params.title}
+Resumen: ${truncateText(params.summary, 400) || "No disponible"}
 
-Articulo 2:
-Titulo: ${params.title2}
-Resumen: ${params.summary2 || "No disponible"}
+Candidatos:
+${candidatesText}
 
-Responde UNICAMENTE con JSON valido, sin markdown ni texto adicional:
-{"sameEvent": true, "confidence": 0.9}
+Responde UNICAMENTE con JSON valido, sin markdown ni texto adicional, con un elemento por candidato usando su numero como id:
+{"results": [{"id": 1, "sameEvent": true, "confidence": 0.9}]}
 
 sameEvent=true si ambos hablan del mismo evento/noticia/anuncio especifico.
 sameEvent=false si son temas relacionados pero eventos distintos.`;
 
   try {
-    const result = await model.generateContent({
+    const result = await generateContentTracked(model, "cluster_compare", {
       contents: [{ role: "user", parts: [{ text: prompt }] }],
-      generationConfig: { maxOutputTokens: 256, temperature: 0.2 },
+      generationConfig: { maxOutputTokens: 64 + 48 * params.candidates.length, temperature: 0.2 },
     });
 
-    const text = result.response.text();
-    const cleaned = cleanJsonResponse(text);
-    const parsed = JSON.parse(cleaned);
-
-    return {
-      sameEvent: Boolean(parsed.sameEvent),
-      confidence: Math.max(0, Math.min(1, parsed.confidence || 0)),
-    };
+    return parseCandidateComparison(result.response.text(), params.candidates.map((c) => c.id));
   } catch (error) {
     console.error("[Clustering] Failed to parse AI comparison:", error);
-    return { sameEvent: false, confidence: 0 };
+    return null;
   }
 }
 
@@ -123,105 +141,199 @@ export async function findClusterParent(params: {
 }): Promise<{ parentId: string | null; score: number }> {
   const { clientId, articleTitle, aiSummary } = params;
 
-  // Check cache first
+  // Check cache first (compartido entre réplicas vía Redis)
   const normalizedTitle = normalizeTitle(articleTitle);
-  const cacheKey = `${clientId}:${normalizedTitle}`;
-  const cached = clusterCache.get(cacheKey);
+  const cachedParentId = await getCachedAssignment(clientId, normalizedTitle).catch((error) => {
+    console.error("[Clustering] Cache lookup failed:", error);
+    return null;
+  });
 
-  if (cached && cached.expiresAt > Date.now()) {
+  if (cachedParentId) {
     console.log(`[Clustering] Cache hit for: ${articleTitle.slice(0, 50)}`);
-    return { parentId: cached.parentId, score: 0.9 };
+    return { parentId: cachedParentId, score: 0.9 };
   }
 
-  // Get recent mentions from the same client (last 24h)
-  const since = new Date(Date.now() - 24 * 60 * 60 * 1000);
-  const recentMentions = await prisma.mention.findMany({
-    where: {
-      clientId,
-      publishedAt: { gte: since },
-      parentMentionId: null, // Only look at cluster parents
-    },
-    include: {
-      article: { select: { title: true } },
-    },
-    orderBy: { createdAt: "desc" },
-    take: 20, // Limit to avoid too many comparisons
-  });
+  const recentMentions = await loadCandidateParents(params);
 
   if (recentMentions.length === 0) {
+    await indexAsParent(params);
     return { parentId: null, score: 0 };
   }
 
   const newKeywords = extractKeywords(articleTitle);
+  const newShingles = buildShingles(articleTitle, aiSummary);
 
-  // First pass: quick keyword similarity check
+  // First pass: quick keyword similarity check (título o título + resumen)
   const candidates: { mention: typeof recentMentions[0]; similarity: number }[] = [];
 
   for (const mention of recentMentions) {
     const existingKeywords = extractKeywords(mention.article.title);
     const similarity = jaccardSimilarity(newKeywords, existingKeywords);
+    const contentSimilarity = shingleSimilarity(
+      newShingles,
+      buildShingles(mention.article.title, mention.aiSummary)
+    );
 
-    if (similarity >= 0.3) {
+    if (similarity >= 0.3 || contentSimilarity >= 0.3) {
       // Low threshold for candidates
       candidates.push({ mention, similarity });
     }
   }
 
-  if (candidates.length === 0) {
+  // Descartar pares que el LLM ya juzgó como eventos distintos
+  const rejected = await getRejectedParents(
+    clientId,
+    normalizedTitle,
+    candidates.map((c) => c.mention.id)
+  ).catch((error) => {
+    console.error("[Clustering] Negative cache lookup failed:", error);
+    return new Set<string>();
+  });
+  const viable = candidates.filter((c) => !rejected.has(c.mention.id));
+
+  if (viable.length === 0) {
+    await indexAsParent(params);
     return { parentId: null, score: 0 };
   }
 
-  // Sort by similarity and take top 3 for AI comparison
-  candidates.sort((a, b) => b.similarity - a.similarity);
-  const topCandidates = candidates.slice(0, 3);
+  viable.sort((a, b) => b.similarity - a.similarity);
 
-  // Second pass: AI comparison for top candidates
-  for (const { mention, similarity } of topCandidates) {
-    // If very high keyword similarity, skip AI check
-    if (similarity >= 0.7) {
-      console.log(`[Clustering] High keyword match (${similarity.toFixed(2)}): ${articleTitle.slice(0, 50)} -> ${mention.article.title.slice(0, 50)}`);
+  // If very high keyword similarity, skip AI check
+  const best = viable[0];
+  if (best.similarity >= 0.7) {
+    console.log(`[Clustering] High keyword match (${best.similarity.toFixed(2)}): ${articleTitle.slice(0, 50)} -> ${best.mention.article.title.slice(0, 50)}`);
+    await rememberAssignment(clientId, normalizedTitle, best.mention.id);
+    return { parentId: best.mention.id, score: best.similarity };
+  }
 
-      // Cache this match
-      addToCache(cacheKey, {
-        parentId: mention.id,
-        expiresAt: Date.now() + CACHE_TTL_MS,
-      });
+  // Use AI for moderate matches: una sola llamada para todos los candidatos
+  const topCandidates = viable.slice(0, MAX_AI_CANDIDATES);
+  const comparisons = await aiRankCandidates({
+    title: articleTitle,
+    summary: aiSummary,
+    candidates: topCandidates.map(({ mention }) => ({
+      id: mention.id,
+      title: mention.article.title,
+      summary: mention.aiSummary || "",
+    })),
+  });
 
-      return { parentId: mention.id, score: similarity };
+  // Se cachea cualquier veredicto real del LLM que no alcanza el umbral ("no es
+  // el mismo evento" o "sí, pero con confianza baja"), no una falla de la llamada
+  const newlyRejected: string[] = [];
+  let match: { mention: typeof topCandidates[0]["mention"]; confidence: number } | null = null;
+
+  if (comparisons) {
+    for (const { mention } of topCandidates) {
+      const comparison = comparisons.get(mention.id);
+      if (!comparison) continue;
+
+      if (comparison.sameEvent && comparison.confidence >= SIMILARITY_THRESHOLD) {
+        if (!match || comparison.confidence > match.confidence) {
+          match = { mention, confidence: comparison.confidence };
+        }
+      } else {
+        newlyRejected.push(mention.id);
+      }
     }
+  }
 
-    // Use AI for moderate matches
-    const aiResult = await aiCompareArticles({
-      title1: articleTitle,
-      summary1: aiSummary,
-      title2: mention.article.title,
-      summary2: mention.aiSummary || "",
-    });
+  await rememberRejections(clientId, normalizedTitle, newlyRejected);
 
-    if (aiResult.sameEvent && aiResult.confidence >= SIMILARITY_THRESHOLD) {
-      console.log(`[Clustering] AI match (${aiResult.confidence.toFixed(2)}): ${articleTitle.slice(0, 50)} -> ${mention.article.title.slice(0, 50)}`);
+  if (match) {
+    console.log(`[Clustering] AI match (${match.confidence.toFixed(2)}): ${articleTitle.slice(0, 50)} -> ${match.mention.article.title.slice(0, 50)}`);
+    await rememberAssignment(clientId, normalizedTitle, match.mention.id);
+    return { parentId: match.mention.id, score: match.confidence };
+  }
+
+  await indexAsParent(params);
+  return { parentId: null, score: 0 };
+}
 
-      // Cache this match
-      addToCache(cacheKey, {
-        parentId: mention.id,
-        expiresAt: Date.now() + CACHE_TTL_MS,
-      });
+/**
+ * Carga los padres de cluster candidatos del cliente. Usa el índice LSH en
+ * Redis (sub-lineal, sin depender de un tope de menciones recientes); si Redis
+ * falla, cae a las 20 menciones padre más recientes de las últimas 24 h.
+ */
+async function loadCandidateParents(params: {
+  mentionId: string;
+  clientId: string;
+  articleTitle: string;
+  aiSummary: string;
+}) {
+  const { mentionId, clientId } = params;
 
-      return { parentId: mention.id, score: aiResult.confidence };
-    }
+  try {
+    const candidateIds = (await findClusterCandidates({
+      clientId,
+      articleTitle: params.articleTitle,
+      aiSummary: params.aiSummary,
+      limit: LSH_MAX_CANDIDATES,
+    })).filter((id) => id !== mentionId);
+
+    if (candidateIds.length === 0) return [];
+
+    const since = new Date(Date.now() - clusterIndexTtlHours() * 60 * 60 * 1000);
+    return await prisma.mention.findMany({
+      where: {
+        id: { in: candidateIds },
+        clientId,
+        createdAt: { gte: since },
+        parentMentionId: null, // Only look at cluster parents
+      },
+      include: {
+        article: { select: { title: true } },
+      },
+    });
+  } catch (error) {
+    console.error("[Clustering] LSH lookup failed, falling back to recent mentions:", error);
   }
 
-  return { parentId: null, score: 0 };
+  const since = new Date(Date.now() - 24 * 60 * 60 * 1000);
+  return prisma.mention.findMany({
+    where: {
+      clientId,
+      id: { not: mentionId },
+      publishedAt: { gte: since },
+      parentMentionId: null,
+    },
+    include: {
+      article: { select: { title: true } },
+    },
+    orderBy: { createdAt: "desc" },
+    take: 20,
+  });
 }
 
 /**
- * Cleans up expired cache entries (call periodically)
+ * Registra la mención como padre potencial en el índice LSH (no encontró
+ * cluster existente).
  */
-export function cleanupClusterCache(): void {
-  const now = Date.now();
-  for (const [key, value] of clusterCache.entries()) {
-    if (value.expiresAt < now) {
-      clusterCache.delete(key);
-    }
+async function indexAsParent(params: {
+  mentionId: string;
+  clientId: string;
+  articleTitle: string;
+  aiSummary: string;
+}): Promise<void> {
+  try {
+    await indexMentionForClustering(params);
+  } catch (error) {
+    console.error(`[Clustering] Failed to index mention ${params.mentionId}:`, error);
+  }
+}
+
+async function rememberAssignment(clientId: string, normalizedTitle: string, parentId: string): Promise<void> {
+  try {
+    await cacheAssignment(clientId, normalizedTitle, parentId);
+  } catch (error) {
+    console.error("[Clustering] Failed to cache assignment:", error);
+  }
+}
+
+async function rememberRejections(clientId: string, normalizedTitle: string, parentIds: string[]): Promise<void> {
+  try {
+    await cacheRejectedParents(clientId, normalizedTitle, parentIds);
+  } catch (error) {
+    console.error("[Clustering] Failed to cache rejected pairs:", error);
   }
 }
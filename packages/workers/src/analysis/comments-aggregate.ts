@@ -0,0 +1,70 @@
+/**
+ * Agregado incremental de sentimiento de comentarios sociales.
+ *
+ * Cada refresco analiza solo los comentarios nuevos (delta). El resultado del
+ * delta se convierte en conteos por sentimiento que se suman a los contadores
+ * de SocialMention, y el sentimiento global se deriva de esos contadores.
+ */
+
+import type { Sentiment } from "@prisma/client";
+
+export interface CommentSentimentCounts {
+  positive: number;
+  negative: number;
+  neutral: number;
+}
+
+/**
+ * Umbral de participación a partir del cual positivos y negativos
+ * coexistiendo se consideran MIXED.
+ */
+const MIXED_MIN_SHARE = 0.3;
+
+/**
+ * Convierte el breakdown en porcentajes devuelto por la IA a conteos
+ * absolutos para `total` comentarios (método de residuo mayor, la suma
+ * siempre es exactamente `total`).
+ */
+export function breakdownToCounts(
+  breakdown: CommentSentimentCounts,
+  total: number
+): CommentSentimentCounts {
+  if (total <= 0) return { positive: 0, negative: 0, neutral: 0 };
+
+  const keys = ["positive", "negative", "neutral"] as const;
+  const pctSum = keys.reduce((sum, k) => sum + Math.max(0, breakdown[k] || 0), 0);
+  if (pctSum <= 0) return { positive: 0, negative: 0, neutral: total };
+
+  const exact = keys.map((k) => (Math.max(0, breakdown[k] || 0) / pctSum) * total);
+  const counts = exact.map(Math.floor);
+  let remaining = total - counts.reduce((a, b) => a + b, 0);
+
+  const byRemainder = exact
+    .map((value, i) => ({ i, remainder: value - Math.floor(value) }))
+    .sort((a, b) => b.remainder - a.remainder);
+  for (const { i } of byRemainder) {
+    if (remaining <= 0) break;
+    counts[i]++;
+    remaining--;
+  }
+
+  return { positive: counts[0], negative: counts[1], neutral: counts[2] };
+}
+
+/**
+ * Deriva el sentimiento agregado a partir de los contadores acumulados.
+ */
+export function deriveCommentsSentiment(counts: CommentSentimentCounts): Sentiment {
+  const total = counts.positive + counts.negative + counts.neutral;
+  if (total === 0) return "NEUTRAL";
+
+  const positiveShare = counts.positive / total;
+  const negativeShare = counts.negative / total;
+  if (positiveShare >= MIXED_MIN_SHARE && negativeShare >= MIXED_MIN_SHARE) {
+    return "MIXED";
+  }
+
+  if (counts.negative > counts.positive && counts.negative >= counts.neutral) return "NEGATIVE";
+  if (counts.positive > counts.negative && counts.positive >= counts.neutral) return "POSITIVE";
+  return "NEUTRAL";
+}
@@ -0,0 +1,160 @@
+/**
+ * Contadores de menciones negativas por cliente en Redis, en buckets de un
+ * minuto (por `publishedAt`), para que la detección de crisis no haga un
+ * COUNT sobre `Mention` por cada mención negativa analizada.
+ *
+ * - El worker de análisis incrementa el bucket al guardar una mención NEGATIVE
+ *   y lo decrementa si un re-análisis la mueve a otro sentimiento.
+ * - `reconcileCrisisCounters` (cola CRISIS_CHECK, cada 5 min) reconstruye los
+ *   contadores desde Postgres con una sola consulta agrupada y marca hasta qué
+ *   ventana están sincronizados.
+ * - Si la marca no existe o cubre menos que la ventana pedida, el lector
+ *   retorna null y el detector cae al COUNT en Postgres.
+ */
+
+import { prisma } from "@mediabot/shared";
+import { connection } from "../queues.js";
+
+const COUNTER_KEY_PREFIX = "crisis:neg:";
+const CLIENTS_KEY = "crisis:neg-clients";
+const SYNC_KEY = "crisis:neg-synced";
+const COUNTED_KEY_PREFIX = "crisis:neg-counted:";
+
+const BUCKET_MS = 60 * 1000;
+const COUNTER_TTL_SECONDS = 24 * 60 * 60;
+/** La marca de sincronización vence si el reconciliador deja de correr */
+const SYNC_TTL_SECONDS = 15 * 60;
+
+function counterKey(clientId: string): string {
+  return `${COUNTER_KEY_PREFIX}${clientId}`;
+}
+
+function bucketOf(timestamp: number): number {
+  return Math.floor(timestamp / BUCKET_MS);
+}
+
+// Marca por mención con su estado en el contador ("1" contada, "0" descontada)
+// y ajusta su bucket solo si el estado cambia, para que reintentos y
+// re-análisis no cuenten ni descuenten dos veces. Sin marca, ARGV[4] dice si
+// la mención ya está en el hash (reconstruido desde Postgres). El bucket no
+// baja de 0.
+// KEYS: marca, hash del cliente, set de clientes. ARGV: estado nuevo, bucket,
+// TTL (s), estado asumido sin marca, clientId.
+const SET_STATE_SCRIPT = `
+local current = redis.call("GET", KEYS[1]) or ARGV[4]
+if current == ARGV[1] then return 0 end
+redis.call("SET", KEYS[1], ARGV[1], "EX", tonumber(ARGV[3]))
+if ARGV[1] == "1" then
+  redis.call("HINCRBY", KEYS[2], ARGV[2], 1)
+  redis.call("SADD", KEYS[3], ARGV[5])
+elseif tonumber(redis.call("HGET", KEYS[2], ARGV[2]) or "0") > 0 then
+  redis.call("HINCRBY", KEYS[2], ARGV[2], -1)
+end
+redis.call("EXPIRE", KEYS[2], tonumber(ARGV[3]))
+return 1
+`;
+
+/**
+ * Ajusta el bucket de una mención según su sentimiento: la suma al pasar a
+ * NEGATIVE y la resta al dejar de serlo en un re-análisis. Idempotente por
+ * mención. `previousSentiment` es null en el primer análisis. Las menciones
+ * sin `publishedAt` no cuentan, igual que en el COUNT original.
+ */
+export async function recordMentionSentiment(params: {
+  clientId: string;
+  mentionId: string;
+  publishedAt: Date | null;
+  sentiment: string;
+  previousSentiment: string | null;
+}): Promise<void> {
+  if (!params.publishedAt) return;
+
+  const negative = params.sentiment === "NEGATIVE";
+  const wasNegative = params.previousSentiment === "NEGATIVE";
+  if (negative === wasNegative) return;
+
+  const now = Date.now();
+  const publishedMs = params.publishedAt.getTime();
+  if (now - publishedMs > COUNTER_TTL_SECONDS * 1000) return;
+
+  // Fechas futuras (zonas horarias mal parseadas) cuentan en el minuto actual
+  const bucket = bucketOf(Math.min(publishedMs, now));
+  await connection.eval(
+    SET_STATE_SCRIPT,
+    3,
+    `${COUNTED_KEY_PREFIX}${params.mentionId}`,
+    counterKey(params.clientId),
+    CLIENTS_KEY,
+    negative ? "1" : "0",
+    String(bucket),
+    COUNTER_TTL_SECONDS,
+    wasNegative ? "1" : "0",
+    params.clientId
+  );
+}
+
+/**
+ * Menciones negativas del cliente publicadas en los últimos `windowMinutes`,
+ * o null si los contadores no están sincronizados para esa ventana.
+ */
+export async function getNegativeMentionCount(clientId: string, windowMinutes: number): Promise<number | null> {
+  const synced = await connection.get(SYNC_KEY);
+  if (!synced || Number(synced) < windowMinutes) return null;
+
+  const now = Date.now();
+  const firstBucket = bucketOf(now - windowMinutes * 60 * 1000);
+  const lastBucket = bucketOf(now);
+  const fields: string[] = [];
+  for (let b = firstBucket; b <= lastBucket; b++) fields.push(String(b));
+
+  const values = await connection.hmget(counterKey(clientId), ...fields);
+  return values.reduce((sum, v) => sum + (parseInt(v || "0", 10) || 0), 0);
+}
+
+/**
+ * Reconstruye los contadores de todos los clientes para la ventana dada con
+ * una consulta agrupada por cliente y minuto. Los clientes sin menciones
+ * negativas en la ventana quedan vacíos. El reemplazo va en un MULTI para que
+ * ningún HINCRBY concurrente caiga entre el DEL y el HSET de un cliente.
+ */
+export async function reconcileCrisisCounters(windowMinutes: number): Promise<{ clients: number; mentions: number }> {
+  const since = new Date(Date.now() - windowMinutes * 60 * 1000);
+
+  const rows = await prisma.$queryRaw<{ clientId: string; bucket: bigint; count: number }[]>`
+    SELECT "clientId",
+           FLOOR(EXTRACT(EPOCH FROM LEAST("publishedAt", NOW())) / 60)::bigint AS bucket,
+           COUNT(*)::int AS count
+    FROM "Mention"
+    WHERE sentiment = 'NEGATIVE'
+      AND "publishedAt" >= ${since}
+    GROUP BY 1, 2
+  `;
+
+  const byClient = new Map<string, Record<string, number>>();
+  let mentions = 0;
+  for (const row of rows) {
+    const buckets = byClient.get(row.clientId) ?? {};
+    buckets[String(row.bucket)] = row.count;
+    byClient.set(row.clientId, buckets);
+    mentions += row.count;
+  }
+
+  const knownClients = await connection.smembers(CLIENTS_KEY);
+  const transaction = connection.multi();
+  for (const clientId of new Set([...knownClients, ...byClient.keys()])) {
+    const key = counterKey(clientId);
+    const buckets = byClient.get(clientId);
+    transaction.del(key);
+    if (buckets) {
+      transaction.hset(key, buckets);
+      transaction.expire(key, COUNTER_TTL_SECONDS);
+      transaction.sadd(CLIENTS_KEY, clientId);
+    } else {
+      transaction.srem(CLIENTS_KEY, clientId);
+    }
+  }
+  transaction.set(SYNC_KEY, String(windowMinutes), "EX", SYNC_TTL_SECONDS);
+  await transaction.exec();
+
+  return { clients: byClient.size, mentions };
+}
@@ -2,6 +2,9 @@ import { prisma, getSettingNumber, config } from "@mediabot/shared";
 import { publishRealtimeEvent } from "@mediabot/shared/src/realtime-publisher.js";
 import { REALTIME_CHANNELS } from "@mediabot/shared/src/realtime-types.js";
 import { getQueue, QUEUE_NAMES } from "../queues.js";
+import { getNegativeMentionCount } from "./crisis-counters.js";
+import { getAnomalyScores } from "./anomaly.js";
+import type { AnomalyScores } from "./anomaly-model.js";
 import type { CrisisTriggerType, CrisisSeverity } from "@prisma/client";
 
 interface CrisisCheckResult {
@@ -26,16 +29,8 @@ export async function checkForCrisis(clientId: string): Promise<CrisisCheckResul
     config.crisis.windowMinutes
   );
 
-  const windowStart = new Date(Date.now() - windowMinutes * 60 * 1000);
-
-  // Count recent negative mentions for this client
-  const recentNegativeMentions = await prisma.mention.count({
-    where: {
-      clientId,
-      sentiment: "NEGATIVE",
-      publishedAt: { gte: windowStart },
-    },
-  });
+  // Contadores en Redis (O(1)); COUNT en Postgres si no están sincronizados
+  const recentNegativeMentions = await countRecentNegativeMentions(clientId, windowMinutes);
 
   // Check if there's already an active crisis alert for this client
   const existingAlert = await prisma.crisisAlert.findFirst({
@@ -46,11 +41,13 @@ export async function checkForCrisis(clientId: string): Promise<CrisisCheckResul
   });
 
   if (existingAlert) {
-    // Update mention count on existing alert
-    await prisma.crisisAlert.update({
-      where: { id: existingAlert.id },
-      data: { mentionCount: recentNegativeMentions },
-    });
+    // Update mention count on existing alert (solo si cambió)
+    if (existingAlert.mentionCount !== recentNegativeMentions) {
+      await prisma.crisisAlert.update({
+        where: { id: existingAlert.id },
+        data: { mentionCount: recentNegativeMentions },
+      });
+    }
 
     return {
       isCrisis: false,
@@ -58,6 +55,43 @@ export async function checkForCrisis(clientId: string): Promise<CrisisCheckResul
     };
   }
 
+  // Con línea base caliente, la crisis se detecta por anomalía respecto al
+  // volumen habitual del cliente (hora del día / día de la semana), lo que
+  // alerta a clientes chicos por debajo del umbral fijo. El umbral fijo se
+  // mantiene como piso: si no hay anomalía, sigue aplicando.
+  const anomaly = await getAnomalySafe(clientId, windowMinutes);
+  if (anomaly) {
+    const minSurprise = await getSettingNumber("crisis.anomaly_min_surprise", 4);
+    const minMentions = await getSettingNumber("crisis.anomaly_min_mentions", 3);
+    const { observed, expected, surprise } = anomaly.negative;
+    const detail = `${observed} negative mentions in last ${anomaly.windowMinutes} minutes (expected ${expected.toFixed(1)}, surprise ${surprise.toFixed(1)})`;
+
+    if (surprise >= minSurprise && observed >= minMentions) {
+      let severity: CrisisSeverity = "MEDIUM";
+      if (surprise >= minSurprise * 3) {
+        severity = "CRITICAL";
+      } else if (surprise >= minSurprise * 2) {
+        severity = "HIGH";
+      }
+
+      return {
+        isCrisis: true,
+        triggerType: "NEGATIVE_SPIKE",
+        severity,
+        mentionCount: recentNegativeMentions,
+        reason: detail,
+      };
+    }
+
+    if (recentNegativeMentions < threshold) {
+      return {
+        isCrisis: false,
+        mentionCount: recentNegativeMentions,
+        reason: `Not anomalous: ${detail}`,
+      };
+    }
+  }
+
   // Check for crisis threshold
   if (recentNegativeMentions >= threshold) {
     // Determine severity based on mention count
@@ -84,6 +118,37 @@ export async function checkForCrisis(clientId: string): Promise<CrisisCheckResul
   };
 }
 
+/**
+ * Menciones negativas del cliente en la ventana. Lee los contadores de Redis
+ * y solo consulta Postgres si no están sincronizados o Redis falla.
+ */
+async function countRecentNegativeMentions(clientId: string, windowMinutes: number): Promise<number> {
+  try {
+    const cached = await getNegativeMentionCount(clientId, windowMinutes);
+    if (cached !== null) return cached;
+  } catch (error) {
+    console.error("[Crisis] Counter lookup failed, falling back to COUNT:", error);
+  }
+
+  const windowStart = new Date(Date.now() - windowMinutes * 60 * 1000);
+  return prisma.mention.count({
+    where: {
+      clientId,
+      sentiment: "NEGATIVE",
+      publishedAt: { gte: windowStart },
+    },
+  });
+}
+
+async function getAnomalySafe(clientId: string, windowMinutes: number): Promise<AnomalyScores | null> {
+  try {
+    return await getAnomalyScores(clientId, windowMinutes);
+  } catch (error) {
+    console.error("[Crisis] Anomaly lookup failed, using flat threshold:", error);
+    return null;
+  }
+}
+
 /**
  * Create a crisis alert and enqueue notification
  */
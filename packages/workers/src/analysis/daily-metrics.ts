@@ -0,0 +1,303 @@
+/**
+ * Rollup diario por cliente (ClientDailyMetrics).
+ *
+ * - Incremental: cada mención analizada suma a su día (sentimiento, urgencia,
+ *   tier de la fuente) y cada post social nuevo suma conteo y engagement. Un
+ *   re-análisis solo mueve la mención entre buckets.
+ * - Reconstrucción: rebuildDailyMetrics recalcula un rango de días desde
+ *   Mention/SocialMention (backfill y reconciliación nocturna).
+ *
+ * El día es la fecha UTC de COALESCE(publishedAt, createdAt) (postedAt para
+ * social). Se cuentan también las menciones legacy: el auto-archivado no debe
+ * cambiar el histórico ya agregado.
+ */
+import { randomUUID } from "crypto";
+import { prisma, type DailyMetricsTotals } from "@mediabot/shared";
+import { getSourceTierMap, sourceWeight } from "./source-tiers.js";
+
+/** Días que reconstruye cada transacción del backfill */
+const REBUILD_CHUNK_DAYS = 7;
+/** Tiempo máximo de la transacción de un bloque (consultas agrupadas incluidas) */
+const REBUILD_CHUNK_TIMEOUT_MS = 5 * 60 * 1000;
+/**
+ * Advisory lock del rollup: los incrementos lo toman compartido y la
+ * reconstrucción exclusivo, para que ningún incremento caiga entre sus
+ * consultas y el reemplazo de filas.
+ */
+const METRICS_LOCK_NAME = "client-daily-metrics";
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+/** Umbral de engagement de un post (likes, comments o shares) */
+export const SOCIAL_ENGAGED_THRESHOLD = 10;
+
+export type DailyMetricsCounters = DailyMetricsTotals;
+
+export function emptyCounters(): DailyMetricsCounters {
+  return {
+    mentions: 0,
+    positive: 0,
+    negative: 0,
+    neutral: 0,
+    mixed: 0,
+    critical: 0,
+    high: 0,
+    medium: 0,
+    low: 0,
+    tier1: 0,
+    tier2: 0,
+    tier3: 0,
+    weightedMentions: 0,
+    socialMentions: 0,
+    socialEngaged: 0,
+    socialEngagement: 0,
+  };
+}
+
+/** Inicio del día UTC */
+export function metricsDay(date: Date): Date {
+  return new Date(Math.floor(date.getTime() / DAY_MS) * DAY_MS);
+}
+
+const SENTIMENT_FIELD: Record<string, keyof DailyMetricsCounters> = {
+  POSITIVE: "positive",
+  NEGATIVE: "negative",
+  NEUTRAL: "neutral",
+  MIXED: "mixed",
+};
+
+const URGENCY_FIELD: Record<string, keyof DailyMetricsCounters> = {
+  CRITICAL: "critical",
+  HIGH: "high",
+  MEDIUM: "medium",
+  LOW: "low",
+};
+
+const WEIGHT_FIELD: Record<number, keyof DailyMetricsCounters> = {
+  3: "tier1",
+  2: "tier2",
+  1: "tier3",
+};
+
+/**
+ * Suma `count` menciones (negativo para restar) con ese sentimiento, urgencia
+ * y peso de fuente.
+ */
+export function addMentionCounts(
+  counters: DailyMetricsCounters,
+  mention: { sentiment: string; urgency: string; weight: number },
+  count: number = 1
+): DailyMetricsCounters {
+  counters.mentions += count;
+  const sentimentField = SENTIMENT_FIELD[mention.sentiment];
+  if (sentimentField) counters[sentimentField] += count;
+  const urgencyField = URGENCY_FIELD[mention.urgency];
+  if (urgencyField) counters[urgencyField] += count;
+  counters[WEIGHT_FIELD[mention.weight] ?? "tier3"] += count;
+  counters.weightedMentions += count * mention.weight;
+  return counters;
+}
+
+export function isEngaged(post: { likes: number; comments: number; shares: number }): boolean {
+  return (
+    post.likes >= SOCIAL_ENGAGED_THRESHOLD ||
+    post.comments >= SOCIAL_ENGAGED_THRESHOLD ||
+    post.shares >= SOCIAL_ENGAGED_THRESHOLD
+  );
+}
+
+/**
+ * Suma los contadores al día del cliente (INSERT ... ON CONFLICT, atómico
+ * frente a otras réplicas). Espera a una reconstrucción en curso.
+ */
+async function incrementDailyMetrics(clientId: string, day: Date, c: DailyMetricsCounters): Promise<void> {
+  await prisma.$transaction([
+    prisma.$executeRaw`SELECT pg_advisory_xact_lock_shared(hashtext(${METRICS_LOCK_NAME}))`,
+    prisma.$executeRaw`
+      INSERT INTO "ClientDailyMetrics" (
+        id, "clientId", date, mentions, positive, negative, neutral, mixed,
+        critical, high, medium, low, tier1, tier2, tier3, "weightedMentions",
+        "socialMentions", "socialEngaged", "socialEngagement", "updatedAt"
+      ) VALUES (
+        ${randomUUID()}, ${clientId}, ${day.toISOString().slice(0, 10)}::date, ${c.mentions}, ${c.positive}, ${c.negative},
+        ${c.neutral}, ${c.mixed}, ${c.critical}, ${c.high}, ${c.medium}, ${c.low}, ${c.tier1},
+        ${c.tier2}, ${c.tier3}, ${c.weightedMentions}, ${c.socialMentions}, ${c.socialEngaged},
+        ${c.socialEngagement}, NOW()
+      )
+      ON CONFLICT ("clientId", date) DO UPDATE SET
+        mentions = "ClientDailyMetrics".mentions + EXCLUDED.mentions,
+        positive = "ClientDailyMetrics".positive + EXCLUDED.positive,
+        negative = "ClientDailyMetrics".negative + EXCLUDED.negative,
+        neutral = "ClientDailyMetrics".neutral + EXCLUDED.neutral,
+        mixed = "ClientDailyMetrics".mixed + EXCLUDED.mixed,
+        critical = "ClientDailyMetrics".critical + EXCLUDED.critical,
+        high = "ClientDailyMetrics".high + EXCLUDED.high,
+        medium = "ClientDailyMetrics".medium + EXCLUDED.medium,
+        low = "ClientDailyMetrics".low + EXCLUDED.low,
+        tier1 = "ClientDailyMetrics".tier1 + EXCLUDED.tier1,
+        tier2 = "ClientDailyMetrics".tier2 + EXCLUDED.tier2,
+        tier3 = "ClientDailyMetrics".tier3 + EXCLUDED.tier3,
+        "weightedMentions" = "ClientDailyMetrics"."weightedMentions" + EXCLUDED."weightedMentions",
+        "socialMentions" = "ClientDailyMetrics"."socialMentions" + EXCLUDED."socialMentions",
+        "socialEngaged" = "ClientDailyMetrics"."socialEngaged" + EXCLUDED."socialEngaged",
+        "socialEngagement" = "ClientDailyMetrics"."socialEngagement" + EXCLUDED."socialEngagement",
+        "updatedAt" = NOW()
+    `,
+  ]);
+}
+
+/**
+ * Registra una mención recién analizada. Si ya estaba analizada (`previous`),
+ * solo se mueve de bucket de sentimiento/urgencia.
+ */
+export async function recordMentionMetrics(params: {
+  clientId: string;
+  date: Date;
+  source: string;
+  sentiment: string;
+  urgency: string;
+  previous?: { sentiment: string; urgency: string } | null;
+}): Promise<void> {
+  const weight = sourceWeight(params.source, await getSourceTierMap());
+  const counters = addMentionCounts(emptyCounters(), { ...params, weight });
+  if (params.previous) {
+    addMentionCounts(counters, { ...params.previous, weight }, -1);
+  }
+  await incrementDailyMetrics(params.clientId, metricsDay(params.date), counters);
+}
+
+type Engagement = { likes: number; comments: number; shares: number };
+
+/**
+ * Registra un post social nuevo (`previous` null) o el cambio de engagement
+ * de uno existente.
+ */
+export async function recordSocialMetrics(params: {
+  clientId: string;
+  date: Date;
+  current: Engagement;
+  previous?: Engagement | null;
+}): Promise<void> {
+  const { current, previous } = params;
+  const counters = emptyCounters();
+  counters.socialMentions = previous ? 0 : 1;
+  counters.socialEngaged = (isEngaged(current) ? 1 : 0) - (previous && isEngaged(previous) ? 1 : 0);
+  counters.socialEngagement =
+    current.likes + current.comments + current.shares -
+    (previous ? previous.likes + previous.comments + previous.shares : 0);
+
+  if (counters.socialMentions === 0 && counters.socialEngaged === 0 && counters.socialEngagement === 0) return;
+  await incrementDailyMetrics(params.clientId, metricsDay(params.date), counters);
+}
+
+interface MentionGroupRow {
+  clientId: string;
+  day: Date;
+  source: string;
+  sentiment: string;
+  urgency: string;
+  count: number;
+}
+
+interface SocialGroupRow {
+  clientId: string;
+  day: Date;
+  count: number;
+  engaged: number;
+  engagement: number;
+}
+
+/**
+ * Filas del rollup a partir de los grupos (cliente, día, fuente, sentimiento,
+ * urgencia) y (cliente, día) de social. Cada fuente se pondera una vez.
+ */
+export function foldDailyMetrics(
+  mentionRows: MentionGroupRow[],
+  socialRows: SocialGroupRow[],
+  tiers: Map<string, number>
+): Map<string, { clientId: string; date: Date; counters: DailyMetricsCounters }> {
+  const rows = new Map<string, { clientId: string; date: Date; counters: DailyMetricsCounters }>();
+  const weights = new Map<string, number>();
+
+  const rowFor = (clientId: string, day: Date) => {
+    const key = `${clientId}|${day.toISOString()}`;
+    let row = rows.get(key);
+    if (!row) {
+      row = { clientId, date: day, counters: emptyCounters() };
+      rows.set(key, row);
+    }
+    return row;
+  };
+
+  for (const r of mentionRows) {
+    let weight = weights.get(r.source);
+    if (weight === undefined) {
+      weight = sourceWeight(r.source, tiers);
+      weights.set(r.source, weight);
+    }
+    addMentionCounts(rowFor(r.clientId, r.day).counters, { sentiment: r.sentiment, urgency: r.urgency, weight }, r.count);
+  }
+
+  for (const r of socialRows) {
+    const counters = rowFor(r.clientId, r.day).counters;
+    counters.socialMentions += r.count;
+    counters.socialEngaged += r.engaged;
+    counters.socialEngagement += r.engagement;
+  }
+
+  return rows;
+}
+
+/**
+ * Recalcula el rollup de [from, to] (días UTC completos) por bloques de
+ * REBUILD_CHUNK_DAYS. Cada bloque consulta y reemplaza sus filas en una
+ * transacción con el lock exclusivo del rollup.
+ */
+export async function rebuildDailyMetrics(from: Date, to: Date): Promise<{ days: number; rows: number }> {
+  const tiers = await getSourceTierMap();
+  const lastDay = metricsDay(to);
+  let days = 0;
+  let written = 0;
+
+  for (let start = metricsDay(from); start <= lastDay; start = new Date(start.getTime() + REBUILD_CHUNK_DAYS * DAY_MS)) {
+    const end = new Date(Math.min(start.getTime() + REBUILD_CHUNK_DAYS * DAY_MS, lastDay.getTime() + DAY_MS));
+
+    const rows = await prisma.$transaction(async (tx) => {
+      await tx.$executeRaw`SELECT pg_advisory_xact_lock(hashtext(${METRICS_LOCK_NAME}))`;
+
+      const mentionRows = await tx.$queryRaw<MentionGroupRow[]>`
+        SELECT m."clientId", COALESCE(m."publishedAt", m."createdAt")::date AS day, a.source,
+               m.sentiment::text AS sentiment, m.urgency::text AS urgency, COUNT(*)::int AS count
+        FROM "Mention" m
+        JOIN "Article" a ON a.id = m."articleId"
+        WHERE COALESCE(m."publishedAt", m."createdAt") >= ${start}
+        AND COALESCE(m."publishedAt", m."createdAt") < ${end}
+        AND m."aiSummary" IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5
+      `;
+      const socialRows = await tx.$queryRaw<SocialGroupRow[]>`
+        SELECT "clientId", COALESCE("postedAt", "createdAt")::date AS day, COUNT(*)::int AS count,
+               (COUNT(*) FILTER (
+                 WHERE likes >= ${SOCIAL_ENGAGED_THRESHOLD} OR comments >= ${SOCIAL_ENGAGED_THRESHOLD} OR shares >= ${SOCIAL_ENGAGED_THRESHOLD}
+               ))::int AS engaged,
+               COALESCE(SUM(likes + comments + shares), 0)::int AS engagement
+        FROM "SocialMention"
+        WHERE COALESCE("postedAt", "createdAt") >= ${start}
+        AND COALESCE("postedAt", "createdAt") < ${end}
+        GROUP BY 1, 2
+      `;
+
+      const folded = [...foldDailyMetrics(mentionRows, socialRows, tiers).values()];
+      await tx.clientDailyMetrics.deleteMany({ where: { date: { gte: start, lt: end } } });
+      await tx.clientDailyMetrics.createMany({
+        data: folded.map((row) => ({ clientId: row.clientId, date: row.date, ...row.counters })),
+      });
+      return folded;
+    }, { timeout: REBUILD_CHUNK_TIMEOUT_MS });
+
+    days += Math.round((end.getTime() - start.getTime()) / DAY_MS);
+    written += rows.length;
+  }
+
+  console.log(`[DailyMetrics] Rebuilt ${days} days (${written} rows)`);
+  return { days, rows: written };
+}
@@ -0,0 +1,129 @@
+/**
+ * MinHash + LSH (banding) para encontrar menciones candidatas a pertenecer al
+ * mismo evento sin compararlas todas contra todas.
+ *
+ * Con BANDS bandas de ROWS filas, dos textos con similitud Jaccard s colisionan
+ * en al menos una banda con probabilidad 1 - (1 - s^ROWS)^BANDS
+ * (≈95% para s=0.3, ≈27% para s=0.1).
+ *
+ * Módulo puro: lo usan el índice en Redis (cluster-index.ts) y el
+ * re-clustering offline.
+ */
+
+export const NUM_HASHES = 64;
+export const ROWS_PER_BAND = 2;
+export const BANDS = NUM_HASHES / ROWS_PER_BAND;
+
+/**
+ * Shingles presentes en más de esta fracción de las menciones de un cliente
+ * (su nombre, cargo...) se ignoran: no distinguen eventos y harían que todo
+ * colisione con todo. Solo se aplica con MIN_ITEMS_FOR_DF_FILTER menciones.
+ */
+export const MAX_SHINGLE_DOCUMENT_FREQUENCY = 0.2;
+export const MIN_ITEMS_FOR_DF_FILTER = 50;
+
+/** Prefijo de token usado como "stem" barato (inversión/inversiones → invers) */
+const STEM_LENGTH = 6;
+
+const STOPWORDS = new Set([
+  "el", "la", "los", "las", "un", "una", "unos", "unas", "de", "del", "en",
+  "con", "por", "para", "que", "se", "su", "sus", "al", "es", "y", "o", "a",
+  "ante", "como", "mas", "pero", "sobre", "entre", "tras", "sin", "este",
+  "esta", "estos", "estas", "fue", "son", "ser", "han", "the", "an", "and",
+  "or", "of", "in", "on", "for", "to", "with",
+]);
+
+/** Semillas deterministas por función de hash (iguales en todos los procesos) */
+const SEEDS: number[] = (() => {
+  const seeds: number[] = [];
+  let state = 0x9e3779b9;
+  for (let i = 0; i < NUM_HASHES; i++) {
+    state = Math.imul(state ^ (state >>> 16), 0x85ebca6b) >>> 0;
+    state = Math.imul(state ^ (state >>> 13), 0xc2b2ae35) >>> 0;
+    seeds.push((state ^ (state >>> 16)) >>> 0);
+  }
+  return seeds;
+})();
+
+/** FNV-1a de 32 bits */
+function hashString(value: string): number {
+  let hash = 0x811c9dc5;
+  for (let i = 0; i < value.length; i++) {
+    hash ^= value.charCodeAt(i);
+    hash = Math.imul(hash, 0x01000193);
+  }
+  return hash >>> 0;
+}
+
+/** Finalizador de murmur3: mezcla un entero de 32 bits */
+function mix32(value: number): number {
+  let h = value >>> 0;
+  h = Math.imul(h ^ (h >>> 16), 0x85ebca6b);
+  h = Math.imul(h ^ (h >>> 13), 0xc2b2ae35);
+  return (h ^ (h >>> 16)) >>> 0;
+}
+
+/**
+ * Shingles de una mención: tokens del título y resumen en minúsculas, sin
+ * acentos ni stopwords, recortados a un prefijo fijo.
+ */
+export function buildShingles(title: string, summary?: string | null): Set<string> {
+  const text = `${title} ${summary || ""}`
+    .toLowerCase()
+    .normalize("NFD")
+    .replace(/[\u0300-\u036f]/g, "");
+
+  const shingles = new Set<string>();
+  for (const token of text.split(/[^a-z0-9ñ]+/)) {
+    if (token.length <= 2 || STOPWORDS.has(token)) continue;
+    shingles.add(token.slice(0, STEM_LENGTH));
+  }
+  return shingles;
+}
+
+/**
+ * Firma MinHash: para cada función de hash, el mínimo sobre los shingles.
+ */
+export function computeSignature(shingles: Set<string>): number[] {
+  const signature = new Array<number>(NUM_HASHES).fill(0xffffffff);
+  for (const shingle of shingles) {
+    const base = hashString(shingle);
+    for (let i = 0; i < NUM_HASHES; i++) {
+      const h = mix32(base ^ SEEDS[i]);
+      if (h < signature[i]) signature[i] = h;
+    }
+  }
+  return signature;
+}
+
+/**
+ * Claves de banda de una firma (una por banda). Dos firmas que comparten
+ * alguna clave son candidatas.
+ */
+export function signatureBands(signature: number[]): string[] {
+  const bands: string[] = [];
+  for (let b = 0; b < BANDS; b++) {
+    const rows = signature.slice(b * ROWS_PER_BAND, (b + 1) * ROWS_PER_BAND);
+    bands.push(`${b}:${rows.map((r) => r.toString(36)).join(".")}`);
+  }
+  return bands;
+}
+
+/** Similitud Jaccard estimada a partir de dos firmas */
+export function estimateSimilarity(a: number[], b: number[]): number {
+  let equal = 0;
+  for (let i = 0; i < NUM_HASHES; i++) {
+    if (a[i] === b[i]) equal++;
+  }
+  return equal / NUM_HASHES;
+}
+
+/** Similitud Jaccard exacta entre dos conjuntos de shingles */
+export function shingleSimilarity(a: Set<string>, b: Set<string>): number {
+  if (a.size === 0 && b.size === 0) return 0;
+  let intersection = 0;
+  for (const s of a) {
+    if (b.has(s)) intersection++;
+  }
+  return intersection / (a.size + b.size - intersection);
+}
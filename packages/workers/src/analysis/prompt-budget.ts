@@ -0,0 +1,162 @@
+/**
+ * Presupuesto de tamaño para prompts de Gemini.
+ *
+ * En vez de interpolar el cuerpo completo de un artículo, se extraen los
+ * pasajes alrededor de las apariciones de la keyword (más el arranque de la
+ * nota) hasta un límite de caracteres. Las listas (temas, fuentes, acciones)
+ * se recortan por cantidad y por tamaño total.
+ */
+
+/** Aproximación de caracteres por token para texto en español */
+export const CHARS_PER_TOKEN = 4;
+
+/** Separador entre pasajes no contiguos */
+const PASSAGE_SEPARATOR = " [...] ";
+/** Máximo de apariciones de keyword consideradas por texto */
+const MAX_HITS = 20;
+
+export function estimateTokens(text: string): number {
+  return Math.ceil((text?.length || 0) / CHARS_PER_TOKEN);
+}
+
+/**
+ * Recorta un texto a `maxChars` cortando en el último espacio (sin partir
+ * palabras) y marcando el corte con "...".
+ */
+export function truncateText(text: string, maxChars: number): string {
+  if (!text || text.length <= maxChars) return text || "";
+  const cut = text.slice(0, maxChars);
+  const lastSpace = cut.lastIndexOf(" ");
+  return `${(lastSpace > maxChars * 0.6 ? cut.slice(0, lastSpace) : cut).trimEnd()}...`;
+}
+
+export function truncateToTokens(text: string, maxTokens: number): string {
+  return truncateText(text, maxTokens * CHARS_PER_TOKEN);
+}
+
+/**
+ * Pliega un texto a minúsculas sin acentos conservando la posición de cada
+ * carácter (los índices del resultado corresponden al original).
+ */
+function foldPreservingIndex(text: string): string {
+  let out = "";
+  for (const ch of text.split("")) {
+    const folded = ch.normalize("NFD").replace(/[\u0300-\u036f]/g, "").toLowerCase();
+    out += folded.length === 1 ? folded : ch;
+  }
+  return out;
+}
+
+function snapToWhitespace(text: string, index: number, direction: -1 | 1): number {
+  const limit = 40;
+  let i = index;
+  for (let steps = 0; steps < limit && i > 0 && i < text.length; steps++) {
+    if (/\s/.test(text[i])) return direction === 1 ? i : i + 1;
+    i += direction;
+  }
+  return index;
+}
+
+export interface PassageOptions {
+  /** Caracteres de contexto a cada lado de una aparición */
+  windowChars?: number;
+  /** Caracteres iniciales que siempre se incluyen (entrada de la nota) */
+  leadChars?: number;
+}
+
+/**
+ * Extrae los pasajes de `content` alrededor de las apariciones de `terms`
+ * (sin distinguir acentos ni mayúsculas), respetando `maxChars`. Siempre
+ * incluye el arranque del texto; si no hay apariciones devuelve el texto
+ * recortado.
+ */
+export function extractKeywordPassages(
+  content: string,
+  terms: string[],
+  maxChars: number,
+  options: PassageOptions = {}
+): string {
+  if (!content) return "";
+  if (content.length <= maxChars) return content;
+
+  const windowChars = options.windowChars ?? 250;
+  const leadChars = Math.min(options.leadChars ?? 300, maxChars);
+
+  const folded = foldPreservingIndex(content);
+  const needles = [...new Set(terms.map((t) => foldPreservingIndex(t.trim())).filter((t) => t.length >= 2))];
+
+  const hits: Array<{ start: number; end: number }> = [];
+  for (const needle of needles) {
+    let from = 0;
+    while (hits.length < MAX_HITS) {
+      const idx = folded.indexOf(needle, from);
+      if (idx === -1) break;
+      hits.push({ start: idx, end: idx + needle.length });
+      from = idx + needle.length;
+    }
+  }
+  if (hits.length === 0) return truncateText(content, maxChars);
+
+  // Rangos: arranque de la nota + ventana alrededor de cada aparición
+  const ranges: Array<[number, number]> = [[0, snapToWhitespace(content, leadChars, -1)]];
+  for (const hit of hits.sort((a, b) => a.start - b.start)) {
+    ranges.push([
+      snapToWhitespace(content, Math.max(0, hit.start - windowChars), 1),
+      snapToWhitespace(content, Math.min(content.length, hit.end + windowChars), -1),
+    ]);
+  }
+
+  // Fusionar rangos solapados (o casi contiguos)
+  const merged: Array<[number, number]> = [];
+  for (const [start, end] of ranges.sort((a, b) => a[0] - b[0])) {
+    const last = merged[merged.length - 1];
+    if (last && start <= last[1] + PASSAGE_SEPARATOR.length) {
+      last[1] = Math.max(last[1], end);
+    } else {
+      merged.push([start, end]);
+    }
+  }
+
+  // Agregar pasajes en orden hasta agotar el presupuesto
+  const parts: string[] = [];
+  let used = 0;
+  let truncated = false;
+  let lastEnd = 0;
+  for (const [start, end] of merged) {
+    const separatorCost = parts.length > 0 ? PASSAGE_SEPARATOR.length : 0;
+    // Se reservan 3 caracteres para el "..." final
+    const remaining = maxChars - used - separatorCost - 3;
+    if (remaining < 40) break;
+
+    const passage = content.slice(start, end).trim();
+    truncated = passage.length > remaining;
+    const piece = truncated ? truncateText(passage, remaining) : passage;
+    parts.push(piece);
+    used += separatorCost + piece.length;
+    lastEnd = end;
+    if (truncated) break;
+  }
+
+  const suffix = !truncated && lastEnd < content.length ? "..." : "";
+  return `${parts.join(PASSAGE_SEPARATOR)}${suffix}`;
+}
+
+/**
+ * Recorta una lista a `maxItems` elementos y, opcionalmente, a `maxChars`
+ * caracteres en total (contando el separador ", ").
+ */
+export function capList<T extends string>(items: T[] | undefined, maxItems: number, maxChars?: number): T[] {
+  if (!items?.length) return [];
+  const capped = items.slice(0, maxItems);
+  if (maxChars === undefined) return capped;
+
+  const result: T[] = [];
+  let used = 0;
+  for (const item of capped) {
+    const cost = item.length + (result.length > 0 ? 2 : 0);
+    if (used + cost > maxChars) break;
+    result.push(item);
+    used += cost;
+  }
+  return result;
+}
@@ -0,0 +1,410 @@
+/**
+ * Re-clustering offline de menciones de un cliente.
+ *
+ * El clustering en línea solo compara una mención al analizarla, así que las
+ * menciones analizadas antes de que llegara su "padre" (o durante caídas de
+ * Gemini) quedan sin cluster. Este módulo reconstruye los clusters de un rango
+ * de fechas en bloque:
+ *
+ * 1. Carga las menciones paginadas y calcula shingles + firma MinHash en una
+ *    sola pasada.
+ * 2. Agrupa por bandas LSH (sin los términos comunes a casi todo el cliente)
+ *    y verifica los pares candidatos con Jaccard exacto.
+ * 3. Une los pares con union-find (incluye los clusters ya existentes, que
+ *    pudieron haberse confirmado con el LLM).
+ * 4. El padre de cada componente es su padre actual si ya lo tenía (puede
+ *    tener hijos fuera del rango, o confirmados por el LLM); si no, la mención
+ *    más antigua. Dos componentes con padre propio no se fusionan, así ningún
+ *    padre existente pasa a ser hijo y no quedan cadenas de más de un nivel.
+ *    Solo se escriben las filas que cambian, en lotes.
+ */
+
+import { prisma } from "@mediabot/shared";
+import {
+  MAX_SHINGLE_DOCUMENT_FREQUENCY,
+  MIN_ITEMS_FOR_DF_FILTER,
+  buildShingles,
+  computeSignature,
+  shingleSimilarity,
+  signatureBands,
+} from "./minhash.js";
+
+/** Jaccard mínimo (shingles de título + resumen) para unir dos menciones sin LLM */
+export const RECLUSTER_MIN_SIMILARITY = 0.5;
+/** Distancia máxima entre publicaciones para considerarlas el mismo evento */
+export const RECLUSTER_MAX_GAP_HOURS = 72;
+/** Buckets más grandes se comparan solo contra vecinos cercanos en el tiempo */
+const MAX_BUCKET_PAIRWISE = 200;
+const BUCKET_NEIGHBOR_WINDOW = 20;
+
+const LOAD_PAGE_SIZE = 5000;
+const UPDATE_BATCH_SIZE = 1000;
+
+export interface ReclusterItem {
+  id: string;
+  title: string;
+  summary: string | null;
+  /** publishedAt ?? createdAt, en ms */
+  timestamp: number;
+  parentMentionId: string | null;
+  clusterScore: number | null;
+  /** Alguna mención (del rango o no) la tiene como padre */
+  hasChildren?: boolean;
+}
+
+export interface ClusterAssignment {
+  parentMentionId: string | null;
+  clusterScore: number | null;
+}
+
+export interface ReclusterReport {
+  clientId: string;
+  mentions: number;
+  candidatePairs: number;
+  clustersBefore: number;
+  clustersAfter: number;
+  clusteredBefore: number;
+  clusteredAfter: number;
+  updated: number;
+  durationMs: number;
+  dryRun: boolean;
+}
+
+/**
+ * Union-find con compresión de caminos y unión por rango.
+ */
+export class UnionFind {
+  private parent: Int32Array;
+  private rank: Uint8Array;
+
+  constructor(size: number) {
+    this.parent = new Int32Array(size);
+    this.rank = new Uint8Array(size);
+    for (let i = 0; i < size; i++) this.parent[i] = i;
+  }
+
+  find(x: number): number {
+    let root = x;
+    while (this.parent[root] !== root) root = this.parent[root];
+    while (this.parent[x] !== root) {
+      const next = this.parent[x];
+      this.parent[x] = root;
+      x = next;
+    }
+    return root;
+  }
+
+  union(a: number, b: number): void {
+    const rootA = this.find(a);
+    const rootB = this.find(b);
+    if (rootA === rootB) return;
+    if (this.rank[rootA] < this.rank[rootB]) {
+      this.parent[rootA] = rootB;
+    } else if (this.rank[rootA] > this.rank[rootB]) {
+      this.parent[rootB] = rootA;
+    } else {
+      this.parent[rootB] = rootA;
+      this.rank[rootA]++;
+    }
+  }
+}
+
+/**
+ * Cuenta clusters (padres con al menos un hijo) y menciones agrupadas.
+ */
+export function countClusters(assignments: Iterable<ClusterAssignment>): { clusters: number; clustered: number } {
+  const parents = new Set<string>();
+  let children = 0;
+  for (const a of assignments) {
+    if (!a.parentMentionId) continue;
+    parents.add(a.parentMentionId);
+    children++;
+  }
+  return { clusters: parents.size, clustered: children + parents.size };
+}
+
+/**
+ * Calcula los clusters de un conjunto de menciones. Retorna la asignación
+ * final de cada mención y el número de pares candidatos evaluados.
+ *
+ * Las menciones cuyo padre actual no está en el conjunto (o está fijo) se
+ * dejan como están, y nunca pasan a ser padre de otra.
+ */
+export function computeClusters(
+  items: ReclusterItem[],
+  options: { minSimilarity?: number; maxGapHours?: number } = {}
+): { assignments: Map<string, ClusterAssignment>; candidatePairs: number } {
+  const minSimilarity = options.minSimilarity ?? RECLUSTER_MIN_SIMILARITY;
+  const maxGapMs = (options.maxGapHours ?? RECLUSTER_MAX_GAP_HOURS) * 60 * 60 * 1000;
+
+  const indexById = new Map(items.map((item, i) => [item.id, i]));
+  const uf = new UnionFind(items.length);
+  // Mejor similitud observada por mención (para clusterScore)
+  const bestScore = new Float64Array(items.length);
+
+  // Fijas: su padre está fuera del rango, o es a su vez una mención fija
+  const fixed = new Set<number>();
+  for (let changed = true; changed; ) {
+    changed = false;
+    items.forEach((item, i) => {
+      if (!item.parentMentionId || fixed.has(i)) return;
+      const parentIndex = indexById.get(item.parentMentionId);
+      if (parentIndex === undefined || fixed.has(parentIndex)) {
+        fixed.add(i);
+        changed = true;
+      }
+    });
+  }
+
+  // Padres actuales: sin padre y con hijos (dentro o fuera del rango)
+  const isExistingRoot = new Uint8Array(items.length);
+  items.forEach((item, i) => {
+    if (item.hasChildren && !item.parentMentionId) isExistingRoot[i] = 1;
+    const parentIndex = item.parentMentionId ? indexById.get(item.parentMentionId) : undefined;
+    if (parentIndex !== undefined && !items[parentIndex].parentMentionId) isExistingRoot[parentIndex] = 1;
+  });
+  // Por raíz del union-find: si el componente ya contiene un padre actual
+  const componentHasRoot = Uint8Array.from(isExistingRoot);
+  const union = (a: number, b: number) => {
+    const hasRoot = componentHasRoot[uf.find(a)] | componentHasRoot[uf.find(b)];
+    uf.union(a, b);
+    componentHasRoot[uf.find(a)] = hasRoot;
+  };
+
+  // Clusters existentes dentro del rango se preservan
+  items.forEach((item, i) => {
+    if (!item.parentMentionId || fixed.has(i)) return;
+    union(i, indexById.get(item.parentMentionId)!);
+    bestScore[i] = Math.max(bestScore[i], item.clusterScore ?? 0);
+  });
+
+  // Shingles sin los términos presentes en casi todas las menciones del
+  // cliente (su nombre, cargo...), que no distinguen eventos y harían que
+  // todo colisione con todo
+  const shingles = items.map((item) => buildShingles(item.title, item.summary));
+  if (items.length >= MIN_ITEMS_FOR_DF_FILTER) {
+    const documentFrequency = new Map<string, number>();
+    for (const set of shingles) {
+      for (const s of set) documentFrequency.set(s, (documentFrequency.get(s) || 0) + 1);
+    }
+    const maxFrequency = items.length * MAX_SHINGLE_DOCUMENT_FREQUENCY;
+    for (const set of shingles) {
+      for (const s of set) {
+        if (documentFrequency.get(s)! > maxFrequency) set.delete(s);
+      }
+    }
+  }
+
+  // Una pasada: firma y buckets LSH
+  const buckets = new Map<string, number[]>();
+  shingles.forEach((set, i) => {
+    if (set.size === 0 || fixed.has(i)) return;
+    for (const band of signatureBands(computeSignature(set))) {
+      const bucket = buckets.get(band);
+      if (bucket) bucket.push(i);
+      else buckets.set(band, [i]);
+    }
+  });
+
+  // Pares candidatos verificados con Jaccard exacto. Los pares ya unidos
+  // (por otra banda o transitivamente) no se vuelven a comparar.
+  let candidatePairs = 0;
+  const tryPair = (a: number, b: number) => {
+    const rootA = uf.find(a);
+    const rootB = uf.find(b);
+    if (rootA === rootB) return;
+    // Fusionar dos clusters con padre propio degradaría a uno de los padres
+    if (componentHasRoot[rootA] && componentHasRoot[rootB]) return;
+    candidatePairs++;
+
+    const similarity = shingleSimilarity(shingles[a], shingles[b]);
+    if (similarity < minSimilarity) return;
+
+    union(a, b);
+    bestScore[a] = Math.max(bestScore[a], similarity);
+    bestScore[b] = Math.max(bestScore[b], similarity);
+  };
+
+  for (const bucket of buckets.values()) {
+    if (bucket.length < 2) continue;
+    // Orden temporal: cada mención solo se compara con las siguientes dentro
+    // de la ventana; en buckets degenerados, además, solo con sus vecinas
+    bucket.sort((a, b) => items[a].timestamp - items[b].timestamp);
+    const window = bucket.length <= MAX_BUCKET_PAIRWISE ? bucket.length : BUCKET_NEIGHBOR_WINDOW;
+    for (let i = 0; i < bucket.length; i++) {
+      const end = Math.min(bucket.length, i + 1 + window);
+      for (let j = i + 1; j < end; j++) {
+        if (items[bucket[j]].timestamp - items[bucket[i]].timestamp > maxGapMs) break;
+        tryPair(bucket[i], bucket[j]);
+      }
+    }
+  }
+
+  // Padre de cada componente: su padre actual si lo tiene; si no, la mención
+  // más antigua (empate por id)
+  const rootParent = new Map<number, number>();
+  items.forEach((item, i) => {
+    if (fixed.has(i)) return;
+    const root = uf.find(i);
+    const current = rootParent.get(root);
+    if (
+      current === undefined ||
+      isExistingRoot[i] > isExistingRoot[current] ||
+      (isExistingRoot[i] === isExistingRoot[current] &&
+        (item.timestamp < items[current].timestamp ||
+          (item.timestamp === items[current].timestamp && item.id < items[current].id)))
+    ) {
+      rootParent.set(root, i);
+    }
+  });
+
+  const assignments = new Map<string, ClusterAssignment>();
+  items.forEach((item, i) => {
+    if (fixed.has(i)) {
+      assignments.set(item.id, { parentMentionId: item.parentMentionId, clusterScore: item.clusterScore });
+      return;
+    }
+    const parentIndex = rootParent.get(uf.find(i))!;
+    if (parentIndex === i) {
+      assignments.set(item.id, { parentMentionId: null, clusterScore: null });
+    } else {
+      assignments.set(item.id, {
+        parentMentionId: items[parentIndex].id,
+        clusterScore: Math.round(bestScore[i] * 1000) / 1000,
+      });
+    }
+  });
+
+  return { assignments, candidatePairs };
+}
+
+async function loadMentions(clientId: string, from: Date, to: Date): Promise<ReclusterItem[]> {
+  const items: ReclusterItem[] = [];
+  let cursor: string | undefined;
+
+  for (;;) {
+    const page = await prisma.mention.findMany({
+      where: { clientId, createdAt: { gte: from, lte: to } },
+      select: {
+        id: true,
+        aiSummary: true,
+        publishedAt: true,
+        createdAt: true,
+        parentMentionId: true,
+        clusterScore: true,
+        article: { select: { title: true } },
+      },
+      orderBy: { id: "asc" },
+      take: LOAD_PAGE_SIZE,
+      ...(cursor ? { cursor: { id: cursor }, skip: 1 } : {}),
+    });
+
+    for (const m of page) {
+      items.push({
+        id: m.id,
+        title: m.article.title,
+        summary: m.aiSummary,
+        timestamp: (m.publishedAt ?? m.createdAt).getTime(),
+        parentMentionId: m.parentMentionId,
+        clusterScore: m.clusterScore,
+      });
+    }
+
+    if (page.length < LOAD_PAGE_SIZE) break;
+    cursor = page[page.length - 1].id;
+  }
+
+  return items;
+}
+
+/**
+ * IDs de menciones del rango que son padre de alguna otra, incluidas las
+ * hijas creadas fuera del rango (que el re-clustering no carga).
+ */
+async function loadClusterParents(clientId: string, from: Date, to: Date): Promise<Set<string>> {
+  const rows = await prisma.$queryRaw<{ id: string }[]>`
+    SELECT DISTINCT c."parentMentionId" AS id
+    FROM "Mention" c
+    JOIN "Mention" p ON p.id = c."parentMentionId"
+    WHERE p."clientId" = ${clientId}
+      AND p."createdAt" >= ${from}
+      AND p."createdAt" <= ${to}
+  `;
+  return new Set(rows.map((row) => row.id));
+}
+
+/**
+ * Escribe las asignaciones en lotes: un UPDATE por lote con arrays (unnest),
+ * así el número de parámetros no depende del tamaño del lote.
+ */
+async function writeAssignments(
+  changes: Array<{ id: string; parentMentionId: string | null; clusterScore: number | null }>
+): Promise<void> {
+  for (let i = 0; i < changes.length; i += UPDATE_BATCH_SIZE) {
+    const batch = changes.slice(i, i + UPDATE_BATCH_SIZE);
+    await prisma.$executeRawUnsafe(
+      `UPDATE "Mention" AS m
+       SET "parentMentionId" = v.parent, "clusterScore" = v.score
+       FROM unnest($1::text[], $2::text[], $3::float8[]) AS v(id, parent, score)
+       WHERE m.id = v.id`,
+      batch.map((c) => c.id),
+      batch.map((c) => c.parentMentionId),
+      batch.map((c) => c.clusterScore)
+    );
+  }
+}
+
+/**
+ * Reconstruye los clusters de un cliente para menciones creadas entre
+ * `from` y `to`. Con `dryRun` solo calcula el reporte.
+ */
+export async function reclusterClientMentions(params: {
+  clientId: string;
+  from: Date;
+  to: Date;
+  dryRun?: boolean;
+  minSimilarity?: number;
+}): Promise<ReclusterReport> {
+  const start = Date.now();
+  const { clientId, from, to, dryRun = false } = params;
+
+  const [items, parents] = await Promise.all([
+    loadMentions(clientId, from, to),
+    loadClusterParents(clientId, from, to),
+  ]);
+  for (const item of items) item.hasChildren = parents.has(item.id);
+  const before = countClusters(items);
+
+  const { assignments, candidatePairs } = computeClusters(items, { minSimilarity: params.minSimilarity });
+  const after = countClusters(assignments.values());
+
+  const changes = items
+    .map((item) => ({ id: item.id, ...assignments.get(item.id)! }))
+    .filter((c, i) => c.parentMentionId !== items[i].parentMentionId);
+
+  if (!dryRun && changes.length > 0) {
+    await writeAssignments(changes);
+  }
+
+  const report: ReclusterReport = {
+    clientId,
+    mentions: items.length,
+    candidatePairs,
+    clustersBefore: before.clusters,
+    clustersAfter: after.clusters,
+    clusteredBefore: before.clustered,
+    clusteredAfter: after.clustered,
+    updated: dryRun ? 0 : changes.length,
+    durationMs: Date.now() - start,
+    dryRun,
+  };
+
+  console.log(
+    `[Recluster] client=${clientId} mentions=${report.mentions} pairs=${candidatePairs} ` +
+      `clusters ${report.clustersBefore} -> ${report.clustersAfter} ` +
+      `(clustered ${report.clusteredBefore} -> ${report.clusteredAfter}), ` +
+      `${dryRun ? `${changes.length} changes (dry run)` : `updated ${report.updated}`} in ${report.durationMs}ms`
+  );
+
+  return report;
+}
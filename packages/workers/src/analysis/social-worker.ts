@@ -9,7 +9,7 @@ import { Worker } from "bullmq";
 import { connection, QUEUE_NAMES, getQueue } from "../queues.js";
 import { prisma, config } from "@mediabot/shared";
 import { analyzeSocialMention, analyzeCommentsSentiment } from "./ai.js";
-import type { SocialComment } from "@mediabot/shared";
+import { breakdownToCounts, deriveCommentsSentiment } from "./comments-aggregate.js";
 import type { Sentiment, Urgency } from "@prisma/client";
 
 // Influencers con alto alcance (umbral de seguidores)
@@ -32,7 +32,7 @@ export function startSocialAnalysisWorker() {
       if (!mention) return;
 
       // Si es análisis de comentarios, procesar diferente
-      if (hasComments && mention.commentsData && !mention.commentsAnalyzed) {
+      if (hasComments && !mention.commentsAnalyzed) {
         return await analyzeCommentsJob(mention);
       }
 
@@ -179,15 +179,20 @@ export async function enqueuePendingSocialAnalysis(): Promise<number> {
 }
 
 /**
- * Analiza los comentarios extraídos de una mención.
- * Se ejecuta después de la extracción de comentarios.
+ * Analiza los comentarios nuevos (aún sin analizar) de una mención.
+ * Se ejecuta después de la extracción de comentarios. El resultado del delta
+ * se suma a los contadores de sentimiento de la mención y el sentimiento
+ * agregado se deriva de ellos, así que el costo depende solo de los nuevos.
  */
 async function analyzeCommentsJob(
   mention: {
     id: string;
     platform: string;
     content: string | null;
-    commentsData: unknown;
+    aiSummary: string | null;
+    commentsPositive: number;
+    commentsNegative: number;
+    commentsNeutral: number;
     analyzed: boolean;
     sourceType: string;
     sourceValue: string;
@@ -202,14 +207,24 @@ async function analyzeCommentsJob(
 ) {
   console.log(`[SocialAnalysis] Analyzing comments for mention ${mention.id}`);
 
-  // Parsear comentarios del JSON
-  const comments = mention.commentsData as SocialComment[];
-  if (!comments || comments.length === 0) {
+  // Solo el delta: comentarios almacenados que aún no se analizaron
+  const comments = await prisma.socialMentionComment.findMany({
+    where: { socialMentionId: mention.id, analyzedAt: null },
+    select: { id: true, text: true, likes: true, authorHandle: true },
+  });
+  if (comments.length === 0) {
     console.log(`[SocialAnalysis] No comments to analyze for mention ${mention.id}`);
+    await prisma.socialMention.update({
+      where: { id: mention.id },
+      data: { commentsAnalyzed: true },
+    });
     return;
   }
 
-  // Ejecutar análisis de sentimiento de comentarios con contexto completo
+  const alreadyAnalyzed =
+    mention.commentsPositive + mention.commentsNegative + mention.commentsNeutral;
+
+  // Ejecutar análisis de sentimiento de los comentarios nuevos con contexto completo
   const analysis = await analyzeCommentsSentiment({
     platform: mention.platform,
     postContent: mention.content,
@@ -218,6 +233,7 @@ async function analyzeCommentsJob(
       likes: c.likes,
       authorHandle: c.authorHandle,
     })),
+    previousPerception: alreadyAnalyzed > 0 ? mention.aiSummary || undefined : undefined,
     clientName: mention.client.name,
     clientDescription: mention.client.description || undefined,
     clientIndustry: mention.client.industry || undefined,
@@ -260,19 +276,50 @@ async function analyzeCommentsJob(
 
   // Combinar resumen: percepción pública de comentarios + resumen del post si existe
   const updatedSummary = analysis.publicPerception;
+  const delta = breakdownToCounts(analysis.sentimentBreakdown, comments.length);
+
+  const overallSentiment = await prisma.$transaction(async (tx) => {
+    // Reclamar el delta antes de sumar: si otro job ya analizó alguno de estos
+    // comentarios, se revierte y el reintento toma solo los que sigan pendientes
+    const claimed = await tx.socialMentionComment.updateMany({
+      where: { id: { in: comments.map((c) => c.id) }, analyzedAt: null },
+      data: { analyzedAt: new Date() },
+    });
+    if (claimed.count !== comments.length) {
+      throw new Error(
+        `Comments of mention ${mention.id} were analyzed concurrently (${claimed.count}/${comments.length} claimed)`
+      );
+    }
 
-  await prisma.socialMention.update({
-    where: { id: mention.id },
-    data: {
-      commentsSentiment: analysis.overallSentiment as Sentiment,
-      commentsAnalyzed: true,
-      aiSummary: updatedSummary,
-      ...postAnalysisData,
-    },
+    const counters = await tx.socialMention.update({
+      where: { id: mention.id },
+      data: {
+        commentsPositive: { increment: delta.positive },
+        commentsNegative: { increment: delta.negative },
+        commentsNeutral: { increment: delta.neutral },
+        commentsAnalyzed: true,
+        aiSummary: updatedSummary,
+        ...postAnalysisData,
+      },
+      select: { commentsPositive: true, commentsNegative: true, commentsNeutral: true },
+    });
+
+    const sentiment = deriveCommentsSentiment({
+      positive: counters.commentsPositive,
+      negative: counters.commentsNegative,
+      neutral: counters.commentsNeutral,
+    });
+
+    await tx.socialMention.update({
+      where: { id: mention.id },
+      data: { commentsSentiment: sentiment },
+    });
+
+    return sentiment;
   });
 
   console.log(
-    `[SocialAnalysis] Comments analyzed for ${mention.id}: ${analysis.overallSentiment}, risk: ${analysis.riskLevel}`
+    `[SocialAnalysis] ${comments.length} new comments analyzed for ${mention.id}: aggregate ${overallSentiment}, risk: ${analysis.riskLevel}`
   );
 
   // Alertas de riesgo alto se manejan via NOTIFY_TOPIC (topic thread pipeline)
@@ -281,7 +328,7 @@ async function analyzeCommentsJob(
   }
 
   return {
-    sentiment: analysis.overallSentiment,
+    sentiment: overallSentiment,
     riskLevel: analysis.riskLevel,
     commentsAnalyzed: comments.length,
   };
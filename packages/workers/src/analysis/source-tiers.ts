@@ -0,0 +1,219 @@
+/**
+ * Índice de alcance de fuentes: tier de SourceTier + lista estática de medios
+ * de alto alcance, cacheado en el proceso.
+ *
+ * La tabla es chica y cambia poco: se lee completa una vez y cada
+ * TIER_CHECK_MS se compara su huella (md5 en SQL); solo se reconstruye el
+ * índice si cambió. Las búsquedas recorren los sufijos del hostname
+ * (edition.cnn.com → cnn.com) en mapas, así que urgencia, SOV, rollup diario
+ * y digest resuelven tier y alcance sin escanear listas ni consultar la BD.
+ */
+import { createHash } from "crypto";
+import { prisma } from "@mediabot/shared";
+
+/** Cada cuánto se verifica si SourceTier cambió */
+const TIER_CHECK_MS = 60 * 1000;
+/** Fuentes con alcance ya resuelto que se recuerdan por índice */
+const MAX_REACH_MEMO = 5000;
+
+// Medios hispanohablantes de alto alcance (además de los tier 1 de SourceTier)
+const HIGH_REACH_DOMAINS = [
+  // España
+  "elpais.com", "elmundo.es", "lavanguardia.com", "abc.es",
+  "20minutos.es", "europapress.es", "efe.com", "rtve.es",
+  "elconfidencial.com",
+  // México
+  "milenio.com", "reforma.com", "expansion.mx", "jornada.com.mx",
+  "eluniversal.com.mx", "excelsior.com.mx", "proceso.com.mx",
+  "sinembargo.mx", "lopezdoriga.com",
+  // Internacional
+  "infobae.com",
+];
+
+/** Marcas internacionales: cuentan como palabra o como etiqueta del dominio */
+const HIGH_REACH_BRANDS = new Set(["cnn", "bbc", "reuters"]);
+
+export interface SourceReachIndex {
+  /** dominio → tier (SourceTier) */
+  tiers: Map<string, number>;
+  /** dominios de alto alcance: lista estática + tier 1 */
+  highReach: Set<string>;
+  /** fuente → alto alcance, ya resuelto */
+  reachMemo: Map<string, boolean>;
+}
+
+interface TierRow {
+  domain: string;
+  tier: number;
+}
+
+let cachedIndex: SourceReachIndex | null = null;
+let cachedFingerprint: string | null = null;
+let checkedAt = 0;
+let loading: Promise<SourceReachIndex> | null = null;
+
+/**
+ * Misma huella que calcula el SQL de loadIndex; las filas vienen ordenadas
+ * por dominio con la collation de la BD.
+ */
+function tierFingerprint(rows: TierRow[]): string {
+  return createHash("md5").update(rows.map((row) => `${row.domain}:${row.tier}`).join(",")).digest("hex");
+}
+
+export function buildSourceReachIndex(rows: TierRow[]): SourceReachIndex {
+  const tiers = new Map(rows.map((row) => [row.domain.toLowerCase(), row.tier]));
+  const highReach = new Set(HIGH_REACH_DOMAINS);
+  for (const [domain, tier] of tiers) {
+    if (tier === 1) highReach.add(domain);
+  }
+  return { tiers, highReach, reachMemo: new Map() };
+}
+
+async function loadIndex(): Promise<SourceReachIndex> {
+  if (cachedIndex && checkedAt > 0) {
+    // Ya cargado: solo reconstruir si la tabla cambió
+    const [{ fingerprint }] = await prisma.$queryRaw<{ fingerprint: string }[]>`
+      SELECT md5(COALESCE(string_agg(domain || ':' || tier, ',' ORDER BY domain), '')) AS fingerprint
+      FROM "SourceTier"
+    `;
+    if (fingerprint === cachedFingerprint) {
+      checkedAt = Date.now();
+      return cachedIndex;
+    }
+  }
+
+  const rows = await prisma.sourceTier.findMany({
+    select: { domain: true, tier: true },
+    orderBy: { domain: "asc" },
+  });
+  cachedIndex = buildSourceReachIndex(rows);
+  cachedFingerprint = tierFingerprint(rows);
+  checkedAt = Date.now();
+  return cachedIndex;
+}
+
+/**
+ * Índice vigente; lo carga (o verifica cambios) si pasó TIER_CHECK_MS.
+ */
+export async function getSourceReachIndex(): Promise<SourceReachIndex> {
+  if (cachedIndex && Date.now() - checkedAt < TIER_CHECK_MS) return cachedIndex;
+
+  if (!loading) {
+    loading = loadIndex().finally(() => {
+      loading = null;
+    });
+  }
+  return loading;
+}
+
+/**
+ * Índice vigente sin esperar a la BD (hot paths). Si no se ha cargado,
+ * responde solo con la lista estática; si venció, lo refresca en segundo plano.
+ */
+export function getSourceReachIndexSync(): SourceReachIndex {
+  if (!cachedIndex || Date.now() - checkedAt >= TIER_CHECK_MS) {
+    getSourceReachIndex().catch((error) => {
+      console.error("[SourceTiers] Failed to refresh source index:", error);
+    });
+  }
+  return cachedIndex ?? (cachedIndex = buildSourceReachIndex([]));
+}
+
+export async function getSourceTierMap(): Promise<Map<string, number>> {
+  return (await getSourceReachIndex()).tiers;
+}
+
+/** Descarta el índice cacheado (la próxima lectura vuelve a la BD) */
+export function invalidateSourceTierMap(): void {
+  cachedIndex = null;
+  cachedFingerprint = null;
+  checkedAt = 0;
+}
+
+/**
+ * Extrae el dominio de una URL o nombre de fuente.
+ */
+export function extractDomain(source: string): string | null {
+  try {
+    // Si ya es un dominio simple
+    if (!source.includes("/") && source.includes(".")) {
+      return source.toLowerCase();
+    }
+    // Si es una URL completa
+    const url = new URL(source.startsWith("http") ? source : `https://${source}`);
+    return url.hostname.replace(/^www\./, "").toLowerCase();
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * Valor del dominio o de su sufijo más específico presente en el mapa
+ * (noticias.eluniversal.com.mx → eluniversal.com.mx).
+ */
+export function lookupDomain<T>(domains: Map<string, T>, domain: string): T | undefined {
+  let candidate = domain.replace(/^www\./, "");
+  for (;;) {
+    const value = domains.get(candidate);
+    if (value !== undefined) return value;
+    const dot = candidate.indexOf(".");
+    if (dot === -1) return undefined;
+    candidate = candidate.slice(dot + 1);
+  }
+}
+
+function hasDomainSuffix(domains: Set<string>, domain: string): boolean {
+  let candidate = domain.replace(/^www\./, "");
+  for (;;) {
+    if (domains.has(candidate)) return true;
+    const dot = candidate.indexOf(".");
+    if (dot === -1) return false;
+    candidate = candidate.slice(dot + 1);
+  }
+}
+
+/**
+ * Peso de un tier: Tier 1 (nacionales) = 3x, Tier 2 (regionales) = 2x,
+ * Tier 3 (digitales) o sin tier = 1x.
+ */
+export function tierWeight(tier: number | undefined): number {
+  switch (tier) {
+    case 1:
+      return 3; // Medios nacionales
+    case 2:
+      return 2; // Medios regionales
+    default:
+      return 1; // Digitales/blogs
+  }
+}
+
+/** Peso de una fuente según el mapa de tiers */
+export function sourceWeight(source: string, tiers: Map<string, number>): number {
+  const domain = extractDomain(source);
+  return domain ? tierWeight(lookupDomain(tiers, domain)) : 1;
+}
+
+/**
+ * Si la fuente es de alto alcance. Acepta dominios, URLs o texto libre
+ * ("BBC Mundo", "El País via elpais.com"): cada palabra se prueba como
+ * dominio (por sufijo) y como marca.
+ */
+export function isHighReachSource(source: string, index: SourceReachIndex): boolean {
+  const memo = index.reachMemo.get(source);
+  if (memo !== undefined) return memo;
+
+  let highReach = false;
+  for (const word of source.toLowerCase().split(/\s+/)) {
+    if (!word) continue;
+    const domain = word.includes(".") ? extractDomain(word) : null;
+    const labels = domain ? domain.split(".") : word.split(/[^a-z0-9]+/);
+    if ((domain && hasDomainSuffix(index.highReach, domain)) || labels.some((l) => HIGH_REACH_BRANDS.has(l))) {
+      highReach = true;
+      break;
+    }
+  }
+
+  if (index.reachMemo.size >= MAX_REACH_MEMO) index.reachMemo.clear();
+  index.reachMemo.set(source, highReach);
+  return highReach;
+}
@@ -1,4 +1,5 @@
 import { prisma } from "@mediabot/shared";
+import { getSourceTierMap, sourceWeight } from "./source-tiers.js";
 
 export interface SOVResult {
   clientId: string;
@@ -28,47 +29,43 @@ export interface SOVHistory {
   mentions: number;
 }
 
-/**
- * Obtiene el peso de una fuente basado en su tier.
- * Tier 1 (nacionales) = 3x, Tier 2 (regionales) = 2x, Tier 3 (digitales) = 1x
- */
-async function getSourceWeight(source: string): Promise<number> {
-  const domain = extractDomain(source);
-  if (!domain) return 1;
-
-  const sourceTier = await prisma.sourceTier.findUnique({
-    where: { domain },
-  });
+/** Menciones de un cliente en una fuente (una fila del agregado) */
+export interface SourceCountRow {
+  clientId: string;
+  source: string;
+  count: number;
+}
 
-  if (!sourceTier) return 1;
-
-  // Invertir el tier para que tier 1 tenga más peso
-  switch (sourceTier.tier) {
-    case 1:
-      return 3; // Medios nacionales
-    case 2:
-      return 2; // Medios regionales
-    case 3:
-    default:
-      return 1; // Digitales/blogs
-  }
+export interface MentionWeights {
+  count: number;
+  weighted: number;
 }
 
 /**
- * Extrae el dominio de una URL o nombre de fuente.
+ * Suma conteos y menciones ponderadas por cliente. Cada fuente distinta se
+ * resuelve una sola vez contra el mapa de tiers.
  */
-function extractDomain(source: string): string | null {
-  try {
-    // Si ya es un dominio simple
-    if (!source.includes("/") && source.includes(".")) {
-      return source.toLowerCase();
+export function weighSourceCounts(
+  rows: SourceCountRow[],
+  tiers: Map<string, number>
+): Map<string, MentionWeights> {
+  const weights = new Map<string, number>();
+  const totals = new Map<string, MentionWeights>();
+
+  for (const row of rows) {
+    let weight = weights.get(row.source);
+    if (weight === undefined) {
+      weight = sourceWeight(row.source, tiers);
+      weights.set(row.source, weight);
     }
-    // Si es una URL completa
-    const url = new URL(source.startsWith("http") ? source : `https://${source}`);
-    return url.hostname.replace(/^www\./, "").toLowerCase();
-  } catch {
-    return null;
+
+    const total = totals.get(row.clientId) ?? { count: 0, weighted: 0 };
+    total.count += row.count;
+    total.weighted += row.count * weight;
+    totals.set(row.clientId, total);
   }
+
+  return totals;
 }
 
 /**
@@ -105,37 +102,40 @@ export async function calculateSOV(
   });
   const competitorNames = clientCompetitors.map((cc) => cc.competitor.name);
 
-  // Calcular menciones del cliente
-  const clientMentions = await getMentionsWithWeights(clientId, startDate, endDate);
-
-  // Calcular menciones de competidores
-  const competitorResults: SOVResult[] = [];
-
-  if (includeCompetitors && competitorNames.length > 0) {
-    // Buscar clientes que coincidan con los nombres de competidores
-    const competitorClients = await prisma.client.findMany({
-      where: {
-        orgId: client.orgId,
-        OR: competitorNames.map((name) => ({
-          name: { contains: name, mode: "insensitive" as const },
-        })),
-        active: true,
-        id: { not: clientId },
-      },
-    });
-
-    for (const competitor of competitorClients) {
-      const compMentions = await getMentionsWithWeights(competitor.id, startDate, endDate);
-      competitorResults.push({
-        clientId: competitor.id,
-        clientName: competitor.name,
-        mentions: compMentions.count,
-        sov: 0, // Se calcula después
-        weightedMentions: compMentions.weighted,
-        weightedSov: 0,
-      });
-    }
-  }
+  // Buscar clientes que coincidan con los nombres de competidores
+  const competitorClients =
+    includeCompetitors && competitorNames.length > 0
+      ? await prisma.client.findMany({
+          where: {
+            orgId: client.orgId,
+            OR: competitorNames.map((name) => ({
+              name: { contains: name, mode: "insensitive" as const },
+            })),
+            active: true,
+            id: { not: clientId },
+          },
+        })
+      : [];
+
+  // Menciones del cliente y sus competidores en una sola consulta
+  const weights = await getMentionsWithWeights(
+    [clientId, ...competitorClients.map((c) => c.id)],
+    startDate,
+    endDate
+  );
+  const clientMentions = weights.get(clientId) ?? { count: 0, weighted: 0 };
+
+  const competitorResults: SOVResult[] = competitorClients.map((competitor) => {
+    const compMentions = weights.get(competitor.id) ?? { count: 0, weighted: 0 };
+    return {
+      clientId: competitor.id,
+      clientName: competitor.name,
+      mentions: compMentions.count,
+      sov: 0, // Se calcula después
+      weightedMentions: compMentions.weighted,
+      weightedSov: 0,
+    };
+  });
 
   // Calcular totales
   const total = clientMentions.count + competitorResults.reduce((sum, c) => sum + c.mentions, 0);
@@ -172,87 +172,100 @@ export async function calculateSOV(
 }
 
 /**
- * Obtiene menciones de un cliente con pesos calculados por tier de fuente.
+ * Menciones y menciones ponderadas por tier de varios clientes con una sola
+ * consulta agregada por (cliente, fuente).
  */
 async function getMentionsWithWeights(
-  clientId: string,
+  clientIds: string[],
   startDate: Date,
   endDate: Date
-): Promise<{ count: number; weighted: number }> {
-  const mentions = await prisma.mention.findMany({
-    where: {
-      clientId,
-      publishedAt: {
-        gte: startDate,
-        lte: endDate,
-      },
-    },
-    include: {
-      article: {
-        select: {
-          source: true,
-        },
-      },
-    },
-  });
-
-  let weighted = 0;
-  for (const mention of mentions) {
-    const weight = await getSourceWeight(mention.article.source);
-    weighted += weight;
-  }
+): Promise<Map<string, MentionWeights>> {
+  if (clientIds.length === 0) return new Map();
+
+  const [rows, tiers] = await Promise.all([
+    prisma.$queryRaw<SourceCountRow[]>`
+      SELECT m."clientId", a.source, COUNT(*)::int AS count
+      FROM "Mention" m
+      JOIN "Article" a ON a.id = m."articleId"
+      WHERE m."clientId" = ANY(${clientIds})
+      AND m."publishedAt" >= ${startDate}
+      AND m."publishedAt" <= ${endDate}
+      GROUP BY m."clientId", a.source
+    `,
+    getSourceTierMap(),
+  ]);
+
+  return weighSourceCounts(rows, tiers);
+}
 
-  return {
-    count: mentions.length,
-    weighted,
-  };
+/** Menciones de una semana del histórico en una fuente: del cliente y de toda la org */
+interface WeekSourceRow {
+  week: number;
+  source: string;
+  count: number;
+  orgCount: number;
 }
 
+const WEEK_MS = 7 * 24 * 60 * 60 * 1000;
+
 /**
- * Obtiene el histórico de SOV para un cliente (últimas N semanas).
+ * Obtiene el histórico de SOV para un cliente (últimas N semanas de 7 días
+ * que terminan hoy). Una sola consulta agrupada por (semana, fuente) cuenta
+ * las menciones del cliente y las de su organización.
  */
 export async function getSOVHistory(
   clientId: string,
   weeks: number = 8
 ): Promise<SOVHistory[]> {
-  const history: SOVHistory[] = [];
-  const now = new Date();
-
   // Obtener cliente para acceder a orgId
   const client = await prisma.client.findUnique({
     where: { id: clientId },
     select: { orgId: true },
   });
 
-  if (!client) return history;
+  if (!client) return [];
+
+  const rangeEnd = new Date();
+  rangeEnd.setHours(24, 0, 0, 0); // Fin de hoy (exclusivo)
+  const rangeStart = new Date(rangeEnd.getTime() - weeks * WEEK_MS);
+
+  // week 0 = la semana que termina hoy
+  const [rows, tiers] = await Promise.all([
+    prisma.$queryRaw<WeekSourceRow[]>`
+      SELECT (CEIL(EXTRACT(EPOCH FROM (${rangeEnd} - m."publishedAt")) * 1000 / ${WEEK_MS}) - 1)::int AS week,
+             a.source,
+             (COUNT(*) FILTER (WHERE m."clientId" = ${clientId}))::int AS count,
+             COUNT(*)::int AS "orgCount"
+      FROM "Mention" m
+      JOIN "Client" c ON c.id = m."clientId"
+      JOIN "Article" a ON a.id = m."articleId"
+      WHERE c."orgId" = ${client.orgId}
+      AND m."publishedAt" >= ${rangeStart}
+      AND m."publishedAt" < ${rangeEnd}
+      GROUP BY 1, 2
+    `,
+    getSourceTierMap(),
+  ]);
+
+  // Cada semana se pondera como un "cliente" de weighSourceCounts
+  const clientWeeks = weighSourceCounts(
+    rows.map((row) => ({ clientId: String(row.week), source: row.source, count: row.count })),
+    tiers
+  );
+  const orgTotals = new Map<number, number>();
+  for (const row of rows) {
+    orgTotals.set(row.week, (orgTotals.get(row.week) ?? 0) + row.orgCount);
+  }
 
+  const history: SOVHistory[] = [];
   for (let i = weeks - 1; i >= 0; i--) {
-    const weekEnd = new Date(now);
-    weekEnd.setDate(weekEnd.getDate() - i * 7);
-    weekEnd.setHours(23, 59, 59, 999);
-
-    const weekStart = new Date(weekEnd);
-    weekStart.setDate(weekStart.getDate() - 7);
-    weekStart.setHours(0, 0, 0, 0);
-
-    // Calcular menciones del cliente en esta semana específica
-    const clientMentions = await getMentionsWithWeights(clientId, weekStart, weekEnd);
-
-    // Calcular total de menciones de la org en esta semana
-    const totalMentions = await prisma.mention.count({
-      where: {
-        client: { orgId: client.orgId },
-        publishedAt: { gte: weekStart, lte: weekEnd },
-      },
-    });
-
-    const sov = totalMentions > 0 ? (clientMentions.count / totalMentions) * 100 : 0;
-    const weightedSov = totalMentions > 0 ? (clientMentions.weighted / totalMentions) * 100 : 0;
+    const clientMentions = clientWeeks.get(String(i)) ?? { count: 0, weighted: 0 };
+    const totalMentions = orgTotals.get(i) ?? 0;
 
     history.push({
-      date: weekStart,
-      sov,
-      weightedSov,
+      date: new Date(rangeEnd.getTime() - (i + 1) * WEEK_MS),
+      sov: totalMentions > 0 ? (clientMentions.count / totalMentions) * 100 : 0,
+      weightedSov: totalMentions > 0 ? (clientMentions.weighted / totalMentions) * 100 : 0,
       mentions: clientMentions.count,
     });
   }
@@ -264,6 +277,10 @@ export async function getSOVHistory(
  * Calcula el SOV de todos los clientes activos de una organización.
  */
 export async function calculateOrgSOV(orgId: string, days: number = 30): Promise<SOVResult[]> {
+  if (days < 1 || days > 365) {
+    throw new Error("Days must be between 1 and 365");
+  }
+
   const clients = await prisma.client.findMany({
     where: {
       orgId,
@@ -271,19 +288,30 @@ export async function calculateOrgSOV(orgId: string, days: number = 30): Promise
     },
   });
 
-  const results: SOVResult[] = [];
-  let totalMentions = 0;
-  let totalWeighted = 0;
+  const endDate = new Date();
+  const startDate = new Date();
+  startDate.setDate(startDate.getDate() - days);
 
-  // Primera pasada: contar menciones
-  for (const client of clients) {
-    const sovData = await calculateSOV(client.id, days, false);
-    results.push(sovData.client);
-    totalMentions += sovData.client.mentions;
-    totalWeighted += sovData.client.weightedMentions;
-  }
+  const weights = await getMentionsWithWeights(
+    clients.map((c) => c.id),
+    startDate,
+    endDate
+  );
+
+  const results: SOVResult[] = clients.map((client) => {
+    const mentions = weights.get(client.id) ?? { count: 0, weighted: 0 };
+    return {
+      clientId: client.id,
+      clientName: client.name,
+      mentions: mentions.count,
+      sov: 0,
+      weightedMentions: mentions.weighted,
+      weightedSov: 0,
+    };
+  });
+  const totalMentions = results.reduce((sum, r) => sum + r.mentions, 0);
+  const totalWeighted = results.reduce((sum, r) => sum + r.weightedMentions, 0);
 
-  // Segunda pasada: calcular SOV
   for (const result of results) {
     result.sov = totalMentions > 0 ? (result.mentions / totalMentions) * 100 : 0;
     result.weightedSov = totalWeighted > 0 ? (result.weightedMentions / totalWeighted) * 100 : 0;
@@ -0,0 +1,142 @@
+/**
+ * Estadísticas incrementales de TopicThread (funciones puras).
+ *
+ * Cada mención nueva suma 1 a su bucket de sentimiento y a su fuente; el
+ * sentimiento dominante se deriva de los contadores. Las fuentes se llevan en
+ * un sketch Space-Saving acotado (SOURCE_SKETCH_CAPACITY entradas): las fuentes
+ * frecuentes siempre quedan, y una fuente nueva desplaza a la de menor conteo
+ * heredando ese conteo + 1 (cota superior del real).
+ */
+
+export const SOURCE_SKETCH_CAPACITY = 20;
+export const TOP_SOURCES_LIMIT = 10;
+
+export type SentimentBreakdown = {
+  positive: number;
+  negative: number;
+  neutral: number;
+  mixed: number;
+};
+
+/** fuente → conteo estimado */
+export type SourceSketch = Record<string, number>;
+
+export function emptyBreakdown(): SentimentBreakdown {
+  return { positive: 0, negative: 0, neutral: 0, mixed: 0 };
+}
+
+/** Clave del bucket para un Sentiment (POSITIVE → "positive"), o null si no aplica */
+export function breakdownKey(sentiment: string | null): keyof SentimentBreakdown | null {
+  if (!sentiment) return null;
+  const key = sentiment.toLowerCase();
+  return key in emptyBreakdown() ? (key as keyof SentimentBreakdown) : null;
+}
+
+/**
+ * Sentimiento dominante. En empate gana POSITIVE, luego NEGATIVE, MIXED y
+ * NEUTRAL (mismo orden que el recálculo completo original).
+ */
+export function dominantSentimentOf(breakdown: SentimentBreakdown): string {
+  const total = breakdown.positive + breakdown.negative + breakdown.neutral + breakdown.mixed;
+  if (total === 0) return "NEUTRAL";
+
+  const max = Math.max(breakdown.positive, breakdown.negative, breakdown.neutral, breakdown.mixed);
+  if (max === breakdown.positive) return "POSITIVE";
+  if (max === breakdown.negative) return "NEGATIVE";
+  if (max === breakdown.mixed) return "MIXED";
+  return "NEUTRAL";
+}
+
+/**
+ * Suma una ocurrencia de `source` al sketch (retorna una copia).
+ */
+export function addToSourceSketch(
+  sketch: SourceSketch,
+  source: string,
+  capacity: number = SOURCE_SKETCH_CAPACITY
+): SourceSketch {
+  const next = { ...sketch };
+  if (Object.prototype.hasOwnProperty.call(next, source)) {
+    next[source]++;
+    return next;
+  }
+
+  const entries = Object.keys(next);
+  if (entries.length < capacity) {
+    next[source] = 1;
+    return next;
+  }
+
+  // Space-Saving: reemplazar la fuente con menor conteo
+  let minSource = entries[0];
+  for (const candidate of entries) {
+    if (next[candidate] < next[minSource]) minSource = candidate;
+  }
+  const minCount = next[minSource];
+  delete next[minSource];
+  next[source] = minCount + 1;
+  return next;
+}
+
+/** Fuentes ordenadas por conteo (desempate alfabético) */
+export function topSourcesOf(sketch: SourceSketch, limit: number = TOP_SOURCES_LIMIT): string[] {
+  return Object.entries(sketch)
+    .sort((a, b) => b[1] - a[1] || a[0].localeCompare(b[0]))
+    .slice(0, limit)
+    .map(([source]) => source);
+}
+
+/**
+ * Sketch exacto a partir de conteos reales (reconciliación): las
+ * `capacity` fuentes con más menciones.
+ */
+export function sketchFromCounts(
+  counts: Map<string, number>,
+  capacity: number = SOURCE_SKETCH_CAPACITY
+): SourceSketch {
+  const sketch: SourceSketch = {};
+  for (const [source, count] of [...counts.entries()]
+    .sort((a, b) => b[1] - a[1] || a[0].localeCompare(b[0]))
+    .slice(0, capacity)) {
+    sketch[source] = count;
+  }
+  return sketch;
+}
+
+/**
+ * Sketch guardado en el thread; los threads anteriores al sketch se
+ * siembran con su lista de fuentes (conteo 1) hasta la próxima reconciliación.
+ */
+export function parseSourceSketch(sketch: unknown, topSources: unknown): SourceSketch {
+  if (sketch && typeof sketch === "object" && !Array.isArray(sketch)) {
+    return { ...(sketch as SourceSketch) };
+  }
+  const seeded: SourceSketch = {};
+  if (Array.isArray(topSources)) {
+    for (const source of topSources) {
+      if (typeof source === "string") seeded[source] = 1;
+    }
+  }
+  return seeded;
+}
+
+/** Compara un sketch guardado (jsonb reordena las claves) con uno calculado */
+export function sameSketch(stored: unknown, sketch: SourceSketch): boolean {
+  if (!stored || typeof stored !== "object" || Array.isArray(stored)) return Object.keys(sketch).length === 0;
+  const entries = Object.entries(stored as SourceSketch);
+  return (
+    entries.length === Object.keys(sketch).length &&
+    entries.every(([source, count]) => sketch[source] === count)
+  );
+}
+
+export function parseBreakdown(value: unknown): SentimentBreakdown {
+  const breakdown = emptyBreakdown();
+  if (value && typeof value === "object") {
+    for (const key of Object.keys(breakdown) as (keyof SentimentBreakdown)[]) {
+      const n = Number((value as Record<string, unknown>)[key]);
+      if (Number.isFinite(n)) breakdown[key] = n;
+    }
+  }
+  return breakdown;
+}
@@ -1,6 +1,19 @@
 import { prisma } from "@mediabot/shared";
 import { extractTopic } from "./ai";
 import { assignMentionToThread } from "./topic-thread-manager.js";
+import { connection } from "../queues.js";
+import { findMatchingTopic, topicKey } from "./topic-key.js";
+
+const CANDIDATES_KEY_PREFIX = "topics:candidates:";
+/** TTL corto: además se invalida al crear un tema nuevo en la org */
+const CANDIDATES_TTL_SECONDS = 5 * 60;
+const CANDIDATES_LIMIT = 50;
+const CANDIDATES_LOOKBACK_DAYS = 30;
+
+export interface CandidateTopic {
+  id: string;
+  name: string;
+}
 
 /**
  * Procesa una mencion para extraer y asignar su tema.
@@ -20,18 +33,14 @@ export async function processMentionTopic(mentionId: string): Promise<string | n
   }
 
   // Obtener temas existentes para mejorar consistencia
-  const existingTopics = await prisma.topicCluster.findMany({
-    select: { name: true },
-    orderBy: { count: "desc" },
-    take: 50,
-  }) as { name: string }[];
+  const existingTopics = await getExistingTopicNames(mention.client.orgId);
 
   try {
     const result = await extractTopic({
       articleTitle: mention.article.title,
       articleContent: mention.article.content || "",
       clientName: mention.client.name,
-      existingTopics: existingTopics.map((t) => t.name),
+      existingTopics,
     });
 
     if (result.confidence < 0.3) {
@@ -39,77 +48,150 @@ export async function processMentionTopic(mentionId: string): Promise<string | n
       return null;
     }
 
-    // Buscar o crear el cluster de tema usando transacción para evitar race conditions
-    const normalizedTopic = normalizeTopic(result.topic);
+    return await applyMentionTopic(mentionId, result.topic, mention.client.orgId);
+  } catch (error) {
+    console.error(`[TopicExtractor] Error procesando mencion ${mentionId}:`, error);
+    return null;
+  }
+}
 
-    const topicCluster = await prisma.$transaction(async (tx) => {
-      // Intentar encontrar cluster existente
-      let cluster = await tx.topicCluster.findFirst({
-        where: {
-          name: {
-            equals: normalizedTopic,
-            mode: "insensitive",
-          },
-        },
-      });
+/**
+ * Temas más usados por la org en los últimos 30 días, cacheados en Redis.
+ * Las orgs sin temas todavía usan los más usados globalmente.
+ */
+export async function getCandidateTopics(orgId: string): Promise<CandidateTopic[]> {
+  const key = `${CANDIDATES_KEY_PREFIX}${orgId}`;
+  const cached = await connection.get(key);
+  if (cached) return JSON.parse(cached) as CandidateTopic[];
+
+  const since = new Date(Date.now() - CANDIDATES_LOOKBACK_DAYS * 24 * 60 * 60 * 1000);
+  let topics = await prisma.$queryRaw<CandidateTopic[]>`
+    SELECT tc.id, tc.name
+    FROM "Mention" m
+    JOIN "Client" c ON c.id = m."clientId"
+    JOIN "TopicCluster" tc ON tc.id = m."topicClusterId"
+    WHERE c."orgId" = ${orgId}
+      AND m."createdAt" >= ${since}
+    GROUP BY tc.id, tc.name
+    ORDER BY COUNT(*) DESC
+    LIMIT ${CANDIDATES_LIMIT}
+  `;
 
-      // Crear si no existe
-      if (!cluster) {
-        try {
-          cluster = await tx.topicCluster.create({
-            data: {
-              name: normalizedTopic,
-              count: 0,
-            },
-          });
-          console.log(`[TopicExtractor] Nuevo cluster creado: ${normalizedTopic}`);
-        } catch {
-          // Si falla por unique constraint, otro worker lo creó primero
-          cluster = await tx.topicCluster.findFirst({
-            where: { name: { equals: normalizedTopic, mode: "insensitive" } },
-          });
-        }
-      }
+  if (topics.length === 0) {
+    topics = await prisma.topicCluster.findMany({
+      select: { id: true, name: true },
+      orderBy: { count: "desc" },
+      take: CANDIDATES_LIMIT,
+    });
+  }
 
-      if (!cluster) {
-        throw new Error(`No se pudo crear/encontrar cluster para: ${normalizedTopic}`);
-      }
+  await connection.set(key, JSON.stringify(topics), "EX", CANDIDATES_TTL_SECONDS);
+  return topics;
+}
 
-      // Actualizar la mención con el tema
-      await tx.mention.update({
-        where: { id: mentionId },
-        data: {
-          topic: normalizedTopic,
-          topicClusterId: cluster.id,
-        },
+/** Fuerza a recalcular los candidatos de la org en la próxima mención */
+export async function invalidateCandidateTopics(orgId: string): Promise<void> {
+  await connection.del(`${CANDIDATES_KEY_PREFIX}${orgId}`);
+}
+
+/**
+ * Nombres de temas existentes de la org para guiar a la IA hacia temas reutilizables.
+ */
+export async function getExistingTopicNames(orgId: string): Promise<string[]> {
+  const topics = await getCandidateTopics(orgId);
+  return topics.map((t) => t.name);
+}
+
+/**
+ * Asigna un tema ya extraído a una mención: busca o crea el TopicCluster,
+ * actualiza la mención y la asigna a su TopicThread. Lo usa también el análisis
+ * combinado, que obtiene el tema en la misma llamada de IA.
+ *
+ * El cluster se resuelve por clave normalizada (índice único), luego por
+ * similitud contra los candidatos de la org, y por último por nombre sin
+ * distinguir mayúsculas (clusters previos a la clave). Si se fusiona con un tema existente, la
+ * mención queda con el nombre de ese tema.
+ */
+export async function applyMentionTopic(mentionId: string, topic: string, orgId: string): Promise<string> {
+  const normalizedTopic = normalizeTopic(topic);
+  const key = topicKey(normalizedTopic);
+  const similar = findMatchingTopic(normalizedTopic, await getCandidateTopics(orgId));
+
+  // Buscar o crear el cluster de tema usando transacción para evitar race conditions
+  const topicCluster = await prisma.$transaction(async (tx) => {
+    let cluster = await tx.topicCluster.findUnique({ where: { normalizedKey: key } });
+
+    if (!cluster && similar) {
+      cluster = await tx.topicCluster.findUnique({ where: { id: similar.id } });
+    }
+    if (!cluster) {
+      // Los clusters legacy guardan el nombre tal como se creó (no siempre en Title Case)
+      cluster = await tx.topicCluster.findFirst({
+        where: { name: { equals: normalizedTopic, mode: "insensitive" }, normalizedKey: null },
       });
+    }
 
-      // Incrementar contador del cluster
-      await tx.topicCluster.update({
-        where: { id: cluster.id },
-        data: { count: { increment: 1 } },
+    if (cluster && !cluster.normalizedKey) {
+      // Cluster previo a la clave: guardarla si ningún otro la tiene
+      const clusterKey = topicKey(cluster.name);
+      await tx.$executeRaw`
+        UPDATE "TopicCluster" SET "normalizedKey" = ${clusterKey}
+        WHERE id = ${cluster.id}
+          AND NOT EXISTS (SELECT 1 FROM "TopicCluster" WHERE "normalizedKey" = ${clusterKey})
+      `;
+    }
+
+    // Crear si no existe (upsert sobre el unique: otro worker pudo crearlo primero)
+    if (!cluster) {
+      cluster = await tx.topicCluster.upsert({
+        where: { normalizedKey: key },
+        create: { name: normalizedTopic, normalizedKey: key, count: 0 },
+        update: {},
       });
+      if (cluster.count === 0) {
+        console.log(`[TopicExtractor] Nuevo cluster creado: ${normalizedTopic}`);
+      }
+    }
 
-      return cluster;
+    // Actualizar la mención con el tema
+    await tx.mention.update({
+      where: { id: mentionId },
+      data: {
+        topic: cluster.name,
+        topicClusterId: cluster.id,
+      },
     });
 
-    console.log(`[TopicExtractor] Tema asignado: ${normalizedTopic} -> mencion ${mentionId}`);
+    // Incrementar contador del cluster
+    await tx.topicCluster.update({
+      where: { id: cluster.id },
+      data: { count: { increment: 1 } },
+    });
 
-    // Asignar mención al TopicThread correspondiente (Sprint 19)
-    try {
-      const threadResult = await assignMentionToThread(mentionId, "mention");
-      if (threadResult) {
-        console.log(`[TopicExtractor] Mención ${mentionId} asignada a thread ${threadResult.threadId}`);
-      }
-    } catch (threadError) {
-      console.error(`[TopicExtractor] Error asignando thread para mención ${mentionId}:`, threadError);
-    }
+    return cluster;
+  });
 
-    return normalizedTopic;
-  } catch (error) {
-    console.error(`[TopicExtractor] Error procesando mencion ${mentionId}:`, error);
-    return null;
+  // Tema nuevo: refrescar los candidatos de la org para que lo vean las siguientes menciones
+  if (topicCluster.count === 0) {
+    await invalidateCandidateTopics(orgId);
+  }
+
+  if (topicCluster.name !== normalizedTopic) {
+    console.log(`[TopicExtractor] Tema "${normalizedTopic}" fusionado con "${topicCluster.name}"`);
+  }
+  console.log(`[TopicExtractor] Tema asignado: ${topicCluster.name} -> mencion ${mentionId}`);
+
+  // Asignar mención al TopicThread correspondiente (Sprint 19)
+  try {
+    const threadResult = await assignMentionToThread(mentionId, "mention");
+    if (threadResult) {
+      console.log(`[TopicExtractor] Mención ${mentionId} asignada a thread ${threadResult.threadId}`);
+    }
+  } catch (threadError) {
+    console.error(`[TopicExtractor] Error asignando thread para mención ${mentionId}:`, threadError);
   }
+
+  return topicCluster.name;
 }
 
 /**
@@ -147,18 +229,15 @@ export async function processSocialMentionTopic(socialMentionId: string): Promis
   }
 
   // Obtener temas existentes para consistencia
-  const existingTopics = await prisma.topicCluster.findMany({
-    select: { name: true },
-    orderBy: { count: "desc" },
-    take: 50,
-  }) as { name: string }[];
+  const candidates = await getCandidateTopics(socialMention.client.orgId);
+  const existingTopics = candidates.map((t) => t.name);
 
   try {
     const result = await extractTopic({
       articleTitle: (socialMention.content || "").slice(0, 100),
       articleContent: socialMention.content || "",
       clientName: socialMention.client.name,
-      existingTopics: existingTopics.map((t) => t.name),
+      existingTopics,
     });
 
     if (result.confidence < 0.3) {
@@ -166,7 +245,9 @@ export async function processSocialMentionTopic(socialMentionId: string): Promis
       return null;
     }
 
-    const normalizedTopic = normalizeTopic(result.topic);
+    // Variantes de un tema existente de la org usan su nombre (mismo thread)
+    const extracted = normalizeTopic(result.topic);
+    const normalizedTopic = findMatchingTopic(extracted, candidates)?.name ?? extracted;
 
     // Guardar topic en SocialMention
     await prisma.socialMention.update({
@@ -193,53 +274,63 @@ export async function processSocialMentionTopic(socialMentionId: string): Promis
   }
 }
 
+export interface EmergingTopic {
+  topic: string;
+  /** Menciones en la ventana actual */
+  count: number;
+  /** Menciones en la semana previa a la ventana */
+  baselineCount: number;
+  /** Tasa actual / tasa de la semana previa (suavizado +1); >= count + 1 si es nuevo */
+  growth: number;
+  isNew: boolean;
+}
+
+/**
+ * Crecimiento de un tema: menciones de la ventana contra las esperadas según
+ * la tasa de la línea base, con suavizado +1 para temas sin historia.
+ */
+export function topicGrowth(count: number, baselineCount: number, windowHours: number, baselineHours: number): number {
+  const expected = baselineHours > 0 ? (baselineCount * windowHours) / baselineHours : 0;
+  return (count + 1) / (expected + 1);
+}
+
 /**
  * Detecta temas emergentes (>= umbral de menciones en las ultimas horas).
+ * Una sola consulta con agregación condicional cuenta la ventana actual y la
+ * semana previa por tema, ambas sobre COALESCE(publishedAt, createdAt).
+ * Ordenados por crecimiento.
  */
 export async function detectEmergingTopics(
   orgId: string,
   hoursBack: number = 24,
   threshold: number = 3
-): Promise<Array<{ topic: string; count: number; isNew: boolean }>> {
+): Promise<EmergingTopic[]> {
   const since = new Date(Date.now() - hoursBack * 60 * 60 * 1000);
   const weekAgo = new Date(Date.now() - 7 * 24 * 60 * 60 * 1000);
+  const baselineHours = Math.max(7 * 24 - hoursBack, 0);
 
-  // Temas con >= threshold menciones en el periodo
-  const recentTopics = await prisma.$queryRaw<{ topic: string; count: bigint }[]>`
-    SELECT m.topic, COUNT(*) as count
+  const rows = await prisma.$queryRaw<{ topic: string; count: number; baselineCount: number }[]>`
+    SELECT m.topic,
+           COUNT(*) FILTER (WHERE COALESCE(m."publishedAt", m."createdAt") >= ${since})::int AS count,
+           COUNT(*) FILTER (WHERE COALESCE(m."publishedAt", m."createdAt") < ${since})::int AS "baselineCount"
     FROM "Mention" m
     JOIN "Client" c ON m."clientId" = c.id
     WHERE c."orgId" = ${orgId}
-    AND COALESCE(m."publishedAt", m."createdAt") >= ${since}
+    AND COALESCE(m."publishedAt", m."createdAt") >= ${weekAgo}
     AND m.topic IS NOT NULL
     GROUP BY m.topic
-    HAVING COUNT(*) >= ${threshold}
-    ORDER BY count DESC
+    HAVING COUNT(*) FILTER (WHERE COALESCE(m."publishedAt", m."createdAt") >= ${since}) >= ${threshold}
   `;
 
-  // Verificar cuales son nuevos (no existian hace una semana)
-  const emergingTopics = [];
-
-  for (const topic of recentTopics) {
-    const previousCount = await prisma.mention.count({
-      where: {
-        client: { orgId },
-        topic: topic.topic,
-        publishedAt: {
-          gte: weekAgo,
-          lt: since,
-        },
-      },
-    });
-
-    emergingTopics.push({
-      topic: topic.topic,
-      count: Number(topic.count),
-      isNew: previousCount === 0,
-    });
-  }
-
-  return emergingTopics;
+  return rows
+    .map((row) => ({
+      topic: row.topic,
+      count: row.count,
+      baselineCount: row.baselineCount,
+      growth: topicGrowth(row.count, row.baselineCount, hoursBack, baselineHours),
+      isNew: row.baselineCount === 0,
+    }))
+    .sort((a, b) => b.growth - a.growth || b.count - a.count);
 }
 
 /**
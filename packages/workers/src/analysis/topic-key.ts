@@ -0,0 +1,89 @@
+/**
+ * Clave normalizada y similitud por trigramas para nombres de tema.
+ *
+ * La clave quita mayúsculas, acentos, puntuación, artículos/preposiciones y
+ * plurales simples, de modo que "La Reforma Judicial" y "Reformas Judiciales"
+ * comparten clave y se resuelven con un lookup indexado
+ * (`TopicCluster.normalizedKey`). Para variantes que no comparten clave se
+ * compara contra los candidatos de la org con similitud de trigramas (como
+ * pg_trgm), sin fusionar temas que difieren en un número ("Elecciones 2024").
+ */
+
+/** Similitud mínima de trigramas para fusionar con un tema existente */
+export const TOPIC_SIMILARITY_THRESHOLD = 0.8;
+
+const STOPWORDS = new Set([
+  "el", "la", "los", "las", "lo", "un", "una", "unos", "unas",
+  "de", "del", "al", "a", "en", "y", "e", "o", "u", "por", "para", "con", "sobre",
+]);
+
+/** Plural simple: "reformas" → "reforma", "judiciales" → "judicial" */
+function singular(word: string): string {
+  if (word.length <= 3 || !word.endsWith("s") || /\d/.test(word)) return word;
+  const stem = word.slice(0, -1);
+  return /[lnrdz]e$/.test(stem) ? stem.slice(0, -1) : stem;
+}
+
+export function topicKey(topic: string): string {
+  const words = topic
+    .normalize("NFD")
+    .replace(/[\u0300-\u036f]/g, "")
+    .toLowerCase()
+    .replace(/[^a-z0-9\s]/g, " ")
+    .split(/\s+/)
+    .filter(Boolean);
+
+  const meaningful = words.filter((w) => !STOPWORDS.has(w));
+  // Un tema formado solo por stopwords conserva sus palabras
+  return (meaningful.length > 0 ? meaningful : words).map(singular).join(" ");
+}
+
+function trigrams(key: string): Set<string> {
+  const grams = new Set<string>();
+  for (const word of key.split(" ")) {
+    const padded = `  ${word} `;
+    for (let i = 0; i < padded.length - 2; i++) grams.add(padded.slice(i, i + 3));
+  }
+  return grams;
+}
+
+/** Similitud de trigramas entre dos claves (|A ∩ B| / |A ∪ B|, igual que pg_trgm) */
+export function trigramSimilarity(a: string, b: string): number {
+  if (a === b) return 1;
+  const ga = trigrams(a);
+  const gb = trigrams(b);
+  if (ga.size === 0 || gb.size === 0) return 0;
+
+  let shared = 0;
+  for (const gram of ga) if (gb.has(gram)) shared++;
+  return shared / (ga.size + gb.size - shared);
+}
+
+/**
+ * Candidato con la misma clave o, si no hay, el más similar por encima del
+ * umbral. Null si ninguno se parece lo suficiente.
+ */
+export function findMatchingTopic<T extends { name: string }>(
+  topic: string,
+  candidates: T[],
+  threshold: number = TOPIC_SIMILARITY_THRESHOLD
+): T | null {
+  const key = topicKey(topic);
+  if (!key) return null;
+  const numbers = key.match(/\d+/g)?.join(" ") ?? "";
+
+  let best: T | null = null;
+  let bestScore = threshold;
+  for (const candidate of candidates) {
+    const candidateKey = topicKey(candidate.name);
+    if (candidateKey === key) return candidate;
+    if ((candidateKey.match(/\d+/g)?.join(" ") ?? "") !== numbers) continue;
+
+    const score = trigramSimilarity(key, candidateKey);
+    if (score >= bestScore) {
+      best = candidate;
+      bestScore = score;
+    }
+  }
+  return best;
+}
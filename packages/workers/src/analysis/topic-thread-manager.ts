@@ -1,10 +1,26 @@
 /**
  * Motor de Topic Threads (Sprint 19).
  * Agrupa menciones del mismo tema por cliente en hilos temáticos.
+ *
+ * Las stats del thread (conteos, desglose de sentimiento, fuentes) se
+ * actualizan de forma incremental por mención (thread-stats.ts);
+ * `reconcileThreadStats` las recalcula periódicamente para corregir desvíos.
  */
 import { prisma } from "@mediabot/shared";
 import { getQueue, QUEUE_NAMES } from "../queues.js";
-import type { Sentiment } from "@prisma/client";
+import type { Prisma, Sentiment } from "@prisma/client";
+import {
+  addToSourceSketch,
+  breakdownKey,
+  dominantSentimentOf,
+  emptyBreakdown,
+  parseBreakdown,
+  parseSourceSketch,
+  sameSketch,
+  sketchFromCounts,
+  topSourcesOf,
+  type SentimentBreakdown,
+} from "./thread-stats.js";
 
 // Umbrales de notificación por cantidad de menciones
 const NOTIFICATION_THRESHOLDS = [5, 10, 20, 50];
@@ -18,6 +34,9 @@ const SENTIMENT_SHIFT_COOLDOWN_MS = 4 * 60 * 60 * 1000;
 // Ventana para reabrir thread cerrado (72 horas)
 const REOPEN_WINDOW_MS = 72 * 60 * 60 * 1000;
 
+// Threads cerrados por transacción en closeInactiveThreads
+export const CLOSE_BATCH_SIZE = 500;
+
 /**
  * Asigna una mención a un TopicThread existente o crea uno nuevo.
  * Se llama DESPUÉS de que topic-extractor asigna el topic.
@@ -32,6 +51,7 @@ export async function assignMentionToThread(
     let clientId: string | null = null;
     let sentiment: string | null = null;
     let source: string | null = null;
+    let linkedThreadId: string | null = null;
 
     if (type === "mention") {
       const mention = await prisma.mention.findUnique({
@@ -43,6 +63,7 @@ export async function assignMentionToThread(
       clientId = mention.clientId;
       sentiment = mention.sentiment;
       source = mention.article.source;
+      linkedThreadId = mention.topicThreadId;
     } else {
       const socialMention = await prisma.socialMention.findUnique({
         where: { id: mentionId },
@@ -52,6 +73,7 @@ export async function assignMentionToThread(
       clientId = socialMention.clientId;
       sentiment = socialMention.sentiment;
       source = socialMention.authorHandle;
+      linkedThreadId = socialMention.topicThreadId;
     }
 
     // Si no hay topic, no asignar
@@ -68,22 +90,16 @@ export async function assignMentionToThread(
       },
     });
 
+    // Re-análisis de una mención ya vinculada: no volver a sumarla
+    if (thread && linkedThreadId === thread.id) return { threadId: thread.id };
+
     const previousSentiment = thread?.dominantSentiment ?? null;
 
-    if (thread) {
-      // Thread existente: actualizar stats y vincular
-      const updateData =
-        type === "mention"
-          ? { mentionCount: { increment: 1 } }
-          : { socialMentionCount: { increment: 1 } };
+    let updatedThread: ThreadNotificationState | null;
 
-      await prisma.topicThread.update({
-        where: { id: thread.id },
-        data: {
-          ...updateData,
-          lastMentionAt: new Date(),
-        },
-      });
+    if (thread) {
+      // Thread existente: sumar la mención a las stats y vincular
+      updatedThread = await incrementThreadStats(thread, type, sentiment, source);
 
       // Vincular mención al thread
       if (type === "mention") {
@@ -120,20 +136,16 @@ export async function assignMentionToThread(
 
       if (closedThread) {
         // Reabrir thread cerrado
-        const updateData =
-          type === "mention"
-            ? { mentionCount: { increment: 1 } }
-            : { socialMentionCount: { increment: 1 } };
-
         thread = await prisma.topicThread.update({
           where: { id: closedThread.id },
           data: {
             status: "ACTIVE",
             closedAt: null,
-            lastMentionAt: new Date(),
-            ...updateData,
           },
         });
+        // Si la mención ya era de este thread, sus stats ya la incluyen
+        updatedThread =
+          linkedThreadId === thread.id ? null : await incrementThreadStats(thread, type, sentiment, source);
 
         await prisma.topicThreadEvent.create({
           data: {
@@ -143,11 +155,15 @@ export async function assignMentionToThread(
           },
         });
       } else {
-        // Crear nuevo thread
+        // Crear nuevo thread con las stats de su primera mención
         const initCount =
           type === "mention"
             ? { mentionCount: 1, socialMentionCount: 0 }
             : { mentionCount: 0, socialMentionCount: 1 };
+        const breakdown = emptyBreakdown();
+        const key = breakdownKey(sentiment);
+        if (key) breakdown[key]++;
+        const sketch = type === "mention" && source ? addToSourceSketch({}, source) : {};
 
         thread = await prisma.topicThread.create({
           data: {
@@ -155,11 +171,13 @@ export async function assignMentionToThread(
             name: topic,
             normalizedName,
             ...initCount,
-            dominantSentiment: sentiment,
-            sentimentBreakdown: { positive: 0, negative: 0, neutral: 0, mixed: 0 },
-            topSources: source ? [source] : [],
+            dominantSentiment: dominantSentimentOf(breakdown),
+            sentimentBreakdown: { ...breakdown },
+            sourceSketch: sketch,
+            topSources: topSourcesOf(sketch),
           },
         });
+        updatedThread = thread;
 
         await prisma.topicThreadEvent.create({
           data: {
@@ -184,13 +202,10 @@ export async function assignMentionToThread(
       }
     }
 
-    // Recalcular stats del thread
-    await recalculateThreadStats(thread.id);
-
-    // Recargar thread con stats actualizadas para verificar eventos de notificación
-    const updatedThread = await prisma.topicThread.findUnique({
-      where: { id: thread.id },
-    });
+    // Re-vinculada desde otro thread (p. ej. el topic cambió): restarla del anterior
+    if (linkedThreadId && linkedThreadId !== thread.id) {
+      await decrementThreadStats(linkedThreadId, type, sentiment);
+    }
 
     if (updatedThread) {
       await checkThreadNotificationEvents(updatedThread, previousSentiment, mentionId, type);
@@ -204,62 +219,215 @@ export async function assignMentionToThread(
 }
 
 /**
- * Recalcula las stats agregadas de un thread.
+ * Campos del thread que necesita la verificación de eventos notificables.
  */
-export async function recalculateThreadStats(threadId: string): Promise<void> {
-  const thread = await prisma.topicThread.findUnique({
-    where: { id: threadId },
-    include: {
-      mentions: {
-        select: { sentiment: true, article: { select: { source: true } } },
-      },
-      socialMentions: {
-        select: { sentiment: true, authorHandle: true },
-      },
-    },
-  });
+interface ThreadNotificationState {
+  id: string;
+  clientId: string;
+  mentionCount: number;
+  socialMentionCount: number;
+  dominantSentiment: string | null;
+  lastNotifiedAt: Date | null;
+  thresholdsReached: unknown;
+}
+
+/**
+ * Suma una mención a las stats del thread en un solo UPDATE: los contadores
+ * y el bucket de sentimiento se incrementan en SQL (atómico entre workers);
+ * el sketch de fuentes se calcula desde el thread leído (un incremento
+ * concurrente puede perderse, lo corrige la reconciliación). Retorna el
+ * estado actualizado sin volver a leer el thread.
+ */
+async function incrementThreadStats(
+  thread: { id: string; sourceSketch: unknown; topSources: unknown },
+  type: "mention" | "social",
+  sentiment: string | null,
+  source: string | null
+): Promise<ThreadNotificationState | null> {
+  const key = breakdownKey(sentiment) ?? "neutral";
+  const bump = breakdownKey(sentiment) ? 1 : 0;
+
+  // Solo las fuentes de artículos cuentan como fuentes del thread
+  let sketchJson: string | null = null;
+  let topSourcesJson: string | null = null;
+  if (type === "mention" && source) {
+    const sketch = addToSourceSketch(parseSourceSketch(thread.sourceSketch, thread.topSources), source);
+    sketchJson = JSON.stringify(sketch);
+    topSourcesJson = JSON.stringify(topSourcesOf(sketch));
+  }
 
-  if (!thread) return;
+  const rows = await prisma.$queryRaw<(ThreadNotificationState & { sentimentBreakdown: unknown })[]>`
+    UPDATE "TopicThread"
+    SET "mentionCount" = "mentionCount" + ${type === "mention" ? 1 : 0},
+        "socialMentionCount" = "socialMentionCount" + ${type === "social" ? 1 : 0},
+        "sentimentBreakdown" = jsonb_set(
+          COALESCE("sentimentBreakdown", '{"positive":0,"negative":0,"neutral":0,"mixed":0}'::jsonb),
+          ARRAY[${key}::text],
+          to_jsonb(COALESCE(("sentimentBreakdown" ->> ${key}::text)::int, 0) + ${bump}::int)
+        ),
+        "sourceSketch" = COALESCE(${sketchJson}::jsonb, "sourceSketch"),
+        "topSources" = COALESCE(${topSourcesJson}::jsonb, "topSources"),
+        "lastMentionAt" = NOW(),
+        "updatedAt" = NOW()
+    WHERE id = ${thread.id}
+    RETURNING id, "clientId", "mentionCount", "socialMentionCount", "sentimentBreakdown",
+              "dominantSentiment", "lastNotifiedAt", "thresholdsReached"
+  `;
+  const updated = rows[0];
+  if (!updated) return null;
+
+  const dominantSentiment = dominantSentimentOf(parseBreakdown(updated.sentimentBreakdown));
+  if (dominantSentiment !== updated.dominantSentiment) {
+    await prisma.topicThread.update({
+      where: { id: updated.id },
+      data: { dominantSentiment },
+    });
+  }
 
-  // Calcular sentiment breakdown
-  const breakdown = { positive: 0, negative: 0, neutral: 0, mixed: 0 };
-  const sources = new Set<string>();
+  return { ...updated, dominantSentiment };
+}
 
-  for (const m of thread.mentions) {
-    const key = m.sentiment.toLowerCase() as keyof typeof breakdown;
-    if (key in breakdown) breakdown[key]++;
-    if (m.article.source) sources.add(m.article.source);
+/**
+ * Resta una mención de las stats del thread al que estaba vinculada. Usa el
+ * sentimiento actual de la mención (si cambió desde que se sumó, el bucket lo
+ * corrige la reconciliación); los contadores nunca bajan de 0. El sketch de
+ * fuentes no se toca: Space-Saving no admite restas, lo recalcula la
+ * reconciliación.
+ */
+async function decrementThreadStats(
+  threadId: string,
+  type: "mention" | "social",
+  sentiment: string | null
+): Promise<void> {
+  const key = breakdownKey(sentiment) ?? "neutral";
+  const bump = breakdownKey(sentiment) ? 1 : 0;
+
+  const rows = await prisma.$queryRaw<{ id: string; sentimentBreakdown: unknown; dominantSentiment: string | null }[]>`
+    UPDATE "TopicThread"
+    SET "mentionCount" = GREATEST("mentionCount" - ${type === "mention" ? 1 : 0}, 0),
+        "socialMentionCount" = GREATEST("socialMentionCount" - ${type === "social" ? 1 : 0}, 0),
+        "sentimentBreakdown" = jsonb_set(
+          COALESCE("sentimentBreakdown", '{"positive":0,"negative":0,"neutral":0,"mixed":0}'::jsonb),
+          ARRAY[${key}::text],
+          to_jsonb(GREATEST(COALESCE(("sentimentBreakdown" ->> ${key}::text)::int, 0) - ${bump}::int, 0))
+        ),
+        "updatedAt" = NOW()
+    WHERE id = ${threadId}
+    RETURNING id, "sentimentBreakdown", "dominantSentiment"
+  `;
+  const updated = rows[0];
+  if (!updated) return;
+
+  const dominantSentiment = dominantSentimentOf(parseBreakdown(updated.sentimentBreakdown));
+  if (dominantSentiment !== updated.dominantSentiment) {
+    await prisma.topicThread.update({
+      where: { id: updated.id },
+      data: { dominantSentiment },
+    });
   }
+}
 
-  for (const sm of thread.socialMentions) {
-    const key = sm.sentiment.toLowerCase() as keyof typeof breakdown;
-    if (key in breakdown) breakdown[key]++;
+/**
+ * Recalcula las stats de los threads ACTIVE y de los cerrados dentro de la
+ * ventana de reapertura (pueden volver a activarse con stats desviadas) con
+ * tres consultas agrupadas (sentimiento de menciones, de menciones sociales y
+ * fuentes) y corrige solo los threads que se desviaron de los contadores
+ * incrementales.
+ */
+export async function reconcileThreadStats(): Promise<{ checked: number; corrected: number }> {
+  const closedSince = new Date(Date.now() - REOPEN_WINDOW_MS);
+  const [threads, mentionRows, socialRows, sourceRows] = await Promise.all([
+    prisma.topicThread.findMany({
+      where: { OR: [{ status: "ACTIVE" }, { status: "CLOSED", closedAt: { gte: closedSince } }] },
+      select: {
+        id: true,
+        mentionCount: true,
+        socialMentionCount: true,
+        sentimentBreakdown: true,
+        dominantSentiment: true,
+        sourceSketch: true,
+      },
+    }),
+    prisma.$queryRaw<{ threadId: string; sentiment: string; count: number }[]>`
+      SELECT m."topicThreadId" AS "threadId", m.sentiment::text AS sentiment, COUNT(*)::int AS count
+      FROM "Mention" m
+      JOIN "TopicThread" t ON t.id = m."topicThreadId"
+      WHERE (t.status = 'ACTIVE' OR t."closedAt" >= ${closedSince})
+      GROUP BY 1, 2
+    `,
+    prisma.$queryRaw<{ threadId: string; sentiment: string; count: number }[]>`
+      SELECT s."topicThreadId" AS "threadId", s.sentiment::text AS sentiment, COUNT(*)::int AS count
+      FROM "SocialMention" s
+      JOIN "TopicThread" t ON t.id = s."topicThreadId"
+      WHERE (t.status = 'ACTIVE' OR t."closedAt" >= ${closedSince})
+      GROUP BY 1, 2
+    `,
+    prisma.$queryRaw<{ threadId: string; source: string; count: number }[]>`
+      SELECT m."topicThreadId" AS "threadId", a.source, COUNT(*)::int AS count
+      FROM "Mention" m
+      JOIN "TopicThread" t ON t.id = m."topicThreadId"
+      JOIN "Article" a ON a.id = m."articleId"
+      WHERE (t.status = 'ACTIVE' OR t."closedAt" >= ${closedSince}) AND a.source <> ''
+      GROUP BY 1, 2
+    `,
+  ]);
+
+  const actual = new Map<string, { mentions: number; social: number; breakdown: SentimentBreakdown; sources: Map<string, number> }>();
+  const statsFor = (threadId: string) => {
+    let stats = actual.get(threadId);
+    if (!stats) {
+      stats = { mentions: 0, social: 0, breakdown: emptyBreakdown(), sources: new Map() };
+      actual.set(threadId, stats);
+    }
+    return stats;
+  };
+
+  for (const row of mentionRows) {
+    const stats = statsFor(row.threadId);
+    stats.mentions += row.count;
+    const key = breakdownKey(row.sentiment);
+    if (key) stats.breakdown[key] += row.count;
+  }
+  for (const row of socialRows) {
+    const stats = statsFor(row.threadId);
+    stats.social += row.count;
+    const key = breakdownKey(row.sentiment);
+    if (key) stats.breakdown[key] += row.count;
   }
+  for (const row of sourceRows) {
+    statsFor(row.threadId).sources.set(row.source, row.count);
+  }
+
+  let corrected = 0;
+  for (const thread of threads) {
+    const stats = statsFor(thread.id);
+    const sketch = sketchFromCounts(stats.sources);
+    const dominantSentiment = dominantSentimentOf(stats.breakdown);
 
-  // Calcular sentimiento dominante
-  const total = breakdown.positive + breakdown.negative + breakdown.neutral + breakdown.mixed;
-  let dominantSentiment: string = "NEUTRAL";
-  if (total > 0) {
-    const max = Math.max(breakdown.positive, breakdown.negative, breakdown.neutral, breakdown.mixed);
-    if (max === breakdown.positive) dominantSentiment = "POSITIVE";
-    else if (max === breakdown.negative) dominantSentiment = "NEGATIVE";
-    else if (max === breakdown.mixed) dominantSentiment = "MIXED";
-    else dominantSentiment = "NEUTRAL";
+    const drifted =
+      thread.mentionCount !== stats.mentions ||
+      thread.socialMentionCount !== stats.social ||
+      thread.dominantSentiment !== dominantSentiment ||
+      JSON.stringify(parseBreakdown(thread.sentimentBreakdown)) !== JSON.stringify(stats.breakdown) ||
+      !sameSketch(thread.sourceSketch, sketch);
+    if (!drifted) continue;
+
+    await prisma.topicThread.update({
+      where: { id: thread.id },
+      data: {
+        mentionCount: stats.mentions,
+        socialMentionCount: stats.social,
+        sentimentBreakdown: { ...stats.breakdown },
+        dominantSentiment,
+        sourceSketch: sketch,
+        topSources: topSourcesOf(sketch),
+      },
+    });
+    corrected++;
   }
 
-  // Top sources (máximo 10)
-  const topSources = [...sources].slice(0, 10);
-
-  await prisma.topicThread.update({
-    where: { id: threadId },
-    data: {
-      mentionCount: thread.mentions.length,
-      socialMentionCount: thread.socialMentions.length,
-      sentimentBreakdown: JSON.parse(JSON.stringify(breakdown)),
-      dominantSentiment,
-      topSources: JSON.parse(JSON.stringify(topSources)),
-    },
-  });
+  console.log(`[TopicThreadManager] Reconciled stats: ${corrected}/${threads.length} threads corrected`);
+  return { checked: threads.length, corrected };
 }
 
 /**
@@ -373,38 +541,116 @@ async function checkThreadNotificationEvents(
 
 /**
  * Cierra threads inactivos (sin menciones en 72h).
+ *
+ * Por lotes de CLOSE_BATCH_SIZE, cada uno en una transacción: un SELECT que
+ * bloquea los candidatos (filtra y ordena por [status, lastMentionAt]) y trae
+ * el thread CLOSED anterior con el mismo nombre si existe, un UPDATE que los
+ * cierra y un `createMany` con los eventos CLOSED. Un thread CLOSED anterior
+ * violaría el unique [clientId, normalizedName, status]: se fusiona en el que
+ * se cierra (ver mergePreviousThreads) en vez de saltarse el candidato, que
+ * quedaría ACTIVE para siempre.
  */
 export async function closeInactiveThreads(): Promise<number> {
   const cutoff = new Date(Date.now() - REOPEN_WINDOW_MS);
-
-  const inactiveThreads = await prisma.topicThread.findMany({
-    where: {
-      status: "ACTIVE",
-      lastMentionAt: { lt: cutoff },
-    },
-    select: { id: true },
-  });
-
-  if (inactiveThreads.length === 0) return 0;
-
-  for (const thread of inactiveThreads) {
-    await prisma.topicThread.update({
-      where: { id: thread.id },
-      data: {
-        status: "CLOSED",
-        closedAt: new Date(),
-      },
+  let closed = 0;
+
+  for (;;) {
+    const batch = await prisma.$transaction(async (tx) => {
+      const candidates = await tx.$queryRaw<{ id: string; previousId: string | null }[]>`
+        SELECT t.id, o.id AS "previousId"
+        FROM (
+          SELECT id, "clientId", "normalizedName"
+          FROM "TopicThread"
+          WHERE status = 'ACTIVE' AND "lastMentionAt" < ${cutoff}
+          ORDER BY "lastMentionAt"
+          LIMIT ${CLOSE_BATCH_SIZE}
+          FOR UPDATE SKIP LOCKED
+        ) t
+        LEFT JOIN "TopicThread" o
+          ON o."clientId" = t."clientId"
+          AND o."normalizedName" = t."normalizedName"
+          AND o.status = 'CLOSED'
+      `;
+      if (candidates.length === 0) return 0;
+
+      const merges = candidates.filter((c): c is { id: string; previousId: string } => c.previousId !== null);
+      if (merges.length > 0) await mergePreviousThreads(tx, merges);
+
+      const ids = candidates.map((c) => c.id);
+      await tx.$executeRaw`
+        UPDATE "TopicThread"
+        SET status = 'CLOSED', "closedAt" = NOW(), "updatedAt" = NOW()
+        WHERE id = ANY(${ids}::text[])
+      `;
+
+      const mergedInto = new Map(merges.map((m) => [m.id, m.previousId]));
+      await tx.topicThreadEvent.createMany({
+        data: ids.map((id) => ({
+          topicThreadId: id,
+          type: "CLOSED" as const,
+          data: {
+            reason: "inactivity",
+            cutoffHours: 72,
+            ...(mergedInto.has(id) ? { mergedThreadId: mergedInto.get(id) } : {}),
+          },
+        })),
+      });
+      return ids.length;
     });
 
-    await prisma.topicThreadEvent.create({
-      data: {
-        topicThreadId: thread.id,
-        type: "CLOSED",
-        data: { reason: "inactivity", cutoffHours: 72 },
-      },
-    });
+    closed += batch;
+    if (batch < CLOSE_BATCH_SIZE) break;
+  }
+
+  if (closed > 0) {
+    console.log(`[TopicThreadManager] Closed ${closed} inactive threads`);
   }
+  return closed;
+}
 
-  console.log(`[TopicThreadManager] Closed ${inactiveThreads.length} inactive threads`);
-  return inactiveThreads.length;
+/**
+ * Fusiona cada thread CLOSED anterior en el thread del mismo nombre que se
+ * está cerrando: sus menciones y eventos pasan al nuevo, los contadores y el
+ * desglose de sentimiento se suman y el anterior se elimina. El sketch de
+ * fuentes y el sentimiento dominante los recalcula la reconciliación (cubre
+ * los threads cerrados recientemente).
+ */
+async function mergePreviousThreads(
+  tx: Prisma.TransactionClient,
+  merges: Array<{ id: string; previousId: string }>
+): Promise<void> {
+  const previousIds = merges.map((m) => m.previousId);
+  const threadIds = merges.map((m) => m.id);
+
+  await tx.$executeRaw`
+    UPDATE "Mention" m SET "topicThreadId" = v.thread
+    FROM unnest(${previousIds}::text[], ${threadIds}::text[]) AS v(prev, thread)
+    WHERE m."topicThreadId" = v.prev
+  `;
+  await tx.$executeRaw`
+    UPDATE "SocialMention" s SET "topicThreadId" = v.thread
+    FROM unnest(${previousIds}::text[], ${threadIds}::text[]) AS v(prev, thread)
+    WHERE s."topicThreadId" = v.prev
+  `;
+  await tx.$executeRaw`
+    UPDATE "TopicThreadEvent" e SET "topicThreadId" = v.thread
+    FROM unnest(${previousIds}::text[], ${threadIds}::text[]) AS v(prev, thread)
+    WHERE e."topicThreadId" = v.prev
+  `;
+  await tx.$executeRaw`
+    UPDATE "TopicThread" t
+    SET "mentionCount" = t."mentionCount" + o."mentionCount",
+        "socialMentionCount" = t."socialMentionCount" + o."socialMentionCount",
+        "sentimentBreakdown" = jsonb_build_object(
+          'positive', COALESCE((t."sentimentBreakdown" ->> 'positive')::int, 0) + COALESCE((o."sentimentBreakdown" ->> 'positive')::int, 0),
+          'negative', COALESCE((t."sentimentBreakdown" ->> 'negative')::int, 0) + COALESCE((o."sentimentBreakdown" ->> 'negative')::int, 0),
+          'neutral', COALESCE((t."sentimentBreakdown" ->> 'neutral')::int, 0) + COALESCE((o."sentimentBreakdown" ->> 'neutral')::int, 0),
+          'mixed', COALESCE((t."sentimentBreakdown" ->> 'mixed')::int, 0) + COALESCE((o."sentimentBreakdown" ->> 'mixed')::int, 0)
+        ),
+        "firstSeenAt" = LEAST(t."firstSeenAt", o."firstSeenAt")
+    FROM unnest(${previousIds}::text[], ${threadIds}::text[]) AS v(prev, thread)
+    JOIN "TopicThread" o ON o.id = v.prev
+    WHERE t.id = v.thread
+  `;
+  await tx.$executeRaw`DELETE FROM "TopicThread" WHERE id = ANY(${previousIds}::text[])`;
 }
@@ -0,0 +1,419 @@
+/**
+ * Modelo local de triage (solo CPU) para sentimiento y relevancia.
+ *
+ * Combina un léxico en español (términos negativos, positivos y de contexto
+ * ajeno como deportes o bolsa) con un modelo lineal sobre bolsa de palabras
+ * con hashing. Se entrena con las etiquetas que Gemini ya dejó en Mention
+ * (sentiment / relevance) y solo resuelve localmente los casos de alta
+ * confianza; el resto se escala al LLM.
+ *
+ * Este módulo es puro (sin Prisma ni Redis) para poder probarlo y evaluarlo
+ * offline.
+ */
+
+export const SENTIMENT_LABELS = ["POSITIVE", "NEGATIVE", "NEUTRAL", "MIXED"] as const;
+export type TriageSentiment = (typeof SENTIMENT_LABELS)[number];
+
+/** Relevancia (1-10) a partir de la cual una mención se considera relevante */
+export const RELEVANT_MIN_RELEVANCE = 5;
+
+/** Resumen que se guarda cuando el análisis se resuelve localmente */
+export const TRIAGE_LOCAL_SUMMARY = "Mencion de baja relevancia clasificada localmente (triage)";
+
+/** Dimensiones del espacio de hashing de tokens */
+const HASH_DIMS = 4096;
+/** Caracteres de contenido considerados (el inicio concentra la señal) */
+const CONTENT_MAX_CHARS = 2000;
+
+const NEGATIVE_LEXICON = [
+  "acusa", "acusacion", "acusado", "alerta", "amenaza", "arresto", "boicot",
+  "clausura", "colapso", "conflicto", "corrupcion", "crisis", "critica",
+  "demanda", "denuncia", "derrame", "despido", "despidos", "detenido",
+  "escandalo", "explosion", "falla", "fraude", "huelga", "incendio",
+  "investigacion", "irregularidades", "multa", "muerte", "negligencia",
+  "perdida", "perdidas", "polemica", "protesta", "quiebra", "queja",
+  "quejas", "rechazo", "renuncia", "retiro", "robo", "sancion", "soborno",
+  "violencia", "vulnerabilidad", "fuga", "contaminacion", "accidente",
+];
+
+const POSITIVE_LEXICON = [
+  "alianza", "apertura", "avance", "beneficio", "celebra", "crecimiento",
+  "distincion", "exito", "exitoso", "expansion", "galardon", "impulsa",
+  "inaugura", "inauguracion", "innovacion", "inversion", "lanza",
+  "lanzamiento", "liderazgo", "logro", "mejora", "premio", "reconoce",
+  "reconocimiento", "record", "respaldo", "fortalece", "ganancias",
+  "certificacion", "donacion", "apoyo",
+];
+
+/** Contexto deportivo: la keyword suele aparecer de forma incidental */
+const SPORTS_LEXICON = [
+  "gol", "goles", "partido", "liga", "torneo", "jornada", "futbol",
+  "marcador", "delantero", "portero", "estadio", "campeonato", "clasico",
+  "entrenador", "afición", "aficion", "liguilla", "cancha", "anotacion",
+];
+
+/** Contexto bursátil/financiero genérico (tablas de cotizaciones, índices) */
+const MARKET_LEXICON = [
+  "bmv", "nasdaq", "nyse", "ipc", "cotizacion", "cotizaciones", "acciones",
+  "emisora", "emisoras", "indice", "bolsa", "dolar", "peso", "tipo de cambio",
+  "alza", "baja", "puntos", "cierre", "dow", "jones",
+];
+
+const STOPWORDS = new Set([
+  "de", "la", "que", "el", "en", "y", "a", "los", "se", "del", "las", "un",
+  "por", "con", "no", "una", "su", "para", "es", "al", "lo", "como", "mas",
+  "pero", "sus", "le", "ya", "o", "este", "si", "porque", "esta", "entre",
+  "cuando", "muy", "sin", "sobre", "tambien", "me", "hasta", "hay", "donde",
+  "quien", "desde", "todo", "nos", "durante", "todos", "uno", "les", "ni",
+  "contra", "otros", "ese", "eso", "ante", "ellos", "e", "esto", "antes",
+  "algunos", "unos", "otro", "otras", "otra", "tanto", "esa", "estos",
+  "mucho", "quienes", "nada", "muchos", "cual", "poco", "ella", "estar",
+  "estas", "algunas", "algo", "fue", "ser", "son", "ha", "han", "dijo",
+]);
+
+const NEGATIONS = new Set(["no", "sin", "nunca", "tampoco", "ni"]);
+
+const LEXICONS = [NEGATIVE_LEXICON, POSITIVE_LEXICON, SPORTS_LEXICON, MARKET_LEXICON];
+
+/**
+ * Features densas del léxico, en este orden: negativos, positivos,
+ * deportes, mercado, negaciones, keyword en título, menciones de la keyword,
+ * texto corto.
+ */
+const LEXICON_FEATURES = 8;
+export const FEATURE_DIMS = HASH_DIMS + LEXICON_FEATURES;
+
+export interface TriageInput {
+  title: string;
+  content: string;
+  keyword: string;
+}
+
+export interface TriageExample extends TriageInput {
+  sentiment: TriageSentiment;
+  relevance: number;
+}
+
+export interface TriageModel {
+  version: 1;
+  trainedAt: string;
+  examples: number;
+  /** Pesos por clase de sentimiento (mismo orden que SENTIMENT_LABELS) */
+  sentimentWeights: number[][];
+  sentimentBias: number[];
+  relevanceWeights: number[];
+  relevanceBias: number;
+}
+
+export interface TriagePrediction {
+  sentiment: TriageSentiment;
+  sentimentConfidence: number;
+  relevant: boolean;
+  relevanceConfidence: number;
+}
+
+export interface TrainOptions {
+  epochs?: number;
+  learningRate?: number;
+  l2?: number;
+  seed?: number;
+}
+
+type SparseVector = Map<number, number>;
+
+function normalizeText(text: string): string {
+  return text
+    .toLowerCase()
+    .normalize("NFD")
+    .replace(/[\u0300-\u036f]/g, "");
+}
+
+export function tokenize(text: string): string[] {
+  return normalizeText(text)
+    .split(/[^a-z0-9ñ]+/)
+    .filter((t) => t.length > 1);
+}
+
+/** FNV-1a de 32 bits, suficiente para hashing de features */
+function hashToken(token: string): number {
+  let hash = 0x811c9dc5;
+  for (let i = 0; i < token.length; i++) {
+    hash ^= token.charCodeAt(i);
+    hash = Math.imul(hash, 0x01000193);
+  }
+  return (hash >>> 0) % HASH_DIMS;
+}
+
+const lexiconSets = LEXICONS.map((words) => ({
+  single: new Set(words.filter((w) => !w.includes(" ")).map(normalizeText)),
+  phrases: words.filter((w) => w.includes(" ")).map(normalizeText),
+}));
+
+/**
+ * Convierte una mención en un vector disperso: tokens con hashing
+ * (normalizados L2, el título pesa doble) + features del léxico.
+ */
+export function extractFeatures(input: TriageInput): SparseVector {
+  const features: SparseVector = new Map();
+  const titleTokens = tokenize(input.title);
+  const content = input.content.slice(0, CONTENT_MAX_CHARS);
+  const contentTokens = tokenize(content);
+
+  const addToken = (token: string, weight: number) => {
+    if (STOPWORDS.has(token)) return;
+    const idx = hashToken(token);
+    features.set(idx, (features.get(idx) || 0) + weight);
+  };
+  for (const t of titleTokens) addToken(t, 2);
+  for (const t of contentTokens) addToken(t, 1);
+
+  let norm = 0;
+  for (const v of features.values()) norm += v * v;
+  norm = Math.sqrt(norm) || 1;
+  for (const [k, v] of features) features.set(k, v / norm);
+
+  const allTokens = [...titleTokens, ...contentTokens];
+  const fullText = normalizeText(`${input.title} ${content}`);
+  const scale = Math.log1p(allTokens.length) || 1;
+
+  lexiconSets.forEach((lex, i) => {
+    let hits = allTokens.filter((t) => lex.single.has(t)).length;
+    for (const phrase of lex.phrases) {
+      if (fullText.includes(phrase)) hits++;
+    }
+    if (hits > 0) features.set(HASH_DIMS + i, Math.log1p(hits) / scale);
+  });
+
+  const negations = allTokens.filter((t) => NEGATIONS.has(t)).length;
+  if (negations > 0) features.set(HASH_DIMS + 4, Math.log1p(negations) / scale);
+
+  const keyword = normalizeText(input.keyword).trim();
+  if (keyword) {
+    if (normalizeText(input.title).includes(keyword)) features.set(HASH_DIMS + 5, 1);
+    const occurrences = fullText.split(keyword).length - 1;
+    if (occurrences > 0) features.set(HASH_DIMS + 6, Math.log1p(occurrences));
+  }
+
+  if (allTokens.length < 40) features.set(HASH_DIMS + 7, 1);
+
+  return features;
+}
+
+function dot(weights: number[], x: SparseVector, bias: number): number {
+  let sum = bias;
+  for (const [i, v] of x) sum += weights[i] * v;
+  return sum;
+}
+
+function sigmoid(z: number): number {
+  return 1 / (1 + Math.exp(-z));
+}
+
+function softmax(scores: number[]): number[] {
+  const max = Math.max(...scores);
+  const exps = scores.map((s) => Math.exp(s - max));
+  const total = exps.reduce((a, b) => a + b, 0);
+  return exps.map((e) => e / total);
+}
+
+/** PRNG determinista (mulberry32) para que el entrenamiento sea reproducible */
+function createRng(seed: number): () => number {
+  let a = seed >>> 0;
+  return () => {
+    a = (a + 0x6d2b79f5) >>> 0;
+    let t = a;
+    t = Math.imul(t ^ (t >>> 15), t | 1);
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+}
+
+/**
+ * Entrena el modelo con SGD: regresión logística multiclase para sentimiento
+ * y binaria (relevance >= RELEVANT_MIN_RELEVANCE) para relevancia.
+ */
+export function trainTriageModel(
+  examples: TriageExample[],
+  options: TrainOptions = {}
+): TriageModel {
+  const { epochs = 8, learningRate = 0.5, l2 = 1e-5, seed = 42 } = options;
+
+  const sentimentWeights = SENTIMENT_LABELS.map(() => new Array<number>(FEATURE_DIMS).fill(0));
+  const sentimentBias = SENTIMENT_LABELS.map(() => 0);
+  const relevanceWeights = new Array<number>(FEATURE_DIMS).fill(0);
+  let relevanceBias = 0;
+
+  const data = examples.map((ex) => ({
+    x: extractFeatures(ex),
+    sentimentIdx: SENTIMENT_LABELS.indexOf(ex.sentiment),
+    relevant: ex.relevance >= RELEVANT_MIN_RELEVANCE ? 1 : 0,
+  }));
+
+  const rng = createRng(seed);
+  const order = data.map((_, i) => i);
+
+  for (let epoch = 0; epoch < epochs; epoch++) {
+    // Fisher-Yates
+    for (let i = order.length - 1; i > 0; i--) {
+      const j = Math.floor(rng() * (i + 1));
+      [order[i], order[j]] = [order[j], order[i]];
+    }
+    const lr = learningRate / (1 + epoch);
+
+    for (const idx of order) {
+      const { x, sentimentIdx, relevant } = data[idx];
+
+      if (sentimentIdx >= 0) {
+        const probs = softmax(
+          sentimentWeights.map((w, c) => dot(w, x, sentimentBias[c]))
+        );
+        for (let c = 0; c < SENTIMENT_LABELS.length; c++) {
+          const grad = probs[c] - (c === sentimentIdx ? 1 : 0);
+          const w = sentimentWeights[c];
+          for (const [i, v] of x) w[i] -= lr * (grad * v + l2 * w[i]);
+          sentimentBias[c] -= lr * grad;
+        }
+      }
+
+      const grad = sigmoid(dot(relevanceWeights, x, relevanceBias)) - relevant;
+      for (const [i, v] of x) {
+        relevanceWeights[i] -= lr * (grad * v + l2 * relevanceWeights[i]);
+      }
+      relevanceBias -= lr * grad;
+    }
+  }
+
+  return {
+    version: 1,
+    trainedAt: new Date().toISOString(),
+    examples: examples.length,
+    sentimentWeights,
+    sentimentBias,
+    relevanceWeights,
+    relevanceBias,
+  };
+}
+
+export function predictTriage(model: TriageModel, input: TriageInput): TriagePrediction {
+  const x = extractFeatures(input);
+
+  const probs = softmax(
+    model.sentimentWeights.map((w, c) => dot(w, x, model.sentimentBias[c]))
+  );
+  let best = 0;
+  for (let c = 1; c < probs.length; c++) {
+    if (probs[c] > probs[best]) best = c;
+  }
+
+  const pRelevant = sigmoid(dot(model.relevanceWeights, x, model.relevanceBias));
+
+  return {
+    sentiment: SENTIMENT_LABELS[best],
+    sentimentConfidence: probs[best],
+    relevant: pRelevant >= 0.5,
+    relevanceConfidence: pRelevant >= 0.5 ? pRelevant : 1 - pRelevant,
+  };
+}
+
+/** Serializa el modelo redondeando pesos (reduce el tamaño en Redis) */
+export function serializeTriageModel(model: TriageModel): string {
+  const round = (v: number) => Math.round(v * 1e5) / 1e5;
+  return JSON.stringify({
+    ...model,
+    sentimentWeights: model.sentimentWeights.map((w) => w.map(round)),
+    sentimentBias: model.sentimentBias.map(round),
+    relevanceWeights: model.relevanceWeights.map(round),
+    relevanceBias: round(model.relevanceBias),
+  });
+}
+
+export function parseTriageModel(raw: string): TriageModel | null {
+  try {
+    const parsed = JSON.parse(raw) as TriageModel;
+    if (
+      parsed.version !== 1 ||
+      parsed.sentimentWeights?.length !== SENTIMENT_LABELS.length ||
+      parsed.relevanceWeights?.length !== FEATURE_DIMS
+    ) {
+      return null;
+    }
+    return parsed;
+  } catch {
+    return null;
+  }
+}
+
+export interface TriageEvaluation {
+  threshold: number;
+  total: number;
+  sentimentAccuracy: number;
+  relevanceAccuracy: number;
+  /** Fracción de casos que el pre-filtro aceptaría sin LLM */
+  preFilterAvoided: number;
+  preFilterConfidentAccuracy: number;
+  /** Fracción de análisis resueltos localmente (baja relevancia + sentimiento seguro) */
+  analysisAvoided: number;
+  analysisConfidentAccuracy: number;
+}
+
+/**
+ * Decide si el triage puede resolver un análisis completo sin LLM: solo
+ * menciones de baja relevancia con sentimiento y relevancia de alta confianza.
+ */
+export function canResolveLocally(prediction: TriagePrediction, threshold: number): boolean {
+  return (
+    !prediction.relevant &&
+    prediction.relevanceConfidence >= threshold &&
+    prediction.sentimentConfidence >= threshold
+  );
+}
+
+/**
+ * Compara las predicciones con las etiquetas de Gemini para un umbral de
+ * confianza: exactitud global, exactitud en los casos seguros y la fracción
+ * de llamadas que se evitarían.
+ */
+export function evaluateTriageModel(
+  model: TriageModel,
+  examples: TriageExample[],
+  threshold: number
+): TriageEvaluation {
+  let sentimentHits = 0;
+  let relevanceHits = 0;
+  let preFilterConfident = 0;
+  let preFilterConfidentHits = 0;
+  let analysisConfident = 0;
+  let analysisConfidentHits = 0;
+
+  for (const ex of examples) {
+    const p = predictTriage(model, ex);
+    const isRelevant = ex.relevance >= RELEVANT_MIN_RELEVANCE;
+    const sentimentOk = p.sentiment === ex.sentiment;
+    const relevanceOk = p.relevant === isRelevant;
+
+    if (sentimentOk) sentimentHits++;
+    if (relevanceOk) relevanceHits++;
+
+    // El pre-filtro solo acepta localmente (nunca descarta)
+    if (p.relevant && p.relevanceConfidence >= threshold) {
+      preFilterConfident++;
+      if (relevanceOk) preFilterConfidentHits++;
+    }
+    if (canResolveLocally(p, threshold)) {
+      analysisConfident++;
+      if (relevanceOk && sentimentOk) analysisConfidentHits++;
+    }
+  }
+
+  const ratio = (a: number, b: number) => (b > 0 ? a / b : 0);
+  return {
+    threshold,
+    total: examples.length,
+    sentimentAccuracy: ratio(sentimentHits, examples.length),
+    relevanceAccuracy: ratio(relevanceHits, examples.length),
+    preFilterAvoided: ratio(preFilterConfident, examples.length),
+    preFilterConfidentAccuracy: ratio(preFilterConfidentHits, preFilterConfident),
+    analysisAvoided: ratio(analysisConfident, examples.length),
+    analysisConfidentAccuracy: ratio(analysisConfidentHits, analysisConfident),
+  };
+}
@@ -0,0 +1,139 @@
+/**
+ * Triage local previo a Gemini: carga el modelo entrenado desde Redis y decide
+ * qué casos se resuelven localmente (alta confianza) y cuáles se escalan al LLM.
+ *
+ * El modelo se entrena con scripts/train-triage.ts. Sin modelo, o con el
+ * triage desactivado (setting `triage.enabled`), todo se escala al LLM.
+ */
+
+import { prisma, getSettingNumber } from "@mediabot/shared";
+import { connection } from "../queues.js";
+import {
+  TRIAGE_LOCAL_SUMMARY,
+  canResolveLocally,
+  parseTriageModel,
+  predictTriage,
+  serializeTriageModel,
+  type TriageExample,
+  type TriageInput,
+  type TriageModel,
+  type TriagePrediction,
+} from "./triage-model.js";
+import type { CombinedAnalysisResult } from "./ai.js";
+
+export const TRIAGE_MODEL_KEY = "triage:model";
+/** Cada cuánto se relee el modelo de Redis (recoge reentrenamientos) */
+const MODEL_REFRESH_MS = 10 * 60 * 1000;
+/** Relevancia asignada a las menciones descartadas localmente */
+const LOCAL_LOW_RELEVANCE = 2;
+
+let cachedModel: TriageModel | null = null;
+let cachedAt = 0;
+
+export async function getTriageModel(): Promise<TriageModel | null> {
+  if (Date.now() - cachedAt < MODEL_REFRESH_MS) return cachedModel;
+  cachedAt = Date.now();
+  try {
+    const raw = await connection.get(TRIAGE_MODEL_KEY);
+    cachedModel = raw ? parseTriageModel(raw) : null;
+  } catch (error) {
+    console.error("[Triage] Failed to load model:", error);
+    cachedModel = null;
+  }
+  return cachedModel;
+}
+
+export async function saveTriageModel(model: TriageModel): Promise<void> {
+  await connection.set(TRIAGE_MODEL_KEY, serializeTriageModel(model));
+  cachedModel = model;
+  cachedAt = Date.now();
+}
+
+/**
+ * Predicción local si el triage está habilitado y hay modelo; null en caso
+ * contrario (el llamador debe escalar al LLM).
+ */
+async function predict(input: TriageInput): Promise<{ prediction: TriagePrediction; threshold: number } | null> {
+  if ((await getSettingNumber("triage.enabled", 1)) < 1) return null;
+  const model = await getTriageModel();
+  if (!model) return null;
+
+  const threshold = await getSettingNumber("triage.confidence_threshold", 0.9);
+  return { prediction: predictTriage(model, input), threshold };
+}
+
+export type TriagePreFilterDecision = "accept" | "escalate";
+
+/**
+ * Acepta sin LLM cuando el modelo predice relevancia con alta confianza.
+ * Nunca descarta: el modelo se entrena solo con menciones que ya pasaron el
+ * pre-filtro y sin distinguir cliente, así que "no relevante" significa
+ * "relevancia baja", no "el pre-filtro la habría rechazado". Esos casos se
+ * escalan a preFilterArticle.
+ */
+export async function triagePreFilter(input: TriageInput): Promise<{
+  decision: TriagePreFilterDecision;
+  confidence: number;
+}> {
+  const result = await predict(input);
+  const confidence = result?.prediction.relevanceConfidence ?? 0;
+  if (!result || !result.prediction.relevant || confidence < result.threshold) {
+    return { decision: "escalate", confidence };
+  }
+  return { decision: "accept", confidence };
+}
+
+/**
+ * Resuelve localmente el análisis de menciones de baja relevancia con
+ * sentimiento seguro. Las relevantes siempre van al LLM (requieren resumen
+ * y acción sugerida).
+ */
+export async function triageAnalysis(input: TriageInput): Promise<CombinedAnalysisResult | null> {
+  const result = await predict(input);
+  if (!result || !canResolveLocally(result.prediction, result.threshold)) return null;
+
+  return {
+    sentiment: result.prediction.sentiment,
+    relevance: LOCAL_LOW_RELEVANCE,
+    summary: TRIAGE_LOCAL_SUMMARY,
+    suggestedAction: "Sin accion requerida",
+    topic: null,
+    topicConfidence: 0,
+  };
+}
+
+/**
+ * Carga las etiquetas de Gemini guardadas en Mention como ejemplos de
+ * entrenamiento, ordenadas por fecha. Excluye fallbacks de error y menciones
+ * resueltas por el propio triage (evita que el modelo aprenda de sí mismo).
+ */
+export async function loadTriageExamples(limit: number): Promise<TriageExample[]> {
+  const mentions = await prisma.mention.findMany({
+    where: {
+      aiSummary: { not: null },
+      NOT: [
+        { aiSummary: { startsWith: "Mencion detectada" } },
+        { aiSummary: TRIAGE_LOCAL_SUMMARY },
+      ],
+    },
+    select: {
+      keywordMatched: true,
+      snippet: true,
+      sentiment: true,
+      relevance: true,
+      article: { select: { title: true, content: true } },
+    },
+    orderBy: { createdAt: "desc" },
+    take: limit,
+  });
+
+  return mentions
+    .reverse()
+    .map((m) => ({
+      title: m.article.title,
+      content: m.article.content || m.snippet || "",
+      keyword: m.keywordMatched,
+      sentiment: m.sentiment,
+      relevance: m.relevance,
+    }));
+}
@@ -0,0 +1,34 @@
+/**
+ * Clasificación de urgencia de una mención analizada.
+ *
+ * Síncrona: los umbrales salen del snapshot de settings y el alcance de la
+ * fuente del índice de source-tiers.ts, ambos en memoria.
+ */
+import { getSettingNumberSync } from "@mediabot/shared";
+import { getSourceReachIndexSync, isHighReachSource } from "./source-tiers.js";
+
+export function classifyUrgency(
+  relevance: number,
+  sentiment: string,
+  source: string
+): "CRITICAL" | "HIGH" | "MEDIUM" | "LOW" {
+  // Get thresholds from the settings snapshot (with fallbacks)
+  const criticalMinRelevance = getSettingNumberSync("urgency.critical_min_relevance", 8);
+  const highMinRelevance = getSettingNumberSync("urgency.high_min_relevance", 7);
+  const mediumMinRelevance = getSettingNumberSync("urgency.medium_min_relevance", 4);
+
+  if (
+    relevance >= criticalMinRelevance &&
+    sentiment === "NEGATIVE" &&
+    isHighReachSource(source, getSourceReachIndexSync())
+  ) {
+    return "CRITICAL";
+  }
+  if (relevance >= highMinRelevance || sentiment === "NEGATIVE") {
+    return "HIGH";
+  }
+  if (relevance >= mediumMinRelevance) {
+    return "MEDIUM";
+  }
+  return "LOW";
+}
@@ -1,135 +1,128 @@
-import { Worker } from "bullmq";
+import { Worker, DelayedError } from "bullmq";
 import { connection, QUEUE_NAMES, getQueue } from "../queues.js";
-import { prisma, config, getSettingNumber } from "@mediabot/shared";
+import { prisma, config } from "@mediabot/shared";
 import { publishRealtimeEvent } from "@mediabot/shared/src/realtime-publisher.js";
 import { REALTIME_CHANNELS } from "@mediabot/shared/src/realtime-types.js";
-import { analyzeMention } from "./ai.js";
+import { analyzeMentionsBatch, type CombinedAnalysisResult } from "./ai.js";
 import { processMentionForCrisis } from "./crisis-detector.js";
+import { recordMentionSentiment } from "./crisis-counters.js";
+import { recordMentionForAnomaly } from "./anomaly.js";
+import { recordMentionMetrics } from "./daily-metrics.js";
 import { findClusterParent } from "./clustering.js";
-import type { Urgency, Sentiment } from "@prisma/client";
-
-// High-reach Spanish-language media sources
-const HIGH_REACH_SOURCES = new Set([
-  // Spain
-  "elpais.com", "elmundo.es", "lavanguardia.com", "abc.es",
-  "20minutos.es", "europapress.es", "efe.com", "rtve.es",
-  "elconfidencial.com",
-  // Mexico
-  "milenio.com", "reforma.com", "expansion.mx", "jornada.com.mx",
-  "eluniversal.com.mx", "excelsior.com.mx", "proceso.com.mx",
-  "sinembargo.mx", "lopezdoriga.com",
-  // International
-  "infobae.com", "cnn", "bbc", "reuters",
-]);
+import { applyMentionTopic, getExistingTopicNames } from "./topic-extractor.js";
+import { triageAnalysis } from "./triage.js";
+import { classifyUrgency } from "./urgency.js";
+import { TRIAGE_LOCAL_SUMMARY } from "./triage-model.js";
+import type { Urgency, Sentiment, Prisma } from "@prisma/client";
+
+/** Claim de una mención mientras un lote la analiza (evita doble análisis entre jobs) */
+const CLAIM_KEY_PREFIX = "analysis:claim:";
+/** Marca de menciones ya analizadas como parte del lote de otro job */
+const DONE_KEY_PREFIX = "analysis:done:";
+const CLAIM_TTL_SECONDS = 5 * 60;
+const DONE_TTL_SECONDS = 60 * 60;
+/** Espera antes de reintentar un job cuya mención está en el lote de otro job */
+const CLAIM_RETRY_DELAY_MS = 30 * 1000;
+/** Solo se agrupan menciones pendientes recientes (las que tienen job en cola) */
+const BATCH_LOOKBACK_MS = 24 * 60 * 60 * 1000;
+
+type MentionForAnalysis = Prisma.MentionGetPayload<{
+  include: { article: true; client: true };
+}>;
 
 export function startAnalysisWorker() {
   const worker = new Worker(
     QUEUE_NAMES.ANALYZE_MENTION,
-    async (job) => {
+    async (job, token) => {
       const { mentionId } = job.data as { mentionId: string };
 
-      const mention = await prisma.mention.findUnique({
-        where: { id: mentionId },
-        include: {
-          article: true,
-          client: true,
-        },
-      });
+      // Ya analizada dentro del lote de otro job
+      if (await connection.del(`${DONE_KEY_PREFIX}${mentionId}`)) {
+        return { mentionId, batched: true };
+      }
 
-      if (!mention) return;
+      // Otro job la tiene en un lote en curso: posponer sin consumir intentos
+      const claimed = await connection.set(
+        `${CLAIM_KEY_PREFIX}${mentionId}`, job.id || "1", "EX", CLAIM_TTL_SECONDS, "NX"
+      );
+      if (!claimed) {
+        await job.moveToDelayed(Date.now() + CLAIM_RETRY_DELAY_MS, token);
+        throw new DelayedError();
+      }
 
-      // Run AI analysis
-      const analysis = await analyzeMention({
-        articleTitle: mention.article.title,
-        articleContent: mention.article.content || mention.snippet || "",
-        source: mention.article.source,
-        clientName: mention.client.name,
-        clientDescription: mention.client.description || "",
-        clientIndustry: mention.client.industry || "",
-        keyword: mention.keywordMatched,
-      });
+      let siblings: MentionForAnalysis[] = [];
+      const finished = new Set<string>();
 
-      // Classify urgency using dynamic settings
-      const urgency = await classifyUrgency(
-        analysis.relevance,
-        analysis.sentiment,
-        mention.article.source
-      );
+      try {
+        const mention = await prisma.mention.findUnique({
+          where: { id: mentionId },
+          include: {
+            article: true,
+            client: true,
+          },
+        });
 
-      // Update mention with analysis results
-      await prisma.mention.update({
-        where: { id: mentionId },
-        data: {
-          aiSummary: analysis.summary,
-          aiAction: analysis.suggestedAction,
-          sentiment: analysis.sentiment as Sentiment,
-          relevance: analysis.relevance,
-          urgency: urgency as Urgency,
-        },
-      });
+        if (!mention) return;
 
-      // Publicar evento realtime con resultados del análisis
-      publishRealtimeEvent(REALTIME_CHANNELS.MENTION_ANALYZED, {
-        id: mentionId,
-        clientId: mention.clientId,
-        orgId: mention.client.orgId ?? null,
-        title: mention.article.title,
-        source: mention.article.source,
-        sentiment: analysis.sentiment,
-        urgency,
-        timestamp: new Date().toISOString(),
-      });
+        siblings = await claimBatchSiblings(mention);
+        const batch = [mention, ...siblings];
 
-      // Run clustering for relevant mentions
-      if (analysis.relevance >= 5) {
-        try {
-          const cluster = await findClusterParent({
-            mentionId,
-            clientId: mention.clientId,
-            articleTitle: mention.article.title,
-            aiSummary: analysis.summary,
+        // Triage local: menciones obvias de baja relevancia no pasan por Gemini
+        const analyses = new Map<string, CombinedAnalysisResult>();
+        for (const m of batch) {
+          const local = await triageAnalysis({
+            title: m.article.title,
+            content: m.article.content || m.snippet || "",
+            keyword: m.keywordMatched,
           });
+          if (local) analyses.set(m.id, local);
+        }
+        const pending = batch.filter((m) => !analyses.has(m.id));
 
-          if (cluster.parentId) {
-            await prisma.mention.update({
-              where: { id: mentionId },
-              data: {
-                parentMentionId: cluster.parentId,
-                clusterScore: cluster.score,
-              },
-            });
-            console.log(`[Analysis] Mention ${mentionId} clustered with parent ${cluster.parentId} (score: ${cluster.score.toFixed(2)})`);
-          }
-        } catch (error) {
-          console.error(`[Analysis] Clustering failed for mention ${mentionId}:`, error);
+        if (pending.length > 0) {
+          // Análisis combinado (sentimiento, relevancia, resumen, acción y tema) en una llamada
+          const llmAnalyses = await analyzeMentionsBatch({
+            clientName: mention.client.name,
+            clientDescription: mention.client.description || "",
+            clientIndustry: mention.client.industry || "",
+            existingTopics: await getExistingTopicNames(mention.client.orgId),
+            mentions: pending.map((m) => ({
+              id: m.id,
+              articleTitle: m.article.title,
+              articleContent: m.article.content || m.snippet || "",
+              source: m.article.source,
+              keyword: m.keywordMatched,
+            })),
+          });
+          for (const [id, analysis] of llmAnalyses) analyses.set(id, analysis);
+        }
+
+        if (batch.length > 1 || pending.length < batch.length) {
+          console.log(
+            `[Analysis] Batch of ${batch.length} mentions for client ${mention.clientId}: ` +
+            `${batch.length - pending.length} resolved by triage, ${pending.length} in ${pending.length > 0 ? 1 : 0} AI call`
+          );
         }
-      }
 
-      // Skip notificaciones y crisis para menciones legacy (contexto histórico)
-      // o menciones con publishedAt > 30 días (artículos viejos recién descubiertos)
-      const publishedAt = mention.publishedAt || mention.article.publishedAt;
-      const thirtyDaysAgo = new Date(Date.now() - 30 * 24 * 60 * 60 * 1000);
-      const isOldArticle = publishedAt && new Date(publishedAt) < thirtyDaysAgo;
-
-      if (mention.isLegacy || isOldArticle) {
-        console.log(`[Analysis] Mention ${mentionId} is ${mention.isLegacy ? "legacy" : "old article"}, skipping notification and crisis check`);
-      } else {
-        // Notificaciones se manejan a nivel de tema (NOTIFY_TOPIC) via topic extraction pipeline
-        if (analysis.sentiment === "NEGATIVE") {
-          try {
-            await processMentionForCrisis(mentionId);
-          } catch (error) {
-            console.error(`Crisis check failed for mention ${mentionId}:`, error);
+        for (const m of batch) {
+          await finalizeMention(m, analyses.get(m.id)!);
+          if (m.id !== mentionId) {
+            // Solo tras persistir: su propio job la dará por analizada
+            await connection.set(`${DONE_KEY_PREFIX}${m.id}`, "1", "EX", DONE_TTL_SECONDS);
+            await connection.del(`${CLAIM_KEY_PREFIX}${m.id}`);
+            finished.add(m.id);
           }
         }
-      }
 
-      // Enqueue topic extraction (Sprint 6)
-      try {
-        const topicQueue = getQueue(QUEUE_NAMES.EXTRACT_TOPIC);
-        await topicQueue.add("extract", { mentionId }, { delay: 1000 });
-      } catch (error) {
-        console.error(`[Analysis] Topic extraction enqueue failed for mention ${mentionId}:`, error);
+        return { mentionId, batchSize: batch.length };
+      } finally {
+        // Si el lote falló, liberar las hermanas sin terminar para que sus
+        // propios jobs las analicen sin esperar el TTL del claim
+        const unfinished = siblings.filter((m) => !finished.has(m.id));
+        await connection.del(
+          `${CLAIM_KEY_PREFIX}${mentionId}`,
+          ...unfinished.map((m) => `${CLAIM_KEY_PREFIX}${m.id}`)
+        );
       }
     },
     {
@@ -146,32 +139,180 @@ export function startAnalysisWorker() {
     console.error(`Analysis job ${job?.id} failed:`, err);
   });
 
-  console.log(`🧠 Analysis worker started (concurrency: ${config.workers.analysis.concurrency}, rate: ${config.workers.analysis.rateLimitMax}/${config.workers.analysis.rateLimitWindowMs}ms)`);
+  console.log(`🧠 Analysis worker started (concurrency: ${config.workers.analysis.concurrency}, rate: ${config.workers.analysis.rateLimitMax}/${config.workers.analysis.rateLimitWindowMs}ms, batch: ${config.workers.analysis.batchSize})`);
+}
+
+/**
+ * Reclama otras menciones pendientes del mismo cliente para analizarlas en el
+ * mismo lote. Solo se incluyen las que se logran reclamar en Redis; sus propios
+ * jobs las encontrarán marcadas como analizadas.
+ */
+async function claimBatchSiblings(mention: MentionForAnalysis): Promise<MentionForAnalysis[]> {
+  const extra = config.workers.analysis.batchSize - 1;
+  if (extra <= 0) return [];
+
+  const pending = await prisma.mention.findMany({
+    where: {
+      clientId: mention.clientId,
+      id: { not: mention.id },
+      aiSummary: null,
+      createdAt: { gte: new Date(Date.now() - BATCH_LOOKBACK_MS) },
+    },
+    include: {
+      article: true,
+      client: true,
+    },
+    orderBy: { createdAt: "asc" },
+    take: extra * 2, // Margen para las que ya estén reclamadas por otro job
+  });
+
+  const claimed: MentionForAnalysis[] = [];
+  for (const candidate of pending) {
+    if (claimed.length >= extra) break;
+    const ok = await connection.set(
+      `${CLAIM_KEY_PREFIX}${candidate.id}`, mention.id, "EX", CLAIM_TTL_SECONDS, "NX"
+    );
+    if (ok) claimed.push(candidate);
+  }
+  return claimed;
 }
 
-async function classifyUrgency(
-  relevance: number,
-  sentiment: string,
-  source: string
-): Promise<string> {
-  // Get thresholds from settings (with fallbacks)
-  const criticalMinRelevance = await getSettingNumber("urgency.critical_min_relevance", 8);
-  const highMinRelevance = await getSettingNumber("urgency.high_min_relevance", 7);
-  const mediumMinRelevance = await getSettingNumber("urgency.medium_min_relevance", 4);
-
-  const sourceLower = source.toLowerCase();
-  const isHighReach = [...HIGH_REACH_SOURCES].some((s) =>
-    sourceLower.includes(s)
+/**
+ * Persiste el análisis de una mención y ejecuta los pasos posteriores:
+ * urgencia, evento realtime, clustering, crisis y asignación de tema.
+ */
+async function finalizeMention(
+  mention: MentionForAnalysis,
+  analysis: CombinedAnalysisResult
+): Promise<void> {
+  const mentionId = mention.id;
+
+  // Classify urgency using dynamic settings
+  const urgency = classifyUrgency(
+    analysis.relevance,
+    analysis.sentiment,
+    mention.article.source
   );
 
-  if (relevance >= criticalMinRelevance && sentiment === "NEGATIVE" && isHighReach) {
-    return "CRITICAL";
+  // Update mention with analysis results
+  await prisma.mention.update({
+    where: { id: mentionId },
+    data: {
+      aiSummary: analysis.summary,
+      aiAction: analysis.suggestedAction,
+      sentiment: analysis.sentiment as Sentiment,
+      relevance: analysis.relevance,
+      urgency: urgency as Urgency,
+    },
+  });
+
+  // Rollup diario (un re-análisis solo mueve la mención de bucket)
+  try {
+    await recordMentionMetrics({
+      clientId: mention.clientId,
+      date: mention.publishedAt ?? mention.createdAt,
+      source: mention.article.source,
+      sentiment: analysis.sentiment,
+      urgency,
+      previous: mention.aiSummary ? { sentiment: mention.sentiment, urgency: mention.urgency } : null,
+    });
+  } catch (error) {
+    console.error(`[Analysis] Failed to update daily metrics for mention ${mentionId}:`, error);
   }
-  if (relevance >= highMinRelevance || sentiment === "NEGATIVE") {
-    return "HIGH";
+
+  // Publicar evento realtime con resultados del análisis
+  publishRealtimeEvent(REALTIME_CHANNELS.MENTION_ANALYZED, {
+    id: mentionId,
+    clientId: mention.clientId,
+    orgId: mention.client.orgId ?? null,
+    title: mention.article.title,
+    source: mention.article.source,
+    sentiment: analysis.sentiment,
+    urgency,
+    timestamp: new Date().toISOString(),
+  });
+
+  // Run clustering for relevant mentions
+  if (analysis.relevance >= 5) {
+    try {
+      const cluster = await findClusterParent({
+        mentionId,
+        clientId: mention.clientId,
+        articleTitle: mention.article.title,
+        aiSummary: analysis.summary,
+      });
+
+      if (cluster.parentId) {
+        await prisma.mention.update({
+          where: { id: mentionId },
+          data: {
+            parentMentionId: cluster.parentId,
+            clusterScore: cluster.score,
+          },
+        });
+        console.log(`[Analysis] Mention ${mentionId} clustered with parent ${cluster.parentId} (score: ${cluster.score.toFixed(2)})`);
+      }
+    } catch (error) {
+      console.error(`[Analysis] Clustering failed for mention ${mentionId}:`, error);
+    }
   }
-  if (relevance >= mediumMinRelevance) {
-    return "MEDIUM";
+
+  // Skip notificaciones y crisis para menciones legacy (contexto histórico)
+  // o menciones con publishedAt > 30 días (artículos viejos recién descubiertos)
+  const publishedAt = mention.publishedAt || mention.article.publishedAt;
+  const thirtyDaysAgo = new Date(Date.now() - 30 * 24 * 60 * 60 * 1000);
+  const isOldArticle = publishedAt && new Date(publishedAt) < thirtyDaysAgo;
+
+  if (mention.isLegacy || isOldArticle) {
+    console.log(`[Analysis] Mention ${mentionId} is ${mention.isLegacy ? "legacy" : "old article"}, skipping notification and crisis check`);
+  } else {
+    // Notificaciones se manejan a nivel de tema (NOTIFY_TOPIC) via topic extraction pipeline
+    // El baseline cuenta por hora de análisis: un re-análisis ya está contado
+    // en la hora original y no se vuelve a sumar
+    if (!mention.aiSummary) {
+      try {
+        await recordMentionForAnomaly({ clientId: mention.clientId, sentiment: analysis.sentiment });
+      } catch (error) {
+        console.error(`[Analysis] Failed to update anomaly baseline for mention ${mentionId}:`, error);
+      }
+    }
+    try {
+      await recordMentionSentiment({
+        clientId: mention.clientId,
+        mentionId,
+        publishedAt: mention.publishedAt ? new Date(mention.publishedAt) : null,
+        sentiment: analysis.sentiment,
+        previousSentiment: mention.aiSummary ? mention.sentiment : null,
+      });
+    } catch (error) {
+      console.error(`[Analysis] Failed to record negative counter for mention ${mentionId}:`, error);
+    }
+    if (analysis.sentiment === "NEGATIVE") {
+      try {
+        await processMentionForCrisis(mentionId);
+      } catch (error) {
+        console.error(`Crisis check failed for mention ${mentionId}:`, error);
+      }
+    }
+  }
+
+  // Tema: viene en el análisis combinado; si no, se extrae aparte (Sprint 6).
+  // Las menciones resueltas por el triage local no justifican otra llamada a Gemini.
+  if (analysis.summary === TRIAGE_LOCAL_SUMMARY) {
+    return;
+  }
+  if (analysis.topic && analysis.topicConfidence >= 0.3) {
+    try {
+      await applyMentionTopic(mentionId, analysis.topic, mention.client.orgId);
+    } catch (error) {
+      console.error(`[Analysis] Topic assignment failed for mention ${mentionId}:`, error);
+    }
+  } else {
+    try {
+      const topicQueue = getQueue(QUEUE_NAMES.EXTRACT_TOPIC);
+      await topicQueue.add("extract", { mentionId }, { delay: 1000 });
+    } catch (error) {
+      console.error(`[Analysis] Topic extraction enqueue failed for mention ${mentionId}:`, error);
+    }
   }
-  return "LOW";
 }
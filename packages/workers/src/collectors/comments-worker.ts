@@ -2,20 +2,73 @@
  * Worker para extracción de comentarios de posts de Instagram y TikTok.
  *
  * Procesa la cola EXTRACT_COMMENTS para extraer comentarios bajo demanda.
- * Los comentarios se guardan en commentsData del SocialMention y se
- * encola el análisis de sentimiento de los comentarios.
+ * Los comentarios se guardan en la tabla SocialMentionComment (uno por
+ * comentario de la plataforma). La extracción es incremental: se omiten los
+ * comentarios ya almacenados (en Instagram se corta la paginación al llegar a
+ * ellos) y solo el delta se encola para análisis de sentimiento. Los
+ * comentarios del JSON legacy (`commentsData`) se migran a filas en la
+ * primera extracción.
  */
 
 import { Worker } from "bullmq";
 import { connection, QUEUE_NAMES, getQueue } from "../queues.js";
 import { prisma, config, getEnsembleDataClient } from "@mediabot/shared";
 import type { SocialComment } from "@mediabot/shared";
+import type { SocialPlatform } from "@prisma/client";
+
+/**
+ * Cantidad de IDs recientes que se pasan como ya almacenados. En Instagram
+ * (orden cronológico) basta con los más nuevos; en YouTube/TikTok solo evitan
+ * gastar cupo en repetidos, el dedup final lo hace el unique (platform, commentId).
+ */
+const KNOWN_IDS_WINDOW = 200;
 
 interface ExtractCommentsJobData {
   mentionId: string;
   maxComments?: number;
 }
 
+/**
+ * Comentarios del JSON legacy (`SocialMention.commentsData`), extraídos antes
+ * de la tabla SocialMentionComment. Descarta entradas sin ID o sin texto.
+ */
+function parseLegacyComments(data: unknown): SocialComment[] {
+  if (!Array.isArray(data)) return [];
+  const comments: SocialComment[] = [];
+  for (const item of data) {
+    if (!item || typeof item !== "object") continue;
+    const raw = item as Record<string, unknown>;
+    if (!raw.commentId || typeof raw.text !== "string") continue;
+    const postedAt = raw.postedAt ? new Date(String(raw.postedAt)) : null;
+    comments.push({
+      commentId: String(raw.commentId),
+      text: raw.text,
+      authorHandle: String(raw.authorHandle ?? ""),
+      authorName: raw.authorName ? String(raw.authorName) : null,
+      likes: Number(raw.likes) || 0,
+      replies: Number(raw.replies) || 0,
+      postedAt: postedAt && !isNaN(postedAt.getTime()) ? postedAt : null,
+    });
+  }
+  return comments;
+}
+
+function toCommentRows(mentionId: string, platform: SocialPlatform, comments: SocialComment[]) {
+  return comments
+    .filter((c) => c.commentId)
+    .map((c) => ({
+      socialMentionId: mentionId,
+      platform,
+      commentId: c.commentId,
+      text: c.text,
+      authorHandle: c.authorHandle,
+      authorName: c.authorName,
+      likes: c.likes,
+      replies: c.replies,
+      postedAt: c.postedAt,
+    }));
+}
+
 /**
  * Extrae el shortcode de una URL de Instagram.
  * Formato: https://instagram.com/p/SHORTCODE
@@ -84,6 +137,31 @@ export function startCommentsExtractionWorker() {
         return { error: "api_not_configured" };
       }
 
+      // IDs ya almacenados para omitirlos (y cortar la paginación en Instagram)
+      const stored = await prisma.socialMentionComment.findMany({
+        where: { socialMentionId: mentionId },
+        select: { commentId: true },
+        orderBy: [{ postedAt: "desc" }, { createdAt: "desc" }],
+        take: KNOWN_IDS_WINDOW,
+      });
+
+      // Primera extracción con la tabla: migrar los comentarios del JSON legacy
+      // a filas (quedan pendientes de análisis para los contadores de sentimiento)
+      let migrated = 0;
+      const knownIds = stored.map((c) => c.commentId);
+      if (stored.length === 0) {
+        const legacy = parseLegacyComments(mention.commentsData);
+        if (legacy.length > 0) {
+          ({ count: migrated } = await prisma.socialMentionComment.createMany({
+            data: toCommentRows(mentionId, mention.platform, legacy),
+            skipDuplicates: true,
+          }));
+          knownIds.push(...legacy.map((c) => c.commentId));
+          console.log(`[CommentsWorker] Migrated ${migrated} legacy comments for mention ${mentionId}`);
+        }
+      }
+      const fetchOptions = knownIds.length > 0 ? { knownCommentIds: new Set(knownIds) } : {};
+
       let comments: SocialComment[] = [];
 
       try {
@@ -93,7 +171,8 @@ export function startCommentsExtractionWorker() {
             const videoId = extractTikTokVideoId(mention.postUrl) || mention.postId;
             comments = await client.getTikTokPostComments(
               videoId,
-              maxComments || config.socialComments.tiktokMaxComments
+              maxComments || config.socialComments.tiktokMaxComments,
+              fetchOptions
             );
             break;
           }
@@ -102,7 +181,8 @@ export function startCommentsExtractionWorker() {
             // Usar el postId (media_id numérico) directamente
             comments = await client.getInstagramPostComments(
               mention.postId,
-              maxComments || config.socialComments.instagramMaxComments
+              maxComments || config.socialComments.instagramMaxComments,
+              fetchOptions
             );
             break;
           }
@@ -111,7 +191,8 @@ export function startCommentsExtractionWorker() {
             const videoId = extractYouTubeVideoId(mention.postUrl) || mention.postId;
             comments = await client.getYouTubeVideoComments(
               videoId,
-              maxComments || config.socialComments.youtubeMaxComments
+              maxComments || config.socialComments.youtubeMaxComments,
+              fetchOptions
             );
             break;
           }
@@ -126,23 +207,31 @@ export function startCommentsExtractionWorker() {
             return { skipped: true, reason: "unknown_platform" };
         }
 
-        // Guardar comentarios en la DB
+        // Guardar solo comentarios nuevos (dedup por platform + commentId)
+        const { count: inserted } = await prisma.socialMentionComment.createMany({
+          data: toCommentRows(mentionId, mention.platform, comments),
+          skipDuplicates: true,
+        });
+        const added = migrated + inserted;
+
         await prisma.socialMention.update({
           where: { id: mentionId },
           data: {
-            commentsData: comments as unknown as object[],
-            commentsCount: comments.length,
+            // Sin filas previas la tabla tiene exactamente lo migrado + lo nuevo
+            // (el conteo anterior venía del JSON legacy, ya migrado)
+            commentsCount: stored.length === 0 ? added : { increment: inserted },
             commentsExtractedAt: new Date(),
-            commentsAnalyzed: false, // Marca para análisis pendiente
+            // Solo hay análisis pendiente si llegaron comentarios nuevos
+            ...(added > 0 ? { commentsAnalyzed: false } : {}),
           },
         });
 
         console.log(
-          `[CommentsWorker] Saved ${comments.length} comments for mention ${mentionId}`
+          `[CommentsWorker] Saved ${inserted} new comments for mention ${mentionId} (${comments.length} fetched)`
         );
 
-        // Encolar análisis de comentarios si hay suficientes
-        if (comments.length > 0) {
+        // Encolar análisis del delta
+        if (added > 0) {
           await analyzeQueue.add(
             "analyze-comments",
             {
@@ -150,7 +239,7 @@ export function startCommentsExtractionWorker() {
               hasComments: true,
             },
             {
-              jobId: `analyze-comments-${mentionId}`,
+              jobId: `analyze-comments-${mentionId}-${Date.now()}`,
               attempts: 3,
               backoff: { type: "exponential", delay: 5000 },
             }
@@ -160,7 +249,7 @@ export function startCommentsExtractionWorker() {
 
         return {
           success: true,
-          commentsExtracted: comments.length,
+          commentsExtracted: inserted,
           platform: mention.platform,
         };
       } catch (error) {
@@ -5,6 +5,7 @@ import { publishRealtimeEvent } from "@mediabot/shared/src/realtime-publisher.js
 import { REALTIME_CHANNELS } from "@mediabot/shared/src/realtime-types.js";
 import { getQueue, QUEUE_NAMES } from "../queues.js";
 import { preFilterArticle } from "../analysis/ai.js";
+import { triagePreFilter } from "../analysis/triage.js";
 
 /** Patrones de URLs que no son artículos reales */
 const NON_ARTICLE_PATTERNS = [
@@ -168,28 +169,42 @@ async function matchArticle(
   for (const [, match] of matchesByClient) {
     // Pre-filter: Use AI to validate if this is a real mention
     try {
-      const preFilterThreshold = await getSettingNumber("prefilter.confidence_threshold", 0.6);
-
-      const preFilterResult = await preFilterArticle({
-        articleTitle: article.title,
-        articleContent: article.content || "",
-        clientName: match.client.name,
-        clientDescription: match.client.description || "",
+      // Triage local: los casos obvios se resuelven sin llamar a Gemini
+      const triage = await triagePreFilter({
+        title: article.title,
+        content: article.content || "",
         keyword: match.keyword,
       });
 
-      if (!preFilterResult.relevant || preFilterResult.confidence < preFilterThreshold) {
+      if (triage.decision === "accept") {
         console.log(
-          `⏭️ Pre-filter skip: client="${match.client.name}" keyword="${match.keyword}" ` +
-          `reason="${preFilterResult.reason}" confidence=${preFilterResult.confidence.toFixed(2)} (threshold: ${preFilterThreshold})`
+          `✅ Triage pass: client="${match.client.name}" keyword="${match.keyword}" ` +
+          `confidence=${triage.confidence.toFixed(2)}`
         );
-        continue;
-      }
+      } else {
+        const preFilterThreshold = await getSettingNumber("prefilter.confidence_threshold", 0.6);
+
+        const preFilterResult = await preFilterArticle({
+          articleTitle: article.title,
+          articleContent: article.content || "",
+          clientName: match.client.name,
+          clientDescription: match.client.description || "",
+          keyword: match.keyword,
+        });
+
+        if (!preFilterResult.relevant || preFilterResult.confidence < preFilterThreshold) {
+          console.log(
+            `⏭️ Pre-filter skip: client="${match.client.name}" keyword="${match.keyword}" ` +
+            `reason="${preFilterResult.reason}" confidence=${preFilterResult.confidence.toFixed(2)} (threshold: ${preFilterThreshold})`
+          );
+          continue;
+        }
 
-      console.log(
-        `✅ Pre-filter pass: client="${match.client.name}" keyword="${match.keyword}" ` +
-        `confidence=${preFilterResult.confidence.toFixed(2)}`
-      );
+        console.log(
+          `✅ Pre-filter pass: client="${match.client.name}" keyword="${match.keyword}" ` +
+          `confidence=${preFilterResult.confidence.toFixed(2)}`
+        );
+      }
     } catch (error) {
       // If pre-filter fails, proceed with mention creation (don't lose potential mentions)
       console.error(`⚠️ Pre-filter error for client="${match.client.name}":`, error);
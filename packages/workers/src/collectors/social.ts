@@ -19,6 +19,7 @@ import {
 import { publishRealtimeEvent } from "@mediabot/shared/src/realtime-publisher.js";
 import { REALTIME_CHANNELS } from "@mediabot/shared/src/realtime-types.js";
 import { getQueue, QUEUE_NAMES } from "../queues.js";
+import { recordSocialMetrics } from "../analysis/daily-metrics.js";
 import type { SocialPlatform as PrismaSocialPlatform } from "@prisma/client";
 
 // Delay entre llamadas a la API para respetar rate limits
@@ -329,6 +330,13 @@ async function savePosts(
             updatedAt: new Date(),
           },
         });
+
+        await recordSocialMetrics({
+          clientId: existing.clientId,
+          date: existing.postedAt ?? existing.createdAt,
+          current: post,
+          previous: existing,
+        }).catch((error) => console.error(`[Social] Failed to update daily metrics for ${existing.id}:`, error));
       } else {
         // Crear nueva mención
         const created = await prisma.socialMention.create({
@@ -352,6 +360,12 @@ async function savePosts(
         });
         newCount++;
 
+        await recordSocialMetrics({
+          clientId,
+          date: created.postedAt ?? created.createdAt,
+          current: created,
+        }).catch((error) => console.error(`[Social] Failed to update daily metrics for ${created.id}:`, error));
+
         // Publicar evento realtime
         publishRealtimeEvent(REALTIME_CHANNELS.SOCIAL_NEW, {
           id: created.id,
@@ -1,4 +1,7 @@
 import http from "node:http";
+import { getAiUsageStats } from "./analysis/ai-metrics.js";
+import { getClusterCacheStats } from "./analysis/cluster-cache.js";
+import { getTelegramDeliveryStats } from "./notifications/telegram-delivery.js";
 
 const PORT = parseInt(process.env.HEALTH_PORT || "3001", 10);
 
@@ -21,6 +24,42 @@ export function startHealthServer(): Promise<void> {
         });
         res.writeHead(200, { "Content-Type": "application/json" });
         res.end(payload);
+      } else if (req.url === "/metrics/ai" && req.method === "GET") {
+        // Uso de Gemini del día por familia de prompt (tokens y latencia)
+        getAiUsageStats()
+          .then((stats) => {
+            res.writeHead(200, { "Content-Type": "application/json" });
+            res.end(JSON.stringify({ date: new Date().toISOString().slice(0, 10), families: stats }));
+          })
+          .catch((error) => {
+            console.error("[Health] Failed to read AI metrics:", error);
+            res.writeHead(500);
+            res.end();
+          });
+      } else if (req.url === "/metrics/cluster-cache" && req.method === "GET") {
+        // Hit rates del cache de clustering del día
+        getClusterCacheStats()
+          .then((stats) => {
+            res.writeHead(200, { "Content-Type": "application/json" });
+            res.end(JSON.stringify({ date: new Date().toISOString().slice(0, 10), ...stats }));
+          })
+          .catch((error) => {
+            console.error("[Health] Failed to read cluster cache metrics:", error);
+            res.writeHead(500);
+            res.end();
+          });
+      } else if (req.url === "/metrics/telegram" && req.method === "GET") {
+        // Entregas Telegram del día por prioridad (enviados, fallidos, 429, latencia) y envíos ahorrados por agrupación
+        getTelegramDeliveryStats()
+          .then((stats) => {
+            res.writeHead(200, { "Content-Type": "application/json" });
+            res.end(JSON.stringify({ date: new Date().toISOString().slice(0, 10), ...stats }));
+          })
+          .catch((error) => {
+            console.error("[Health] Failed to read Telegram metrics:", error);
+            res.writeHead(500);
+            res.end();
+          });
       } else {
         res.writeHead(404);
         res.end();
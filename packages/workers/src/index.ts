@@ -19,8 +19,12 @@ import { startWatchdogWorker } from "./workers/watchdog.js";
 import { startArchiveWorker } from "./workers/archive-worker.js";
 import { startAlertRulesWorker } from "./workers/alert-rules-worker.js";
 import { startCloseInactiveThreadsWorker, startSocialTopicWorker } from "./workers/topic-thread-worker.js";
+import { startReclusterWorker } from "./workers/recluster-worker.js";
+import { startDailyMetricsWorker } from "./workers/daily-metrics-worker.js";
+import { startCrisisCheckWorker } from "./workers/crisis-check-worker.js";
 import { startHealthServer, stopHealthServer } from "./health.js";
-import { config } from "@mediabot/shared";
+import { getSourceReachIndex } from "./analysis/source-tiers.js";
+import { config, prefetchSettings } from "@mediabot/shared";
 
 async function main() {
   console.log("🔄 Starting MediaBot workers...");
@@ -28,6 +32,9 @@ async function main() {
   // Health server para Docker healthcheck (antes de queues para detectar fallos de inicio)
   await startHealthServer();
 
+  // Settings e índice de fuentes antes de procesar jobs (los hot paths los leen síncrono)
+  await Promise.all([prefetchSettings(), getSourceReachIndex()]);
+
   const queues = setupQueues();
 
   // Start all workers
@@ -65,6 +72,15 @@ async function main() {
   startCloseInactiveThreadsWorker();
   startSocialTopicWorker();
 
+  // Reconciliación de contadores de crisis (cada 5 minutos)
+  startCrisisCheckWorker();
+
+  // Re-clustering offline (bajo demanda)
+  startReclusterWorker();
+
+  // Rollup diario de métricas (reconciliación nocturna + backfill bajo demanda)
+  startDailyMetricsWorker();
+
   console.log("✅ All workers started");
 
   // Graceful shutdown
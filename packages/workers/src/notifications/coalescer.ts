@@ -0,0 +1,186 @@
+/**
+ * Agrupación de notificaciones Telegram no críticas por (destinatario, cliente).
+ *
+ * Durante una noticia en desarrollo un mismo grupo recibía decenas de alertas,
+ * temas y temas emergentes en pocos minutos. Los eventos se acumulan en una
+ * lista de Redis durante config.workers.notification.coalesceWindowSeconds y
+ * un job "coalesce-flush" envía al vencer un solo mensaje (el original si solo
+ * hubo uno), con la prioridad más alta de la ventana. CRITICAL nunca se agrupa.
+ *
+ * Cada evento programa el flush con un jobId derivado del buffer y del primer
+ * evento de la ventana: BullMQ ignora los duplicados, y si el add del primero
+ * falla lo programa el siguiente.
+ */
+import { randomUUID } from "crypto";
+import type { Job } from "bullmq";
+import { config } from "@mediabot/shared";
+import { connection, QUEUE_NAMES, getQueue } from "../queues.js";
+import {
+  DELIVERY_PRIORITY,
+  enqueueTelegramDeliveries,
+  recordCoalescedFlush,
+  toJobOptions,
+  type DeliveryPriority,
+  type RecipientSource,
+  type TelegramSendOptions,
+} from "./telegram-delivery.js";
+
+export const COALESCE_FLUSH_JOB = "coalesce-flush";
+
+const BUFFER_KEY_PREFIX = "telegram:coalesce:";
+/** Eventos listados en un mensaje combinado */
+const MAX_COMBINED_ITEMS = 15;
+
+/** Cliente del evento y la línea que lo resume en un mensaje combinado */
+export interface CoalesceTarget {
+  clientId: string;
+  clientName: string;
+  summary: string;
+}
+
+export interface BufferedEvent {
+  /** Identifica la ventana cuando es el primer evento del buffer */
+  id?: string;
+  message: string;
+  summary: string;
+  options?: TelegramSendOptions;
+  priority?: DeliveryPriority;
+}
+
+export interface CoalesceFlushJob {
+  chatId: string;
+  label?: string | null;
+  source?: RecipientSource;
+  clientId: string;
+  clientName: string;
+  /** Prioridad del primer evento; la entrega usa la más alta del buffer */
+  priority: DeliveryPriority;
+}
+
+function bufferKey(chatId: string, clientId: string): string {
+  return `${BUFFER_KEY_PREFIX}${chatId}:${clientId}`;
+}
+
+/** Un flush por ventana: mismo buffer y mismo primer evento */
+function flushJobId(chatId: string, clientId: string, windowId: string): string {
+  return `coalesce-${chatId}-${clientId}-${windowId}`;
+}
+
+/**
+ * Prioridad de la entrega combinada: la más alta (menor número) de los
+ * eventos. Los eventos encolados sin prioridad usan la del job.
+ */
+export function flushPriority(events: BufferedEvent[], fallback: DeliveryPriority): DeliveryPriority {
+  return events.reduce<DeliveryPriority>((best, e) => Math.min(best, e.priority ?? fallback) as DeliveryPriority, fallback);
+}
+
+/**
+ * Mensaje a enviar por los eventos de una ventana: el original (con su
+ * teclado) si hubo uno, o una lista de resúmenes si hubo varios.
+ */
+export function combineEvents(
+  clientName: string,
+  events: BufferedEvent[]
+): { message: string; options?: TelegramSendOptions } {
+  if (events.length === 1) {
+    return { message: events[0].message, options: events[0].options };
+  }
+
+  const lines = events.slice(0, MAX_COMBINED_ITEMS).map((e) => `• ${e.summary}`);
+  if (events.length > MAX_COMBINED_ITEMS) {
+    lines.push(`... y ${events.length - MAX_COMBINED_ITEMS} mas`);
+  }
+
+  return {
+    message:
+      `📬 ${events.length} NOTIFICACIONES | ${clientName}\n` +
+      `━━━━━━━━━━━━━━━━━━━━\n\n` +
+      `${lines.join("\n")}\n\n` +
+      `Revisa el detalle en el dashboard.`,
+  };
+}
+
+/**
+ * Encola un mensaje agrupable. Sin ventana configurada o con prioridad
+ * CRITICAL se entrega directo.
+ */
+export async function enqueueCoalescedDeliveries(
+  recipients: Array<{ chatId: string; label?: string | null; source?: RecipientSource }>,
+  message: string,
+  target: CoalesceTarget,
+  options?: TelegramSendOptions,
+  priority: DeliveryPriority = DELIVERY_PRIORITY.NORMAL
+): Promise<number> {
+  const windowMs = config.workers.notification.coalesceWindowSeconds * 1000;
+  if (windowMs <= 0 || priority === DELIVERY_PRIORITY.CRITICAL) {
+    return enqueueTelegramDeliveries(recipients, message, options, priority);
+  }
+
+  const event = JSON.stringify({
+    id: randomUUID(),
+    message,
+    summary: target.summary,
+    options: toJobOptions(options),
+    priority,
+  } satisfies BufferedEvent);
+  const queue = getQueue(QUEUE_NAMES.NOTIFY_TELEGRAM);
+
+  for (const r of recipients) {
+    const key = bufferKey(r.chatId, target.clientId);
+    // TTL de respaldo: si el flush se pierde, la lista no crece indefinidamente
+    const results = await connection
+      .multi()
+      .rpush(key, event)
+      .pexpire(key, windowMs * 10)
+      .lindex(key, 0)
+      .exec();
+    const first = JSON.parse(String(results?.[2]?.[1] ?? event)) as BufferedEvent;
+    // Buffer anterior a los ids: su primer evento ya programó el flush
+    if (!first.id) continue;
+
+    await queue.add(
+      COALESCE_FLUSH_JOB,
+      {
+        chatId: r.chatId,
+        label: r.label,
+        source: r.source,
+        clientId: target.clientId,
+        clientName: target.clientName,
+        priority: first.priority ?? priority,
+      } satisfies CoalesceFlushJob,
+      {
+        jobId: flushJobId(r.chatId, target.clientId, first.id),
+        delay: windowMs,
+        priority: first.priority ?? priority,
+        removeOnComplete: 1000,
+        removeOnFail: 1000,
+      }
+    );
+  }
+  return recipients.length;
+}
+
+/**
+ * Cierra la ventana de un (destinatario, cliente): toma los eventos
+ * acumulados y encola una sola entrega.
+ */
+export async function processCoalesceFlush(job: Job<CoalesceFlushJob>): Promise<void> {
+  const { chatId, label, source, clientId, clientName, priority } = job.data;
+  const key = bufferKey(chatId, clientId);
+
+  const results = await connection.multi().lrange(key, 0, -1).del(key).exec();
+  const raw = (results?.[0]?.[1] as string[] | undefined) ?? [];
+  if (raw.length === 0) return;
+
+  const events = raw.map((item) => JSON.parse(item) as BufferedEvent);
+  const { message, options } = combineEvents(clientName, events);
+  await enqueueTelegramDeliveries([{ chatId, label, source }], message, options, flushPriority(events, priority));
+
+  recordCoalescedFlush(events.length);
+
+  if (events.length > 1) {
+    console.log(
+      `[Telegram] Coalesced ${events.length} events for ${label || chatId} (${clientName}), saved ${events.length - 1} sends`
+    );
+  }
+}
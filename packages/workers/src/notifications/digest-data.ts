@@ -0,0 +1,267 @@
+/**
+ * Datos del digest diario calculados en SQL.
+ *
+ * Los conteos (sentimiento de hoy y ayer, SOV contra la org, redes sociales,
+ * crisis activas) se resuelven para todos los clientes con unas pocas
+ * consultas agregadas antes de procesar el digest. Por cliente solo se leen
+ * las filas que se muestran (top noticias por cluster, top posts); a igual
+ * relevancia se prefieren las fuentes de mayor tier.
+ */
+import { prisma } from "@mediabot/shared";
+import { getSourceTierMap, sourceWeight } from "../analysis/source-tiers.js";
+
+/** Candidatos leídos por cada puesto del ranking, para desempatar por fuente */
+export const RANK_CANDIDATES_FACTOR = 3;
+
+export interface SentimentCounts {
+  positive: number;
+  negative: number;
+  neutral: number;
+  mixed: number;
+}
+
+export interface DigestSocialStats {
+  totalPosts: number;
+  platforms: Record<string, number>;
+  likes: number;
+  comments: number;
+  shares: number;
+}
+
+export interface DigestStats {
+  mentions: number;
+  sentiment: SentimentCounts;
+  yesterdayMentions: number;
+  yesterdaySentiment: SentimentCounts;
+  /** % de las menciones de la org en las últimas 24h */
+  sov: number;
+  yesterdaySov: number;
+  social: DigestSocialStats;
+  activeCrises: number;
+}
+
+export interface DigestCluster {
+  title: string;
+  source: string;
+  sentiment: string;
+  relevance: number;
+  /** Fuentes del cluster, por relevancia, sin repetir */
+  sources: string[];
+}
+
+interface MentionCountRow {
+  clientId: string;
+  sentiment: string;
+  today: number;
+  yesterday: number;
+}
+
+interface OrgCountRow {
+  orgId: string;
+  today: number;
+  yesterday: number;
+}
+
+interface SocialCountRow {
+  clientId: string;
+  platform: string;
+  posts: number;
+  likes: number;
+  comments: number;
+  shares: number;
+}
+
+function emptySentiment(): SentimentCounts {
+  return { positive: 0, negative: 0, neutral: 0, mixed: 0 };
+}
+
+function emptyStats(): DigestStats {
+  return {
+    mentions: 0,
+    sentiment: emptySentiment(),
+    yesterdayMentions: 0,
+    yesterdaySentiment: emptySentiment(),
+    sov: 0,
+    yesterdaySov: 0,
+    social: { totalPosts: 0, platforms: {}, likes: 0, comments: 0, shares: 0 },
+    activeCrises: 0,
+  };
+}
+
+/**
+ * Combina las filas agregadas en stats por cliente. Función pura.
+ */
+export function foldDigestStats(
+  clients: { id: string; orgId: string }[],
+  mentionRows: MentionCountRow[],
+  orgRows: OrgCountRow[],
+  socialRows: SocialCountRow[],
+  crisisRows: { clientId: string; count: number }[]
+): Map<string, DigestStats> {
+  const stats = new Map<string, DigestStats>(clients.map((c) => [c.id, emptyStats()]));
+
+  for (const row of mentionRows) {
+    const s = stats.get(row.clientId);
+    if (!s) continue;
+    const key = row.sentiment.toLowerCase() as keyof SentimentCounts;
+    s.mentions += row.today;
+    s.yesterdayMentions += row.yesterday;
+    if (key in s.sentiment) {
+      s.sentiment[key] += row.today;
+      s.yesterdaySentiment[key] += row.yesterday;
+    }
+  }
+
+  const orgTotals = new Map(orgRows.map((row) => [row.orgId, row]));
+  for (const client of clients) {
+    const s = stats.get(client.id)!;
+    const org = orgTotals.get(client.orgId);
+    s.sov = org && org.today > 0 ? (s.mentions / org.today) * 100 : 0;
+    s.yesterdaySov = org && org.yesterday > 0 ? (s.yesterdayMentions / org.yesterday) * 100 : 0;
+  }
+
+  for (const row of socialRows) {
+    const social = stats.get(row.clientId)?.social;
+    if (!social) continue;
+    social.totalPosts += row.posts;
+    social.platforms[row.platform] = (social.platforms[row.platform] || 0) + row.posts;
+    social.likes += row.likes;
+    social.comments += row.comments;
+    social.shares += row.shares;
+  }
+
+  for (const row of crisisRows) {
+    const s = stats.get(row.clientId);
+    if (s) s.activeCrises = row.count;
+  }
+
+  return stats;
+}
+
+/**
+ * Stats de todos los clientes: 4 consultas agregadas en total.
+ */
+export async function loadDigestStats(
+  clients: { id: string; orgId: string }[],
+  since: Date
+): Promise<Map<string, DigestStats>> {
+  if (clients.length === 0) return new Map();
+
+  const clientIds = clients.map((c) => c.id);
+  const orgIds = [...new Set(clients.map((c) => c.orgId))];
+  const yesterdayStart = new Date(since.getTime() - 24 * 60 * 60 * 1000);
+
+  const [mentionRows, orgRows, socialRows, crisisRows] = await Promise.all([
+    prisma.$queryRaw<MentionCountRow[]>`
+      SELECT "clientId", sentiment::text AS sentiment,
+             COUNT(*) FILTER (WHERE "publishedAt" >= ${since})::int AS today,
+             COUNT(*) FILTER (WHERE "publishedAt" < ${since})::int AS yesterday
+      FROM "Mention"
+      WHERE "clientId" = ANY(${clientIds})
+      AND "publishedAt" >= ${yesterdayStart}
+      GROUP BY "clientId", sentiment
+    `,
+    prisma.$queryRaw<OrgCountRow[]>`
+      SELECT c."orgId",
+             COUNT(*) FILTER (WHERE m."publishedAt" >= ${since})::int AS today,
+             COUNT(*) FILTER (WHERE m."publishedAt" < ${since})::int AS yesterday
+      FROM "Mention" m
+      JOIN "Client" c ON c.id = m."clientId"
+      WHERE c."orgId" = ANY(${orgIds})
+      AND m."publishedAt" >= ${yesterdayStart}
+      GROUP BY c."orgId"
+    `,
+    prisma.$queryRaw<SocialCountRow[]>`
+      SELECT "clientId", platform::text AS platform, COUNT(*)::int AS posts,
+             COALESCE(SUM(likes), 0)::int AS likes,
+             COALESCE(SUM(comments), 0)::int AS comments,
+             COALESCE(SUM(shares), 0)::int AS shares
+      FROM "SocialMention"
+      WHERE "clientId" = ANY(${clientIds})
+      AND "postedAt" >= ${since}
+      GROUP BY "clientId", platform
+    `,
+    prisma.crisisAlert.groupBy({
+      by: ["clientId"],
+      where: { clientId: { in: clientIds }, status: "ACTIVE" },
+      _count: { _all: true },
+    }),
+  ]);
+
+  return foldDigestStats(
+    clients,
+    mentionRows,
+    orgRows,
+    socialRows,
+    crisisRows.map((row) => ({ clientId: row.clientId, count: row._count._all }))
+  );
+}
+
+/**
+ * Los `limit` primeros por relevancia; a igual relevancia, por peso de la
+ * fuente (tier). Función pura.
+ */
+export function rankBySourceReach<T extends { relevance: number; source: string }>(
+  rows: T[],
+  tiers: Map<string, number>,
+  limit: number
+): T[] {
+  return rows
+    .map((row) => ({ row, weight: sourceWeight(row.source, tiers) }))
+    .sort((a, b) => b.row.relevance - a.row.relevance || b.weight - a.weight)
+    .slice(0, limit)
+    .map(({ row }) => row);
+}
+
+/**
+ * Top noticias del cliente agrupadas por cluster (parentMentionId o la
+ * propia mención): la mención más relevante de cada cluster y sus fuentes.
+ */
+export async function getTopClusters(clientId: string, since: Date, limit: number): Promise<DigestCluster[]> {
+  const rows = await prisma.$queryRaw<(Omit<DigestCluster, "sources"> & { sources: string[] })[]>`
+    WITH recent AS (
+      SELECT COALESCE(m."parentMentionId", m.id) AS "clusterId", m.relevance,
+             m.sentiment::text AS sentiment, a.title, a.source,
+             ROW_NUMBER() OVER (
+               PARTITION BY COALESCE(m."parentMentionId", m.id) ORDER BY m.relevance DESC, m."createdAt" DESC
+             ) AS rank
+      FROM "Mention" m
+      JOIN "Article" a ON a.id = m."articleId"
+      WHERE m."clientId" = ${clientId}
+      AND m."publishedAt" >= ${since}
+    )
+    SELECT p.title, p.source, p.sentiment, p.relevance,
+           (SELECT array_agg(r.source ORDER BY r.rank) FROM recent r WHERE r."clusterId" = p."clusterId") AS sources
+    FROM recent p
+    WHERE p.rank = 1
+    ORDER BY p.relevance DESC
+    LIMIT ${limit * RANK_CANDIDATES_FACTOR}
+  `;
+
+  const ranked = rankBySourceReach(rows, await getSourceTierMap(), limit);
+  return ranked.map((row) => ({ ...row, sources: [...new Set(row.sources)] }));
+}
+
+/**
+ * Ejecuta `fn` sobre cada elemento con a lo más `limit` en paralelo. Un error
+ * en un elemento no detiene a los demás (se reporta a `onError`).
+ */
+export async function forEachWithConcurrency<T>(
+  items: T[],
+  limit: number,
+  fn: (item: T) => Promise<void>,
+  onError: (item: T, error: unknown) => void
+): Promise<void> {
+  let next = 0;
+  const runners = Array.from({ length: Math.max(1, Math.min(limit, items.length)) }, async () => {
+    while (next < items.length) {
+      const item = items[next++];
+      try {
+        await fn(item);
+      } catch (error) {
+        onError(item, error);
+      }
+    }
+  });
+  await Promise.all(runners);
+}
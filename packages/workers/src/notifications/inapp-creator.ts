@@ -1,4 +1,7 @@
-import { prisma } from "@mediabot/shared";
+import { randomUUID } from "crypto";
+import { prisma, adjustUnreadCounts } from "@mediabot/shared";
+import { publishRealtimeEvent } from "@mediabot/shared/src/realtime-publisher.js";
+import { REALTIME_CHANNELS } from "@mediabot/shared/src/realtime-types.js";
 import { Prisma, type NotificationType } from "@prisma/client";
 
 /**
@@ -12,26 +15,56 @@ export interface CreateInAppNotificationParams {
   data?: Prisma.InputJsonValue;
 }
 
+/**
+ * Crea la misma notificación para varios usuarios: un createMany, un ajuste de
+ * los contadores de no leídas y un solo evento realtime para todo el lote.
+ */
+export async function createInAppNotifications(
+  userIds: string[],
+  params: Omit<CreateInAppNotificationParams, "userId">,
+  orgId: string | null = null
+): Promise<number> {
+  const { type, title, message, data } = params;
+  if (userIds.length === 0) return 0;
+
+  await prisma.notification.createMany({
+    data: userIds.map((userId) => ({
+      userId,
+      type,
+      title,
+      message,
+      data: data ?? Prisma.JsonNull,
+    })),
+  });
+
+  await adjustUnreadCounts(userIds, 1);
+
+  const dataClientId =
+    data && typeof data === "object" ? (data as Prisma.InputJsonObject).clientId : undefined;
+  publishRealtimeEvent(REALTIME_CHANNELS.NOTIFICATION_NEW, {
+    id: randomUUID(),
+    clientId: typeof dataClientId === "string" ? dataClientId : "",
+    orgId,
+    title,
+    userIds,
+    timestamp: new Date().toISOString(),
+  });
+
+  return userIds.length;
+}
+
 /**
  * Crea una notificación in-app para un usuario específico.
  */
 export async function createInAppNotification(
   params: CreateInAppNotificationParams
 ): Promise<void> {
-  const { userId, type, title, message, data } = params;
+  const { userId, ...notification } = params;
 
   try {
-    await prisma.notification.create({
-      data: {
-        userId,
-        type,
-        title,
-        message,
-        data: data ?? Prisma.JsonNull,
-      },
-    });
+    await createInAppNotifications([userId], notification);
 
-    console.log(`📱 In-app notification created: ${type} for user ${userId}`);
+    console.log(`📱 In-app notification created: ${notification.type} for user ${userId}`);
   } catch (error) {
     console.error(`Failed to create in-app notification:`, error);
     throw error;
@@ -45,8 +78,6 @@ export async function createInAppNotificationForOrg(
   orgId: string,
   params: Omit<CreateInAppNotificationParams, "userId">
 ): Promise<number> {
-  const { type, title, message, data } = params;
-
   try {
     // Obtener todos los usuarios de la organización
     const users = await prisma.user.findMany({
@@ -59,22 +90,17 @@ export async function createInAppNotificationForOrg(
       return 0;
     }
 
-    // Crear notificaciones para todos los usuarios
-    await prisma.notification.createMany({
-      data: users.map((user) => ({
-        userId: user.id,
-        type,
-        title,
-        message,
-        data: data ?? Prisma.JsonNull,
-      })),
-    });
+    const created = await createInAppNotifications(
+      users.map((user) => user.id),
+      params,
+      orgId
+    );
 
     console.log(
-      `📱 In-app notifications created: ${type} for ${users.length} users in org ${orgId}`
+      `📱 In-app notifications created: ${params.type} for ${created} users in org ${orgId}`
     );
 
-    return users.length;
+    return created;
   } catch (error) {
     console.error(`Failed to create org-wide in-app notifications:`, error);
     throw error;
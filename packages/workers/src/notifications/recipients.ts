@@ -2,17 +2,34 @@
  * Módulo centralizado para resolución de destinatarios Telegram.
  * Consolida 3 niveles: cliente, organización y SuperAdmin.
  */
-import { prisma, isNotifTypeEnabled } from "@mediabot/shared";
+import { prisma, isNotifTypeEnabled, RECIPIENT_CACHE_VERSION_KEY } from "@mediabot/shared";
 import type { TelegramNotifType } from "@mediabot/shared";
 import { InlineKeyboard } from "grammy";
-import { bot } from "./bot-instance.js";
+import { connection } from "../queues.js";
+import {
+  DELIVERY_PRIORITY,
+  enqueueTelegramDeliveries,
+  type DeliveryPriority,
+  type RecipientSource,
+} from "./telegram-delivery.js";
+import { enqueueCoalescedDeliveries, type CoalesceTarget } from "./coalescer.js";
 
 export interface ResolvedRecipient {
   chatId: string;
   label: string | null;
-  source: "client" | "org" | "orgadmin" | "superadmin";
+  source: RecipientSource;
 }
 
+/**
+ * Cache de resoluciones por (cliente, tipo de notificación, opciones). Una
+ * entrada vale mientras la versión en Redis no cambie (invalidateRecipientCache
+ * desde web, bot y disableRecipient) y no supere RECIPIENT_CACHE_TTL_MS.
+ */
+const RECIPIENT_CACHE_TTL_MS = 5 * 60 * 1000;
+const RECIPIENT_CACHE_MAX_ENTRIES = 5000;
+
+const recipientCache = new Map<string, { version: string; cachedAt: number; recipients: ResolvedRecipient[] }>();
+
 /**
  * Obtiene los destinatarios de Telegram para un cliente a nivel de cliente.
  * Primero busca en TelegramRecipient, luego fallback a campos legacy.
@@ -62,8 +79,15 @@ export async function getClientLevelRecipients(
   return fallbackRecipients;
 }
 
+type RecipientOptions = {
+  recipientTypes?: ("AGENCY_INTERNAL" | "CLIENT_GROUP" | "CLIENT_INDIVIDUAL")[];
+  legacyGroupId?: string | null;
+  legacyClientGroupId?: string | null;
+};
+
 /**
  * Consolida los 3 niveles de destinatarios, deduplica y filtra por preferencias.
+ * El resultado se cachea (ver recipientCache); los llamadores reciben una copia.
  *
  * Niveles:
  * 1. Cliente: TelegramRecipient (sin filtro de preferencias)
@@ -73,11 +97,38 @@ export async function getClientLevelRecipients(
 export async function getAllRecipientsForClient(
   clientId: string,
   notifType: TelegramNotifType,
-  options?: {
-    recipientTypes?: ("AGENCY_INTERNAL" | "CLIENT_GROUP" | "CLIENT_INDIVIDUAL")[];
-    legacyGroupId?: string | null;
-    legacyClientGroupId?: string | null;
+  options?: RecipientOptions
+): Promise<ResolvedRecipient[]> {
+  const key = [
+    clientId,
+    notifType,
+    (options?.recipientTypes || ["AGENCY_INTERNAL"]).join(","),
+    options?.legacyGroupId ?? "",
+    options?.legacyClientGroupId ?? "",
+  ].join("|");
+
+  const version = (await connection.get(RECIPIENT_CACHE_VERSION_KEY)) ?? "0";
+  const cached = recipientCache.get(key);
+  if (cached && cached.version === version && Date.now() - cached.cachedAt < RECIPIENT_CACHE_TTL_MS) {
+    return cached.recipients.map((r) => ({ ...r }));
   }
+
+  const recipients = await resolveRecipientsForClient(clientId, notifType, options);
+
+  if (recipientCache.size >= RECIPIENT_CACHE_MAX_ENTRIES) recipientCache.clear();
+  recipientCache.set(key, { version, cachedAt: Date.now(), recipients });
+  return recipients.map((r) => ({ ...r }));
+}
+
+/** Descarta las resoluciones cacheadas en este proceso */
+export function clearRecipientCache(): void {
+  recipientCache.clear();
+}
+
+async function resolveRecipientsForClient(
+  clientId: string,
+  notifType: TelegramNotifType,
+  options?: RecipientOptions
 ): Promise<ResolvedRecipient[]> {
   const seen = new Set<string>();
   const result: ResolvedRecipient[] = [];
@@ -171,95 +222,24 @@ export async function getAllRecipientsForClient(
   return result;
 }
 
-/**
- * Desactiva un destinatario de Telegram en la BD según su nivel (source).
- * Se llama automáticamente cuando un envío falla con error permanente.
- */
-async function disableRecipient(
-  chatId: string,
-  source: "client" | "org" | "orgadmin" | "superadmin"
-): Promise<void> {
-  try {
-    switch (source) {
-      case "client":
-        await prisma.telegramRecipient.updateMany({
-          where: { chatId, active: true },
-          data: { active: false },
-        });
-        break;
-      case "org":
-        await prisma.orgTelegramRecipient.updateMany({
-          where: { chatId, active: true },
-          data: { active: false },
-        });
-        break;
-      case "orgadmin":
-        // Para Admin de org, limpiar telegramUserId
-        await prisma.user.updateMany({
-          where: { telegramUserId: chatId, isSuperAdmin: false, role: "ADMIN" },
-          data: { telegramUserId: null },
-        });
-        break;
-      case "superadmin":
-        // Para SuperAdmin, limpiar telegramUserId en lugar de desactivar el user
-        await prisma.user.updateMany({
-          where: { telegramUserId: chatId, isSuperAdmin: true },
-          data: { telegramUserId: null },
-        });
-        break;
-    }
-  } catch (err) {
-    console.error(`Failed to disable recipient ${chatId} (${source}):`, err);
-  }
-}
-
 /**
  * Envía un mensaje a múltiples destinatarios de Telegram.
- * Auto-desactiva destinatarios con errores permanentes (chat not found, bot blocked, etc).
- * Retorna el número de envíos exitosos, fallidos y desactivados.
+ * Encola una entrega por destinatario en NOTIFY_TELEGRAM (rate limit global y
+ * por chat, ver telegram-delivery.ts). Con `coalesce`, los mensajes no
+ * críticos del mismo cliente se agrupan por destinatario (ver coalescer.ts).
+ * Retorna cuántas entregas se encolaron.
  */
 export async function sendToMultipleRecipients(
-  recipients: Array<{ chatId: string; label?: string | null; source?: "client" | "org" | "orgadmin" | "superadmin" }>,
+  recipients: Array<{ chatId: string; label?: string | null; source?: RecipientSource }>,
   message: string,
-  options?: { reply_markup?: InlineKeyboard; parse_mode?: "Markdown" | "HTML" }
-): Promise<{ sent: number; failed: number; disabled: number }> {
-  const results = await Promise.allSettled(
-    recipients.map((r) =>
-      bot.api.sendMessage(r.chatId, message, options)
-    )
-  );
-
-  let sent = 0;
-  let failed = 0;
-  let disabled = 0;
-
-  for (const [i, result] of results.entries()) {
-    if (result.status === "fulfilled") {
-      sent++;
-    } else {
-      failed++;
-      const reason = String(result.reason);
-      const recipient = recipients[i];
-
-      // Errores permanentes que justifican desactivar al destinatario
-      const isPermanentError =
-        /chat not found|bot was blocked|user is deactivated|PEER_ID_INVALID|bot was kicked/i.test(reason);
-
-      if (isPermanentError && recipient.source) {
-        disabled++;
-        await disableRecipient(recipient.chatId, recipient.source);
-        console.warn(
-          `Auto-disabled ${recipient.label || recipient.chatId} (${recipient.source}): ${reason}`
-        );
-      } else {
-        console.error(
-          `Failed to send to ${recipient.label || recipient.chatId}: ${reason}`
-        );
-      }
-    }
-  }
-
-  return { sent, failed, disabled };
+  options?: { reply_markup?: InlineKeyboard; parse_mode?: "Markdown" | "HTML" },
+  priority: DeliveryPriority = DELIVERY_PRIORITY.NORMAL,
+  coalesce?: CoalesceTarget
+): Promise<{ queued: number }> {
+  const queued = coalesce
+    ? await enqueueCoalescedDeliveries(recipients, message, coalesce, options, priority)
+    : await enqueueTelegramDeliveries(recipients, message, options, priority);
+  return { queued };
 }
 
 /**
@@ -273,18 +253,20 @@ export async function sendNotification(
     recipientTypes?: ("AGENCY_INTERNAL" | "CLIENT_GROUP" | "CLIENT_INDIVIDUAL")[];
     keyboard?: InlineKeyboard;
     parseMode?: "Markdown";
+    priority?: DeliveryPriority;
   }
-): Promise<{ sent: number; failed: number; disabled: number }> {
+): Promise<{ queued: number }> {
   const recipients = await getAllRecipientsForClient(clientId, notifType, {
     recipientTypes: options?.recipientTypes,
   });
 
-  if (recipients.length === 0) {
-    return { sent: 0, failed: 0, disabled: 0 };
-  }
-
-  return sendToMultipleRecipients(recipients, message, {
-    reply_markup: options?.keyboard,
-    parse_mode: options?.parseMode,
-  });
+  return sendToMultipleRecipients(
+    recipients,
+    message,
+    {
+      reply_markup: options?.keyboard,
+      parse_mode: options?.parseMode,
+    },
+    options?.priority
+  );
 }
@@ -0,0 +1,366 @@
+/**
+ * Capa de entrega de mensajes Telegram sobre la cola NOTIFY_TELEGRAM.
+ *
+ * Cada envío es un job "deliver" (un destinatario, un mensaje). Antes de
+ * llamar a la API se toma un token de dos buckets en Redis, compartidos por
+ * todas las réplicas de workers:
+ * - global: config.telegram.globalRatePerSecond (30 msg/s de Telegram)
+ * - por chat: 1 mensaje cada config.telegram.perChatIntervalMs
+ *
+ * Si el chat no tiene token el job se pospone de inmediato (un chat con
+ * muchos mensajes no ocupa los slots del worker); solo la espera corta del
+ * bucket global se resuelve dentro del job. Un 429 bloquea el chat durante el
+ * `retry_after` que indica Telegram. La prioridad del job (BullMQ) hace que
+ * una crisis CRITICAL salga antes que los digests encolados.
+ */
+import { DelayedError, type Job } from "bullmq";
+import type { InlineKeyboard } from "grammy";
+import { prisma, config, invalidateRecipientCache } from "@mediabot/shared";
+import { connection, QUEUE_NAMES, getQueue } from "../queues.js";
+import { bot } from "./bot-instance.js";
+
+export const TELEGRAM_DELIVERY_JOB = "deliver";
+
+/** Prioridad BullMQ de una entrega (menor = antes) */
+export const DELIVERY_PRIORITY = {
+  CRITICAL: 1,
+  HIGH: 2,
+  NORMAL: 5,
+  DIGEST: 10,
+} as const;
+
+export type DeliveryPriority = (typeof DELIVERY_PRIORITY)[keyof typeof DELIVERY_PRIORITY];
+
+/** Teclado serializable en el job (InlineKeyboard sin métodos) */
+export type InlineKeyboardMarkup = { inline_keyboard: InlineKeyboard["inline_keyboard"] };
+
+export type TelegramSendOptions = { reply_markup?: InlineKeyboardMarkup; parse_mode?: "Markdown" | "HTML" };
+
+export type RecipientSource = "client" | "org" | "orgadmin" | "superadmin";
+
+export interface TelegramDeliveryJob {
+  chatId: string;
+  label?: string | null;
+  source?: RecipientSource;
+  message: string;
+  options?: TelegramSendOptions;
+  priority: DeliveryPriority;
+}
+
+const BUCKET_KEY_PREFIX = "telegram:bucket:";
+const BLOCK_KEY_PREFIX = "telegram:block:";
+const METRICS_KEY_PREFIX = "metrics:telegram:";
+const METRICS_TTL_SECONDS = 14 * 24 * 60 * 60;
+/** Espera máxima del bucket global que se resuelve dentro del job */
+const MAX_INLINE_WAIT_MS = 250;
+/** Dispersión al posponer, para que los jobs de un mismo chat no despierten juntos */
+const DELAY_JITTER_MS = 250;
+
+/**
+ * Toma un token del bucket global y del bucket del chat, o ninguno.
+ * Retorna {ms a esperar, 1 si la espera es del chat (bucket o bloqueo)}, o
+ * {0, 0} si se puede enviar.
+ *
+ * KEYS: bucket global, bucket del chat, bloqueo del chat (retry_after)
+ * ARGV: ahora (ms), tasa global (tokens/ms), burst global, tasa chat, burst chat
+ */
+const TAKE_TOKEN_SCRIPT = `
+local now = tonumber(ARGV[1])
+local blocked = redis.call('PTTL', KEYS[3])
+if blocked > 0 then return {blocked, 1} end
+
+local function level(key, rate, burst)
+  local b = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = tonumber(b[1]) or burst
+  local ts = tonumber(b[2]) or now
+  return math.min(burst, tokens + math.max(0, now - ts) * rate)
+end
+
+local gRate, gBurst = tonumber(ARGV[2]), tonumber(ARGV[3])
+local cRate, cBurst = tonumber(ARGV[4]), tonumber(ARGV[5])
+local g = level(KEYS[1], gRate, gBurst)
+local c = level(KEYS[2], cRate, cBurst)
+
+if c < 1 then
+  return {math.ceil(math.max((1 - c) / cRate, 1)), 1}
+end
+if g < 1 then
+  return {math.ceil(math.max((1 - g) / gRate, 1)), 0}
+end
+
+redis.call('HSET', KEYS[1], 'tokens', g - 1, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(gBurst / gRate) + 1000)
+redis.call('HSET', KEYS[2], 'tokens', c - 1, 'ts', now)
+redis.call('PEXPIRE', KEYS[2], math.ceil(cBurst / cRate) + 1000)
+return {0, 0}
+`;
+
+export interface SendSlot {
+  /** ms a esperar (0 = se puede enviar ya) */
+  waitMs: number;
+  /** La espera es del chat: no tiene sentido esperarla dentro del job */
+  chatLimited: boolean;
+}
+
+/**
+ * Intenta reservar un envío a `chatId`.
+ */
+export async function acquireSendSlot(chatId: string): Promise<SendSlot> {
+  const { globalRatePerSecond, perChatIntervalMs } = config.telegram;
+  const result = (await connection.eval(
+    TAKE_TOKEN_SCRIPT,
+    3,
+    `${BUCKET_KEY_PREFIX}global`,
+    `${BUCKET_KEY_PREFIX}chat:${chatId}`,
+    `${BLOCK_KEY_PREFIX}chat:${chatId}`,
+    Date.now(),
+    globalRatePerSecond / 1000,
+    globalRatePerSecond,
+    1 / perChatIntervalMs,
+    1
+  )) as [number, number];
+  return { waitMs: Number(result[0]) || 0, chatLimited: Number(result[1]) === 1 };
+}
+
+/** Bloquea los envíos a un chat (retry_after de un 429) */
+async function blockChat(chatId: string, ms: number): Promise<void> {
+  await connection.set(`${BLOCK_KEY_PREFIX}chat:${chatId}`, "1", "PX", ms);
+}
+
+/**
+ * ms indicados por Telegram en un 429 (`parameters.retry_after`, en segundos).
+ * null si el error no es un 429.
+ */
+export function retryAfterMs(error: unknown): number | null {
+  const e = error as { error_code?: number; parameters?: { retry_after?: number } } | null;
+  if (!e || e.error_code !== 429) return null;
+  return Math.max(1, e.parameters?.retry_after ?? 1) * 1000;
+}
+
+/** Errores permanentes que justifican desactivar al destinatario */
+export function isPermanentTelegramError(error: unknown): boolean {
+  return /chat not found|bot was blocked|user is deactivated|PEER_ID_INVALID|bot was kicked/i.test(String(error));
+}
+
+/** Prioridad de una alerta según su urgencia o severidad */
+export function priorityForUrgency(urgency: string | null | undefined): DeliveryPriority {
+  if (urgency === "CRITICAL") return DELIVERY_PRIORITY.CRITICAL;
+  if (urgency === "HIGH") return DELIVERY_PRIORITY.HIGH;
+  return DELIVERY_PRIORITY.NORMAL;
+}
+
+function priorityLabel(priority: number): string {
+  const entry = Object.entries(DELIVERY_PRIORITY).find(([, value]) => value === priority);
+  return entry ? entry[0].toLowerCase() : String(priority);
+}
+
+function telegramMetricsKey(date: Date = new Date()): string {
+  return `${METRICS_KEY_PREFIX}${date.toISOString().slice(0, 10)}`;
+}
+
+/**
+ * Registra una entrega (latencia desde que se encoló) o una falla.
+ * Fire-and-forget, como las métricas de AI.
+ */
+function recordDelivery(priority: number, outcome: "sent" | "failed" | "rateLimited", latencyMs = 0): void {
+  const key = telegramMetricsKey();
+  const label = priorityLabel(priority);
+  const tx = connection.multi().hincrby(key, `${label}:${outcome}`, 1);
+  if (outcome === "sent") tx.hincrby(key, `${label}:latencyMs`, latencyMs);
+  tx.expire(key, METRICS_TTL_SECONDS)
+    .exec()
+    .catch((error) => console.error("[Telegram] Failed to record delivery metrics:", error));
+}
+
+/** Registra el envío agrupado de `events` eventos (ver coalescer.ts) */
+export function recordCoalescedFlush(events: number): void {
+  const key = telegramMetricsKey();
+  connection
+    .multi()
+    .hincrby(key, "coalesced:events", events)
+    .hincrby(key, "coalesced:flushes", 1)
+    .hincrby(key, "coalesced:saved", events - 1)
+    .expire(key, METRICS_TTL_SECONDS)
+    .exec()
+    .catch((error) => console.error("[Telegram] Failed to record coalescing metrics:", error));
+}
+
+export interface TelegramPriorityStats {
+  sent: number;
+  failed: number;
+  rateLimited: number;
+  latencyMs: number;
+  avgLatencyMs: number;
+}
+
+export interface TelegramCoalescingStats {
+  /** Eventos que pasaron por la ventana de agrupación */
+  events: number;
+  /** Mensajes enviados por esos eventos */
+  flushes: number;
+  /** Envíos ahorrados (events - flushes) */
+  saved: number;
+}
+
+/** Métricas de entrega de un día agrupadas por prioridad, más la agrupación */
+export async function getTelegramDeliveryStats(
+  date: Date = new Date()
+): Promise<{ priorities: Record<string, TelegramPriorityStats>; coalesced: TelegramCoalescingStats }> {
+  const raw = await connection.hgetall(telegramMetricsKey(date));
+  const stats: Record<string, TelegramPriorityStats> = {};
+  const coalesced: TelegramCoalescingStats = { events: 0, flushes: 0, saved: 0 };
+
+  for (const [field, value] of Object.entries(raw)) {
+    const [label, metric] = field.split(":");
+    if (label === "coalesced") {
+      if (metric in coalesced) coalesced[metric as keyof TelegramCoalescingStats] = parseInt(value, 10) || 0;
+      continue;
+    }
+    stats[label] ??= { sent: 0, failed: 0, rateLimited: 0, latencyMs: 0, avgLatencyMs: 0 };
+    if (metric in stats[label]) {
+      stats[label][metric as keyof TelegramPriorityStats] = parseInt(value, 10) || 0;
+    }
+  }
+
+  for (const s of Object.values(stats)) {
+    s.avgLatencyMs = s.sent > 0 ? Math.round(s.latencyMs / s.sent) : 0;
+  }
+  return { priorities: stats, coalesced };
+}
+
+/** Opciones de envío serializables (un InlineKeyboard se reduce a su markup) */
+export function toJobOptions(options?: TelegramSendOptions): TelegramSendOptions {
+  return {
+    parse_mode: options?.parse_mode,
+    reply_markup: options?.reply_markup ? { inline_keyboard: options.reply_markup.inline_keyboard } : undefined,
+  };
+}
+
+/**
+ * Encola un envío por destinatario. Los reintentos de errores transitorios
+ * los maneja BullMQ; los 429 y la espera por rate limit no consumen intentos.
+ */
+export async function enqueueTelegramDeliveries(
+  recipients: Array<{ chatId: string; label?: string | null; source?: RecipientSource }>,
+  message: string,
+  options?: TelegramSendOptions,
+  priority: DeliveryPriority = DELIVERY_PRIORITY.NORMAL
+): Promise<number> {
+  if (recipients.length === 0) return 0;
+
+  const jobOptions = toJobOptions(options);
+
+  const queue = getQueue(QUEUE_NAMES.NOTIFY_TELEGRAM);
+  await queue.addBulk(
+    recipients.map((r) => ({
+      name: TELEGRAM_DELIVERY_JOB,
+      data: {
+        chatId: r.chatId,
+        label: r.label,
+        source: r.source,
+        message,
+        options: jobOptions,
+        priority,
+      } satisfies TelegramDeliveryJob,
+      opts: {
+        priority,
+        attempts: 3,
+        backoff: { type: "exponential", delay: 2000 },
+        removeOnComplete: 1000,
+        removeOnFail: 1000,
+      },
+    }))
+  );
+  return recipients.length;
+}
+
+/**
+ * Desactiva un destinatario de Telegram en la BD según su nivel (source).
+ * Se llama automáticamente cuando un envío falla con error permanente.
+ * Invalida la resolución cacheada de destinatarios en todos los procesos.
+ */
+export async function disableRecipient(chatId: string, source: RecipientSource): Promise<void> {
+  try {
+    switch (source) {
+      case "client":
+        await prisma.telegramRecipient.updateMany({
+          where: { chatId, active: true },
+          data: { active: false },
+        });
+        break;
+      case "org":
+        await prisma.orgTelegramRecipient.updateMany({
+          where: { chatId, active: true },
+          data: { active: false },
+        });
+        break;
+      case "orgadmin":
+        // Para Admin de org, limpiar telegramUserId
+        await prisma.user.updateMany({
+          where: { telegramUserId: chatId, isSuperAdmin: false, role: "ADMIN" },
+          data: { telegramUserId: null },
+        });
+        break;
+      case "superadmin":
+        // Para SuperAdmin, limpiar telegramUserId en lugar de desactivar el user
+        await prisma.user.updateMany({
+          where: { telegramUserId: chatId, isSuperAdmin: true },
+          data: { telegramUserId: null },
+        });
+        break;
+    }
+    await invalidateRecipientCache();
+  } catch (err) {
+    console.error(`Failed to disable recipient ${chatId} (${source}):`, err);
+  }
+}
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+/**
+ * Procesa un job "deliver": espera su turno en los buckets, envía y registra
+ * la latencia. Auto-desactiva destinatarios con errores permanentes.
+ */
+export async function processTelegramDelivery(job: Job<TelegramDeliveryJob>, token?: string): Promise<void> {
+  const { chatId, label, source, message, options, priority } = job.data;
+
+  let slot = await acquireSendSlot(chatId);
+  while (slot.waitMs > 0) {
+    // Chat sin token: liberar el slot del worker para otros chats (y prioridades)
+    if (slot.chatLimited || slot.waitMs > MAX_INLINE_WAIT_MS) {
+      const jitter = Math.floor(Math.random() * DELAY_JITTER_MS);
+      await job.moveToDelayed(Date.now() + slot.waitMs + jitter, token);
+      throw new DelayedError();
+    }
+    await sleep(slot.waitMs);
+    slot = await acquireSendSlot(chatId);
+  }
+
+  try {
+    await bot.api.sendMessage(chatId, message, options);
+  } catch (error) {
+    const retryAfter = retryAfterMs(error);
+    if (retryAfter !== null) {
+      // Respetar retry_after: el chat queda bloqueado y el job se pospone sin gastar intentos
+      recordDelivery(priority, "rateLimited");
+      await blockChat(chatId, retryAfter);
+      console.warn(`[Telegram] 429 for ${label || chatId}, retry after ${retryAfter}ms`);
+      await job.moveToDelayed(Date.now() + retryAfter, token);
+      throw new DelayedError();
+    }
+
+    recordDelivery(priority, "failed");
+    if (isPermanentTelegramError(error) && source) {
+      await disableRecipient(chatId, source);
+      console.warn(`Auto-disabled ${label || chatId} (${source}): ${String(error)}`);
+      return;
+    }
+
+    console.error(`Failed to send to ${label || chatId}: ${String(error)}`);
+    throw error;
+  }
+
+  const latencyMs = Date.now() - job.timestamp;
+  recordDelivery(priority, "sent", latencyMs);
+  console.log(`[Telegram] Delivered to ${label || chatId} priority=${priorityLabel(priority)} latency=${latencyMs}ms`);
+}
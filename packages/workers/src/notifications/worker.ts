@@ -1,4 +1,4 @@
-import { Worker } from "bullmq";
+import { Worker, type Job } from "bullmq";
 import { connection, QUEUE_NAMES } from "../queues.js";
 import { prisma, config } from "@mediabot/shared";
 import { InlineKeyboard } from "grammy";
@@ -12,6 +12,17 @@ import {
   sendToMultipleRecipients,
   sendNotification,
 } from "./recipients.js";
+import {
+  TELEGRAM_DELIVERY_JOB,
+  DELIVERY_PRIORITY,
+  priorityForUrgency,
+  processTelegramDelivery,
+  type TelegramDeliveryJob,
+} from "./telegram-delivery.js";
+import { COALESCE_FLUSH_JOB, processCoalesceFlush, type CoalesceFlushJob } from "./coalescer.js";
+
+/** Notificaciones genéricas de resumen: ceden el paso a alertas y crisis */
+const DIGEST_NOTIF_TYPES = new Set(["DAILY_DIGEST", "BRIEF_READY", "CAMPAIGN_REPORT", "WEEKLY_REPORT"]);
 
 export function startNotificationWorker() {
   // Standard alert notification worker
@@ -89,15 +100,21 @@ export function startNotificationWorker() {
         .text("📢 Informar cliente", `notify_client:${mention.id}`)
         .text("🔇 Ignorar", `ignore_mention:${mention.id}`);
 
-      // Enviar a todos los destinatarios
-      const { sent, failed } = await sendToMultipleRecipients(
+      // Enviar a todos los destinatarios (salvo CRITICAL, se agrupa con otras alertas del cliente)
+      const { queued } = await sendToMultipleRecipients(
         recipients,
         message,
-        { reply_markup: keyboard }
+        { reply_markup: keyboard },
+        priorityForUrgency(mention.urgency),
+        {
+          clientId: mention.clientId,
+          clientName: mention.client.name,
+          summary: `${urgencyIcon} ${mention.article.title.slice(0, 80)} (${mention.article.source})`,
+        }
       );
 
       console.log(
-        `📬 Alert sent for ${mention.client.name}: ${sent} delivered, ${failed} failed`
+        `📬 Alert queued for ${mention.client.name}: ${queued} recipients`
       );
 
       // Crear notificación in-app para menciones críticas y altas
@@ -212,11 +229,12 @@ export function startNotificationWorker() {
         .text("👁️ Monitorear", `monitor_crisis:${crisisAlert.id}`)
         .text("❌ Descartar", `dismiss_crisis:${crisisAlert.id}`);
 
-      // Enviar a todos los destinatarios
-      const { sent, failed } = await sendToMultipleRecipients(
+      // Enviar a todos los destinatarios (CRITICAL sale antes que cualquier otro envío)
+      const { queued } = await sendToMultipleRecipients(
         recipients,
         message,
-        { reply_markup: keyboard }
+        { reply_markup: keyboard },
+        priorityForUrgency(crisisAlert.severity)
       );
 
       // Crear notificación in-app para alertas de crisis
@@ -239,7 +257,7 @@ export function startNotificationWorker() {
         data: { notified: true, notifiedAt: new Date() },
       });
 
-      console.log(`🚨 Crisis alert sent: client=${crisisAlert.client.name} severity=${crisisAlert.severity} (${sent} delivered, ${failed} failed)`);
+      console.log(`🚨 Crisis alert queued: client=${crisisAlert.client.name} severity=${crisisAlert.severity} (${queued} recipients)`);
     },
     { connection, concurrency: 2 }
   );
@@ -301,10 +319,12 @@ export function startNotificationWorker() {
         .text("✅ Crear tarea", `create_topic_task:${clientId}:${encodeURIComponent(topic)}`);
 
       // Enviar a todos los destinatarios
-      const { sent, failed } = await sendToMultipleRecipients(
+      const { queued } = await sendToMultipleRecipients(
         recipients,
         message,
-        { parse_mode: "Markdown", reply_markup: keyboard }
+        { parse_mode: "Markdown", reply_markup: keyboard },
+        undefined,
+        { clientId, clientName, summary: `📈 Tema emergente: ${topic} (${count} menciones)` }
       );
 
       // Crear notificación in-app para tema emergente
@@ -329,7 +349,7 @@ export function startNotificationWorker() {
         },
       });
 
-      console.log(`📈 Emerging topic notification sent: client=${clientName} topic="${topic}" (${sent} delivered, ${failed} failed)`);
+      console.log(`📈 Emerging topic notification queued: client=${clientName} topic="${topic}" (${queued} recipients)`);
     },
     { connection, concurrency: 2 }
   );
@@ -338,10 +358,20 @@ export function startNotificationWorker() {
     console.error(`Emerging topic notification job ${job?.id} failed:`, err);
   });
 
-  // Worker genérico de notificaciones Telegram
+  // Worker de NOTIFY_TELEGRAM: entregas individuales ("deliver", con rate
+  // limit) y notificaciones genéricas por cliente, que se abren en entregas
   const genericTelegramWorker = new Worker(
     QUEUE_NAMES.NOTIFY_TELEGRAM,
-    async (job) => {
+    async (job, token) => {
+      if (job.name === TELEGRAM_DELIVERY_JOB) {
+        await processTelegramDelivery(job as Job<TelegramDeliveryJob>, token);
+        return;
+      }
+      if (job.name === COALESCE_FLUSH_JOB) {
+        await processCoalesceFlush(job as Job<CoalesceFlushJob>);
+        return;
+      }
+
       const { clientId, type, message, parseMode } = job.data as {
         clientId: string;
         type: string;
@@ -349,16 +379,16 @@ export function startNotificationWorker() {
         parseMode?: "Markdown";
       };
 
-      const { sent, failed } = await sendNotification(
+      const { queued } = await sendNotification(
         clientId,
         type as import("@mediabot/shared").TelegramNotifType,
         message,
-        { parseMode }
+        { parseMode, priority: DIGEST_NOTIF_TYPES.has(type) ? DELIVERY_PRIORITY.DIGEST : DELIVERY_PRIORITY.NORMAL }
       );
 
-      console.log(`📨 Generic telegram notification (${type}): ${sent} delivered, ${failed} failed`);
+      console.log(`📨 Generic telegram notification (${type}): ${queued} recipients`);
     },
-    { connection, concurrency: 3 }
+    { connection, concurrency: config.workers.telegramDelivery.concurrency }
   );
 
   genericTelegramWorker.on("failed", (job, err) => {
@@ -405,6 +435,7 @@ export function startNotificationWorker() {
       const sentimentLabel = sentimentLabels[thread.dominantSentiment || "NEUTRAL"] || "Neutral";
 
       let message = "";
+      let summary = "";
 
       if (eventType === "new") {
         const recentLines = thread.mentions
@@ -425,6 +456,7 @@ export function startNotificationWorker() {
             ? `\n📰 Menciones recientes:\n${recentLines}\n`
             : "") +
           `\n💡 Considere monitorear este tema.`;
+        summary = `📊 Nuevo tema: ${thread.name} (${totalCount} menciones)`;
       } else if (eventType === "threshold") {
         const breakdown = thread.sentimentBreakdown as Record<string, number> | null;
         const breakdownStr = breakdown
@@ -443,6 +475,7 @@ export function startNotificationWorker() {
           (topSourcesList.length > 0
             ? `📰 Últimas fuentes: ${topSourcesList.slice(0, 5).join(", ")}\n`
             : "");
+        summary = `🔥 Tema en escalada: ${thread.name} (${totalCount} menciones)`;
       } else if (eventType === "sentiment_shift") {
         const { oldSentiment, newSentiment } = job.data;
         const oldLabel = sentimentLabels[oldSentiment || ""] || oldSentiment;
@@ -461,6 +494,7 @@ export function startNotificationWorker() {
           `📈 ${totalCount} menciones\n` +
           latestLine +
           `\n🎯 Acción: Evaluar postura y preparar comunicado si es necesario.`;
+        summary = `⚠️ Cambio de sentimiento: ${thread.name} (${oldLabel} → ${newLabel})`;
       }
 
       if (!message) return;
@@ -476,8 +510,12 @@ export function startNotificationWorker() {
       );
 
       if (recipients.length > 0) {
-        const { sent, failed } = await sendToMultipleRecipients(recipients, message);
-        console.log(`🏷️ Topic notification (${eventType}) sent for ${thread.client.name}: ${sent} delivered, ${failed} failed`);
+        const { queued } = await sendToMultipleRecipients(recipients, message, undefined, undefined, {
+          clientId,
+          clientName: thread.client.name,
+          summary,
+        });
+        console.log(`🏷️ Topic notification (${eventType}) queued for ${thread.client.name}: ${queued} recipients`);
       }
 
       // Actualizar thread
@@ -496,7 +534,7 @@ export function startNotificationWorker() {
     console.error(`Topic notification job ${job?.id} failed:`, err);
   });
 
-  console.log(`🔔 Notification workers started (alerts: ${config.workers.notification.concurrency}, crisis: 2, emerging: 2, topic: 2, generic: 3)`);
+  console.log(`🔔 Notification workers started (alerts: ${config.workers.notification.concurrency}, crisis: 2, emerging: 2, topic: 2, telegram: ${config.workers.telegramDelivery.concurrency})`);
 }
 
 function getTimeAgo(date: Date): string {
@@ -64,6 +64,10 @@ export const QUEUE_NAMES = {
   NOTIFY_TOPIC: "notify-topic",
   CLOSE_INACTIVE_THREADS: "close-inactive-threads",
   ANALYZE_SOCIAL_TOPIC: "analyze-social-topic",
+  // Re-clustering offline de menciones (bajo demanda)
+  RECLUSTER: "recluster-mentions",
+  // Rollup diario de métricas por cliente
+  DAILY_METRICS: "daily-metrics",
 } as const;
 
 export function setupQueues() {
@@ -107,6 +111,8 @@ export function setupQueues() {
     notifyTopic: new Queue(QUEUE_NAMES.NOTIFY_TOPIC, { connection }),
     closeInactiveThreads: new Queue(QUEUE_NAMES.CLOSE_INACTIVE_THREADS, { connection }),
     analyzeSocialTopic: new Queue(QUEUE_NAMES.ANALYZE_SOCIAL_TOPIC, { connection }),
+    recluster: new Queue(QUEUE_NAMES.RECLUSTER, { connection }),
+    dailyMetrics: new Queue(QUEUE_NAMES.DAILY_METRICS, { connection }),
   };
 
   // Registrar todos los schedulers de cron (idempotente via upsertJobScheduler)
@@ -155,6 +161,8 @@ interface QueueMap {
   archiveOldMentions: Queue;
   checkAlertRules: Queue;
   closeInactiveThreads: Queue;
+  crisisCheck: Queue;
+  dailyMetrics: Queue;
   [key: string]: Queue;
 }
 
@@ -297,6 +305,30 @@ async function registerAllSchedulers(
     { name: "close-inactive-threads" }
   );
 
+  // Reconciliación de stats incrementales de topic threads (default: cada hora)
+  const threadStatsCron = process.env.THREAD_STATS_RECONCILE_CRON || "15 * * * *";
+  await queues.closeInactiveThreads.upsertJobScheduler(
+    "reconcile-thread-stats-cron",
+    { pattern: threadStatsCron },
+    { name: "reconcile-thread-stats" }
+  );
+
+  // Reconciliación de contadores de crisis en Redis (default: cada 5 minutos)
+  const crisisReconcileCron = process.env.CRISIS_RECONCILE_CRON || "*/5 * * * *";
+  await queues.crisisCheck.upsertJobScheduler(
+    "crisis-reconcile-cron",
+    { pattern: crisisReconcileCron },
+    { name: "reconcile-crisis-counters" }
+  );
+
+  // Reconciliación del rollup diario por cliente (default: 3:30 AM diario)
+  const dailyMetricsCron = process.env.DAILY_METRICS_RECONCILE_CRON || "30 3 * * *";
+  await queues.dailyMetrics.upsertJobScheduler(
+    "reconcile-daily-metrics-cron",
+    { pattern: dailyMetricsCron },
+    { name: "reconcile-daily-metrics" }
+  );
+
   if (isRefresh) {
     console.log(`${label} Todos los schedulers re-registrados OK`);
   } else {
@@ -318,6 +350,9 @@ async function registerAllSchedulers(
     console.log(`${label} Archive Old Mentions: ${archiveCron}`);
     console.log(`${label} Alert Rules: ${alertRulesCron}`);
     console.log(`${label} Close Inactive Threads: ${closeThreadsCron}`);
+    console.log(`${label} Thread Stats Reconcile: ${threadStatsCron}`);
+    console.log(`${label} Crisis Counters Reconcile: ${crisisReconcileCron}`);
+    console.log(`${label} Daily Metrics Reconcile: ${dailyMetricsCron}`);
     console.log(
       `[Scheduler] Auto-refresh habilitado cada ${SCHEDULER_REFRESH_INTERVAL_MS / 60000} minutos`
     );
@@ -0,0 +1,53 @@
+/**
+ * Backfill del rollup diario ClientDailyMetrics.
+ * Usage:
+ *   npx tsx packages/workers/src/scripts/backfill-daily-metrics.ts [--days 365] [--enqueue]
+ *
+ * Por defecto reconstruye los últimos 365 días en este proceso. Con --enqueue
+ * lo delega al worker (cola DAILY_METRICS).
+ */
+import "dotenv/config";
+import { prisma } from "@mediabot/shared";
+import { connection, getQueue, QUEUE_NAMES } from "../queues.js";
+import { rebuildDailyMetrics } from "../analysis/daily-metrics.js";
+
+function argValue(name: string): string | undefined {
+  const index = process.argv.indexOf(name);
+  return index >= 0 ? process.argv[index + 1] : undefined;
+}
+
+async function main() {
+  const days = parseInt(argValue("--days") || "365", 10);
+  if (!Number.isFinite(days) || days < 1) {
+    console.error("Invalid --days");
+    process.exit(1);
+  }
+
+  const to = new Date();
+  const from = new Date(to.getTime() - (days - 1) * 24 * 60 * 60 * 1000);
+
+  if (process.argv.includes("--enqueue")) {
+    const queue = getQueue(QUEUE_NAMES.DAILY_METRICS);
+    const job = await queue.add("backfill-daily-metrics", {
+      from: from.toISOString(),
+      to: to.toISOString(),
+    });
+    console.log(`Enqueued daily metrics backfill job ${job.id} (${days} days)`);
+    await queue.close();
+  } else {
+    const started = Date.now();
+    const result = await rebuildDailyMetrics(from, to);
+    console.log(`\nDays:     ${result.days}`);
+    console.log(`Rows:     ${result.rows}`);
+    console.log(`Duration: ${((Date.now() - started) / 1000).toFixed(1)}s`);
+  }
+
+  await prisma.$disconnect();
+  await connection.quit();
+  process.exit(0);
+}
+
+main().catch((err) => {
+  console.error("Daily metrics backfill failed:", err);
+  process.exit(1);
+});
@@ -0,0 +1,58 @@
+/**
+ * Evaluación offline del triage local contra las etiquetas de Gemini.
+ * Entrena con el 80% más antiguo de las menciones etiquetadas, evalúa sobre el
+ * 20% más reciente y reporta exactitud y fracción de llamadas evitadas por umbral.
+ * Usage: npx tsx packages/workers/src/scripts/evaluate-triage.ts [--limit=20000]
+ */
+import "dotenv/config";
+import { prisma } from "@mediabot/shared";
+import { connection } from "../queues.js";
+import { evaluateTriageModel, trainTriageModel } from "../analysis/triage-model.js";
+import { loadTriageExamples } from "../analysis/triage.js";
+
+const THRESHOLDS = [0.7, 0.8, 0.9, 0.95];
+const TRAIN_SPLIT = 0.8;
+
+function parseLimit(): number {
+  const arg = process.argv.find((a) => a.startsWith("--limit="));
+  return arg ? parseInt(arg.split("=")[1], 10) : 20000;
+}
+
+const pct = (v: number) => `${(v * 100).toFixed(1)}%`.padStart(7);
+
+async function main() {
+  const examples = await loadTriageExamples(parseLimit());
+  const splitAt = Math.floor(examples.length * TRAIN_SPLIT);
+  const train = examples.slice(0, splitAt);
+  const test = examples.slice(splitAt);
+
+  console.log(`Labeled mentions: ${examples.length} (train ${train.length}, test ${test.length})`);
+  if (train.length === 0 || test.length === 0) {
+    console.log("Not enough labeled mentions to evaluate");
+  } else {
+    const model = trainTriageModel(train);
+
+    console.log("");
+    console.log("threshold | sentiment acc | relevance acc | prefilter avoided (acc) | analysis avoided (acc)");
+    for (const threshold of THRESHOLDS) {
+      const r = evaluateTriageModel(model, test, threshold);
+      console.log(
+        `${threshold.toFixed(2).padStart(9)} | ${pct(r.sentimentAccuracy).padStart(13)} | ` +
+        `${pct(r.relevanceAccuracy).padStart(13)} | ` +
+        `${pct(r.preFilterAvoided)} (${pct(r.preFilterConfidentAccuracy)})`.padEnd(23) + " | " +
+        `${pct(r.analysisAvoided)} (${pct(r.analysisConfidentAccuracy)})`
+      );
+    }
+    console.log("");
+    console.log("avoided = share of Gemini calls resolved locally; acc in parentheses = agreement with Gemini on those cases");
+  }
+
+  await connection.quit();
+  await prisma.$disconnect();
+  process.exit(0);
+}
+
+main().catch((err) => {
+  console.error("Evaluate triage script failed:", err);
+  process.exit(1);
+});
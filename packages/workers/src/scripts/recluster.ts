@@ -0,0 +1,65 @@
+/**
+ * Re-clustering offline de las menciones de un cliente en un rango de fechas.
+ * Usage:
+ *   npx tsx packages/workers/src/scripts/recluster.ts --client <clientId> [--from YYYY-MM-DD] [--to YYYY-MM-DD] [--dry-run] [--enqueue]
+ *
+ * Por defecto procesa los últimos 30 días en este proceso e imprime el
+ * reporte antes/después. Con --enqueue lo delega al worker (cola RECLUSTER).
+ */
+import "dotenv/config";
+import { prisma } from "@mediabot/shared";
+import { connection, getQueue, QUEUE_NAMES } from "../queues.js";
+import { reclusterClientMentions } from "../analysis/recluster.js";
+
+function argValue(name: string): string | undefined {
+  const index = process.argv.indexOf(name);
+  return index >= 0 ? process.argv[index + 1] : undefined;
+}
+
+async function main() {
+  const clientId = argValue("--client");
+  if (!clientId) {
+    console.error("Missing --client <clientId>");
+    process.exit(1);
+  }
+
+  const to = argValue("--to") ? new Date(`${argValue("--to")}T23:59:59.999Z`) : new Date();
+  const from = argValue("--from")
+    ? new Date(`${argValue("--from")}T00:00:00.000Z`)
+    : new Date(to.getTime() - 30 * 24 * 60 * 60 * 1000);
+  const dryRun = process.argv.includes("--dry-run");
+
+  if (isNaN(from.getTime()) || isNaN(to.getTime()) || from > to) {
+    console.error("Invalid --from/--to range");
+    process.exit(1);
+  }
+
+  if (process.argv.includes("--enqueue")) {
+    const queue = getQueue(QUEUE_NAMES.RECLUSTER);
+    const job = await queue.add("recluster", {
+      clientId,
+      from: from.toISOString(),
+      to: to.toISOString(),
+      dryRun,
+    });
+    console.log(`Enqueued recluster job ${job.id} for client ${clientId}`);
+    await queue.close();
+  } else {
+    const report = await reclusterClientMentions({ clientId, from, to, dryRun });
+    console.log(`\nMentions:        ${report.mentions}`);
+    console.log(`Candidate pairs: ${report.candidatePairs}`);
+    console.log(`Clusters:        ${report.clustersBefore} -> ${report.clustersAfter}`);
+    console.log(`Clustered:       ${report.clusteredBefore} -> ${report.clusteredAfter}`);
+    console.log(`Updated:         ${report.updated}${dryRun ? " (dry run)" : ""}`);
+    console.log(`Duration:        ${(report.durationMs / 1000).toFixed(1)}s`);
+  }
+
+  await prisma.$disconnect();
+  await connection.quit();
+  process.exit(0);
+}
+
+main().catch((err) => {
+  console.error("Recluster script failed:", err);
+  process.exit(1);
+});
@@ -0,0 +1,41 @@
+/**
+ * Entrena el modelo local de triage con las etiquetas de Gemini guardadas en
+ * Mention y lo publica en Redis (los workers lo recargan cada 10 minutos).
+ * Usage: npx tsx packages/workers/src/scripts/train-triage.ts [--limit=20000]
+ */
+import "dotenv/config";
+import { prisma } from "@mediabot/shared";
+import { connection } from "../queues.js";
+import { trainTriageModel } from "../analysis/triage-model.js";
+import { loadTriageExamples, saveTriageModel } from "../analysis/triage.js";
+
+/** Mínimo de ejemplos para que el modelo sea útil */
+const MIN_EXAMPLES = 200;
+
+function parseLimit(): number {
+  const arg = process.argv.find((a) => a.startsWith("--limit="));
+  return arg ? parseInt(arg.split("=")[1], 10) : 20000;
+}
+
+async function main() {
+  const examples = await loadTriageExamples(parseLimit());
+  console.log(`Loaded ${examples.length} labeled mentions`);
+
+  if (examples.length < MIN_EXAMPLES) {
+    console.log(`Not enough labeled mentions (min ${MIN_EXAMPLES}), model not saved`);
+  } else {
+    const start = Date.now();
+    const model = trainTriageModel(examples);
+    await saveTriageModel(model);
+    console.log(`Triage model trained in ${Date.now() - start}ms and saved to Redis`);
+  }
+
+  await connection.quit();
+  await prisma.$disconnect();
+  process.exit(0);
+}
+
+main().catch((err) => {
+  console.error("Train triage script failed:", err);
+  process.exit(1);
+});
@@ -0,0 +1,359 @@
+/**
+ * Evaluación en lote de reglas de alerta.
+ *
+ * En vez de 1-10 COUNT por regla, se juntan las ventanas de tiempo que piden
+ * todas las reglas, se ejecuta una consulta agrupada por ventana distinta
+ * (`GROUP BY clientId, sentiment`) y cada regla se evalúa en memoria sobre ese
+ * resultado. El número de consultas depende de cuántas ventanas distintas
+ * haya configuradas, no de cuántas reglas.
+ */
+import { prisma } from "@mediabot/shared";
+import { getAnomalyScores } from "../analysis/anomaly.js";
+import type { AnomalyScores } from "../analysis/anomaly-model.js";
+
+const HOUR_MS = 60 * 60 * 1000;
+const DAY_MS = 24 * HOUR_MS;
+
+/** -log10 p mínimo para VOLUME_SURGE con línea base (p <= 0.01) */
+export const VOLUME_SURGE_MIN_SURPRISE = 2;
+
+export interface RuleForEvaluation {
+  id: string;
+  type: string;
+  clientId: string;
+  condition: unknown;
+  client: { orgId: string | null };
+}
+
+/**
+ * Ventana relativa a `now`: menciones con publishedAt en
+ * [now - sinceMs, now - untilMs), o sin límite superior si untilMs es null.
+ */
+export interface CountWindow {
+  sinceMs: number;
+  untilMs: number | null;
+}
+
+export interface ClientCounts {
+  total: number;
+  negative: number;
+}
+
+/**
+ * Resultado de una regla: si se cumple y el valor de la métrica que se compara
+ * contra el umbral (conteo, % de aumento o puntos de caída según el tipo).
+ */
+export interface RuleEvaluation {
+  triggered: boolean;
+  value: number | null;
+}
+
+export interface EvaluationContext {
+  /** windowKey → clientId → conteos */
+  counts: Map<string, Map<string, ClientCounts>>;
+  /** orgId → ids de todos sus clientes */
+  orgClients: Map<string, string[]>;
+  /** clientId de la regla → ids de clientes competidores (misma org, activos) */
+  competitorClients: Map<string, string[]>;
+  /** clientId → puntajes de anomalía de 24 h (solo clientes con VOLUME_SURGE) */
+  anomalies: Map<string, AnomalyScores | null>;
+}
+
+export function windowKey(window: CountWindow): string {
+  return `${window.sinceMs}:${window.untilMs ?? "open"}`;
+}
+
+function conditionOf(rule: RuleForEvaluation): Record<string, number> {
+  return (rule.condition ?? {}) as Record<string, number>;
+}
+
+/** Ventana actual y anterior de `days` días */
+function periodWindows(days: number): { current: CountWindow; previous: CountWindow } {
+  return {
+    current: { sinceMs: days * DAY_MS, untilMs: null },
+    previous: { sinceMs: 2 * days * DAY_MS, untilMs: days * DAY_MS },
+  };
+}
+
+/**
+ * Ventanas de conteo que necesita una regla.
+ */
+export function ruleWindows(rule: RuleForEvaluation): CountWindow[] {
+  const condition = conditionOf(rule);
+
+  switch (rule.type) {
+    case "NEGATIVE_SPIKE":
+      return [{ sinceMs: (condition.timeWindowHours ?? 24) * HOUR_MS, untilMs: null }];
+    case "VOLUME_SURGE":
+      return [
+        { sinceMs: DAY_MS, untilMs: null },
+        { sinceMs: (condition.comparisonDays ?? 7) * DAY_MS, untilMs: DAY_MS },
+      ];
+    case "NO_MENTIONS":
+      return [{ sinceMs: (condition.hours ?? 48) * HOUR_MS, untilMs: null }];
+    case "SOV_DROP":
+    case "COMPETITOR_SPIKE":
+    case "SENTIMENT_SHIFT": {
+      const { current, previous } = periodWindows(condition.days ?? 7);
+      return [current, previous];
+    }
+    default:
+      return [];
+  }
+}
+
+function countsFor(ctx: EvaluationContext, window: CountWindow, clientId: string): ClientCounts {
+  return ctx.counts.get(windowKey(window))?.get(clientId) ?? { total: 0, negative: 0 };
+}
+
+function sumTotals(ctx: EvaluationContext, window: CountWindow, clientIds: string[]): number {
+  return clientIds.reduce((sum, id) => sum + countsFor(ctx, window, id).total, 0);
+}
+
+/**
+ * Evalúa una regla sobre los conteos ya cargados. Misma semántica que la
+ * evaluación por regla original.
+ */
+export function evaluateRuleInMemory(rule: RuleForEvaluation, ctx: EvaluationContext): RuleEvaluation {
+  const condition = conditionOf(rule);
+  const windows = ruleWindows(rule);
+
+  switch (rule.type) {
+    case "NEGATIVE_SPIKE": {
+      const threshold = condition.threshold ?? 5;
+      const negative = countsFor(ctx, windows[0], rule.clientId).negative;
+      return { triggered: negative >= threshold, value: negative };
+    }
+
+    case "VOLUME_SURGE": {
+      const percentageIncrease = condition.percentageIncrease ?? 50;
+      const comparisonDays = condition.comparisonDays ?? 7;
+
+      // Con línea base estacional: últimas 24 h contra lo esperado para esas
+      // horas, exigiendo además que el exceso sea estadísticamente improbable
+      const anomaly = ctx.anomalies.get(rule.clientId);
+      if (anomaly) {
+        const { observed, expected, surprise } = anomaly.total;
+        const increase = ((observed - expected) / Math.max(expected, 1)) * 100;
+        return { triggered: increase >= percentageIncrease && surprise >= VOLUME_SURGE_MIN_SURPRISE, value: increase };
+      }
+
+      const currentCount = countsFor(ctx, windows[0], rule.clientId).total;
+      const historicalCount = countsFor(ctx, windows[1], rule.clientId).total;
+      const dailyAverage = historicalCount / Math.max(comparisonDays - 1, 1);
+      if (dailyAverage === 0) return { triggered: currentCount > 0, value: null };
+      const increase = ((currentCount - dailyAverage) / dailyAverage) * 100;
+      return { triggered: increase >= percentageIncrease, value: increase };
+    }
+
+    case "NO_MENTIONS": {
+      const total = countsFor(ctx, windows[0], rule.clientId).total;
+      return { triggered: total === 0, value: total };
+    }
+
+    case "SOV_DROP": {
+      const dropThreshold = condition.dropThreshold ?? 10;
+      const orgId = rule.client.orgId;
+      if (!orgId) return { triggered: false, value: null };
+      const orgClientIds = ctx.orgClients.get(orgId) ?? [];
+      const [current, previous] = windows;
+
+      const currentTotal = sumTotals(ctx, current, orgClientIds);
+      const previousTotal = sumTotals(ctx, previous, orgClientIds);
+      const currentSOV = currentTotal > 0 ? (countsFor(ctx, current, rule.clientId).total / currentTotal) * 100 : 0;
+      const previousSOV = previousTotal > 0 ? (countsFor(ctx, previous, rule.clientId).total / previousTotal) * 100 : 0;
+
+      if (previousSOV === 0) return { triggered: false, value: null };
+      const drop = previousSOV - currentSOV;
+      return { triggered: drop >= dropThreshold, value: drop };
+    }
+
+    case "COMPETITOR_SPIKE": {
+      const spikeThreshold = condition.spikeThreshold ?? 30;
+      const [current, previous] = windows;
+      let maxIncrease: number | null = null;
+
+      for (const competitorId of ctx.competitorClients.get(rule.clientId) ?? []) {
+        const currentCount = countsFor(ctx, current, competitorId).total;
+        const previousCount = countsFor(ctx, previous, competitorId).total;
+
+        if (previousCount === 0 && currentCount > 0) return { triggered: true, value: null };
+        if (previousCount > 0) {
+          const increase = ((currentCount - previousCount) / previousCount) * 100;
+          if (increase >= spikeThreshold) return { triggered: true, value: increase };
+          maxIncrease = Math.max(maxIncrease ?? increase, increase);
+        }
+      }
+      return { triggered: false, value: maxIncrease };
+    }
+
+    case "SENTIMENT_SHIFT": {
+      const shiftThreshold = condition.shiftThreshold ?? 15;
+      const current = countsFor(ctx, windows[0], rule.clientId);
+      const previous = countsFor(ctx, windows[1], rule.clientId);
+
+      const currentNegPct = current.total > 0 ? (current.negative / current.total) * 100 : 0;
+      const previousNegPct = previous.total > 0 ? (previous.negative / previous.total) * 100 : 0;
+
+      if (previous.total === 0) return { triggered: false, value: null };
+      const shift = currentNegPct - previousNegPct;
+      return { triggered: shift >= shiftThreshold, value: shift };
+    }
+
+    default:
+      return { triggered: false, value: null };
+  }
+}
+
+/**
+ * Una consulta agrupada por cliente y sentimiento para una ventana.
+ * Dos variantes en lugar de un filtro condicional (ver nota sobre
+ * Prisma.empty en los routers).
+ */
+async function loadWindowCounts(
+  window: CountWindow,
+  clientIds: string[],
+  now: number
+): Promise<Map<string, ClientCounts>> {
+  const since = new Date(now - window.sinceMs);
+  const rows =
+    window.untilMs === null
+      ? await prisma.$queryRaw<{ clientId: string; sentiment: string; count: number }[]>`
+          SELECT "clientId", sentiment::text AS sentiment, COUNT(*)::int AS count
+          FROM "Mention"
+          WHERE "clientId" = ANY(${clientIds})
+            AND "publishedAt" >= ${since}
+          GROUP BY 1, 2
+        `
+      : await prisma.$queryRaw<{ clientId: string; sentiment: string; count: number }[]>`
+          SELECT "clientId", sentiment::text AS sentiment, COUNT(*)::int AS count
+          FROM "Mention"
+          WHERE "clientId" = ANY(${clientIds})
+            AND "publishedAt" >= ${since}
+            AND "publishedAt" < ${new Date(now - window.untilMs)}
+          GROUP BY 1, 2
+        `;
+
+  const counts = new Map<string, ClientCounts>();
+  for (const row of rows) {
+    const entry = counts.get(row.clientId) ?? { total: 0, negative: 0 };
+    entry.total += row.count;
+    if (row.sentiment === "NEGATIVE") entry.negative += row.count;
+    counts.set(row.clientId, entry);
+  }
+  return counts;
+}
+
+/**
+ * Carga todo lo que necesitan las reglas (una consulta por ventana distinta,
+ * clientes de las orgs y competidores una vez) y las evalúa en memoria.
+ * Retorna ruleId → resultado.
+ */
+export async function evaluateRules(
+  rules: RuleForEvaluation[],
+  now: number = Date.now()
+): Promise<Map<string, RuleEvaluation>> {
+  const results = new Map<string, RuleEvaluation>();
+  if (rules.length === 0) return results;
+
+  const windows = new Map<string, CountWindow>();
+  for (const rule of rules) {
+    for (const window of ruleWindows(rule)) windows.set(windowKey(window), window);
+  }
+
+  // Clientes de las orgs con reglas que comparan contra otros clientes
+  const orgIds = [
+    ...new Set(
+      rules
+        .filter((r) => (r.type === "SOV_DROP" || r.type === "COMPETITOR_SPIKE") && r.client.orgId)
+        .map((r) => r.client.orgId as string)
+    ),
+  ];
+  const competitorRuleClients = [...new Set(rules.filter((r) => r.type === "COMPETITOR_SPIKE").map((r) => r.clientId))];
+  const volumeSurgeClients = [...new Set(rules.filter((r) => r.type === "VOLUME_SURGE").map((r) => r.clientId))];
+
+  const [orgClientRows, clientCompetitors, anomalyEntries] = await Promise.all([
+    orgIds.length > 0
+      ? prisma.client.findMany({
+          where: { orgId: { in: orgIds } },
+          select: { id: true, name: true, orgId: true, active: true },
+        })
+      : Promise.resolve([]),
+    competitorRuleClients.length > 0
+      ? prisma.clientCompetitor.findMany({
+          where: { clientId: { in: competitorRuleClients } },
+          include: { competitor: true },
+        })
+      : Promise.resolve([]),
+    Promise.all(
+      volumeSurgeClients.map(async (clientId) => {
+        const scores = await getAnomalyScores(clientId, 24 * 60).catch((error) => {
+          console.error(`[AlertRulesWorker] Anomaly lookup failed for client ${clientId}:`, error);
+          return null;
+        });
+        return [clientId, scores] as const;
+      })
+    ),
+  ]);
+
+  const orgClients = new Map<string, string[]>();
+  for (const client of orgClientRows) {
+    if (!client.orgId) continue;
+    const ids = orgClients.get(client.orgId) ?? [];
+    ids.push(client.id);
+    orgClients.set(client.orgId, ids);
+  }
+
+  // Competidores: clientes activos de la misma org cuyo nombre contiene el del competidor
+  const competitorClients = new Map<string, string[]>();
+  const ruleOrg = new Map(rules.map((r) => [r.clientId, r.client.orgId]));
+  for (const clientId of competitorRuleClients) {
+    const orgId = ruleOrg.get(clientId);
+    const names = clientCompetitors
+      .filter((cc) => cc.clientId === clientId)
+      .map((cc) => cc.competitor.name.toLowerCase());
+    if (!orgId || names.length === 0) continue;
+
+    competitorClients.set(
+      clientId,
+      orgClientRows
+        .filter(
+          (c) =>
+            c.orgId === orgId &&
+            c.active &&
+            c.id !== clientId &&
+            names.some((name) => c.name.toLowerCase().includes(name))
+        )
+        .map((c) => c.id)
+    );
+  }
+
+  const clientIds = [...new Set([...rules.map((r) => r.clientId), ...orgClientRows.map((c) => c.id)])];
+  const counts = new Map<string, Map<string, ClientCounts>>();
+  await Promise.all(
+    [...windows.entries()].map(async ([key, window]) => {
+      counts.set(key, await loadWindowCounts(window, clientIds, now));
+    })
+  );
+
+  const ctx: EvaluationContext = {
+    counts,
+    orgClients,
+    competitorClients,
+    anomalies: new Map(anomalyEntries),
+  };
+
+  for (const rule of rules) {
+    try {
+      results.set(rule.id, evaluateRuleInMemory(rule, ctx));
+    } catch (error) {
+      console.error(`[AlertRulesWorker] Error evaluating rule ${rule.id}:`, error);
+      results.set(rule.id, { triggered: false, value: null });
+    }
+  }
+
+  console.log(
+    `[AlertRulesWorker] Evaluated ${rules.length} rules with ${windows.size} window queries over ${clientIds.length} clients`
+  );
+  return results;
+}
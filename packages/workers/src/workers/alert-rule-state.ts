@@ -0,0 +1,175 @@
+/**
+ * Estado persistente de las reglas de alerta en Redis.
+ *
+ * Reemplaza al Map en memoria del worker: sobrevive a deploys y se comparte
+ * entre réplicas. Por regla se guarda si está disparada, cuándo notificó por
+ * última vez, el último valor evaluado y la racha de evaluaciones sin cumplirse.
+ *
+ * - Una regla notifica al pasar a disparada, y mientras siga disparada repite
+ *   como máximo una vez por ALERT_RULE_COOLDOWN_MS.
+ * - Histéresis: deja de estar disparada solo tras CLEAR_EVALUATIONS
+ *   evaluaciones seguidas sin cumplirse, para que una métrica que oscila
+ *   alrededor del umbral no genere avisos nuevos en cada corrida.
+ * - Si cambia la condición de la regla, el estado se reinicia.
+ *
+ * También cachea los admins/supervisores de cada org que reciben la
+ * notificación in-app, para no consultar usuarios por cada regla disparada.
+ * La web borra la entrada de la org al crear usuarios o cambiar roles
+ * (invalidateOrgAdminCache).
+ */
+import { prisma, ORG_ADMINS_KEY_PREFIX } from "@mediabot/shared";
+import { connection } from "../queues.js";
+import type { RuleEvaluation } from "./alert-rule-evaluator.js";
+
+const STATE_KEY_PREFIX = "alert-rule:state:";
+
+/** Intervalo mínimo entre notificaciones de una regla que sigue disparada */
+export const ALERT_RULE_COOLDOWN_MS = 60 * 60 * 1000;
+/** Evaluaciones seguidas sin cumplirse para considerar la regla resuelta */
+export const CLEAR_EVALUATIONS = 2;
+
+/** Reglas inactivas o borradas expiran solas */
+const STATE_TTL_SECONDS = 30 * 24 * 60 * 60;
+const ORG_ADMINS_TTL_SECONDS = 10 * 60;
+
+export interface AlertRuleState {
+  firing: boolean;
+  lastFiredAt: number | null;
+  lastValue: number | null;
+  lastEvaluatedAt: number | null;
+  /** Evaluaciones seguidas sin cumplirse desde que se disparó */
+  clearStreak: number;
+  /** Condición con la que se calculó el estado */
+  conditionKey: string | null;
+}
+
+const EMPTY_STATE: AlertRuleState = {
+  firing: false,
+  lastFiredAt: null,
+  lastValue: null,
+  lastEvaluatedAt: null,
+  clearStreak: 0,
+  conditionKey: null,
+};
+
+function stateKey(ruleId: string): string {
+  return `${STATE_KEY_PREFIX}${ruleId}`;
+}
+
+export function conditionKeyOf(condition: unknown): string {
+  return JSON.stringify(condition ?? {});
+}
+
+/**
+ * Siguiente estado de una regla y si corresponde notificar. Función pura.
+ */
+export function nextRuleState(
+  previous: AlertRuleState | null,
+  evaluation: RuleEvaluation,
+  conditionKey: string,
+  now: number
+): { state: AlertRuleState; notify: boolean } {
+  const prev =
+    previous && previous.conditionKey === conditionKey
+      ? previous
+      : { ...EMPTY_STATE, lastFiredAt: previous?.lastFiredAt ?? null };
+
+  if (evaluation.triggered) {
+    const notify = !prev.firing || prev.lastFiredAt === null || now - prev.lastFiredAt >= ALERT_RULE_COOLDOWN_MS;
+    return {
+      notify,
+      state: {
+        firing: true,
+        lastFiredAt: notify ? now : prev.lastFiredAt,
+        lastValue: evaluation.value,
+        lastEvaluatedAt: now,
+        clearStreak: 0,
+        conditionKey,
+      },
+    };
+  }
+
+  const clearStreak = prev.firing ? prev.clearStreak + 1 : 0;
+  return {
+    notify: false,
+    state: {
+      firing: prev.firing && clearStreak < CLEAR_EVALUATIONS,
+      lastFiredAt: prev.lastFiredAt,
+      lastValue: evaluation.value,
+      lastEvaluatedAt: now,
+      clearStreak: prev.firing && clearStreak < CLEAR_EVALUATIONS ? clearStreak : 0,
+      conditionKey,
+    },
+  };
+}
+
+/**
+ * Estado de varias reglas con un solo MGET.
+ */
+export async function loadRuleStates(ruleIds: string[]): Promise<Map<string, AlertRuleState>> {
+  const states = new Map<string, AlertRuleState>();
+  if (ruleIds.length === 0) return states;
+
+  const values = await connection.mget(...ruleIds.map(stateKey));
+  ruleIds.forEach((ruleId, i) => {
+    const raw = values[i];
+    if (!raw) return;
+    try {
+      states.set(ruleId, { ...EMPTY_STATE, ...(JSON.parse(raw) as Partial<AlertRuleState>) });
+    } catch {
+      // Estado corrupto: se trata como regla nueva
+    }
+  });
+  return states;
+}
+
+export async function saveRuleStates(states: Map<string, AlertRuleState>): Promise<void> {
+  if (states.size === 0) return;
+
+  const pipeline = connection.pipeline();
+  for (const [ruleId, state] of states) {
+    pipeline.set(stateKey(ruleId), JSON.stringify(state), "EX", STATE_TTL_SECONDS);
+  }
+  await pipeline.exec();
+}
+
+/**
+ * Ids de ADMIN/SUPERVISOR por org. Lee la caché de Redis y resuelve todas las
+ * orgs faltantes con una sola consulta.
+ */
+export async function getOrgAdminIds(orgIds: string[]): Promise<Map<string, string[]>> {
+  const unique = [...new Set(orgIds)];
+  const admins = new Map<string, string[]>();
+  if (unique.length === 0) return admins;
+
+  const cached = await connection.mget(...unique.map((orgId) => `${ORG_ADMINS_KEY_PREFIX}${orgId}`));
+  const missing: string[] = [];
+  unique.forEach((orgId, i) => {
+    const raw = cached[i];
+    if (raw) {
+      admins.set(orgId, JSON.parse(raw) as string[]);
+    } else {
+      missing.push(orgId);
+    }
+  });
+
+  if (missing.length > 0) {
+    const users = await prisma.user.findMany({
+      where: { orgId: { in: missing }, role: { in: ["ADMIN", "SUPERVISOR"] } },
+      select: { id: true, orgId: true },
+    });
+
+    for (const orgId of missing) admins.set(orgId, []);
+    for (const user of users) {
+      if (user.orgId) admins.get(user.orgId)?.push(user.id);
+    }
+
+    const pipeline = connection.pipeline();
+    for (const orgId of missing) {
+      pipeline.set(`${ORG_ADMINS_KEY_PREFIX}${orgId}`, JSON.stringify(admins.get(orgId)), "EX", ORG_ADMINS_TTL_SECONDS);
+    }
+    await pipeline.exec();
+  }
+
+  return admins;
+}
@@ -0,0 +1,28 @@
+/**
+ * Worker de la cola CRISIS_CHECK: reconcilia periódicamente los contadores
+ * de menciones negativas en Redis contra Postgres (cada 5 minutos).
+ */
+import { Worker } from "bullmq";
+import { connection, QUEUE_NAMES } from "../queues.js";
+import { getSettingNumber, config } from "@mediabot/shared";
+import { reconcileCrisisCounters } from "../analysis/crisis-counters.js";
+
+export function startCrisisCheckWorker() {
+  const worker = new Worker(
+    QUEUE_NAMES.CRISIS_CHECK,
+    async () => {
+      const windowMinutes = await getSettingNumber("crisis.window_minutes", config.crisis.windowMinutes);
+      const result = await reconcileCrisisCounters(windowMinutes);
+      console.log(
+        `[Crisis] Contadores reconciliados: ${result.clients} clientes, ${result.mentions} menciones negativas en ${windowMinutes} min`
+      );
+    },
+    { connection, concurrency: 1 }
+  );
+
+  worker.on("failed", (job, err) => {
+    console.error(`[Crisis] Job ${job?.id} failed:`, err.message);
+  });
+
+  console.log("🚨 Crisis counters worker started");
+}
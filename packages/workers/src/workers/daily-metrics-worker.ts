@@ -0,0 +1,45 @@
+/**
+ * Worker del rollup diario (ClientDailyMetrics).
+ *
+ * - "reconcile-daily-metrics" (cron): reconstruye los últimos días, donde
+ *   llegan menciones tardías y cambia el engagement social.
+ * - "backfill-daily-metrics": reconstruye un rango arbitrario. Se encola bajo
+ *   demanda (scripts/backfill-daily-metrics.ts).
+ */
+import { Worker } from "bullmq";
+import { connection, QUEUE_NAMES } from "../queues.js";
+import { rebuildDailyMetrics } from "../analysis/daily-metrics.js";
+
+/** Días que reconstruye la reconciliación (incluye hoy) */
+const RECONCILE_DAYS = parseInt(process.env.DAILY_METRICS_RECONCILE_DAYS || "3", 10);
+
+export interface BackfillDailyMetricsJobData {
+  /** ISO date */
+  from: string;
+  /** ISO date */
+  to: string;
+}
+
+export function startDailyMetricsWorker() {
+  const worker = new Worker(
+    QUEUE_NAMES.DAILY_METRICS,
+    async (job) => {
+      if (job.name === "backfill-daily-metrics") {
+        const { from, to } = job.data as BackfillDailyMetricsJobData;
+        console.log(`[DailyMetrics] Backfill ${from} → ${to}`);
+        return rebuildDailyMetrics(new Date(from), new Date(to));
+      }
+
+      const to = new Date();
+      const from = new Date(to.getTime() - (RECONCILE_DAYS - 1) * 24 * 60 * 60 * 1000);
+      return rebuildDailyMetrics(from, to);
+    },
+    { connection, concurrency: 1 }
+  );
+
+  worker.on("failed", (job, err) => {
+    console.error(`[DailyMetrics] Job ${job?.id} failed:`, err.message);
+  });
+
+  console.log("📊 Daily metrics worker started");
+}
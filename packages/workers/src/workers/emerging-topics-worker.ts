@@ -3,9 +3,17 @@ import { connection, QUEUE_NAMES, getQueue } from "../queues.js";
 import { prisma } from "@mediabot/shared";
 import { detectEmergingTopics } from "../analysis/topic-extractor.js";
 
+/**
+ * Crecimiento mínimo (tasa de 24h vs semana previa) para notificar un tema.
+ * Un tema sin historia con >= 3 menciones siempre lo supera.
+ */
+const EMERGING_MIN_GROWTH = 3;
+
 /**
  * Worker que detecta temas emergentes y envia notificaciones a Telegram.
  * Corre cada 4 horas por defecto (configurable via EMERGING_TOPICS_CRON).
+ * Por org: una consulta de detección, una de conteos por cliente y tema y
+ * una de notificaciones recientes.
  */
 export function startEmergingTopicsWorker() {
   // Worker principal que detecta temas emergentes
@@ -36,40 +44,57 @@ export function startEmergingTopicsWorker() {
         try {
           // Detectar temas emergentes para la organizacion
           const emergingTopics = await detectEmergingTopics(org.id, 24, 3);
-          const newTopics = emergingTopics.filter((t) => t.isNew);
+          const newTopics = emergingTopics.filter((t) => t.growth >= EMERGING_MIN_GROWTH);
 
           if (newTopics.length === 0) {
             console.log(`[EmergingTopics] Org ${org.name}: Sin temas nuevos emergentes`);
             continue;
           }
 
-          console.log(`[EmergingTopics] Org ${org.name}: ${newTopics.length} temas nuevos detectados`);
+          console.log(
+            `[EmergingTopics] Org ${org.name}: ${newTopics.length} temas emergentes detectados ` +
+            `(${newTopics.filter((t) => t.isNew).length} nuevos)`
+          );
+
+        const since24h = new Date(Date.now() - 24 * 60 * 60 * 1000);
+        const topicNames = newTopics.map((t) => t.topic);
+        const clientIds = org.clients.map((c) => c.id);
+
+        // Menciones de 24h por cliente y tema, y notificaciones ya enviadas, de una vez
+        const [clientTopicCounts, recentNotifications] = await Promise.all([
+          prisma.mention.groupBy({
+            by: ["clientId", "topic"],
+            where: {
+              clientId: { in: clientIds },
+              topic: { in: topicNames },
+              createdAt: { gte: since24h },
+            },
+            _count: { _all: true },
+          }),
+          prisma.emergingTopicNotification.findMany({
+            where: {
+              clientId: { in: clientIds },
+              topic: { in: topicNames },
+              createdAt: { gte: since24h },
+            },
+            select: { clientId: true, topic: true },
+          }),
+        ]);
 
-        // Para cada tema nuevo, verificar que clientes tienen menciones
+        const mentionCounts = new Map(clientTopicCounts.map((r) => [`${r.clientId}:${r.topic}`, r._count._all]));
+        const notified = new Set(recentNotifications.map((n) => `${n.clientId}:${n.topic}`));
+
+        // Para cada tema emergente, verificar que clientes tienen menciones
         for (const topic of newTopics) {
           for (const client of org.clients) {
             // Verificar si el cliente tiene menciones de este tema
-            const mentionCount = await prisma.mention.count({
-              where: {
-                clientId: client.id,
-                topic: topic.topic,
-                createdAt: { gte: new Date(Date.now() - 24 * 60 * 60 * 1000) },
-              },
-            });
+            const mentionCount = mentionCounts.get(`${client.id}:${topic.topic}`) ?? 0;
 
             if (mentionCount === 0) continue;
             if (!client.telegramGroupId) continue;
 
             // Verificar que no hayamos notificado este tema para este cliente en las ultimas 24h
-            const recentNotification = await prisma.emergingTopicNotification.findFirst({
-              where: {
-                clientId: client.id,
-                topic: topic.topic,
-                createdAt: { gte: new Date(Date.now() - 24 * 60 * 60 * 1000) },
-              },
-            });
-
-            if (recentNotification) {
+            if (notified.has(`${client.id}:${topic.topic}`)) {
               console.log(`[EmergingTopics] Ya notificado: ${topic.topic} para ${client.name}`);
               continue;
             }
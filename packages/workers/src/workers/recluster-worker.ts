@@ -0,0 +1,40 @@
+/**
+ * Worker de re-clustering offline: reconstruye los clusters de un cliente
+ * para un rango de fechas. Se encola bajo demanda (scripts/recluster.ts).
+ */
+import { Worker } from "bullmq";
+import { connection, QUEUE_NAMES } from "../queues.js";
+import { reclusterClientMentions } from "../analysis/recluster.js";
+
+export interface ReclusterJobData {
+  clientId: string;
+  /** ISO date */
+  from: string;
+  /** ISO date */
+  to: string;
+  dryRun?: boolean;
+}
+
+export function startReclusterWorker() {
+  const worker = new Worker<ReclusterJobData>(
+    QUEUE_NAMES.RECLUSTER,
+    async (job) => {
+      const { clientId, from, to, dryRun } = job.data;
+      console.log(`[Recluster] Re-clustering client ${clientId} (${from} → ${to})${dryRun ? " [dry run]" : ""}`);
+
+      return reclusterClientMentions({
+        clientId,
+        from: new Date(from),
+        to: new Date(to),
+        dryRun,
+      });
+    },
+    { connection, concurrency: 1 }
+  );
+
+  worker.on("failed", (job, err) => {
+    console.error(`[Recluster] Job ${job?.id} failed:`, err.message);
+  });
+
+  console.log("🧩 Recluster worker started");
+}
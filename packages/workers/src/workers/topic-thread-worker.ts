@@ -1,18 +1,26 @@
 /**
  * Workers para Topic Threads (Sprint 19).
  * - Cierre automático de threads inactivos (cron cada 6h)
+ * - Reconciliación de stats incrementales de threads (cron cada hora, misma cola)
  * - Extracción de topics para SocialMentions
  */
 import { Worker } from "bullmq";
 import { connection, QUEUE_NAMES } from "../queues.js";
 
 /**
- * Worker cron que cierra threads inactivos (sin menciones en 72h).
+ * Worker cron que cierra threads inactivos (sin menciones en 72h). Los jobs
+ * "reconcile-thread-stats" de la misma cola recalculan las stats de los
+ * threads activos.
  */
 export function startCloseInactiveThreadsWorker() {
   const worker = new Worker(
     QUEUE_NAMES.CLOSE_INACTIVE_THREADS,
-    async () => {
+    async (job) => {
+      if (job.name === "reconcile-thread-stats") {
+        const { reconcileThreadStats } = await import("../analysis/topic-thread-manager.js");
+        return reconcileThreadStats();
+      }
+
       console.log("[TopicThreadWorker] Checking for inactive threads...");
       const { closeInactiveThreads } = await import("../analysis/topic-thread-manager.js");
       const closed = await closeInactiveThreads();